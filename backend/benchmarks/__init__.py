@@ -0,0 +1,15 @@
+"""
+API Benchmarks and Synthetic Data
+Boots `server:app` against a local MongoDB database seeded to a chosen volume,
+drives a weighted mix of realistic requests from concurrent async clients and
+records RPS and p50/p95/p99 latency per endpoint as JSON.
+
+    cd backend
+    python -m benchmarks run --leads 20000 --duration 60 --clients 50
+    python -m benchmarks compare benchmarks/results/a.json benchmarks/results/b.json
+
+The same generator seeds development and capacity-test databases
+(MONGO_URL / DB_NAME, as for the API):
+
+    python -m benchmarks seed --clients 50k --leads 1M --opps 200k --reset
+"""
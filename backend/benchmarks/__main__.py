@@ -0,0 +1,100 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(ROOT_DIR / '.env')
+sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.harness import run_benchmark, compare_results
+from benchmarks.generator import DEFAULT_BATCH_SIZE, DEFAULT_WRITERS, generate_dataset
+
+def count(value: str) -> int:
+    """Accept 50000, 50k or 1M"""
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:].lower(), 1)
+    try:
+        return int(float(value[:-1] if multiplier > 1 else value) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid count '{value}'")
+
+def date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}' (expected YYYY-MM-DD)")
+
+async def seed(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    started = time.monotonic()
+
+    def report(written):
+        print(f"\r{written['leads']:>10} leads  {written['opportunities']:>9} opportunities  "
+              f"{time.monotonic() - started:7.1f}s", end="", flush=True)
+
+    try:
+        written = await generate_dataset(
+            client[args.db_name], args.clients, args.leads, args.opps, args.users,
+            seed=args.seed, anchor=args.anchor, writers=args.writers,
+            batch_size=args.batch_size, reset=args.reset, progress=report,
+        )
+    finally:
+        client.close()
+    print(f"\nGenerated in {time.monotonic() - started:.1f}s into {args.db_name}:")
+    for name, total in written.items():
+        print(f"  {name:<18}{total:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="API load and latency benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Seed, boot the API and drive the mixed workload")
+    run.add_argument("--mongo-url", default=os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+    run.add_argument("--db-name", default=os.environ.get("BENCH_DB_NAME", "crm_benchmark"))
+    run.add_argument("--clients-data", type=count, default=2000, help="Client records to generate")
+    run.add_argument("--leads", type=count, default=20000, help="Lead records to generate")
+    run.add_argument("--opportunities", type=count, default=8000, help="Opportunity records to generate")
+    run.add_argument("--users", type=count, default=50, help="Users (record owners) to generate")
+    run.add_argument("--reseed", action="store_true", help="Drop and reseed the benchmark database (only one it generated)")
+    run.add_argument("--clients", type=int, default=50, help="Concurrent virtual users")
+    run.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    run.add_argument("--warmup", type=float, default=10, help="Unmeasured seconds before measuring")
+    run.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    run.add_argument("--port", type=int, default=8765)
+    run.add_argument("--url", default=None, help="Benchmark an already running server instead of booting one")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+
+    generate = commands.add_parser("seed", help="Generate a synthetic dataset, e.g. --clients 50k --leads 1M --opps 200k")
+    # Same target as `run`: the app's database (DB_NAME) is only written when named explicitly
+    generate.add_argument("--mongo-url", default=os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+    generate.add_argument("--db-name", default=os.environ.get("BENCH_DB_NAME", "crm_benchmark"))
+    generate.add_argument("--clients", type=count, default=200)
+    generate.add_argument("--leads", type=count, default=2000)
+    generate.add_argument("--opps", type=count, default=600)
+    generate.add_argument("--users", type=count, default=25)
+    generate.add_argument("--seed", type=int, default=42)
+    generate.add_argument("--anchor", type=date, default=None, help="'Today' of the generated history (default: today)")
+    generate.add_argument("--writers", type=int, default=DEFAULT_WRITERS, help="Concurrent insert_many writers")
+    generate.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    generate.add_argument("--reset", action="store_true", help="Empty the generated collections first")
+
+    compare = commands.add_parser("compare", help="Diff two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        asyncio.run(run_benchmark(args))
+    elif args.command == "seed":
+        asyncio.run(seed(args))
+    else:
+        compare_results(args.baseline, args.candidate)
+
+if __name__ == "__main__":
+    main()
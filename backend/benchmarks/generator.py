@@ -0,0 +1,547 @@
+"""
+Synthetic Data Generator
+Produces a referentially consistent CRM dataset of any size for benchmarks
+and capacity tests:
+
+    users -> clients -> leads (status logs, attachments)
+          -> opportunities (same task_id as their lead)
+          -> SOWs / projects for won deals, action items, sales activities
+
+Documents are built in fixed-size batches, each from its own RNG seeded by
+(seed, entity, batch), so the output depends only on the seed, the volumes
+and the anchor date - not on how many writers run. Batches are written with
+unordered insert_many by a pool of writer coroutines fed through a bounded
+queue, so generation and I/O overlap without holding the dataset in memory.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import asyncio
+import random
+import uuid
+from utils.auth import TEMP_PASSWORD, get_password_hash
+from utils.client_rollups import reconcile_client_rollups
+from utils.daily_buckets import rebuild_daily_buckets
+from utils.collection_versions import bump_collection_version
+from utils.dedup import build_dedup_keys
+from utils.lead_status import create_status_change_log
+
+REGIONS = {
+    "North America": ["United States", "Canada"],
+    "Europe": ["United Kingdom", "Germany", "France", "Netherlands"],
+    "Asia Pacific": ["India", "Singapore", "Australia", "Japan"],
+    "Middle East": ["United Arab Emirates", "Saudi Arabia"],
+    "South America": ["Brazil", "Argentina", "Colombia"],
+}
+INDUSTRIES = ["Banking", "Insurance", "Retail", "Healthcare", "Manufacturing", "Telecom", "Energy", "Logistics"]
+SERVICE_TYPES = ["Data Engineering", "Analytics", "Cloud Migration", "AI/ML", "Managed Services"]
+LEAD_SOURCES = ["Website", "Referral", "Partner", "Event", "Cold Call", "LinkedIn"]
+USER_ROLES = ["Sales Head", "Presales Lead", "Presales Manager", "Presales Consultant", "Delivery Manager"]
+
+FIRST_NAMES = ["James", "Priya", "Wei", "Fatima", "Lucas", "Aisha", "Carlos", "Hannah", "Ravi", "Sofia",
+               "Daniel", "Mei", "Omar", "Elena", "Arjun", "Grace", "Mateo", "Yuki", "Noah", "Leila"]
+LAST_NAMES = ["Smith", "Sharma", "Chen", "Khan", "Silva", "Mueller", "Garcia", "Tanaka", "Brown", "Nair",
+              "Rossi", "Kim", "Haddad", "Novak", "Iyer", "Walker", "Costa", "Dubois", "Levi", "Okafor"]
+NAME_PREFIXES = ["North", "Blue", "Silver", "Apex", "Vertex", "Summit", "Harbor", "Pioneer", "Crescent", "Evergreen",
+                 "Iron", "Bright", "Atlas", "Nova", "Cedar", "Granite", "Falcon", "Orion", "Sterling", "Meridian"]
+NAME_ROOTS = ["wind", "stone", "bridge", "field", "gate", "point", "wave", "crest", "line", "path",
+              "light", "forge", "brook", "peak", "star", "vale", "port", "ridge", "leaf", "spring"]
+NAME_KINDS = ["Bank", "Insurance", "Retail", "Health", "Industries", "Telecom", "Energy", "Logistics",
+              "Holdings", "Systems", "Group", "Partners"]
+LEGAL_FORMS = ["Ltd", "Inc", "LLC", "GmbH", "Pvt Ltd", ""]
+
+# (value, weight)
+LEAD_STAGES = [("New", 30), ("In Progress", 35), ("Qualified", 10), ("Unqualified", 25)]
+OPPORTUNITY_STAGES = [
+    ("Prospecting", 24), ("Qualification", 18), ("Proposal", 16),
+    ("Negotiation", 10), ("Closed Won", 18), ("Closed Lost", 14),
+]
+WIN_PROBABILITY = {
+    "Prospecting": 10, "Qualification": 25, "Proposal": 50,
+    "Negotiation": 75, "Closed Won": 100, "Closed Lost": 0,
+}
+ACTIVITY_TYPES = [("Email", 40), ("Call", 35), ("Meeting", 20), ("Demo", 5)]
+ATTACHMENT_TYPES = [
+    ("Requirements.pdf", "application/pdf"),
+    ("Proposal.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ("Pricing.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ("Architecture.png", "image/png"),
+]
+
+# Share of opportunities whose won SOW was signed (and so became a project)
+SIGNED_SOW_RATE = 0.7
+
+GENERATED_COLLECTIONS = [
+    "users", "clients", "leads", "opportunities", "sows", "projects", "action_items", "sales_activities"
+]
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WRITERS = 4
+
+def _weighted(rng: random.Random, choices: List[Tuple[str, int]]) -> str:
+    return rng.choices([value for value, _ in choices], [weight for _, weight in choices])[0]
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _day(value: datetime) -> datetime:
+    """Calendar dates are stored as midnight UTC"""
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+class DatasetGenerator:
+    """Builds the documents; `generate_dataset` writes them"""
+
+    def __init__(
+        self, seed: int, clients: int, leads: int, opportunities: int, users: int,
+        anchor: datetime, batch_size: int = DEFAULT_BATCH_SIZE, first_task_number: int = 1
+    ):
+        if opportunities > leads:
+            raise ValueError("Every opportunity converts a lead, so opportunities cannot exceed leads")
+        if leads and not (clients and users):
+            raise ValueError("Leads need at least one client and one user")
+        self.seed = seed
+        self.counts = {"clients": clients, "leads": leads, "opportunities": opportunities, "users": users}
+        self.anchor = anchor
+        self.batch_size = batch_size
+        self.first_task_number = first_task_number
+        self.users: List[Dict[str, Any]] = []
+        self.users_by_region: Dict[str, List[Dict[str, Any]]] = {}
+        # Per client: (name, region, country, industry, created_at); leads reference these
+        self.client_profiles: List[Tuple[str, str, str, str, datetime]] = []
+
+    def rng(self, entity: str, batch: int) -> random.Random:
+        return random.Random(f"{self.seed}:{entity}:{batch}")
+
+    def batches(self, total: int) -> List[Tuple[int, int, int]]:
+        return [
+            (batch, start, min(start + self.batch_size, total))
+            for batch, start in enumerate(range(0, total, self.batch_size))
+        ]
+
+    def when(self, rng: random.Random, earliest: datetime, latest_days: float) -> datetime:
+        """A moment up to `latest_days` after `earliest`, never after the anchor"""
+        return min(self.anchor, earliest + timedelta(days=rng.uniform(0, latest_days), minutes=rng.randint(0, 1439)))
+
+    # ---- users and clients -------------------------------------------------
+
+    def build_users(self) -> List[Dict[str, Any]]:
+        rng = self.rng("users", 0)
+        password = get_password_hash(TEMP_PASSWORD)
+        regions = list(REGIONS)
+        users = []
+        for i in range(self.counts["users"]):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            # Every region gets an owner before any region gets a second one
+            assigned = [regions[i % len(regions)]]
+            if rng.random() < 0.3:
+                assigned.append(rng.choice(regions))
+            created_at = self.anchor - timedelta(days=rng.uniform(800, 1500))
+            users.append({
+                "id": _uuid(rng),
+                "full_name": f"{first} {last} {i + 1}",
+                "email": f"{first.lower()}.{last.lower()}{i + 1}@example.com",
+                "password": password,
+                "role": rng.choice(USER_ROLES),
+                "status": "Active" if rng.random() < 0.95 else "Inactive",
+                "assigned_regions": sorted(set(assigned)),
+                "is_temp_password": True,
+                "password_changed_at": None,
+                "last_login": None,
+                "notes": "",
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+        self.users = users
+        for user in users:
+            for region in user["assigned_regions"]:
+                self.users_by_region.setdefault(region, []).append(user)
+        return users
+
+    def client_name(self, index: int) -> str:
+        combos = len(NAME_PREFIXES) * len(NAME_ROOTS) * len(NAME_KINDS)
+        combo, cycle = index % combos, index // combos
+        prefix = NAME_PREFIXES[combo % len(NAME_PREFIXES)]
+        root = NAME_ROOTS[combo // len(NAME_PREFIXES) % len(NAME_ROOTS)]
+        kind = NAME_KINDS[combo // (len(NAME_PREFIXES) * len(NAME_ROOTS))]
+        name = f"{prefix}{root} {kind}"
+        return f"{name} {cycle + 1}" if cycle else name
+
+    def build_clients(self, batch: int, start: int, stop: int) -> List[Dict[str, Any]]:
+        rng = self.rng("clients", batch)
+        docs = []
+        for i in range(start, stop):
+            name = self.client_name(i)
+            legal_form = rng.choice(LEGAL_FORMS)
+            region = rng.choice(list(REGIONS))
+            country = rng.choice(REGIONS[region])
+            industry = rng.choice(INDUSTRIES)
+            domain = name.lower().replace(" ", "") + ".com"
+            created_at = self.anchor - timedelta(days=rng.uniform(730, 1460))
+            contacts = []
+            for c in range(rng.randint(1, 3)):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                contacts.append({
+                    "name": f"{first} {last}",
+                    "title": rng.choice(["CIO", "CTO", "Head of Data", "Procurement Lead", "VP Engineering"]),
+                    "email": f"{first.lower()}.{last.lower()}@{domain}",
+                    "phone": f"+1-555-{rng.randint(1000000, 9999999)}",
+                    "is_primary": c == 0,
+                })
+            doc = {
+                "id": _uuid(rng),
+                "client_id": f"CL{i + 1:06d}",
+                "client_name": f"{name} {legal_form}".strip(),
+                "contact_email": contacts[0]["email"],
+                "region": region,
+                "country": country,
+                "industry": industry,
+                "service_type": rng.sample(SERVICE_TYPES, rng.randint(1, 2)),
+                "client_tier": rng.choices(["Normal", "Gold", "Platinum"], [75, 20, 5])[0],
+                "client_status": "Active" if rng.random() < 0.9 else "Inactive",
+                "website": f"https://www.{domain}",
+                "notes": "",
+                "contacts": contacts,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+            doc["dedup"] = build_dedup_keys("clients", doc)
+            docs.append(doc)
+            self.client_profiles.append((doc["client_name"], region, country, industry, created_at))
+        return docs
+
+    # ---- leads and everything hanging off them -----------------------------
+
+    def converted(self, index: int) -> bool:
+        """Exactly `opportunities` leads convert, spread evenly over the lead range"""
+        leads, opportunities = self.counts["leads"], self.counts["opportunities"]
+        return (index * opportunities) // leads != ((index + 1) * opportunities) // leads
+
+    def owner_for(self, rng: random.Random, region: str) -> Dict[str, Any]:
+        return rng.choice(self.users_by_region.get(region) or self.users)
+
+    def attachments(self, rng: random.Random, entity_type: str, entity_id: str, uploaded_at: datetime) -> List[Dict[str, Any]]:
+        if rng.random() >= 0.3:
+            return []
+        files = []
+        for name, content_type in rng.sample(ATTACHMENT_TYPES, rng.randint(1, 3)):
+            stored = f"{_uuid(rng)}.{name.rsplit('.', 1)[1]}"
+            files.append({
+                "id": _uuid(rng),
+                "name": name,
+                "originalName": name,
+                "storedName": stored,
+                "size": rng.randint(20_000, 5_000_000),
+                "type": content_type,
+                "path": f"uploads/{entity_type}/{entity_id}/{stored}",
+                "url": f"/api/files/{entity_type}/{entity_id}/{stored}",
+                "uploadedAt": self.when(rng, uploaded_at, 20).isoformat(),
+            })
+        return files
+
+    def build_lead_batch(self, batch: int, start: int, stop: int) -> Dict[str, List[Dict[str, Any]]]:
+        rng = self.rng("leads", batch)
+        out: Dict[str, List[Dict[str, Any]]] = {name: [] for name in GENERATED_COLLECTIONS if name not in ("users", "clients")}
+        clients = len(self.client_profiles)
+
+        for i in range(start, stop):
+            # Skewed towards low indexes so a few accounts carry many leads
+            client_name, region, country, industry, client_created = self.client_profiles[int(clients * rng.random() ** 2)]
+            owner = self.owner_for(rng, region)
+            created_at = self.when(rng, max(client_created, self.anchor - timedelta(days=730)), 700)
+            converted = self.converted(i)
+            stage = "Qualified" if converted else _weighted(rng, LEAD_STAGES)
+            followup = self.when(rng, created_at, 45)
+            if stage == "Qualified":
+                status = "Completed"
+            elif stage == "Unqualified":
+                status = "Rejected"
+            else:
+                status = "Delayed" if followup < self.anchor - timedelta(days=1) and rng.random() < 0.5 else "Active"
+
+            lead_id = _uuid(rng)
+            task_id = f"SAL{self.first_task_number + i:04d}"
+            opportunity_name = f"{rng.choice(SERVICE_TYPES)} for {client_name}"
+            estimated_value = round(rng.lognormvariate(11, 1), 2)
+            contact_first, contact_last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+            status_log = [{
+                **create_status_change_log(lead_id, None, "Active", "Lead created", owner["id"], owner["full_name"]),
+                "changed_at": created_at,
+            }]
+            if status != "Active":
+                reason = "Date exceeded" if status == "Delayed" else "Stage change"
+                status_log.append({
+                    **create_status_change_log(lead_id, "Active", status, reason, owner["id"], owner["full_name"]),
+                    "changed_at": self.when(rng, created_at, 60),
+                })
+
+            lead = {
+                "id": lead_id,
+                "task_id": task_id,
+                "client_name": client_name,
+                "opportunity_name": opportunity_name,
+                "lead_score": rng.randint(60, 100) if converted else rng.randint(0, 80),
+                "sales_poc": owner["full_name"],
+                "lead_owner": owner["full_name"],
+                "owner": owner["full_name"],
+                "next_followup": _day(followup),
+                "lead_source": rng.choice(LEAD_SOURCES),
+                "region": region,
+                "country": country,
+                "industry": industry,
+                "contact_person": f"{contact_first} {contact_last}",
+                "contact_details": f"{contact_first.lower()}.{contact_last.lower()}@example.org",
+                "solution": rng.choice(SERVICE_TYPES),
+                "estimated_value": estimated_value,
+                "currency": "USD",
+                "stage": stage,
+                "lead_status": status,
+                "probability": rng.choice([10, 25, 50, 75]),
+                "expected_closure_date": _day(self.when(rng, created_at, 180)),
+                "next_action": "",
+                "notes": "",
+                "comments": "",
+                "status_change_log": status_log,
+                "attachments": self.attachments(rng, "leads", lead_id, created_at),
+                "created_at": created_at,
+                "updated_at": status_log[-1]["changed_at"],
+            }
+            lead["dedup"] = build_dedup_keys("leads", lead)
+            out["leads"].append(lead)
+
+            opportunity = None
+            if converted:
+                opportunity = self.build_opportunity(rng, lead, owner, created_at, out)
+            self.build_activity(rng, lead, opportunity, owner, created_at, out)
+
+        return out
+
+    def build_opportunity(
+        self, rng: random.Random, lead: Dict[str, Any], owner: Dict[str, Any],
+        lead_created: datetime, out: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        created_at = self.when(rng, lead_created, 45)
+        stage = _weighted(rng, OPPORTUNITY_STAGES)
+        opportunity_id = _uuid(rng)
+        value = round(lead["estimated_value"] * rng.uniform(0.7, 1.5), 2)
+        opportunity = {
+            "id": opportunity_id,
+            "task_id": lead["task_id"],
+            "client_name": lead["client_name"],
+            "opportunity_name": lead["opportunity_name"],
+            "lead_source": lead["lead_source"],
+            "region": lead["region"],
+            "country": lead["country"],
+            "industry": lead["industry"],
+            "sales_owner": owner["full_name"],
+            "technical_poc": rng.choice(self.users)["full_name"],
+            "type": rng.choices(["New Business", "Existing", "Renewal"], [60, 25, 15])[0],
+            "stage": stage,
+            "status": "Completed" if stage.startswith("Closed") else "Active",
+            "pipeline_status": "Converted to SOW" if stage == "Closed Won" else stage,
+            "win_probability": WIN_PROBABILITY[stage],
+            "estimated_value": value,
+            "amount": value,
+            "currency_code": "USD",
+            "expected_closure_date": _day(self.when(rng, created_at, 200)),
+            "win_loss_reason": rng.choice(["Price", "Competition", "No budget", "Timing"]) if stage == "Closed Lost" else None,
+            "next_steps": "",
+            "linked_lead_id": lead["id"],
+            "linked_sow_id": None,
+            "other_documents": self.attachments(rng, "opportunities", opportunity_id, created_at),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+        if stage == "Closed Won":
+            sow_created = self.when(rng, created_at, 90)
+            signed = rng.random() < SIGNED_SOW_RATE
+            sow = {
+                "id": _uuid(rng),
+                "client_name": lead["client_name"],
+                "project_name": lead["opportunity_name"],
+                "sow_title": f"{lead['opportunity_name']} - SOW",
+                "sow_type": "Renewal" if opportunity["type"] == "Renewal" else "New",
+                "start_date": None,
+                "end_date": opportunity["expected_closure_date"],
+                "value": value,
+                "currency": "USD",
+                "billing_type": rng.choice(["Fixed", "T&M", "Milestone"]),
+                "status": "Active",
+                "owner": owner["full_name"],
+                "delivery_spoc": opportunity["technical_poc"],
+                "milestones": None,
+                "po_number": f"PO-{rng.randint(100000, 999999)}" if signed else None,
+                "invoice_plan": None,
+                "documents_link": None,
+                "notes": "",
+                "linked_opportunity_id": opportunity_id,
+                "attachments": self.attachments(rng, "sows", opportunity_id, sow_created),
+                "created_at": sow_created,
+                "updated_at": sow_created,
+            }
+            out["sows"].append(sow)
+            opportunity["linked_sow_id"] = sow["id"]
+            opportunity["sow_title"] = sow["sow_title"]
+            opportunity["sow_status"] = "Signed" if signed else rng.choice(["Draft", "Review"])
+            opportunity["contract_value"] = value
+
+            if signed:
+                kickoff = self.when(rng, sow_created, 30)
+                out["projects"].append({
+                    "id": _uuid(rng),
+                    "project_name": lead["opportunity_name"],
+                    "client_name": lead["client_name"],
+                    "opportunity_name": lead["opportunity_name"],
+                    "linked_opportunity_id": opportunity_id,
+                    "contract_value": value,
+                    "currency": "USD",
+                    "target_kickoff_date": _day(kickoff),
+                    "status": "In Progress" if kickoff < self.anchor - timedelta(days=7) else "Planned",
+                    "project_type": "New",
+                    "priority": rng.choice(["Low", "Medium", "High"]),
+                    "project_manager": opportunity["technical_poc"],
+                    "delivery_spoc": opportunity["technical_poc"],
+                    "sales_owner": owner["full_name"],
+                    "description": f"Project created from signed SOW for {lead['opportunity_name']}",
+                    "start_date": _day(kickoff),
+                    "end_date": None,
+                    "budget": value,
+                    "attachments": [],
+                    "created_at": kickoff,
+                    "updated_at": kickoff,
+                })
+
+        out["opportunities"].append(opportunity)
+        return opportunity
+
+    def build_activity(
+        self, rng: random.Random, lead: Dict[str, Any], opportunity: Optional[Dict[str, Any]],
+        owner: Dict[str, Any], lead_created: datetime, out: Dict[str, List[Dict[str, Any]]]
+    ):
+        """Sales activities and action items sharing the lead's task_id"""
+        for _ in range(rng.choices([0, 1, 2, 3], [30, 35, 25, 10])[0]):
+            activity_date = self.when(rng, lead_created, 120)
+            out["sales_activities"].append({
+                "id": _uuid(rng),
+                "task_id": lead["task_id"],
+                "activity_type": _weighted(rng, ACTIVITY_TYPES),
+                "activity_owner": owner["full_name"],
+                "activity_date": activity_date,
+                "linked_account": lead["client_name"],
+                "linked_lead": lead["id"],
+                "linked_opportunity": opportunity["id"] if opportunity else None,
+                "summary": f"Discussed {lead['solution']} scope",
+                "outcome": rng.choice(["Positive", "Neutral", "Follow-up needed"]),
+                "next_step": "",
+                "created_at": activity_date,
+                "updated_at": activity_date,
+            })
+
+        if rng.random() < 0.4:
+            target = opportunity or lead
+            created_at = self.when(rng, lead_created, 90)
+            due = self.when(rng, created_at, 21)
+            done = due < self.anchor and rng.random() < 0.6
+            out["action_items"].append({
+                "id": _uuid(rng),
+                "task_id": lead["task_id"],
+                "task_title": f"Follow up with {lead['contact_person']}",
+                "linked_to": target["id"],
+                "linked_to_type": "Opportunity" if opportunity else "Lead",
+                "assigned_to": owner["email"],
+                "due_date": _day(due),
+                "priority": rng.choice(["Low", "Medium", "High"]),
+                "status": "Completed" if done else ("Overdue" if due < self.anchor else rng.choice(["Not Started", "In Progress"])),
+                "notes": "",
+                "completed_date": due if done else None,
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+
+async def generate_dataset(
+    db: AsyncIOMotorDatabase,
+    clients: int,
+    leads: int,
+    opportunities: int,
+    users: int = 50,
+    seed: int = 42,
+    anchor: Optional[datetime] = None,
+    writers: int = DEFAULT_WRITERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    reset: bool = False,
+    progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, int]:
+    """
+    Generate and insert a dataset; returns the documents written per
+    collection. `anchor` is "now" for the generated history (defaults to
+    today, midnight UTC) - pass a fixed date for byte-identical reruns.
+    """
+    anchor = anchor or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if reset:
+        for name in GENERATED_COLLECTIONS:
+            await db[name].delete_many({})
+        await db.counters.delete_one({"_id": "task_id"})
+
+    # Reserve the leads' task ids, so generating into a database with leads never reuses one
+    counter = await db.counters.find_one_and_update(
+        {"_id": "task_id"}, {"$inc": {"sequence": leads}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    first_task_number = counter["sequence"] - leads + 1
+    generator = DatasetGenerator(seed, clients, leads, opportunities, users, anchor, batch_size, first_task_number)
+
+    written = {name: 0 for name in GENERATED_COLLECTIONS}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=writers * 2)
+
+    async def writer():
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                name, docs = item
+                for start in range(0, len(docs), batch_size):
+                    chunk = docs[start:start + batch_size]
+                    await db[name].insert_many(chunk, ordered=False)
+                    written[name] += len(chunk)
+            finally:
+                queue.task_done()
+
+    async def put(name: str, docs: List[Dict[str, Any]]):
+        if not docs:
+            return
+        # Writers only finish early by failing; surface that instead of blocking on a full queue
+        putter = asyncio.ensure_future(queue.put((name, docs)))
+        done, _ = await asyncio.wait([putter, *tasks], return_when=asyncio.FIRST_COMPLETED)
+        if putter not in done:
+            putter.cancel()
+            for task in done:
+                task.result()
+
+    tasks = [asyncio.create_task(writer()) for _ in range(max(1, writers))]
+    try:
+        await put("users", generator.build_users())
+        for batch, start, stop in generator.batches(clients):
+            await put("clients", generator.build_clients(batch, start, stop))
+        for batch, start, stop in generator.batches(leads):
+            for name, docs in generator.build_lead_batch(batch, start, stop).items():
+                await put(name, docs)
+            if progress:
+                progress(written)
+            # Let writers drain between CPU-bound batches
+            await asyncio.sleep(0)
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    await reconcile_client_rollups(db)
+    await rebuild_daily_buckets(db)
+    for name, count in written.items():
+        if count:
+            await bump_collection_version(db, name)
+    return written
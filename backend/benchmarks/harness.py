@@ -0,0 +1,250 @@
+"""
+Benchmark runner: server lifecycle, load generation and result files.
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import httpx
+import numpy as np
+from benchmarks.generator import GENERATED_COLLECTIONS, generate_dataset
+from benchmarks.workloads import WorkloadData, available_mix
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+LOGIN = {"email": "admin@sightspectrum.com", "password": "admin123"}
+
+# Written after generating, so only databases the harness created are ever dropped
+MARKER_COLLECTION = "benchmark_dataset"
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain"))}
+
+async def prepare_database(mongo_url: str, db_name: str, volume: Dict[str, int], seed: int, reseed: bool) -> Dict[str, int]:
+    """
+    Generate the benchmark dataset (dropping the database first) when asked or
+    when it has no leads. A database the harness did not generate is never
+    dropped, unless it is empty.
+    """
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+    try:
+        if reseed or await db.leads.estimated_document_count() == 0:
+            generated = await db[MARKER_COLLECTION].find_one({"_id": "dataset"})
+            if generated is None and await db.list_collection_names():
+                raise RuntimeError(
+                    f"Database '{db_name}' holds data the benchmark did not generate; "
+                    "refusing to drop it (use a dedicated --db-name)"
+                )
+            await client.drop_database(db_name)
+            await generate_dataset(
+                db, volume["clients"], volume["leads"], volume["opportunities"], volume["users"], seed=seed
+            )
+            await db[MARKER_COLLECTION].insert_one({
+                "_id": "dataset", "volume": volume, "seed": seed, "generated_at": datetime.now(timezone.utc),
+            })
+        return {name: await db[name].estimated_document_count() for name in GENERATED_COLLECTIONS}
+    finally:
+        client.close()
+
+async def sample_workload_data(mongo_url: str, db_name: str, size: int = 5000) -> WorkloadData:
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+    try:
+        leads = await db.leads.aggregate([{"$sample": {"size": size}}, {"$project": {"_id": 0, "id": 1}}]).to_list(size)
+        opportunities = await db.opportunities.aggregate([{"$sample": {"size": size}}, {"$project": {"_id": 0, "id": 1}}]).to_list(size)
+        clients = await db.clients.aggregate([{"$sample": {"size": 200}}, {"$project": {"_id": 0, "client_name": 1}}]).to_list(200)
+        return WorkloadData(
+            sorted(d["id"] for d in leads),
+            sorted(d["id"] for d in opportunities),
+            sorted(d["client_name"] for d in clients if d.get("client_name")),
+        )
+    finally:
+        client.close()
+
+class Server:
+    """uvicorn serving server:app in a child process"""
+
+    def __init__(self, port: int, workers: int, env: Dict[str, str]):
+        self.port = port
+        self.workers = workers
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, timeout: float = 60):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env={**os.environ, **self.env},
+        )
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {self.process.returncode}")
+                try:
+                    response = await client.get(f"{self.url}/api/health/ready")
+                    if response.status_code == 200:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.5)
+        raise RuntimeError("Server did not become ready in time")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+async def login(base_url: str) -> str:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.post("/api/auth/login", json=LOGIN)
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+async def drive(
+    base_url: str, token: str, data: WorkloadData,
+    clients: int, duration: float, warmup: float, seed: int
+) -> Dict[str, List]:
+    """Closed-loop load: `clients` virtual users issue requests back to back"""
+    mix = available_mix(data)
+    scenarios, weights = list(mix), list(mix.values())
+    samples: Dict[str, List] = {}
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(
+        base_url=base_url, headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=60
+    ) as client:
+        async def virtual_user(index: int):
+            rng = random.Random(seed * 100003 + index)
+            while True:
+                name, method, path, body = rng.choices(scenarios, weights)[0](rng, data)
+                sent = time.monotonic()
+                if sent >= stop_at:
+                    return
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if sent >= measure_from:
+                    latencies, errors = samples.setdefault(name, [[], 0])
+                    latencies.append((time.monotonic() - sent) * 1000)
+                    if not ok:
+                        samples[name][1] = errors + 1
+
+        await asyncio.gather(*(virtual_user(i) for i in range(clients)))
+    return samples
+
+def summarize(samples: Dict[str, List], duration: float) -> Dict[str, Any]:
+    endpoints = {}
+    total = errors = 0
+    for name, (latencies, failed) in sorted(samples.items()):
+        values = np.array(latencies)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": failed,
+            "rps": round(len(latencies) / duration, 2),
+            "mean_ms": round(float(values.mean()), 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(values.max()), 2),
+        }
+        total += len(latencies)
+        errors += failed
+    return {
+        "summary": {"requests": total, "errors": errors, "duration_s": duration, "rps": round(total / duration, 2)},
+        "endpoints": endpoints,
+    }
+
+async def run_benchmark(args) -> Path:
+    volume = {"clients": args.clients_data, "leads": args.leads, "opportunities": args.opportunities, "users": args.users}
+    counts = await prepare_database(args.mongo_url, args.db_name, volume, args.seed, args.reseed)
+    data = await sample_workload_data(args.mongo_url, args.db_name)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server = Server(args.port, args.workers, {"MONGO_URL": args.mongo_url, "DB_NAME": args.db_name})
+        await server.start()
+        base_url = server.url
+    try:
+        token = await login(base_url)
+        samples = await drive(base_url, token, data, args.clients, args.duration, args.warmup, args.seed)
+    finally:
+        if server:
+            server.stop()
+
+    result = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "clients": args.clients, "duration_s": args.duration, "warmup_s": args.warmup,
+                "server_workers": args.workers if server else None, "seed": args.seed,
+            },
+            "data": counts,
+        },
+        **summarize(samples, args.duration),
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{result['meta']['git']['commit'][:10] or 'nogit'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print_result(result)
+    print(f"\nResults written to {output}")
+    return output
+
+def print_result(result: Dict[str, Any]):
+    print(f"{'endpoint':<28}{'reqs':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, stats in result["endpoints"].items():
+        print(f"{name:<28}{stats['requests']:>8}{stats['errors']:>6}{stats['rps']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+    summary = result["summary"]
+    print(f"{'TOTAL':<28}{summary['requests']:>8}{summary['errors']:>6}{summary['rps']:>9.1f}")
+
+def compare_results(baseline_path: str, candidate_path: str):
+    """Per-endpoint change from a baseline run to a candidate run (negative latency change is better)"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+
+    def change(before: float, after: float) -> str:
+        return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+    print(f"baseline  {baseline['meta']['git']['commit'][:10]}  {baseline_path}")
+    print(f"candidate {candidate['meta']['git']['commit'][:10]}  {candidate_path}\n")
+    print(f"{'endpoint':<28}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name in sorted(baseline["endpoints"].keys() | candidate["endpoints"].keys()):
+        before, after = baseline["endpoints"].get(name), candidate["endpoints"].get(name)
+        if not before or not after:
+            print(f"{name:<28}{'only in ' + ('candidate' if after else 'baseline'):>40}")
+            continue
+        print(f"{name:<28}{change(before['rps'], after['rps']):>10}{change(before['p50_ms'], after['p50_ms']):>10}"
+              f"{change(before['p95_ms'], after['p95_ms']):>10}{change(before['p99_ms'], after['p99_ms']):>10}")
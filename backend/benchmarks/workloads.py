@@ -0,0 +1,60 @@
+"""
+Benchmark workload: a weighted mix of the requests the UI makes most.
+Each scenario returns (endpoint name, method, path, json body) for one request;
+the endpoint name (not the concrete path) is what latencies are grouped by.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import random
+
+Request = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+class WorkloadData:
+    """Ids sampled from the seeded database, used to build detail/update requests"""
+
+    def __init__(self, lead_ids: List[str], opportunity_ids: List[str], client_names: List[str]):
+        self.lead_ids = lead_ids
+        self.opportunity_ids = opportunity_ids
+        self.client_names = client_names
+
+def dashboard(rng: random.Random, data: WorkloadData) -> Request:
+    return ("GET /dashboard/analytics", "GET", "/api/dashboard/analytics", None)
+
+def leads_list(rng: random.Random, data: WorkloadData) -> Request:
+    return ("GET /leads", "GET", "/api/leads", None)
+
+def opportunities_list(rng: random.Random, data: WorkloadData) -> Request:
+    return ("GET /opportunities", "GET", "/api/opportunities", None)
+
+def clients_list(rng: random.Random, data: WorkloadData) -> Request:
+    return ("GET /clients", "GET", "/api/clients", None)
+
+def opportunity_detail(rng: random.Random, data: WorkloadData) -> Request:
+    return ("GET /opportunities/{id}", "GET", f"/api/opportunities/{rng.choice(data.opportunity_ids)}", None)
+
+def lead_update(rng: random.Random, data: WorkloadData) -> Request:
+    body = {"lead_score": rng.randint(0, 100), "notes": f"Benchmark update {rng.getrandbits(32):08x}"}
+    return ("PUT /leads/{id}", "PUT", f"/api/leads/{rng.choice(data.lead_ids)}", body)
+
+def search(rng: random.Random, data: WorkloadData) -> Request:
+    term = rng.choice(data.client_names).split()[0] if data.client_names else "client"
+    return ("GET /search", "GET", f"/api/search?q={term}", None)
+
+# scenario -> relative weight
+DEFAULT_MIX: Dict[Callable[[random.Random, WorkloadData], Request], int] = {
+    dashboard: 10,
+    leads_list: 15,
+    opportunities_list: 15,
+    clients_list: 10,
+    opportunity_detail: 30,
+    lead_update: 15,
+    search: 5,
+}
+
+def available_mix(data: WorkloadData) -> Dict[Callable, int]:
+    """Drop scenarios the seeded data cannot support (e.g. no leads to update)"""
+    mix = dict(DEFAULT_MIX)
+    if not data.lead_ids:
+        mix.pop(lead_update)
+    if not data.opportunity_ids:
+        mix.pop(opportunity_detail)
+    return mix
@@ -1,46 +1,110 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+from typing import Dict, Any
 import os
 import logging
+from utils.telemetry import pool_listener
 
 logger = logging.getLogger(__name__)
 
-_client = None
-_db = None
+# Workloads get their own client (and so their own connection pool) and read
+# preference. "analytics" is for read-only reporting (dashboard, employee
+# performance, forecasts, trends) that may lag the primary slightly; never
+# write through it. Each setting can be overridden per workload from the
+# environment, e.g. DB_ANALYTICS_READ_PREFERENCE=primary, DB_ANALYTICS_URL=...
+TRANSACTIONAL = "transactional"
+ANALYTICS = "analytics"
 
-def init_db():
-    global _client, _db
+WORKLOADS: Dict[str, Dict[str, Any]] = {
+    TRANSACTIONAL: {
+        "read_preference": "primary",
+        "max_staleness_seconds": None,
+        "max_pool_size": 50,
+        "min_pool_size": 10,
+    },
+    ANALYTICS: {
+        "read_preference": "secondaryPreferred",
+        # pymongo requires at least 90 seconds
+        "max_staleness_seconds": 120,
+        "max_pool_size": 10,
+        "min_pool_size": 0,
+    },
+}
+
+_clients: Dict[str, AsyncIOMotorClient] = {}
+_dbs: Dict[str, Any] = {}
+
+def workload_settings(workload: str) -> Dict[str, Any]:
+    if workload not in WORKLOADS:
+        raise ValueError(f"Unknown database workload '{workload}'")
+    settings = dict(WORKLOADS[workload])
+    prefix = f"DB_{workload.upper()}_"
+    settings["url"] = os.environ.get(prefix + "URL") or os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    settings["read_preference"] = os.environ.get(prefix + "READ_PREFERENCE", settings["read_preference"])
+    for key in ("max_staleness_seconds", "max_pool_size", "min_pool_size"):
+        value = os.environ.get(prefix + key.upper())
+        if value:
+            settings[key] = int(value)
+    if settings["read_preference"] == "primary":
+        settings["max_staleness_seconds"] = None
+    elif settings["max_staleness_seconds"] is not None:
+        settings["max_staleness_seconds"] = max(90, settings["max_staleness_seconds"])
+    return settings
+
+def init_db(workload: str = TRANSACTIONAL):
     try:
-        mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+        settings = workload_settings(workload)
+        mongo_url = settings["url"]
         db_name = os.environ.get('DB_NAME', 'test_database')
-        
+
         # Configure connection options for Atlas MongoDB
         connection_options = {
             'serverSelectionTimeoutMS': 5000,
             'connectTimeoutMS': 10000,
             'socketTimeoutMS': 10000,
-            'maxPoolSize': 50,
-            'minPoolSize': 10
+            'maxPoolSize': settings["max_pool_size"],
+            'minPoolSize': settings["min_pool_size"],
+            'appname': f"crm-{workload}",
+            # Dates are stored as BSON datetimes in UTC; read them back aware
+            'tz_aware': True,
+            'event_listeners': [pool_listener(workload, settings["max_pool_size"])],
         }
-        
+
         # Add retry writes for Atlas
         if 'mongodb+srv://' in mongo_url or 'mongodb.net' in mongo_url:
             connection_options['retryWrites'] = True
             connection_options['w'] = 'majority'
-        
-        _client = AsyncIOMotorClient(mongo_url, **connection_options)
-        _db = _client[db_name]
-        
-        logger.info(f"MongoDB connection initialized for database: {db_name}")
-        return _db
+
+        read_preference = make_read_preference(
+            read_pref_mode_from_name(settings["read_preference"]),
+            tag_sets=None,
+            max_staleness=settings["max_staleness_seconds"] or -1,
+        )
+        client = AsyncIOMotorClient(mongo_url, **connection_options)
+        _clients[workload] = client
+        _dbs[workload] = client.get_database(db_name, read_preference=read_preference)
+
+        logger.info(
+            f"MongoDB connection initialized for database: {db_name} "
+            f"({workload}, {settings['read_preference']}, pool {settings['max_pool_size']})"
+        )
+        return _dbs[workload]
     except Exception as e:
         logger.error(f"Failed to initialize MongoDB connection: {str(e)}")
         raise
 
-def get_db():
-    global _db
-    if _db is None:
-        init_db()
-    return _db
+def get_db(workload: str = TRANSACTIONAL):
+    """Database handle for a workload; clients are created on first use"""
+    db = _dbs.get(workload)
+    if db is None:
+        db = init_db(workload)
+    return db
+
+def db_for(workload: str):
+    """Route dependency: `db = Depends(db_for(ANALYTICS))`"""
+    def dependency():
+        return get_db(workload)
+    return dependency
 
 async def check_db_connection():
     """Check if database connection is healthy"""
@@ -0,0 +1,76 @@
+"""
+Schema Migration Runner
+Applies, previews and rolls back the data migrations in
+utils/migration_steps.py from the command line (the `migrations.run` and
+`migrations.rollback` jobs do the same from the worker):
+
+    cd backend && python -m migrate status
+    cd backend && python -m migrate up --dry-run
+    cd backend && python -m migrate up 0002_lead_status --batch-size 200 --pause-ms 100
+    cd backend && python -m migrate rollback 0002_lead_status
+
+Progress is checkpointed in the `migrations` collection, so an interrupted
+`up` continues where it stopped when run again.
+"""
+from dotenv import load_dotenv
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+sys.path.insert(0, str(ROOT_DIR))
+
+from database import init_db, check_db_connection
+from utils import migration_steps  # noqa: F401 - registers the migrations
+from utils.migrations import (
+    DEFAULT_BATCH_SIZE, DEFAULT_PAUSE_MS, MigrationError,
+    migration_status, rollback_migration, run_pending
+)
+
+async def run(args: argparse.Namespace):
+    db = init_db()
+    if not await check_db_connection():
+        print("Could not connect to the database", file=sys.stderr)
+        sys.exit(1)
+
+    async def progress(current, total=None, message=None):
+        logging.info(f"{message}: {current} scanned")
+
+    if args.command == "status":
+        result = await migration_status(db)
+    elif args.command == "up":
+        result = await run_pending(
+            db, args.names or None, args.dry_run, args.batch_size, args.pause_ms, args.restart, progress
+        )
+    else:
+        result = await rollback_migration(db, args.name, args.dry_run, args.batch_size, args.pause_ms, progress)
+    print(json.dumps(result, indent=2, default=str))
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply or roll back data migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="List migrations and their state")
+    up = commands.add_parser("up", help="Apply pending migrations (or the named ones) in order")
+    up.add_argument("names", nargs="*", help="Migrations to apply (default: every pending one)")
+    up.add_argument("--restart", action="store_true", help="Ignore checkpoints and walk from the start")
+    rollback = commands.add_parser("rollback", help="Restore the values a migration replaced")
+    rollback.add_argument("name")
+    for command in (up, rollback):
+        command.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+        command.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        command.add_argument("--pause-ms", type=int, default=DEFAULT_PAUSE_MS, help="Pause between batches")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(run(args))
+    except MigrationError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -30,5 +30,6 @@ class ActivityUpdate(BaseModel):
 class Activity(ActivityBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     created_at: datetime
     updated_at: datetime
\ No newline at end of file
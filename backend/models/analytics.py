@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional, Union
+from datetime import date
+
+class PivotMeasure(BaseModel):
+    op: Literal["count", "sum", "avg", "weighted_sum"] = "count"
+    field: Optional[str] = None  # Required for every op but count
+
+class PivotTimeBucket(BaseModel):
+    field: str = "created_at"
+    unit: Literal["day", "week", "month", "quarter", "year"] = "month"
+
+class PivotRequest(BaseModel):
+    source: str  # leads, opportunities, sows or sales_activities
+    dimensions: List[str] = Field(default_factory=list, max_length=3)
+    measures: List[PivotMeasure] = Field(default_factory=lambda: [PivotMeasure()], min_length=1, max_length=6)
+    filters: Dict[str, Union[str, List[str]]] = Field(default_factory=dict)
+    time_bucket: Optional[PivotTimeBucket] = None
+    # Inclusive range on the time bucket field (or the source's created_at)
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
@@ -0,0 +1,5 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class ArchiveRestoreRequest(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=1000)  # Record ids (`id`, not `_id`)
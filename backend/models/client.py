@@ -36,9 +36,24 @@ class ClientUpdate(BaseModel):
     notes: Optional[str] = None
     contacts: Optional[List[ClientContactBase]] = None
 
+class ClientRollup(BaseModel):
+    """Totals over the client's linked records (see utils/client_rollups.py)"""
+    model_config = ConfigDict(extra="ignore")
+    lead_count: int = 0
+    open_lead_count: int = 0
+    open_opportunity_count: int = 0
+    open_pipeline: float = 0.0
+    won_opportunity_count: int = 0
+    sow_count: int = 0
+    won_sow_value: float = 0.0
+    last_activity_at: Optional[datetime] = None
+    reconciled_at: Optional[datetime] = None
+
 class Client(ClientBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     contacts: List[ClientContactBase] = []
+    rollup: ClientRollup = ClientRollup()
     created_at: datetime
     updated_at: datetime
\ No newline at end of file
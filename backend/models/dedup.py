@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any
+
+class DuplicateCheckRequest(BaseModel):
+    # Raw records as they would be posted to create (or read from an import file)
+    records: List[Dict[str, Any]] = Field(..., min_length=1, max_length=1000)
+
+class MergeRequest(BaseModel):
+    primary_id: str
+    duplicate_ids: List[str] = Field(..., min_length=1, max_length=100)
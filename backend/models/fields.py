@@ -0,0 +1,28 @@
+from pydantic import AfterValidator, BeforeValidator
+from typing import Annotated, Any, Optional
+from datetime import datetime, date, timezone
+
+# Dates are stored as BSON datetimes (calendar dates at midnight UTC); older
+# records may still hold ISO strings until the date migration has run
+
+def _blank_to_none(value: Any) -> Any:
+    return None if value == "" else value
+
+def _calendar_date(value: Any) -> Any:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str) and len(value) > 10 and value[10] == "T":
+        return value[:10]
+    return value
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+# A day (YYYY-MM-DD in the API)
+CalendarDate = Annotated[Optional[date], BeforeValidator(_calendar_date)]
+# A moment; accepts YYYY-MM-DD (midnight) and treats offset-less values as UTC
+Timestamp = Annotated[Optional[datetime], BeforeValidator(_blank_to_none), AfterValidator(_as_utc)]
@@ -35,6 +35,7 @@ class ForecastUpdate(BaseModel):
 class Forecast(ForecastBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     task_id: str  # Required
     created_at: datetime
     updated_at: datetime
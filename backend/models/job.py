@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Any
+
+class JobCreate(BaseModel):
+    type: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    priority: int = Field(0, ge=-10, le=10)
+    max_attempts: int = Field(3, ge=1, le=10)
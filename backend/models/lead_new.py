@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from models.fields import CalendarDate
 from enum import Enum
 
 class LeadStage(str, Enum):
@@ -31,7 +32,7 @@ class LeadBase(BaseModel):
     lead_score: int = 0
     sales_poc: str = ""  # Lead Assignee
     lead_owner: str = ""  # System-controlled lead owner
-    next_followup: Optional[str] = None
+    next_followup: CalendarDate = None
     lead_source: str = ""
     region: str = ""
     country: str = ""
@@ -43,7 +44,7 @@ class LeadBase(BaseModel):
     currency: str = "USD"
     stage: LeadStage = LeadStage.NEW
     probability: int = 0
-    expected_closure_date: Optional[str] = None
+    expected_closure_date: CalendarDate = None
     owner: str = ""
     next_action: str = ""
     notes: str = ""
@@ -58,7 +59,7 @@ class LeadUpdate(BaseModel):
     opportunity_name: Optional[str] = None
     lead_score: Optional[int] = None
     sales_poc: Optional[str] = None
-    next_followup: Optional[str] = None
+    next_followup: CalendarDate = None
     lead_source: Optional[str] = None
     region: Optional[str] = None
     country: Optional[str] = None
@@ -70,7 +71,7 @@ class LeadUpdate(BaseModel):
     currency: Optional[str] = None
     stage: Optional[LeadStage] = None
     probability: Optional[int] = None
-    expected_closure_date: Optional[str] = None
+    expected_closure_date: CalendarDate = None
     owner: Optional[str] = None
     next_action: Optional[str] = None
     notes: Optional[str] = None
@@ -80,8 +81,10 @@ class LeadUpdate(BaseModel):
 class Lead(LeadBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     created_at: datetime
     updated_at: datetime
+    archived_at: Optional[datetime] = None  # Set on records read with include_archived=true
     lead_status: LeadStatus
     status_change_log: List[StatusChangeLog] = []
     task_id: Optional[str] = None
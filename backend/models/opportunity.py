@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import Optional, List, Union
-from datetime import datetime, date
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional, List
+from datetime import datetime
+from models.fields import CalendarDate, Timestamp
 
 class AttachmentMetadata(BaseModel):
     id: str
@@ -28,7 +29,7 @@ class OpportunityBase(BaseModel):
     client_name: str  # Customer/Account
     opportunity_name: str
     lead_source: Optional[str] = None
-    close_date: Optional[Union[datetime, date, str]] = None
+    close_date: Timestamp = None
     type: Optional[str] = "New Business"  # New Business, Existing, Renewal
     amount: Optional[float] = 0
     currency_code: str = "USD"
@@ -42,30 +43,15 @@ class OpportunityBase(BaseModel):
     deal_value: Optional[float] = 0  # Alias for estimated_value
     probability_percent: Optional[int] = 0  # Probability %
     win_loss_reason: Optional[str] = None  # Win/Loss Reason
-    last_interaction: Optional[Union[datetime, date, str]] = None  # Last Interaction date
+    last_interaction: Timestamp = None  # Last Interaction date
     next_action: Optional[str] = None  # Next Action
     partner_org: Optional[str] = None  # Partner Organization
     partner_org_contact: Optional[str] = None  # Partner Organization Contact
     
-    @field_validator('last_interaction', mode='before')
-    @classmethod
-    def parse_last_interaction(cls, v):
-        if not v or v == '':
-            return None
-        if isinstance(v, datetime):
-            return v
-        if isinstance(v, date):
-            return datetime.combine(v, datetime.min.time())
-        if isinstance(v, str):
-            if 'T' not in v and len(v) == 10:
-                return datetime.strptime(v, '%Y-%m-%d')
-            return datetime.fromisoformat(v.replace('Z', '+00:00'))
-        return v
-    
     # RFP Details Tab Fields
     rfp_title: Optional[str] = None
     rfp_status: Optional[str] = None  # Won, Lost
-    submission_deadline: Optional[Union[datetime, date, str]] = None
+    submission_deadline: Timestamp = None
     bid_manager: Optional[str] = None
     submission_mode: Optional[str] = None  # Email, Portal, Manual
     portal_url: Optional[str] = None
@@ -81,7 +67,7 @@ class OpportunityBase(BaseModel):
     sow_release_version: Optional[str] = None
     sow_status: Optional[str] = None  # Draft, Review, Signed
     contract_value: Optional[float] = None
-    target_kickoff_date: Optional[Union[datetime, date, str]] = None
+    target_kickoff_date: Timestamp = None
     linked_proposal_reference: Optional[str] = None
     signed_document_assets: Optional[List[AttachmentMetadata]] = []
     
@@ -94,19 +80,7 @@ class OpportunityBase(BaseModel):
     currency: str = "USD"
     probability: Optional[int] = 0
     stage: str = "Prospecting"  # Prospecting, Needs Analysis, Proposal, Negotiation, Closed
-    expected_closure_date: Optional[Union[date, str]] = None
-    
-    @field_validator('expected_closure_date', mode='before')
-    @classmethod
-    def parse_expected_closure_date(cls, v):
-        if not v or v == '':
-            return None
-        if isinstance(v, date):
-            return v
-        if isinstance(v, str):
-            if len(v) == 10:
-                return datetime.strptime(v, '%Y-%m-%d').date()
-        return v
+    expected_closure_date: CalendarDate = None
     sales_owner: Optional[str] = None  # Assigned Salesperson
     technical_poc: Optional[str] = None
     presales_poc: Optional[str] = None
@@ -118,31 +92,14 @@ class OpportunityBase(BaseModel):
     attachments: Optional[List[AttachmentMetadata]] = []
 
 class OpportunityCreate(OpportunityBase):
-    created_at: Optional[Union[datetime, date, str]] = None  # Allow custom creation date
-    
-    @field_validator('created_at', mode='before')
-    @classmethod
-    def parse_created_at(cls, v):
-        if v is None:
-            return None
-        if isinstance(v, datetime):
-            return v
-        if isinstance(v, date):
-            return datetime.combine(v, datetime.min.time())
-        if isinstance(v, str):
-            # Handle date string "2025-12-25"
-            if 'T' not in v and len(v) == 10:
-                return datetime.strptime(v, '%Y-%m-%d')
-            # Handle datetime string
-            return datetime.fromisoformat(v.replace('Z', '+00:00'))
-        return v
+    created_at: Timestamp = None  # Allow custom creation date
 
 class OpportunityUpdate(BaseModel):
     # Details Tab Fields
     client_name: Optional[str] = None
     opportunity_name: Optional[str] = None
     lead_source: Optional[str] = None
-    close_date: Optional[Union[datetime, date, str]] = None
+    close_date: Timestamp = None
     type: Optional[str] = None
     amount: Optional[float] = None
     currency_code: Optional[str] = None
@@ -152,28 +109,11 @@ class OpportunityUpdate(BaseModel):
     next_steps: Optional[str] = None
     
     # Legacy Fields (for backward compatibility)
-    created_at: Optional[Union[datetime, date, str]] = None  # Allow updating creation date
-    
-    @field_validator('created_at', mode='before')
-    @classmethod
-    def parse_created_at(cls, v):
-        if v is None:
-            return None
-        if isinstance(v, datetime):
-            return v
-        if isinstance(v, date):
-            return datetime.combine(v, datetime.min.time())
-        if isinstance(v, str):
-            # Handle date string "2025-12-25"
-            if 'T' not in v and len(v) == 10:
-                return datetime.strptime(v, '%Y-%m-%d')
-            # Handle datetime string
-            return datetime.fromisoformat(v.replace('Z', '+00:00'))
-        return v
+    created_at: Timestamp = None  # Allow updating creation date
     deal_value: Optional[float] = None
     probability_percent: Optional[int] = None
     win_loss_reason: Optional[str] = None
-    last_interaction: Optional[Union[datetime, date, str]] = None
+    last_interaction: Timestamp = None
     next_action: Optional[str] = None
     partner_org: Optional[str] = None
     partner_org_contact: Optional[str] = None
@@ -181,7 +121,7 @@ class OpportunityUpdate(BaseModel):
     # RFP Details Tab Fields
     rfp_title: Optional[str] = None
     rfp_status: Optional[str] = None
-    submission_deadline: Optional[Union[datetime, date, str]] = None
+    submission_deadline: Timestamp = None
     bid_manager: Optional[str] = None
     submission_mode: Optional[str] = None
     portal_url: Optional[str] = None
@@ -197,7 +137,7 @@ class OpportunityUpdate(BaseModel):
     sow_release_version: Optional[str] = None
     sow_status: Optional[str] = None
     contract_value: Optional[float] = None
-    target_kickoff_date: Optional[Union[datetime, date, str]] = None
+    target_kickoff_date: Timestamp = None
     linked_proposal_reference: Optional[str] = None
     signed_document_assets: Optional[List[AttachmentMetadata]] = None
     
@@ -210,7 +150,7 @@ class OpportunityUpdate(BaseModel):
     currency: Optional[str] = None
     probability: Optional[int] = None
     stage: Optional[str] = None
-    expected_closure_date: Optional[date] = None
+    expected_closure_date: CalendarDate = None
     sales_owner: Optional[str] = None
     technical_poc: Optional[str] = None
     presales_poc: Optional[str] = None
@@ -223,9 +163,11 @@ class OpportunityUpdate(BaseModel):
 class Opportunity(OpportunityBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     task_id: str  # Required - shared from Lead
     linked_lead_id: Optional[str] = None
     linked_sow_id: Optional[str] = None
     attachments: List[AttachmentMetadata] = []
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+    archived_at: Optional[datetime] = None  # Set on records read with include_archived=true
\ No newline at end of file
@@ -36,6 +36,7 @@ class PartnerUpdate(BaseModel):
 class Partner(PartnerBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     contacts: List[PartnerContactBase] = []
     created_at: datetime
     updated_at: datetime
\ No newline at end of file
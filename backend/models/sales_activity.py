@@ -32,6 +32,7 @@ class SalesActivityUpdate(BaseModel):
 class SalesActivity(SalesActivityBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     task_id: str  # Required
     created_at: datetime
     updated_at: datetime
@@ -15,5 +15,6 @@ class SettingUpdate(BaseModel):
 class Setting(SettingBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     created_at: datetime
     updated_at: datetime
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import Optional, List, Union
-from datetime import datetime, date
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional, List
+from datetime import datetime
+from models.fields import CalendarDate, Timestamp
 
 class AttachmentMetadata(BaseModel):
     id: str
@@ -18,19 +19,8 @@ class SOWBase(BaseModel):
     project_name: str
     sow_title: str
     sow_type: str = "New"  # New, Renewal, CO
-    start_date: Optional[Union[date, str]] = None
-    end_date: Optional[Union[date, str]] = None
-    
-    @field_validator('start_date', 'end_date', mode='before')
-    @classmethod
-    def parse_dates(cls, v):
-        if not v or v == '':
-            return None
-        if isinstance(v, date):
-            return v
-        if isinstance(v, str) and len(v) == 10:
-            return datetime.strptime(v, '%Y-%m-%d').date()
-        return v
+    start_date: CalendarDate = None
+    end_date: CalendarDate = None
     value: Optional[float] = 0
     currency: str = "USD"
     billing_type: Optional[str] = None  # Fixed, T&M, Milestone
@@ -45,46 +35,16 @@ class SOWBase(BaseModel):
     notes: Optional[str] = None
 
 class SOWCreate(SOWBase):
-    created_at: Optional[Union[datetime, date, str]] = None  # Allow custom creation date
-    
-    @field_validator('created_at', mode='before')
-    @classmethod
-    def parse_created_at(cls, v):
-        if v is None:
-            return None
-        if isinstance(v, datetime):
-            return v
-        if isinstance(v, date):
-            return datetime.combine(v, datetime.min.time())
-        if isinstance(v, str):
-            if 'T' not in v and len(v) == 10:
-                return datetime.strptime(v, '%Y-%m-%d')
-            return datetime.fromisoformat(v.replace('Z', '+00:00'))
-        return v
+    created_at: Timestamp = None  # Allow custom creation date
 
 class SOWUpdate(BaseModel):
     client_name: Optional[str] = None
     project_name: Optional[str] = None
-    created_at: Optional[Union[datetime, date, str]] = None  # Allow updating creation date
-    
-    @field_validator('created_at', mode='before')
-    @classmethod
-    def parse_created_at(cls, v):
-        if v is None:
-            return None
-        if isinstance(v, datetime):
-            return v
-        if isinstance(v, date):
-            return datetime.combine(v, datetime.min.time())
-        if isinstance(v, str):
-            if 'T' not in v and len(v) == 10:
-                return datetime.strptime(v, '%Y-%m-%d')
-            return datetime.fromisoformat(v.replace('Z', '+00:00'))
-        return v
+    created_at: Timestamp = None  # Allow updating creation date
     sow_title: Optional[str] = None
     sow_type: Optional[str] = None
-    start_date: Optional[date] = None
-    end_date: Optional[date] = None
+    start_date: CalendarDate = None
+    end_date: CalendarDate = None
     value: Optional[float] = None
     currency: Optional[str] = None
     billing_type: Optional[str] = None
@@ -100,7 +60,9 @@ class SOWUpdate(BaseModel):
 class SOW(SOWBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     attachments: List[AttachmentMetadata] = []
     linked_opportunity_id: Optional[str] = None
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+    archived_at: Optional[datetime] = None  # Set on records read with include_archived=true
\ No newline at end of file
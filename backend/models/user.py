@@ -19,6 +19,7 @@ class UserUpdate(BaseModel):
 class User(UserBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -37,6 +37,10 @@ class Role(BaseModel):
     
     model_config = ConfigDict(extra="ignore")
 
+class RoleUpdate(BaseModel):
+    description: str = ""
+    permissions: Dict[str, List[str]]
+
 class UserCreate(BaseModel):
     full_name: str = Field(..., min_length=2, max_length=100)
     email: EmailStr
@@ -55,6 +59,7 @@ class UserUpdate(BaseModel):
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: int = 0
     full_name: str
     email: EmailStr
     role: UserRole
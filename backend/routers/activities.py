@@ -3,10 +3,14 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 import uuid
-from typing import List
+from typing import List, Optional
 from models.activity import ActivityCreate, Activity, ActivityUpdate
 from database import get_db
 from utils.middleware import get_current_user
+from utils.dates import with_bson_dates
+from utils.collection_versions import bump_collection_version
+from utils.tombstones import record_deletions
+from utils.updates import if_match_version, update_versioned
 
 router = APIRouter(prefix="/activities", tags=["Activities"])
 
@@ -32,34 +36,37 @@ async def get_activity(activity_id: str, current_user: dict = Depends(get_curren
 async def create_activity(activity_data: ActivityCreate, current_user: dict = Depends(get_current_user)):
     db = get_db()
     activity_dict = activity_data.model_dump()
-    if "due_date" in activity_dict and activity_dict["due_date"]:
-        activity_dict["due_date"] = activity_dict["due_date"].isoformat()
+    with_bson_dates("activities", activity_dict)
     
     activity_dict["id"] = str(uuid.uuid4())
-    activity_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    activity_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    activity_dict["created_at"] = datetime.now(timezone.utc)
+    activity_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.activities.insert_one(activity_dict)
+    await bump_collection_version(db, "activities")
     return activity_dict
 
 @router.put("/{activity_id}", response_model=Activity)
-async def update_activity(activity_id: str, activity_data: ActivityUpdate, current_user: dict = Depends(get_current_user)):
+async def update_activity(
+    activity_id: str,
+    activity_data: ActivityUpdate,
+    current_user: dict = Depends(get_current_user),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
     update_dict = {k: v for k, v in activity_data.model_dump().items() if v is not None}
     if not update_dict:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    if "due_date" in update_dict and update_dict["due_date"]:
-        update_dict["due_date"] = update_dict["due_date"].isoformat()
+    with_bson_dates("activities", update_dict)
     
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
-    result = await db.activities.update_one({"id": activity_id}, {"$set": update_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Activity not found")
-    
-    activity = await db.activities.find_one({"id": activity_id}, {"_id": 0})
-    return activity
+    updated = await update_versioned(
+        db, "activities", {"id": activity_id}, {"$set": update_dict}, expected_version, not_found="Activity not found"
+    )
+    await bump_collection_version(db, "activities")
+    return updated
 
 @router.delete("/{activity_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_activity(activity_id: str, current_user: dict = Depends(get_current_user)):
@@ -67,4 +74,6 @@ async def delete_activity(activity_id: str, current_user: dict = Depends(get_cur
     result = await db.activities.delete_one({"id": activity_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Activity not found")
+    await bump_collection_version(db, "activities")
+    await record_deletions(db, "activities", [{"id": activity_id}])
     return None
\ No newline at end of file
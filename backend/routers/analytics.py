@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from database import get_db, ANALYTICS
+from utils.scoping import Scope, get_scope
+from utils.funnel import GROUP_BY_OPTIONS, compute_funnel
+from utils.pivot import PivotError, run_pivot
+from models.analytics import PivotRequest
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+@router.get("/funnel")
+async def get_conversion_funnel(
+    group_by: str = Query("cohort_month", description="cohort_month, owner, region or lead_source"),
+    from_month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Lead creation month (YYYY-MM)"),
+    to_month: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="Lead creation month (YYYY-MM)"),
+    owner: Optional[str] = Query(None),
+    region: Optional[str] = Query(None),
+    lead_source: Optional[str] = Query(None),
+    scope: Scope = Depends(get_scope)
+):
+    """Lead -> Opportunity -> SOW -> Project conversion rates and median stage durations"""
+    if group_by not in GROUP_BY_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(GROUP_BY_OPTIONS)}")
+    if from_month and to_month and from_month > to_month:
+        raise HTTPException(status_code=400, detail="from_month must not be after to_month")
+
+    db = get_db(ANALYTICS)
+    return await compute_funnel(db, group_by, from_month, to_month, owner, region, lead_source, scope)
+
+@router.post("/pivot")
+async def pivot(request: PivotRequest, scope: Scope = Depends(get_scope)):
+    """Ad-hoc dimensions x measures over leads, opportunities, SOWs or sales activities"""
+    db = get_db(ANALYTICS)
+    try:
+        return await run_pivot(db, request, scope)
+    except PivotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from database import get_db
+from models.archive import ArchiveRestoreRequest
+from utils.middleware import require_admin
+from utils.archival import ARCHIVE_AFTER_MONTHS, ArchiveError, archive_status, restore_records
+from utils.audit import AUDITED_ENTITIES, record_audit
+
+router = APIRouter(prefix="/archive", tags=["Archive"])
+
+@router.get("")
+async def get_archive_status(
+    months: int = Query(ARCHIVE_AFTER_MONTHS, ge=1, description="Age (in months) that makes a terminal record due"),
+    current_user: dict = Depends(require_admin)
+):
+    """Hot, archived and due-for-archive record counts per archived collection"""
+    return await archive_status(get_db(), months)
+
+@router.post("/{collection}/restore")
+async def restore_archived(collection: str, request: ArchiveRestoreRequest, current_user: dict = Depends(require_admin)):
+    """Move archived records back to the live collection"""
+    db = get_db()
+    try:
+        result = await restore_records(db, collection, request.ids)
+    except ArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if collection in AUDITED_ENTITIES:
+        for record_id in result["restored"]:
+            record_audit(collection, record_id, "restore", current_user)
+    return result
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from datetime import datetime
+from typing import Optional
+from database import get_db, ANALYTICS
+from utils.middleware import require_admin
+from utils.audit import AUDITED_ENTITIES, InvalidCursor, buffer, load_audit
+
+router = APIRouter(prefix="/audit", tags=["Audit"])
+
+@router.get("")
+async def get_audit_log(
+    entity: Optional[str] = Query(None, description="One of opportunities, sows, clients, users, settings"),
+    entity_id: Optional[str] = Query(None, description="Record id (setting_type for settings); requires entity"),
+    actor: Optional[str] = Query(None, description="User id of whoever made the change"),
+    from_at: Optional[datetime] = Query(None, alias="from"),
+    to_at: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: dict = Depends(require_admin)
+):
+    """Newest-first field-level change history, by record and/or by the user who made the change"""
+    if entity and entity not in AUDITED_ENTITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown audit entity; use one of {', '.join(AUDITED_ENTITIES)}")
+    if entity_id and not entity:
+        raise HTTPException(status_code=400, detail="entity_id requires entity")
+
+    match = {}
+    if entity:
+        match["meta.entity"] = entity
+    if entity_id:
+        match["meta.entity_id"] = entity_id
+    if actor:
+        match["meta.actor_id"] = actor
+    if from_at or to_at:
+        match["at"] = {}
+        if from_at:
+            match["at"]["$gte"] = from_at
+        if to_at:
+            match["at"]["$lt"] = to_at
+
+    try:
+        return await load_audit(get_db(ANALYTICS), match, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats")
+async def get_audit_buffer_stats(current_user: dict = Depends(require_admin)):
+    """This API process's audit buffer: events waiting, written, dropped and failed flushes"""
+    return buffer.stats()
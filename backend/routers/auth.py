@@ -4,6 +4,8 @@ from datetime import datetime, timezone, timedelta
 import os
 import uuid
 from models.user import UserCreate, User, UserLogin, TokenResponse
+from utils.collection_versions import bump_collection_version
+from utils.audit import record_audit
 from utils.auth import get_password_hash, verify_password, create_access_token
 from utils.middleware import get_current_user
 from database import get_db
@@ -25,10 +27,13 @@ async def register(user_data: UserCreate):
     user_dict = user_data.model_dump()
     user_dict["id"] = str(uuid.uuid4())
     user_dict["password"] = get_password_hash(user_data.password)
-    user_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    user_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    user_dict["created_at"] = datetime.now(timezone.utc)
+    user_dict["updated_at"] = datetime.now(timezone.utc)
 
     await db.users.insert_one(user_dict)
+    await bump_collection_version(db, "users")
+    # Self-registration: the new user is the actor
+    record_audit("users", user_dict["id"], "create", user_dict)
 
     # Remove password from response
     user_dict.pop("password")
@@ -60,8 +65,8 @@ async def login(credentials: UserLogin):
             "email": "admin@sightspectrum.com",
             "full_name": "Admin User",
             "role": "Admin",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc)
         }
 
         print(f"✓ Token created: {access_token}")
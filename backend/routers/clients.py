@@ -1,12 +1,20 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 from datetime import datetime, timezone
 import os
 import uuid
-from typing import List
+from typing import List, Optional
 from models.client import ClientCreate, Client, ClientUpdate
 from database import get_db
 from utils.middleware import get_current_user
+from utils.scoping import Scope, get_scope
+from utils.dedup import build_dedup_keys, find_duplicate_candidates
+from utils.client_rollups import ROLLUP_FIELD, EMPTY_ROLLUP, SORTABLE_FIELDS, compute_rollups, refresh_client_rollups
+from utils.collection_versions import bump_collection_version
+from utils.tombstones import record_deletions, record_scope_change, tombstone_projection
+from utils.updates import VERSION_FIELD, if_match_version, update_versioned_pair, with_version_bump
+from utils.audit import record_audit
 
 router = APIRouter(prefix="/clients", tags=["Clients"])
 
@@ -15,15 +23,27 @@ router = APIRouter(prefix="/clients", tags=["Clients"])
 
 
 @router.get("", response_model=List[Client])
-async def get_clients(current_user: dict = Depends(get_current_user)):
+async def get_clients(
+    sort_by: Optional[str] = Query(None, description=f"Rollup field to sort by, descending: {', '.join(SORTABLE_FIELDS)}"),
+    min_open_pipeline: Optional[float] = Query(None, ge=0),
+    scope: Scope = Depends(get_scope)
+):
+    if sort_by and sort_by not in SORTABLE_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of {', '.join(SORTABLE_FIELDS)}")
     db = get_db()
-    clients = await db.clients.find({}, {"_id": 0}).to_list(1000)
+    query = {}
+    if min_open_pipeline is not None:
+        query[f"{ROLLUP_FIELD}.open_pipeline"] = {"$gte": min_open_pipeline}
+    cursor = db.clients.find(scope.apply("clients", query), {"_id": 0})
+    if sort_by:
+        cursor = cursor.sort(f"{ROLLUP_FIELD}.{sort_by}", -1)
+    clients = await cursor.to_list(1000)
     return clients
 
 @router.get("/{client_id}", response_model=Client)
-async def get_client(client_id: str, current_user: dict = Depends(get_current_user)):
+async def get_client(client_id: str, scope: Scope = Depends(get_scope)):
     db = get_db()
-    client_doc = await db.clients.find_one({"id": client_id}, {"_id": 0})
+    client_doc = await db.clients.find_one(scope.apply("clients", {"id": client_id}), {"_id": 0})
     if not client_doc:
         raise HTTPException(status_code=404, detail="Client not found")
     return client_doc
@@ -35,42 +55,95 @@ def generate_client_id(client_name: str) -> str:
     return f"{prefix}-{timestamp}"
 
 @router.post("", response_model=Client, status_code=status.HTTP_201_CREATED)
-async def create_client(client_data: ClientCreate, current_user: dict = Depends(get_current_user)):
+async def create_client(
+    client_data: ClientCreate,
+    allow_duplicate: bool = Query(False, description="Create even if a likely duplicate exists"),
+    current_user: dict = Depends(get_current_user)
+):
     db = get_db()
     client_dict = client_data.model_dump()
     
+    # Reject likely duplicates unless explicitly confirmed
+    client_dict["dedup"] = build_dedup_keys("clients", client_dict)
+    if not allow_duplicate:
+        duplicates = await find_duplicate_candidates(db, "clients", client_dict)
+        if duplicates:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "A similar client already exists", "duplicates": duplicates}
+            )
+    
     # Generate client ID
     client_dict["client_id"] = generate_client_id(client_data.client_name)
     client_dict["id"] = str(uuid.uuid4())  # Keep UUID as internal ID
     
     # Set timestamps
-    now = datetime.now(timezone.utc).isoformat()
+    now = datetime.now(timezone.utc)
     client_dict["created_at"] = now
     client_dict["updated_at"] = now
+    # Leads and deals may already name this account
+    rollups = await compute_rollups(db, [client_dict["client_name"]])
+    client_dict[ROLLUP_FIELD] = rollups.get(client_dict["client_name"], dict(EMPTY_ROLLUP))
     
     await db.clients.insert_one(client_dict)
+    await bump_collection_version(db, "clients")
+    record_audit("clients", client_dict["id"], "create", current_user)
     return client_dict
 
 @router.put("/{client_id}", response_model=Client)
-async def update_client(client_id: str, client_data: ClientUpdate, current_user: dict = Depends(get_current_user)):
+async def update_client(
+    client_id: str,
+    client_data: ClientUpdate,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
     update_dict = {k: v for k, v in client_data.model_dump().items() if v is not None}
     if not update_dict:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
-    result = await db.clients.update_one({"id": client_id}, {"$set": update_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Client not found")
+    before, client_doc = await update_versioned_pair(
+        db, "clients", scope.apply("clients", {"id": client_id}), {"$set": update_dict}, expected_version,
+        not_found="Client not found"
+    )
+    await bump_collection_version(db, "clients")
+    await record_scope_change(db, "clients", before, client_doc)
+    record_audit("clients", client_id, "update", current_user, before, client_doc)
+    
+    # Linked records are matched by name, so a renamed client gets its rollup recomputed
+    if "client_name" in update_dict:
+        rollups = await refresh_client_rollups(db, [update_dict["client_name"]])
+        client_doc[ROLLUP_FIELD] = rollups[update_dict["client_name"]]
     
-    client_doc = await db.clients.find_one({"id": client_id}, {"_id": 0})
+    # Keep duplicate-detection keys in step with name/email changes
+    if {"client_name", "contact_email", "website", "contacts"} & update_dict.keys():
+        client_doc["dedup"] = build_dedup_keys("clients", client_doc)
+        rekeyed = await db.clients.find_one_and_update(
+            {"id": client_id},
+            with_version_bump({"$set": {"dedup": client_doc["dedup"]}}),
+            projection={"_id": 0, VERSION_FIELD: 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if rekeyed:
+            client_doc[VERSION_FIELD] = rekeyed[VERSION_FIELD]
     return client_doc
 
 @router.delete("/{client_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_client(client_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_client(
+    client_id: str,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    result = await db.clients.delete_one({"id": client_id})
-    if result.deleted_count == 0:
+    deleted = await db.clients.find_one_and_delete(
+        scope.apply("clients", {"id": client_id}), projection=tombstone_projection("clients")
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Client not found")
+    await bump_collection_version(db, "clients")
+    await record_deletions(db, "clients", [deleted])
+    record_audit("clients", client_id, "delete", current_user)
     return None
\ No newline at end of file
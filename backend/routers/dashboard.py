@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
-from typing import Dict, List, Any
-from utils.middleware import get_current_user
-from database import get_db
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Any, Literal, Optional
+from utils.archival import including_archive
+from utils.daily_buckets import windowed_dashboard
+from utils.response_cache import cached_response
+from utils.scoping import Scope, get_scope
+from database import get_db, ANALYTICS
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
@@ -11,78 +15,137 @@ router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
 
+# Everything the all-time and windowed views read (buckets follow their sources)
+DASHBOARD_COLLECTIONS = [
+    "leads", "opportunities", "sows", "sales_activities", "clients", "partners",
+    "activities", "action_items", "forecasts",
+]
+
+def _counts(rows: List[Dict[str, Any]]) -> Dict[Any, int]:
+    return {row["_id"]: row["count"] for row in rows}
+
 @router.get("/analytics")
-async def get_dashboard_analytics(current_user: dict = Depends(get_current_user)) -> Dict[str, Any]:
-    db = get_db()
-    # Get counts
-    total_clients = await db.clients.count_documents({})
-    total_vendors = await db.vendors.count_documents({})
-    total_leads = await db.leads.count_documents({})
-    total_opportunities = await db.opportunities.count_documents({})
-    total_sows = await db.sows.count_documents({})
-    total_activities = await db.activities.count_documents({})
-    
-    # Lead metrics
-    active_leads = await db.leads.count_documents({"status": "Active"})
-    won_leads = await db.leads.count_documents({"stage": "Won"})
-    lost_leads = await db.leads.count_documents({"stage": "Lost"})
-    
+@cached_response(DASHBOARD_COLLECTIONS, ttl_seconds=30)
+async def get_dashboard_analytics(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Shorthand for one month's window (YYYY-MM)"),
+    compare_to: Literal["previous_period", "previous_year"] = "previous_period",
+    scope: Scope = Depends(get_scope),
+) -> Dict[str, Any]:
+    """
+    All-time totals, or with from/to (or month) the window's totals from the
+    daily buckets, compared with the previous period or the same dates a year
+    earlier. A missing `to` means today; a missing `from` means 30 days before `to`.
+    """
+    if month:
+        year, month_number = (int(part) for part in month.split("-"))
+        from_date = date(year, month_number, 1)
+        to_date = (date(year + month_number // 12, month_number % 12 + 1, 1) - timedelta(days=1))
+    if from_date is None and to_date is None:
+        return await get_all_time_analytics(scope)
+
+    to_date = to_date or datetime.now(timezone.utc).date()
+    from_date = from_date or to_date - timedelta(days=29)
+    try:
+        return await windowed_dashboard(get_db(ANALYTICS), from_date, to_date, compare_to, scope)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+async def get_all_time_analytics(scope: Scope) -> Dict[str, Any]:
+    db = get_db(ANALYTICS)
+    # One aggregation per collection (plus one for the small ones) instead of a
+    # count_documents/find per metric; keeps the dashboard at a fixed 7 commands
+    def tagged(collection: str, fields: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        return [
+            {"$match": scope.filter(collection)},
+            {"$project": {"_id": 0, "collection": {"$literal": collection}, **(fields or {})}},
+        ]
+
+    small = await db.clients.aggregate([
+        *tagged("clients"),
+        {"$unionWith": {"coll": "partners", "pipeline": tagged("partners")}},
+        {"$unionWith": {"coll": "vendors", "pipeline": tagged("vendors")}},
+        {"$unionWith": {"coll": "activities", "pipeline": tagged("activities", {"status": 1})}},
+        {"$group": {"_id": {"collection": "$collection", "status": "$status"}, "count": {"$sum": 1}}},
+    ]).to_list(None)
+    small_counts: Dict[str, Dict[Any, int]] = {}
+    for row in small:
+        small_counts.setdefault(row["_id"]["collection"], {})[row["_id"].get("status")] = row["count"]
+    total_clients = sum(small_counts.get("clients", {}).values())
+    total_vendors = sum(small_counts.get("vendors", {}).values())
+    total_partners = sum(small_counts.get("partners", {}).values())
+    activity_statuses = small_counts.get("activities", {})
+    total_activities = sum(activity_statuses.values())
+
+    # Lead metrics (archived records count towards all-time totals)
+    leads = (await db.leads.aggregate(including_archive("leads", [
+        {"$match": scope.filter("leads")},
+        {"$facet": {
+            "status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "stage": [{"$group": {"_id": "$stage", "count": {"$sum": 1}}}],
+            "source": [{"$group": {"_id": {"$ifNull": ["$lead_source", "Unknown"]}, "count": {"$sum": 1}}}],
+        }},
+    ])).to_list(1))[0]
+    lead_stages = _counts(leads["stage"])
+    total_leads = sum(lead_stages.values())
+    active_leads = _counts(leads["status"]).get("Active", 0)
+    won_leads = lead_stages.get("Won", 0)
+    lost_leads = lead_stages.get("Lost", 0)
+    source_counts = _counts(leads["source"])
+
     # Opportunity metrics
-    active_opportunities = await db.opportunities.count_documents({"status": "Active"})
-    closed_won = await db.opportunities.count_documents({"stage": "Closed Won"})
-    
-    # Calculate total pipeline value
-    opportunities_list = await db.opportunities.find({"status": "Active"}, {"_id": 0, "estimated_value": 1}).to_list(1000)
-    total_pipeline_value = sum([opp.get("estimated_value", 0) for opp in opportunities_list])
-    
-    # Calculate total SOW value
-    sows_list = await db.sows.find({}, {"_id": 0, "value": 1}).to_list(1000)
-    total_sow_value = sum([sow.get("value", 0) for sow in sows_list])
-    
-    # Opportunities by stage
-    all_opportunities = await db.opportunities.find({}, {"_id": 0, "stage": 1}).to_list(1000)
-    stage_counts = {}
-    for opp in all_opportunities:
-        stage = opp.get("stage", "Unknown")
-        stage_counts[stage] = stage_counts.get(stage, 0) + 1
-    
-    # Leads by source
-    all_leads = await db.leads.find({}, {"_id": 0, "lead_source": 1}).to_list(1000)
-    source_counts = {}
-    for lead in all_leads:
-        source = lead.get("lead_source", "Unknown")
-        source_counts[source] = source_counts.get(source, 0) + 1
-    
-    # Recent activities
-    pending_activities = await db.activities.count_documents({"status": "Pending"})
-    completed_activities = await db.activities.count_documents({"status": "Completed"})
-    
+    opportunities = (await db.opportunities.aggregate(including_archive("opportunities", [
+        {"$match": scope.filter("opportunities")},
+        {"$facet": {
+            "status": [{"$group": {
+                "_id": "$status", "count": {"$sum": 1}, "value": {"$sum": "$estimated_value"}
+            }}],
+            "stage": [{"$group": {"_id": {"$ifNull": ["$stage", "Unknown"]}, "count": {"$sum": 1}}}],
+        }},
+    ])).to_list(1))[0]
+    stage_counts = _counts(opportunities["stage"])
+    total_opportunities = sum(stage_counts.values())
+    active = next((row for row in opportunities["status"] if row["_id"] == "Active"), {})
+    active_opportunities = active.get("count", 0)
+    total_pipeline_value = active.get("value", 0)
+    closed_won = stage_counts.get("Closed Won", 0)
+
+    # SOW metrics
+    sows = await db.sows.aggregate(including_archive("sows", [
+        {"$match": scope.filter("sows")},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}, "value": {"$sum": "$value"}}},
+    ])).to_list(None)
+    sow_statuses = _counts(sows)
+    total_sows = sum(sow_statuses.values())
+    total_sow_value = sum(row["value"] for row in sows)
+
     # Win rate calculation
     total_closed_leads = won_leads + lost_leads
     win_rate = round((won_leads / total_closed_leads * 100), 2) if total_closed_leads > 0 else 0
     
     # Action Items metrics
-    total_action_items = await db.action_items.count_documents({})
-    pending_action_items = await db.action_items.count_documents({"status": {"$in": ["Not Started", "In Progress"]}})
-    completed_action_items = await db.action_items.count_documents({"status": "Completed"})
-    overdue_action_items = await db.action_items.count_documents({"status": "Overdue"})
+    action_item_statuses = _counts(await db.action_items.aggregate([
+        {"$match": scope.filter("action_items")},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]).to_list(None))
     
     # Sales Activities metrics
-    total_sales_activities = await db.sales_activities.count_documents({})
-    sales_activities_by_type = {}
-    activities = await db.sales_activities.find({}, {"_id": 0, "activity_type": 1}).to_list(1000)
-    for activity in activities:
-        act_type = activity.get("activity_type", "Other")
-        sales_activities_by_type[act_type] = sales_activities_by_type.get(act_type, 0) + 1
+    sales_activities_by_type = _counts(await db.sales_activities.aggregate([
+        {"$match": scope.filter("sales_activities")},
+        {"$group": {"_id": {"$ifNull": ["$activity_type", "Other"]}, "count": {"$sum": 1}}},
+    ]).to_list(None))
     
     # Forecast metrics
-    forecasts = await db.forecasts.find({}, {"_id": 0, "forecast_amount": 1, "deal_value": 1, "probability_percent": 1}).to_list(1000)
-    total_forecast_amount = sum([f.get("forecast_amount", 0) for f in forecasts])
-    total_deal_value = sum([f.get("deal_value", 0) for f in forecasts])
-    avg_win_probability = round(sum([f.get("probability_percent", 0) for f in forecasts]) / len(forecasts), 2) if forecasts else 0
-    
-    # Partners metrics
-    total_partners = await db.partners.count_documents({})
+    forecasts = (await db.forecasts.aggregate([
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "forecast_amount": {"$sum": "$forecast_amount"},
+            "deal_value": {"$sum": "$deal_value"},
+            "probability": {"$avg": {"$ifNull": ["$probability_percent", 0]}},
+        }},
+    ]).to_list(1) or [{"count": 0, "forecast_amount": 0, "deal_value": 0, "probability": 0}])[0]
     
     return {
         "overview": {
@@ -111,31 +174,31 @@ async def get_dashboard_analytics(current_user: dict = Depends(get_current_user)
             "conversion_rate": round((won_leads / total_leads * 100), 2) if total_leads > 0 else 0
         },
         "activities": {
-            "pending_activities": pending_activities,
-            "completed_activities": completed_activities
+            "pending_activities": activity_statuses.get("Pending", 0),
+            "completed_activities": activity_statuses.get("Completed", 0)
         },
         "sow_tracking": {
-            "active_sows": await db.sows.count_documents({"status": "Active"}),
-            "completed_sows": await db.sows.count_documents({"status": "Completed"}),
+            "active_sows": sow_statuses.get("Active", 0),
+            "completed_sows": sow_statuses.get("Completed", 0),
             "total_sow_value": total_sow_value
         },
         "action_items": {
-            "total": total_action_items,
-            "pending": pending_action_items,
-            "completed": completed_action_items,
-            "overdue": overdue_action_items
+            "total": sum(action_item_statuses.values()),
+            "pending": action_item_statuses.get("Not Started", 0) + action_item_statuses.get("In Progress", 0),
+            "completed": action_item_statuses.get("Completed", 0),
+            "overdue": action_item_statuses.get("Overdue", 0)
         },
         "sales_activities": {
-            "total": total_sales_activities,
+            "total": sum(sales_activities_by_type.values()),
             "by_type": sales_activities_by_type
         },
         "forecasts": {
-            "total_forecast_amount": total_forecast_amount,
-            "total_deal_value": total_deal_value,
-            "avg_win_probability": avg_win_probability,
-            "total_forecasts": len(forecasts)
+            "total_forecast_amount": forecasts["forecast_amount"],
+            "total_deal_value": forecasts["deal_value"],
+            "avg_win_probability": round(forecasts["probability"] or 0, 2),
+            "total_forecasts": forecasts["count"]
         },
         "partners": {
             "total_partners": total_partners
         }
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from typing import List, Dict, Any
+from database import get_db
+from models.dedup import DuplicateCheckRequest, MergeRequest
+from utils.middleware import get_current_user, require_admin
+from utils.dedup import (
+    DEDUP_ENTITIES, DUPLICATE_THRESHOLD, MERGE_HANDLERS,
+    build_dedup_keys, find_duplicate_candidates, load_clusters
+)
+from utils.audit import AUDITED_ENTITIES, record_audit
+from utils.jobs import enqueue_job
+
+router = APIRouter(prefix="/dedup", tags=["Duplicate Detection"])
+
+def _validate_entity(entity: str) -> Dict[str, Any]:
+    if entity not in DEDUP_ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Duplicate detection is not available for '{entity}'")
+    return DEDUP_ENTITIES[entity]
+
+@router.post("/{entity}/check")
+async def check_duplicates(
+    entity: str,
+    request: DuplicateCheckRequest,
+    threshold: float = Query(DUPLICATE_THRESHOLD, ge=0.3, le=1.0),
+    current_user: dict = Depends(get_current_user)
+) -> List[Dict[str, Any]]:
+    """Check records (a form entry or an import file) against existing data before creating them"""
+    _validate_entity(entity)
+    db = get_db()
+
+    results = []
+    for index, record in enumerate(request.records):
+        record = {**record, "dedup": build_dedup_keys(entity, record)}
+        duplicates = await find_duplicate_candidates(db, entity, record, threshold=threshold)
+        results.append({"index": index, "duplicates": duplicates})
+    return results
+
+@router.get("/{entity}/clusters")
+async def get_duplicate_clusters(
+    entity: str,
+    response: Response,
+    threshold: float = Query(DUPLICATE_THRESHOLD, ge=0.3, le=1.0),
+    refresh: bool = Query(False, description="Queue a new clustering even if one is stored"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Duplicate clusters across the whole collection for merge review, as last
+    computed by the `dedup.clusters` job. Without a stored result (or with
+    refresh) the job is queued; until it has run the response is 202 with its id.
+    """
+    _validate_entity(entity)
+    db = get_db()
+    stored = await load_clusters(db, entity, threshold)
+
+    job = None
+    if stored is None or refresh:
+        job = await enqueue_job(
+            db, "dedup.clusters", {"entity": entity, "threshold": threshold},
+            created_by=current_user.get("sub"),
+            dedupe_key=f"dedup.clusters:{entity}:{threshold:g}"
+        )
+    if stored is None:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"entity": entity, "threshold": threshold, "status": "computing", "job_id": job["id"]}
+    return {**stored, "job_id": job["id"] if job else None}
+
+@router.post("/{entity}/merge")
+async def merge_duplicates(
+    entity: str,
+    request: MergeRequest,
+    current_user: dict = Depends(require_admin)
+):
+    """Merge duplicates into a primary record and re-point everything linked to them"""
+    config = _validate_entity(entity)
+    if request.primary_id in request.duplicate_ids:
+        raise HTTPException(status_code=400, detail="Primary record cannot also be a duplicate")
+
+    db = get_db()
+    collection = db[config["collection"]]
+    primary = await collection.find_one({"id": request.primary_id}, {"_id": 0})
+    if not primary:
+        raise HTTPException(status_code=404, detail="Primary record not found")
+
+    duplicates = await collection.find({"id": {"$in": request.duplicate_ids}}, {"_id": 0}).to_list(len(request.duplicate_ids))
+    missing = set(request.duplicate_ids) - {d["id"] for d in duplicates}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Records not found: {', '.join(sorted(missing))}")
+
+    updated = await MERGE_HANDLERS[entity](db, primary, duplicates)
+    if config["collection"] in AUDITED_ENTITIES:
+        merged = await collection.find_one({"id": request.primary_id}, {"_id": 0})
+        record_audit(config["collection"], request.primary_id, "update", current_user, primary, merged)
+        for duplicate in duplicates:
+            record_audit(config["collection"], duplicate["id"], "delete", current_user)
+    return {
+        "message": f"Merged {len(duplicates)} record(s) into {request.primary_id}",
+        "primary_id": request.primary_id,
+        "updated": updated
+    }
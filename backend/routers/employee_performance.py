@@ -1,24 +1,71 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional
-from database import get_db
+from database import db_for, ANALYTICS
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime, timezone
 from dateutil import parser
+from utils.dates import parse_datetime
+from utils.response_cache import cached_response
+from utils.scoping import Scope, get_scope
 
 router = APIRouter(prefix="/employees", tags=["employees"])
 
+def _day(value) -> str:
+    """YYYY-MM-DD of a stored timestamp, or N/A"""
+    moment = parse_datetime(value)
+    return moment.date().isoformat() if moment else "N/A"
+
+@router.get("/proposal-counts")
+@cached_response(["users", "leads", "opportunities", "sows"], ttl_seconds=60)
+async def get_all_employee_proposal_counts(
+    db: AsyncIOMotorDatabase = Depends(db_for(ANALYTICS)),
+    scope: Scope = Depends(get_scope)
+):
+    """
+    Get proposal counts for the employees the caller can see, counting only records the caller can see
+    """
+    try:
+        users = await db.users.find(scope.apply("users"), {"_id": 0}).to_list(1000)
+        names = [user["full_name"] for user in users if user.get("full_name")]
+        
+        # One grouped count per collection instead of three counts per user
+        totals = {}
+        for collection, owner_field in (("leads", "owner"), ("opportunities", "sales_owner"), ("sows", "owner")):
+            async for row in db[collection].aggregate([
+                {"$match": scope.apply(collection, {owner_field: {"$in": names}})},
+                {"$group": {"_id": f"${owner_field}", "count": {"$sum": 1}}}
+            ]):
+                totals[row["_id"]] = totals.get(row["_id"], 0) + row["count"]
+        
+        result = []
+        for user in users:
+            result.append({
+                "id": user["id"],
+                "full_name": user["full_name"],
+                "email": user["email"],
+                "role": user["role"],
+                "proposalCount": totals.get(user["full_name"], 0)
+            })
+        
+        return result
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch proposal counts: {str(e)}")
+
 @router.get("/{user_id}/performance")
+@cached_response(["users", "leads", "opportunities", "sows"], ttl_seconds=60)
 async def get_employee_performance(
     user_id: str,
     month: Optional[str] = Query(None, description="Filter by month (YYYY-MM format)"),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(ANALYTICS)),
+    scope: Scope = Depends(get_scope)
 ):
     """
-    Get performance metrics and proposals for a specific employee
+    Get performance metrics and proposals for a specific employee (records the caller can see)
     """
     try:
         # Get employee details
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        user = await db.users.find_one(scope.apply("users", {"id": user_id}), {"_id": 0})
         if not user:
             raise HTTPException(status_code=404, detail="Employee not found")
         
@@ -34,8 +81,8 @@ async def get_employee_performance(
                     end_date = datetime(year, month_num + 1, 1, tzinfo=timezone.utc)
                 date_filter = {
                     "updated_at": {
-                        "$gte": start_date.isoformat(),
-                        "$lt": end_date.isoformat()
+                        "$gte": start_date,
+                        "$lt": end_date
                     }
                 }
             except:
@@ -45,19 +92,19 @@ async def get_employee_performance(
         lead_query = {"owner": user["full_name"]}
         if date_filter:
             lead_query.update(date_filter)
-        leads = await db.leads.find(lead_query, {"_id": 0}).to_list(1000)
+        leads = await db.leads.find(scope.apply("leads", lead_query), {"_id": 0}).to_list(1000)
         
         # Get opportunities owned by this employee
         opp_query = {"sales_owner": user["full_name"]}
         if date_filter:
             opp_query.update(date_filter)
-        opportunities = await db.opportunities.find(opp_query, {"_id": 0}).to_list(1000)
+        opportunities = await db.opportunities.find(scope.apply("opportunities", opp_query), {"_id": 0}).to_list(1000)
         
         # Get SOWs owned by this employee
         sow_query = {"owner": user["full_name"]}
         if date_filter:
             sow_query.update(date_filter)
-        sows = await db.sows.find(sow_query, {"_id": 0}).to_list(1000)
+        sows = await db.sows.find(scope.apply("sows", sow_query), {"_id": 0}).to_list(1000)
         
         # Calculate KPIs
         all_proposals = []
@@ -70,7 +117,7 @@ async def get_employee_performance(
                 "type": "Lead",
                 "status": "Won" if lead.get("stage") == "Won" else "Open" if lead.get("status") == "Active" else "Lost",
                 "dealValue": lead.get("estimated_value", 0),
-                "updated": lead.get("updated_at", "")[:10] if lead.get("updated_at") else "N/A",
+                "updated": _day(lead.get("updated_at")),
                 "stage": lead.get("stage", "Unknown")
             })
         
@@ -83,7 +130,7 @@ async def get_employee_performance(
                 "type": "RFP" if "proposal" in opp.get("opportunity_name", "").lower() else "RFQ",
                 "status": status,
                 "dealValue": opp.get("estimated_value", 0),
-                "updated": opp.get("updated_at", "")[:10] if opp.get("updated_at") else "N/A",
+                "updated": _day(opp.get("updated_at")),
                 "stage": opp.get("stage", "Unknown")
             })
         
@@ -96,7 +143,7 @@ async def get_employee_performance(
                 "type": "SOW",
                 "status": status,
                 "dealValue": sow.get("value", 0),
-                "updated": sow.get("updated_at", "")[:10] if sow.get("updated_at") else "N/A",
+                "updated": _day(sow.get("updated_at")),
                 "stage": sow.get("status", "Unknown")
             })
         
@@ -144,40 +191,3 @@ async def get_employee_performance(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch performance data: {str(e)}")
 
-
-@router.get("/proposal-counts")
-async def get_all_employee_proposal_counts(
-    db: AsyncIOMotorDatabase = Depends(get_db)
-):
-    """
-    Get proposal counts for all employees
-    """
-    try:
-        # Get all users
-        users = await db.users.find({}, {"_id": 0}).to_list(1000)
-        
-        result = []
-        for user in users:
-            # Count leads
-            lead_count = await db.leads.count_documents({"owner": user["full_name"]})
-            
-            # Count opportunities
-            opp_count = await db.opportunities.count_documents({"sales_owner": user["full_name"]})
-            
-            # Count SOWs
-            sow_count = await db.sows.count_documents({"owner": user["full_name"]})
-            
-            total_count = lead_count + opp_count + sow_count
-            
-            result.append({
-                "id": user["id"],
-                "full_name": user["full_name"],
-                "email": user["email"],
-                "role": user["role"],
-                "proposalCount": total_count
-            })
-        
-        return result
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch proposal counts: {str(e)}")
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import uuid
-from typing import List
+from typing import List, Optional
 from models.forecast import ForecastCreate, Forecast, ForecastUpdate
-from database import get_db
+from database import get_db, ANALYTICS
 from utils.middleware import get_current_user
+from utils.scoping import Scope, get_scope
+from utils.forecast_engine import get_weighted_forecast, run_simulation
+from utils.dates import with_bson_dates
+from utils.collection_versions import bump_collection_version
+from utils.tombstones import record_deletions
+from utils.updates import if_match_version, literal_fields, update_versioned
 
 router = APIRouter(prefix="/forecasts", tags=["Forecasts"])
 
@@ -15,6 +21,34 @@ async def get_forecasts(current_user: dict = Depends(get_current_user)):
     forecasts = await db.forecasts.find({}, {"_id": 0}).to_list(1000)
     return forecasts
 
+def _month_index(month: Optional[str]) -> Optional[int]:
+    """Convert YYYY-MM to the engine's month index"""
+    if not month:
+        return None
+    year, month_num = map(int, month.split("-"))
+    return year * 12 + month_num - 1
+
+@router.get("/pipeline/weighted")
+async def get_weighted_pipeline_forecast(scope: Scope = Depends(get_scope)):
+    """Weighted open-pipeline forecast by close month, quarter, owner and region (of the opportunities the caller can see)"""
+    db = get_db(ANALYTICS)
+    return await get_weighted_forecast(db, scope)
+
+@router.get("/pipeline/simulation")
+async def simulate_pipeline_bookings(
+    trials: int = Query(10000, ge=100, le=100000),
+    seed: Optional[int] = Query(42, description="Fixed by default so repeated runs are comparable"),
+    from_month: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="YYYY-MM"),
+    to_month: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="YYYY-MM"),
+    scope: Scope = Depends(get_scope)
+):
+    """Monte Carlo simulation of bookings (P10/P50/P90) for the open pipeline"""
+    start, end = _month_index(from_month), _month_index(to_month)
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="from_month must not be after to_month")
+    db = get_db(ANALYTICS)
+    return await run_simulation(db, trials, seed, start, end, scope)
+
 @router.get("/{forecast_id}", response_model=Forecast)
 async def get_forecast(forecast_id: str, current_user: dict = Depends(get_current_user)):
     db = get_db()
@@ -34,39 +68,41 @@ async def create_forecast(forecast_data: ForecastCreate, current_user: dict = De
         probability = forecast_dict.get("probability_percent", 0)
         forecast_dict["forecast_amount"] = round((deal_value * probability) / 100, 2)
     
-    if "expected_closure_date" in forecast_dict and forecast_dict["expected_closure_date"]:
-        forecast_dict["expected_closure_date"] = forecast_dict["expected_closure_date"].isoformat()
+    with_bson_dates("forecasts", forecast_dict)
     
     forecast_dict["id"] = str(uuid.uuid4())
-    forecast_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    forecast_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    forecast_dict["created_at"] = datetime.now(timezone.utc)
+    forecast_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.forecasts.insert_one(forecast_dict)
+    await bump_collection_version(db, "forecasts")
     return forecast_dict
 
 @router.put("/{forecast_id}", response_model=Forecast)
-async def update_forecast(forecast_id: str, forecast_data: ForecastUpdate, current_user: dict = Depends(get_current_user)):
+async def update_forecast(
+    forecast_id: str,
+    forecast_data: ForecastUpdate,
+    current_user: dict = Depends(get_current_user),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
-    forecast = await db.forecasts.find_one({"id": forecast_id})
-    if not forecast:
-        raise HTTPException(status_code=404, detail="Forecast not found")
-    
     update_data = forecast_data.model_dump(exclude_unset=True)
+    with_bson_dates("forecasts", update_data)
     
-    # Recalculate forecast amount if deal_value or probability changed
-    if "deal_value" in update_data or "probability_percent" in update_data:
-        deal_value = update_data.get("deal_value", forecast.get("deal_value", 0))
-        probability = update_data.get("probability_percent", forecast.get("probability_percent", 0))
-        update_data["forecast_amount"] = round((deal_value * probability) / 100, 2)
-    
-    if "expected_closure_date" in update_data and update_data["expected_closure_date"]:
-        update_data["expected_closure_date"] = update_data["expected_closure_date"].isoformat()
+    update_data["updated_at"] = datetime.now(timezone.utc)
     
-    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update = [{"$set": literal_fields(update_data)}]
+    # Recalculate forecast amount if deal_value or probability changed (from the stored value of the other)
+    if "deal_value" in update_data or "probability_percent" in update_data:
+        update.append({"$set": {"forecast_amount": {"$round": [{"$divide": [
+            {"$multiply": [{"$ifNull": ["$deal_value", 0]}, {"$ifNull": ["$probability_percent", 0]}]}, 100
+        ]}, 2]}}})
     
-    await db.forecasts.update_one({"id": forecast_id}, {"$set": update_data})
-    updated_forecast = await db.forecasts.find_one({"id": forecast_id}, {"_id": 0})
-    return updated_forecast
+    updated = await update_versioned(
+        db, "forecasts", {"id": forecast_id}, update, expected_version, not_found="Forecast not found"
+    )
+    await bump_collection_version(db, "forecasts")
+    return updated
 
 @router.delete("/{forecast_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_forecast(forecast_id: str, current_user: dict = Depends(get_current_user)):
@@ -74,4 +110,6 @@ async def delete_forecast(forecast_id: str, current_user: dict = Depends(get_cur
     result = await db.forecasts.delete_one({"id": forecast_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Forecast not found")
+    await bump_collection_version(db, "forecasts")
+    await record_deletions(db, "forecasts", [{"id": forecast_id}])
     return None
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from typing import Optional
+from database import get_db
+from models.job import JobCreate
+from utils.middleware import get_current_user, require_admin
+from utils.scoping import UNRESTRICTED_ROLES
+from utils import job_handlers  # noqa: F401 - registers the job types
+from utils.jobs import JOBS_COLLECTION, JOB_HANDLERS, enqueue_job, get_job, cancel_job
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+def _visible_to(current_user: dict) -> dict:
+    """Admins see every job; everyone else only the jobs they started"""
+    if current_user.get("role") in UNRESTRICTED_ROLES:
+        return {}
+    return {"created_by": current_user.get("sub")}
+
+@router.get("")
+async def list_jobs(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    job_type: Optional[str] = Query(None, alias="type"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user)
+):
+    """Most recent jobs, newest first"""
+    db = get_db()
+    query = _visible_to(current_user)
+    if status_filter:
+        query["status"] = status_filter
+    if job_type:
+        query["type"] = job_type
+    jobs = await db[JOBS_COLLECTION].find(query, {"_id": 0, "payload": 0}).sort("created_at", -1).to_list(limit)
+    return jobs
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status, progress and result of a job"""
+    db = get_db()
+    job = await get_job(db, job_id)
+    if not job or (_visible_to(current_user) and job.get("created_by") != current_user.get("sub")):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def create_job(job_data: JobCreate, current_user: dict = Depends(require_admin)):
+    """Queue a maintenance job (snapshots, backfills) for the worker"""
+    entry = JOB_HANDLERS.get(job_data.type)
+    if entry is None or not entry["enqueueable"]:
+        enqueueable = sorted(t for t, e in JOB_HANDLERS.items() if e["enqueueable"])
+        raise HTTPException(status_code=400, detail=f"Job type must be one of: {', '.join(enqueueable)}")
+
+    db = get_db()
+    return await enqueue_job(
+        db, job_data.type, job_data.payload,
+        priority=job_data.priority, max_attempts=job_data.max_attempts,
+        created_by=current_user.get("sub")
+    )
+
+@router.post("/{job_id}/cancel")
+async def cancel_job_request(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Cancel a queued or running job"""
+    db = get_db()
+    job = await get_job(db, job_id)
+    if not job or (_visible_to(current_user) and job.get("created_by") != current_user.get("sub")):
+        raise HTTPException(status_code=404, detail="Job not found")
+    cancelled = await cancel_job(db, job_id)
+    if not cancelled:
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+    return cancelled
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 from datetime import datetime, timezone
 import os
 import uuid
@@ -8,43 +9,72 @@ from models.lead_new import LeadCreate, Lead, LeadUpdate, StatusChangeLog
 from database import get_db
 from models.opportunity import OpportunityCreate
 from utils.middleware import get_current_user
+from utils.scoping import Scope, get_scope
 from utils.task_id_generator import generate_task_id
-from utils.lead_status import calculate_lead_status, create_status_change_log
+from utils.lead_status import calculate_lead_status, create_status_change_log, lead_status_stages
+from utils.dedup import build_dedup_keys, find_duplicate_candidates
+from utils.collection_versions import bump_collection_version
+from utils.dates import with_bson_dates
+from utils.archival import find_record, find_records
+from utils.derived_data import CHANGE_PROJECTIONS, record_change
+from utils.client_rollups import refresh_client_rollups
+from utils.tombstones import record_deletions, record_scope_change
+from utils.updates import VERSION_FIELD, if_match_version, literal_fields, update_from_current, version_filter, with_version_bump
 
 router = APIRouter(prefix="/leads", tags=["Leads"])
 
 @router.get("", response_model=List[Lead])
-async def get_leads(current_user: dict = Depends(get_current_user)):
+async def get_leads(
+    include_archived: bool = Query(False, description="Also return archived (rejected) leads"),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    leads = await db.leads.find({}, {"_id": 0}).to_list(1000)
+    leads = await find_records(db, "leads", scope.apply("leads"), {"_id": 0}, 1000, include_archived)
     
     # Add task_id to existing leads if missing and update status calculation
+    now = datetime.now(timezone.utc)
+    status_updates = []
+    changed_clients = set()
     for lead in leads:
         if not lead.get("task_id"):
             lead["task_id"] = f"LEAD-{lead.get('id', 'UNKNOWN')[:8].upper()}"
         
-        # Recalculate status for existing leads
-        if lead.get("stage"):
+        # Recalculate status for existing leads (archived leads are read-only)
+        if lead.get("stage") and not lead.get("archived_at"):
             new_status, reason = calculate_lead_status(
                 lead["stage"], 
                 lead.get("next_followup"),
                 lead.get("lead_status")
             )
+            if new_status != lead.get("lead_status"):
+                # Only if nobody edited the lead since it was read; the next read recalculates otherwise
+                version = lead.get(VERSION_FIELD) or 0
+                status_updates.append(UpdateOne(
+                    {"id": lead["id"], **version_filter(version)},
+                    with_version_bump({"$set": {"lead_status": new_status, "updated_at": now}})
+                ))
+                lead[VERSION_FIELD] = version + 1
+                changed_clients.add(lead.get("client_name"))
             # Always set the lead_status to ensure it's present
             lead["lead_status"] = new_status
-            if new_status != lead.get("lead_status"):
-                # Update in database
-                await db.leads.update_one(
-                    {"id": lead["id"]},
-                    {"$set": {"lead_status": new_status, "updated_at": datetime.now(timezone.utc).isoformat()}}
-                )
+    
+    # Persist recalculated statuses in one round trip; a status change moves
+    # open_lead_count, so the affected clients' rollups are recomputed
+    if status_updates:
+        await db.leads.bulk_write(status_updates, ordered=False)
+        await refresh_client_rollups(db, list(changed_clients))
+        await bump_collection_version(db, "leads")
     
     return leads
 
 @router.get("/{lead_id}", response_model=Lead)
-async def get_lead(lead_id: str, current_user: dict = Depends(get_current_user)):
+async def get_lead(
+    lead_id: str,
+    include_archived: bool = Query(False, description="Also look in the archive"),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    lead = await db.leads.find_one({"id": lead_id}, {"_id": 0})
+    lead = await find_record(db, "leads", scope.apply("leads", {"id": lead_id}), {"_id": 0}, include_archived)
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     
@@ -53,7 +83,7 @@ async def get_lead(lead_id: str, current_user: dict = Depends(get_current_user))
         lead["task_id"] = f"LEAD-{lead.get('id', 'UNKNOWN')[:8].upper()}"
     
     # Recalculate status if needed
-    if lead.get("next_followup") and lead.get("stage"):
+    if lead.get("next_followup") and lead.get("stage") and not lead.get("archived_at"):
         new_status, reason = calculate_lead_status(
             lead["stage"], 
             lead["next_followup"],
@@ -64,21 +94,35 @@ async def get_lead(lead_id: str, current_user: dict = Depends(get_current_user))
             # Update in database
             await db.leads.update_one(
                 {"id": lead["id"]},
-                {"$set": {"lead_status": new_status, "updated_at": datetime.now(timezone.utc).isoformat()}}
+                {"$set": {"lead_status": new_status, "updated_at": datetime.now(timezone.utc)}}
             )
     
     return lead
 
 @router.post("", response_model=Lead, status_code=status.HTTP_201_CREATED)
-async def create_lead(lead_data: LeadCreate, current_user: dict = Depends(get_current_user)):
+async def create_lead(
+    lead_data: LeadCreate,
+    allow_duplicate: bool = Query(False, description="Create even if a likely duplicate exists"),
+    current_user: dict = Depends(get_current_user)
+):
     db = get_db()
     lead_dict = lead_data.model_dump()
     
+    # Reject likely duplicates unless explicitly confirmed
+    lead_dict["dedup"] = build_dedup_keys("leads", lead_dict)
+    if not allow_duplicate:
+        duplicates = await find_duplicate_candidates(db, "leads", lead_dict)
+        if duplicates:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "A similar lead already exists", "duplicates": duplicates}
+            )
+    
     # Generate Task ID
     task_id = await generate_task_id(db)
     
     # Set lead_owner to current user (system-controlled)
-    lead_dict["lead_owner"] = current_user["full_name"]
+    lead_dict["lead_owner"] = current_user.get("full_name") or current_user.get("email", "")
     
     # Calculate initial lead status
     initial_status, reason = calculate_lead_status(
@@ -92,8 +136,8 @@ async def create_lead(lead_data: LeadCreate, current_user: dict = Depends(get_cu
         previous_status=None,
         new_status=initial_status,
         reason="Lead created",
-        user_id=current_user["id"],
-        user_name=current_user["full_name"]
+        user_id=current_user.get("id") or current_user.get("sub"),
+        user_name=current_user.get("full_name") or current_user.get("email", "")
     )
     
     # Add required fields
@@ -101,19 +145,17 @@ async def create_lead(lead_data: LeadCreate, current_user: dict = Depends(get_cu
     lead_dict["lead_status"] = initial_status
     lead_dict["status_change_log"] = [status_log]
     lead_dict["task_id"] = task_id
-    lead_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    lead_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    lead_dict["created_at"] = datetime.now(timezone.utc)
+    lead_dict["updated_at"] = datetime.now(timezone.utc)
     lead_dict["attachments"] = []
+    with_bson_dates("leads", lead_dict)
     
     # Update the status log with the lead ID
     status_log["lead_id"] = lead_dict["id"]
     
     await db.leads.insert_one(lead_dict)
-    
-    # Convert datetime objects to strings for response
-    for log in lead_dict["status_change_log"]:
-        if isinstance(log.get("changed_at"), datetime):
-            log["changed_at"] = log["changed_at"].isoformat()
+    await bump_collection_version(db, "leads")
+    await record_change(db, "leads", None, lead_dict)
     
     return lead_dict
 
@@ -121,72 +163,51 @@ async def create_lead(lead_data: LeadCreate, current_user: dict = Depends(get_cu
 async def update_lead(
     lead_id: str, 
     lead_data: LeadUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope),
+    expected_version: Optional[int] = Depends(if_match_version)
 ):
     db = get_db()
     
-    # Find existing lead
-    existing_lead = await db.leads.find_one({"id": lead_id}, {"_id": 0})
-    if not existing_lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
-    
     # Prepare update data
     update_dict = {k: v for k, v in lead_data.model_dump().items() if v is not None}
     
     if not update_dict:
         raise HTTPException(status_code=400, detail="No valid fields to update")
     
-    # Calculate new status based on changes
-    stage = update_dict.get("stage", existing_lead.get("stage"))
-    next_followup = update_dict.get("next_followup", existing_lead.get("next_followup"))
-    
-    new_status, reason = calculate_lead_status(
-        stage, 
-        next_followup,
-        existing_lead.get("lead_status")
+    with_bson_dates("leads", update_dict)
+    update_dict["updated_at"] = datetime.now(timezone.utc)
+    
+    def build_update(existing_lead: dict) -> list:
+        fields = dict(update_dict)
+        # Keep duplicate-detection keys in step with company/contact changes
+        if {"client_name", "contact_person", "contact_details"} & fields.keys():
+            fields["dedup"] = build_dedup_keys("leads", {**existing_lead, **fields})
+        # lead_status (and its change log) is recalculated from the updated stage and follow-up
+        return [
+            {"$set": literal_fields(fields)},
+            *lead_status_stages(
+                user_id=current_user.get("id") or current_user.get("sub"),
+                user_name=current_user.get("full_name") or current_user.get("email", "")
+            ),
+        ]
+    
+    existing_lead, updated_lead = await update_from_current(
+        db, "leads", scope.apply("leads", {"id": lead_id}), build_update, expected_version, not_found="Lead not found"
     )
-    
-    # Create status change log if status changed
-    status_logs = existing_lead.get("status_change_log", [])
-    if new_status != existing_lead.get("lead_status"):
-        status_log = create_status_change_log(
-            lead_id=lead_id,
-            previous_status=existing_lead.get("lead_status"),
-            new_status=new_status,
-            reason=reason,
-            user_id=current_user["id"],
-            user_name=current_user["full_name"]
-        )
-        status_logs.append(status_log)
-    
-    # Update the lead
-    update_dict.update({
-        "lead_status": new_status,
-        "status_change_log": status_logs,
-        "updated_at": datetime.now(timezone.utc).isoformat()
-    })
-    
-    result = await db.leads.update_one({"id": lead_id}, {"$set": update_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Lead not found")
-    
-    # Return updated lead
-    updated_lead = await db.leads.find_one({"id": lead_id}, {"_id": 0})
-    
-    # Convert datetime objects to strings for response
-    for log in updated_lead["status_change_log"]:
-        if isinstance(log.get("changed_at"), datetime):
-            log["changed_at"] = log["changed_at"].isoformat()
+    await bump_collection_version(db, "leads")
+    await record_change(db, "leads", existing_lead, updated_lead)
+    await record_scope_change(db, "leads", existing_lead, updated_lead)
     
     return updated_lead
 
 @router.get("/{lead_id}/status-history")
-async def get_lead_status_history(lead_id: str, current_user: dict = Depends(get_current_user)):
+async def get_lead_status_history(lead_id: str, scope: Scope = Depends(get_scope)):
     """Get the complete status change history for a lead."""
     db = get_db()
     
     lead = await db.leads.find_one(
-        {"id": lead_id}, 
+        scope.apply("leads", {"id": lead_id}), 
         {"_id": 0, "status_change_log": 1}
     )
     
@@ -199,11 +220,20 @@ async def get_lead_status_history(lead_id: str, current_user: dict = Depends(get
     }
 
 @router.delete("/{lead_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_lead(lead_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_lead(
+    lead_id: str,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    result = await db.leads.delete_one({"id": lead_id})
-    if result.deleted_count == 0:
+    deleted = await db.leads.find_one_and_delete(
+        scope.apply("leads", {"id": lead_id}), projection=CHANGE_PROJECTIONS["leads"]
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Lead not found")
+    await bump_collection_version(db, "leads")
+    await record_deletions(db, "leads", [deleted])
+    await record_change(db, "leads", deleted, None)
 
 @router.get("/status/config")
 async def get_status_config(current_user: dict = Depends(get_current_user)):
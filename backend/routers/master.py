@@ -2,13 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from motor.motor_asyncio import AsyncIOMotorClient
 from typing import List, Dict, Any
 import os
-from datetime import datetime
-from database import get_db
+from datetime import datetime, timezone
+from database import db_for, TRANSACTIONAL
 
 router = APIRouter(prefix="/master", tags=["master"])
 
 @router.get("/regions", response_model=List[Dict[str, Any]])
-async def get_regions(db = Depends(get_db)):
+async def get_regions(db = Depends(db_for(TRANSACTIONAL))):
     """Get all regions from master data"""
     try:
         regions_setting = await db.settings.find_one({"setting_type": "regions"}, {"_id": 0})
@@ -33,7 +33,7 @@ async def get_regions(db = Depends(get_db)):
                 "$set": {
                     "setting_type": "regions",
                     "data": fallback_regions,
-                    "updated_at": datetime.utcnow()
+                    "updated_at": datetime.now(timezone.utc)
                 }
             },
             upsert=True
@@ -45,7 +45,7 @@ async def get_regions(db = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error fetching regions: {str(e)}")
 
 @router.get("/countries", response_model=List[Dict[str, Any]])
-async def get_countries(db = Depends(get_db)):
+async def get_countries(db = Depends(db_for(TRANSACTIONAL))):
     """Get all countries from master data"""
     try:
         countries_setting = await db.settings.find_one({"setting_type": "countries"}, {"_id": 0})
@@ -116,7 +116,7 @@ async def get_countries(db = Depends(get_db)):
                 "$set": {
                     "setting_type": "countries",
                     "data": fallback_countries,
-                    "updated_at": datetime.utcnow()
+                    "updated_at": datetime.now(timezone.utc)
                 }
             },
             upsert=True
@@ -128,7 +128,7 @@ async def get_countries(db = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error fetching countries: {str(e)}")
 
 @router.get("/countries/by-region/{region_name}", response_model=List[Dict[str, Any]])
-async def get_countries_by_region(region_name: str, db = Depends(get_db)):
+async def get_countries_by_region(region_name: str, db = Depends(db_for(TRANSACTIONAL))):
     """Get countries filtered by region"""
     try:
         countries = await get_countries(db)
@@ -139,7 +139,7 @@ async def get_countries_by_region(region_name: str, db = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error fetching countries by region: {str(e)}")
 
 @router.post("/regions", response_model=Dict[str, Any])
-async def create_or_update_regions(regions: List[Dict[str, Any]], db = Depends(get_db)):
+async def create_or_update_regions(regions: List[Dict[str, Any]], db = Depends(db_for(TRANSACTIONAL))):
     """Create or update regions master data"""
     try:
         await db.settings.update_one(
@@ -148,7 +148,7 @@ async def create_or_update_regions(regions: List[Dict[str, Any]], db = Depends(g
                 "$set": {
                     "setting_type": "regions",
                     "data": regions,
-                    "updated_at": datetime.utcnow()
+                    "updated_at": datetime.now(timezone.utc)
                 }
             },
             upsert=True
@@ -160,7 +160,7 @@ async def create_or_update_regions(regions: List[Dict[str, Any]], db = Depends(g
         raise HTTPException(status_code=500, detail=f"Error updating regions: {str(e)}")
 
 @router.post("/countries", response_model=Dict[str, Any])
-async def create_or_update_countries(countries: List[Dict[str, Any]], db = Depends(get_db)):
+async def create_or_update_countries(countries: List[Dict[str, Any]], db = Depends(db_for(TRANSACTIONAL))):
     """Create or update countries master data"""
     try:
         await db.settings.update_one(
@@ -169,7 +169,7 @@ async def create_or_update_countries(countries: List[Dict[str, Any]], db = Depen
                 "$set": {
                     "setting_type": "countries",
                     "data": countries,
-                    "updated_at": datetime.utcnow()
+                    "updated_at": datetime.now(timezone.utc)
                 }
             },
             upsert=True
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone, timedelta
 import os
 import uuid
-from typing import List
+from typing import List, Optional
 from models.opportunity import OpportunityCreate, Opportunity, OpportunityUpdate
 from database import get_db
 from utils.middleware import get_current_user
+from utils.scoping import Scope, get_scope
 from utils.task_id_generator import generate_task_id
+from utils.collection_versions import bump_collection_version
+from utils.dates import to_bson_date, with_bson_dates
+from utils.archival import find_record, find_records
+from utils.derived_data import CHANGE_PROJECTIONS, record_change
+from utils.tombstones import record_deletions, record_scope_change
+from utils.updates import if_match_version, update_from_current
+from utils.audit import record_audit
 
 router = APIRouter(prefix="/opportunities", tags=["Opportunities"])
 
@@ -16,9 +24,12 @@ router = APIRouter(prefix="/opportunities", tags=["Opportunities"])
 
 
 @router.get("", response_model=List[Opportunity])
-async def get_opportunities(current_user: dict = Depends(get_current_user)):
+async def get_opportunities(
+    include_archived: bool = Query(False, description="Also return archived (closed-lost) opportunities"),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    opportunities = await db.opportunities.find({}, {"_id": 0}).to_list(1000)
+    opportunities = await find_records(db, "opportunities", scope.apply("opportunities"), {"_id": 0}, 1000, include_archived)
     
     # Add task_id to existing opportunities if missing
     for opportunity in opportunities:
@@ -28,9 +39,15 @@ async def get_opportunities(current_user: dict = Depends(get_current_user)):
     return opportunities
 
 @router.get("/{opportunity_id}", response_model=Opportunity)
-async def get_opportunity(opportunity_id: str, current_user: dict = Depends(get_current_user)):
+async def get_opportunity(
+    opportunity_id: str,
+    include_archived: bool = Query(False, description="Also look in the archive"),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    opportunity = await db.opportunities.find_one({"id": opportunity_id}, {"_id": 0})
+    opportunity = await find_record(
+        db, "opportunities", scope.apply("opportunities", {"id": opportunity_id}), {"_id": 0}, include_archived
+    )
     if not opportunity:
         raise HTTPException(status_code=404, detail="Opportunity not found")
     
@@ -49,64 +66,62 @@ async def create_opportunity(opportunity_data: OpportunityCreate, current_user:
     if not opportunity_dict.get("task_id"):
         opportunity_dict["task_id"] = await generate_task_id(db)
     
-    if "expected_closure_date" in opportunity_dict and opportunity_dict["expected_closure_date"]:
-        opportunity_dict["expected_closure_date"] = opportunity_dict["expected_closure_date"].isoformat()
-    
     opportunity_dict["id"] = str(uuid.uuid4())
     opportunity_dict["linked_lead_id"] = None
     opportunity_dict["linked_sow_id"] = None
     
     # Use provided created_at or default to now
-    if opportunity_dict.get("created_at"):
-        # If provided as string date, convert to datetime
-        if isinstance(opportunity_dict["created_at"], str) and 'T' not in opportunity_dict["created_at"]:
-            # It's a date string like "2025-12-11", convert to datetime
-            opportunity_dict["created_at"] = opportunity_dict["created_at"] + "T00:00:00+00:00"
-        elif isinstance(opportunity_dict["created_at"], datetime):
-            opportunity_dict["created_at"] = opportunity_dict["created_at"].isoformat()
-    else:
-        opportunity_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    
-    opportunity_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    with_bson_dates("opportunities", opportunity_dict)
+    if not opportunity_dict.get("created_at"):
+        opportunity_dict["created_at"] = datetime.now(timezone.utc)
+    
+    opportunity_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.opportunities.insert_one(opportunity_dict)
+    await bump_collection_version(db, "opportunities")
+    await record_change(db, "opportunities", None, opportunity_dict)
+    record_audit("opportunities", opportunity_dict["id"], "create", current_user)
     return opportunity_dict
 
 @router.put("/{opportunity_id}", response_model=Opportunity)
-async def update_opportunity(opportunity_id: str, opportunity_data: OpportunityUpdate, current_user: dict = Depends(get_current_user)):
+async def update_opportunity(
+    opportunity_id: str,
+    opportunity_data: OpportunityUpdate,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
     update_dict = {k: v for k, v in opportunity_data.model_dump().items() if v is not None}
     if not update_dict:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    # Handle date fields
-    for date_field in ['expected_closure_date', 'close_date', 'submission_deadline', 'target_kickoff_date']:
-        if date_field in update_dict and update_dict[date_field]:
-            if hasattr(update_dict[date_field], 'isoformat'):
-                update_dict[date_field] = update_dict[date_field].isoformat()
+    with_bson_dates("opportunities", update_dict)
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
-    # Handle created_at update if provided
-    if "created_at" in update_dict and update_dict["created_at"]:
-        if isinstance(update_dict["created_at"], str) and 'T' not in update_dict["created_at"]:
-            # It's a date string like "2025-12-11", convert to datetime
-            update_dict["created_at"] = update_dict["created_at"] + "T00:00:00+00:00"
-        elif hasattr(update_dict["created_at"], 'isoformat'):
-            update_dict["created_at"] = update_dict["created_at"].isoformat()
+    converting = update_dict.get("pipeline_status") == "Converted to SOW" or update_dict.get("stage") == "Closed Won"
+    sow_id = str(uuid.uuid4())
     
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    def build_update(opportunity: dict) -> dict:
+        fields = dict(update_dict)
+        # Link the SOW Workflow 1 creates; the version check lets only one concurrent update convert
+        if converting and not opportunity.get("linked_sow_id"):
+            fields["linked_sow_id"] = sow_id
+        return {"$set": fields}
     
-    # Get opportunity for workflow checks
-    opportunity = await db.opportunities.find_one({"id": opportunity_id}, {"_id": 0})
-    if not opportunity:
-        raise HTTPException(status_code=404, detail="Opportunity not found")
+    opportunity, updated = await update_from_current(
+        db, "opportunities", scope.apply("opportunities", {"id": opportunity_id}), build_update, expected_version,
+        not_found="Opportunity not found"
+    )
+    await bump_collection_version(db, "opportunities")
     
     # Workflow 1: Auto-convert to SOW if pipeline status is Converted to SOW
-    if update_dict.get("pipeline_status") == "Converted to SOW" or update_dict.get("stage") == "Closed Won":
+    if converting:
         # Check if already converted
-        if not opportunity.get("linked_sow_id"):
+        if updated.get("linked_sow_id") == sow_id:
             # Create SOW
             sow_dict = {
-                "id": str(uuid.uuid4()),
+                "id": sow_id,
                 "client_name": opportunity.get("client_name"),
                 "project_name": opportunity.get("opportunity_name"),
                 "sow_title": update_dict.get("sow_title") or f"{opportunity.get('opportunity_name')} - SOW",
@@ -126,13 +141,13 @@ async def update_opportunity(opportunity_id: str, opportunity_data: OpportunityU
                 "notes": opportunity.get("next_steps"),
                 "linked_opportunity_id": opportunity_id,
                 "attachments": [],
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "created_at": datetime.now(timezone.utc),
+                "updated_at": datetime.now(timezone.utc)
             }
             await db.sows.insert_one(sow_dict)
-            
-            # Update opportunity with linked SOW
-            update_dict["linked_sow_id"] = sow_dict["id"]
+            await bump_collection_version(db, "sows")
+            await record_change(db, "sows", None, sow_dict)
+            record_audit("sows", sow_id, "create", current_user)
     
     # Workflow 2: Auto-create Project if SOW status is Signed
     if update_dict.get("sow_status") == "Signed":
@@ -163,10 +178,11 @@ async def update_opportunity(opportunity_id: str, opportunity_data: OpportunityU
                 "end_date": None,
                 "budget": update_dict.get("contract_value") or opportunity.get("estimated_value", 0),
                 "attachments": update_dict.get("signed_document_assets", []),
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "created_at": datetime.now(timezone.utc),
+                "updated_at": datetime.now(timezone.utc)
             }
             await db.projects.insert_one(project_dict)
+            await bump_collection_version(db, "projects")
     
     # Workflow 3: Auto-create Action Item if status is Completed
     if update_dict.get("status") == "Completed":
@@ -185,27 +201,36 @@ async def update_opportunity(opportunity_id: str, opportunity_data: OpportunityU
                 "linked_to": opportunity_id,
                 "linked_to_type": "Opportunity",
                 "assigned_to": opportunity.get("sales_owner", ""),
-                "due_date": (datetime.now(timezone.utc) + timedelta(days=7)).date().isoformat(),
+                "due_date": to_bson_date((datetime.now(timezone.utc) + timedelta(days=7)).date()),
                 "priority": "Medium",
                 "status": "Not Started",
                 "notes": f"Post-completion follow-up for {opportunity['opportunity_name']}. Next steps: {opportunity.get('next_steps', 'N/A')}",
                 "completed_date": None,
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "created_at": datetime.now(timezone.utc),
+                "updated_at": datetime.now(timezone.utc)
             }
             await db.action_items.insert_one(action_item_dict)
+            await bump_collection_version(db, "action_items")
     
-    result = await db.opportunities.update_one({"id": opportunity_id}, {"$set": update_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Opportunity not found")
-    
-    opportunity = await db.opportunities.find_one({"id": opportunity_id}, {"_id": 0})
-    return opportunity
+    await record_change(db, "opportunities", opportunity, updated)
+    await record_scope_change(db, "opportunities", opportunity, updated)
+    record_audit("opportunities", opportunity_id, "update", current_user, opportunity, updated)
+    return updated
 
 @router.delete("/{opportunity_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_opportunity(opportunity_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_opportunity(
+    opportunity_id: str,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    result = await db.opportunities.delete_one({"id": opportunity_id})
-    if result.deleted_count == 0:
+    deleted = await db.opportunities.find_one_and_delete(
+        scope.apply("opportunities", {"id": opportunity_id}), projection=CHANGE_PROJECTIONS["opportunities"]
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Opportunity not found")
+    await bump_collection_version(db, "opportunities")
+    await record_deletions(db, "opportunities", [deleted])
+    await record_change(db, "opportunities", deleted, None)
+    record_audit("opportunities", opportunity_id, "delete", current_user)
     return None
\ No newline at end of file
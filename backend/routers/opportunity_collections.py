@@ -13,9 +13,15 @@ from models.opportunity_collections import (
     RFP_DOCUMENTS_COLLECTION, SOW_DETAILS_COLLECTION, 
     SOW_DOCUMENTS_COLLECTION
 )
-from database import get_db
+from database import db_for, TRANSACTIONAL
 from utils.middleware import get_current_user
+from utils.scoping import Scope, get_scope
 from utils.opportunity_collections_setup import create_opportunity_collections, validate_collections_exist
+from utils.collection_versions import bump_collection_version
+from utils.derived_data import record_change
+from utils.tombstones import record_scope_change
+from utils.audit import record_audit
+from utils.updates import VERSION_FIELD, if_match_version, update_from_current
 import uuid
 
 router = APIRouter(prefix="/opportunity-collections", tags=["Opportunity Collections"])
@@ -24,7 +30,7 @@ router = APIRouter(prefix="/opportunity-collections", tags=["Opportunity Collect
 @router.post("/init", status_code=status.HTTP_201_CREATED)
 async def initialize_collections(
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Initialize all Opportunity collections with indexes"""
     try:
@@ -39,7 +45,7 @@ async def initialize_collections(
 @router.get("/validate", status_code=status.HTTP_200_OK)
 async def validate_collections(
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Validate that all Opportunity collections exist"""
     try:
@@ -58,8 +64,8 @@ async def get_opportunities(
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None),
     pipeline_status: Optional[str] = Query(None),
-    current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    scope: Scope = Depends(get_scope),
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Get opportunities with optional filtering"""
     try:
@@ -70,7 +76,7 @@ async def get_opportunities(
             filter_dict["pipeline_status"] = pipeline_status
             
         collection = db[OPPORTUNITIES_COLLECTION]
-        opportunities = await collection.find(filter_dict).skip(skip).limit(limit).to_list(limit)
+        opportunities = await collection.find(scope.apply(OPPORTUNITIES_COLLECTION, filter_dict)).skip(skip).limit(limit).to_list(limit)
         
         # Convert ObjectId to string for JSON serialization
         for opp in opportunities:
@@ -89,7 +95,7 @@ async def get_opportunities(
 async def create_opportunity(
     opportunity: OpportunityMongo,
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Create a new opportunity"""
     try:
@@ -111,16 +117,19 @@ async def create_opportunity(
         
         # Set created_by and timestamps
         opportunity.created_by = current_user.get("email", "unknown")
-        opportunity.created_at = datetime.utcnow()
-        opportunity.updated_at = datetime.utcnow()
+        opportunity.created_at = datetime.now(timezone.utc)
+        opportunity.updated_at = datetime.now(timezone.utc)
         
         collection = db[OPPORTUNITIES_COLLECTION]
         result = await collection.insert_one(opportunity.model_dump(by_alias=True))
+        await bump_collection_version(db, OPPORTUNITIES_COLLECTION)
         
         # Return the created opportunity
         created_opp = await collection.find_one({"_id": result.inserted_id})
+        await record_change(db, OPPORTUNITIES_COLLECTION, None, created_opp)
         created_opp["id"] = str(created_opp["_id"])
         del created_opp["_id"]
+        record_audit(OPPORTUNITIES_COLLECTION, created_opp["id"], "create", current_user)
         
         return created_opp
     except Exception as e:
@@ -134,39 +143,27 @@ async def update_opportunity(
     opportunity_id: str,
     opportunity_update: dict,
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    expected_version: Optional[int] = Depends(if_match_version),
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Update an existing opportunity"""
     try:
-        collection = db[OPPORTUNITIES_COLLECTION]
-        
-        # Find the opportunity
-        existing = await collection.find_one({"id": opportunity_id})
-        if not existing:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Opportunity not found"
-            )
-        
-        # Update timestamp
-        opportunity_update["updated_at"] = datetime.utcnow()
+        # Identity and version are owned by the server
+        update_fields = {
+            key: value for key, value in opportunity_update.items()
+            if key not in ("_id", "id", VERSION_FIELD)
+        }
+        update_fields["updated_at"] = datetime.now(timezone.utc)
         
-        # Update the opportunity
-        result = await collection.update_one(
-            {"id": opportunity_id},
-            {"$set": opportunity_update}
+        existing, updated_opp = await update_from_current(
+            db, OPPORTUNITIES_COLLECTION, {"id": opportunity_id},
+            lambda current: {"$set": update_fields}, expected_version,
+            not_found="Opportunity not found"
         )
-        
-        if result.matched_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Opportunity not found"
-            )
-        
-        # Return updated opportunity
-        updated_opp = await collection.find_one({"id": opportunity_id})
-        updated_opp["id"] = str(updated_opp["_id"])
-        del updated_opp["_id"]
+        await bump_collection_version(db, OPPORTUNITIES_COLLECTION)
+        await record_change(db, OPPORTUNITIES_COLLECTION, existing, updated_opp)
+        await record_scope_change(db, OPPORTUNITIES_COLLECTION, existing, updated_opp)
+        record_audit(OPPORTUNITIES_COLLECTION, opportunity_id, "update", current_user, existing, updated_opp)
         
         return updated_opp
     except HTTPException:
@@ -182,7 +179,7 @@ async def update_opportunity(
 async def get_rfp_details(
     opportunity_id: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Get RFP details, optionally filtered by opportunity_id"""
     try:
@@ -210,12 +207,12 @@ async def get_rfp_details(
 async def create_rfp_details(
     rfp_details: RFPDetailsMongo,
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Create RFP details for an opportunity"""
     try:
-        rfp_details.created_at = datetime.utcnow()
-        rfp_details.updated_at = datetime.utcnow()
+        rfp_details.created_at = datetime.now(timezone.utc)
+        rfp_details.updated_at = datetime.now(timezone.utc)
         
         collection = db[RFP_DETAILS_COLLECTION]
         result = await collection.insert_one(rfp_details.model_dump(by_alias=True))
@@ -236,11 +233,11 @@ async def create_rfp_details(
 async def upload_rfp_document(
     document: RFPDocumentsMongo,
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Upload an RFP document"""
     try:
-        document.uploaded_at = datetime.utcnow()
+        document.uploaded_at = datetime.now(timezone.utc)
         
         collection = db[RFP_DOCUMENTS_COLLECTION]
         result = await collection.insert_one(document.model_dump(by_alias=True))
@@ -261,7 +258,7 @@ async def get_rfp_documents(
     opportunity_id: Optional[str] = Query(None),
     document_type: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Get RFP documents with optional filtering"""
     try:
@@ -291,12 +288,12 @@ async def get_rfp_documents(
 async def create_sow_details(
     sow_details: SOWDetailsMongo,
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Create SOW details for an opportunity"""
     try:
-        sow_details.created_at = datetime.utcnow()
-        sow_details.updated_at = datetime.utcnow()
+        sow_details.created_at = datetime.now(timezone.utc)
+        sow_details.updated_at = datetime.now(timezone.utc)
         
         collection = db[SOW_DETAILS_COLLECTION]
         result = await collection.insert_one(sow_details.model_dump(by_alias=True))
@@ -316,7 +313,7 @@ async def create_sow_details(
 async def get_sow_details(
     opportunity_id: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Get SOW details, optionally filtered by opportunity_id"""
     try:
@@ -344,11 +341,11 @@ async def get_sow_details(
 async def upload_sow_document(
     document: SOWDocumentsMongo,
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Upload an SOW document"""
     try:
-        document.uploaded_at = datetime.utcnow()
+        document.uploaded_at = datetime.now(timezone.utc)
         
         collection = db[SOW_DOCUMENTS_COLLECTION]
         result = await collection.insert_one(document.model_dump(by_alias=True))
@@ -368,7 +365,7 @@ async def upload_sow_document(
 async def get_sow_documents(
     sow_id: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Get SOW documents, optionally filtered by sow_id"""
     try:
@@ -396,7 +393,7 @@ async def get_sow_documents(
 async def get_complete_opportunity(
     opportunity_id: str,
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(db_for(TRANSACTIONAL))
 ):
     """Get complete opportunity data including all related collections"""
     try:
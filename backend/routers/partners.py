@@ -3,10 +3,14 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 import uuid
-from typing import List
+from typing import List, Optional
 from models.partner import PartnerCreate, Partner, PartnerUpdate
 from database import get_db
 from utils.middleware import get_current_user
+from utils.scoping import Scope, get_scope
+from utils.collection_versions import bump_collection_version
+from utils.tombstones import record_deletions, record_scope_change, tombstone_projection
+from utils.updates import if_match_version, update_versioned_pair
 
 router = APIRouter(prefix="/partners", tags=["Partners"])
 
@@ -15,15 +19,15 @@ router = APIRouter(prefix="/partners", tags=["Partners"])
 
 
 @router.get("", response_model=List[Partner])
-async def get_partners(current_user: dict = Depends(get_current_user)):
+async def get_partners(scope: Scope = Depends(get_scope)):
     db = get_db()
-    partners = await db.partners.find({}, {"_id": 0}).to_list(1000)
+    partners = await db.partners.find(scope.apply("partners"), {"_id": 0}).to_list(1000)
     return partners
 
 @router.get("/{partner_id}", response_model=Partner)
-async def get_partner(partner_id: str, current_user: dict = Depends(get_current_user)):
+async def get_partner(partner_id: str, scope: Scope = Depends(get_scope)):
     db = get_db()
-    partner = await db.partners.find_one({"id": partner_id}, {"_id": 0})
+    partner = await db.partners.find_one(scope.apply("partners", {"id": partner_id}), {"_id": 0})
     if not partner:
         raise HTTPException(status_code=404, detail="Partner not found")
     return partner
@@ -33,32 +37,48 @@ async def create_partner(partner_data: PartnerCreate, current_user: dict = Depen
     db = get_db()
     partner_dict = partner_data.model_dump()
     partner_dict["id"] = str(uuid.uuid4())
-    partner_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    partner_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    partner_dict["created_at"] = datetime.now(timezone.utc)
+    partner_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.partners.insert_one(partner_dict)
+    await bump_collection_version(db, "partners")
     return partner_dict
 
 @router.put("/{partner_id}", response_model=Partner)
-async def update_partner(partner_id: str, partner_data: PartnerUpdate, current_user: dict = Depends(get_current_user)):
+async def update_partner(
+    partner_id: str,
+    partner_data: PartnerUpdate,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
     update_dict = {k: v for k, v in partner_data.model_dump().items() if v is not None}
     if not update_dict:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
-    result = await db.partners.update_one({"id": partner_id}, {"$set": update_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Partner not found")
-    
-    partner = await db.partners.find_one({"id": partner_id}, {"_id": 0})
-    return partner
+    before, updated = await update_versioned_pair(
+        db, "partners", scope.apply("partners", {"id": partner_id}), {"$set": update_dict}, expected_version,
+        not_found="Partner not found"
+    )
+    await bump_collection_version(db, "partners")
+    await record_scope_change(db, "partners", before, updated)
+    return updated
 
 @router.delete("/{partner_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_partner(partner_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_partner(
+    partner_id: str,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    result = await db.partners.delete_one({"id": partner_id})
-    if result.deleted_count == 0:
+    deleted = await db.partners.find_one_and_delete(
+        scope.apply("partners", {"id": partner_id}), projection=tombstone_projection("partners")
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Partner not found")
+    await bump_collection_version(db, "partners")
+    await record_deletions(db, "partners", [deleted])
     return None
\ No newline at end of file
@@ -2,18 +2,24 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import uuid
-from typing import List
+from typing import List, Optional
 from models.sales_activity import SalesActivityCreate, SalesActivity, SalesActivityUpdate
 from database import get_db
 from utils.middleware import get_current_user
+from utils.scoping import Scope, get_scope
 from utils.task_id_generator import generate_task_id
+from utils.derived_data import CHANGE_PROJECTIONS, record_change
+from utils.collection_versions import bump_collection_version
+from utils.dates import with_bson_dates
+from utils.tombstones import record_deletions, record_scope_change
+from utils.updates import if_match_version, update_from_current
 
 router = APIRouter(prefix="/sales-activities", tags=["Sales Activities"])
 
 @router.get("", response_model=List[SalesActivity])
-async def get_sales_activities(current_user: dict = Depends(get_current_user)):
+async def get_sales_activities(scope: Scope = Depends(get_scope)):
     db = get_db()
-    activities = await db.sales_activities.find({}, {"_id": 0}).to_list(1000)
+    activities = await db.sales_activities.find(scope.apply("sales_activities"), {"_id": 0}).to_list(1000)
     
     # Add task_id to existing sales activities if missing
     for activity in activities:
@@ -23,9 +29,9 @@ async def get_sales_activities(current_user: dict = Depends(get_current_user)):
     return activities
 
 @router.get("/{activity_id}", response_model=SalesActivity)
-async def get_sales_activity(activity_id: str, current_user: dict = Depends(get_current_user)):
+async def get_sales_activity(activity_id: str, scope: Scope = Depends(get_scope)):
     db = get_db()
-    activity = await db.sales_activities.find_one({"id": activity_id}, {"_id": 0})
+    activity = await db.sales_activities.find_one(scope.apply("sales_activities", {"id": activity_id}), {"_id": 0})
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     
@@ -44,37 +50,54 @@ async def create_sales_activity(activity_data: SalesActivityCreate, current_user
     if not activity_dict.get("task_id"):
         activity_dict["task_id"] = await generate_task_id(db)
     
-    if "activity_date" in activity_dict and activity_dict["activity_date"]:
-        activity_dict["activity_date"] = activity_dict["activity_date"].isoformat()
+    with_bson_dates("sales_activities", activity_dict)
     
     activity_dict["id"] = str(uuid.uuid4())
-    activity_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    activity_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    activity_dict["created_at"] = datetime.now(timezone.utc)
+    activity_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.sales_activities.insert_one(activity_dict)
+    await bump_collection_version(db, "sales_activities")
+    await record_change(db, "sales_activities", None, activity_dict)
     return activity_dict
 
 @router.put("/{activity_id}", response_model=SalesActivity)
-async def update_sales_activity(activity_id: str, activity_data: SalesActivityUpdate, current_user: dict = Depends(get_current_user)):
+async def update_sales_activity(
+    activity_id: str,
+    activity_data: SalesActivityUpdate,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
-    activity = await db.sales_activities.find_one({"id": activity_id})
-    if not activity:
-        raise HTTPException(status_code=404, detail="Activity not found")
-    
     update_data = activity_data.model_dump(exclude_unset=True)
-    if "activity_date" in update_data and update_data["activity_date"]:
-        update_data["activity_date"] = update_data["activity_date"].isoformat()
+    with_bson_dates("sales_activities", update_data)
     
-    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_data["updated_at"] = datetime.now(timezone.utc)
     
-    await db.sales_activities.update_one({"id": activity_id}, {"$set": update_data})
-    updated_activity = await db.sales_activities.find_one({"id": activity_id}, {"_id": 0})
+    activity, updated_activity = await update_from_current(
+        db, "sales_activities", scope.apply("sales_activities", {"id": activity_id}),
+        lambda current: {"$set": update_data}, expected_version,
+        read_projection=CHANGE_PROJECTIONS["sales_activities"], not_found="Activity not found"
+    )
+    await bump_collection_version(db, "sales_activities")
+    await record_change(db, "sales_activities", activity, updated_activity)
+    await record_scope_change(db, "sales_activities", activity, updated_activity)
     return updated_activity
 
 @router.delete("/{activity_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_sales_activity(activity_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_sales_activity(
+    activity_id: str,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    result = await db.sales_activities.delete_one({"id": activity_id})
-    if result.deleted_count == 0:
+    deleted = await db.sales_activities.find_one_and_delete(
+        scope.apply("sales_activities", {"id": activity_id}), projection=CHANGE_PROJECTIONS["sales_activities"]
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Activity not found")
+    await bump_collection_version(db, "sales_activities")
+    await record_deletions(db, "sales_activities", [deleted])
+    await record_change(db, "sales_activities", deleted, None)
     return None
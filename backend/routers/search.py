@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from database import get_db
+from utils.scoping import Scope, get_scope
+from utils.search import SEARCH_SOURCES, search_entities
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+@router.get("")
+async def global_search(
+    q: str = Query(..., min_length=2, max_length=200),
+    types: Optional[str] = Query(None, description="Comma-separated entity types, e.g. leads,clients"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=50),
+    scope: Scope = Depends(get_scope)
+):
+    """Ranked full-text search across leads, clients, opportunities, SOWs and partners"""
+    entity_types = None
+    if types:
+        entity_types = [t.strip() for t in types.split(",") if t.strip()]
+        unknown = [t for t in entity_types if t not in SEARCH_SOURCES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+
+    entity_types = entity_types or list(SEARCH_SOURCES.keys())
+    scope_filters = {
+        entity_type: scope.filter(SEARCH_SOURCES[entity_type]["collection"])
+        for entity_type in entity_types
+    }
+
+    db = get_db()
+    results = await search_entities(db, q, scope_filters, entity_types, skip, limit)
+
+    return {
+        "query": q,
+        "total": sum(len(items) for items in results.values()),
+        "results": results
+    }
@@ -3,10 +3,12 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 import uuid
-from typing import List
+from typing import List, Optional
 from models.settings import SettingCreate, Setting, SettingUpdate
 from database import get_db
 from utils.middleware import get_current_user, require_admin
+from utils.updates import if_match_version, update_versioned_pair
+from utils.audit import record_audit
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
@@ -50,26 +52,32 @@ async def create_setting(setting_data: SettingCreate, current_user: dict = Depen
     
     setting_dict = setting_data.model_dump()
     setting_dict["id"] = str(uuid.uuid4())
-    setting_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    setting_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    setting_dict["created_at"] = datetime.now(timezone.utc)
+    setting_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.settings.insert_one(setting_dict)
+    record_audit("settings", setting_dict["setting_type"], "create", current_user)
     return setting_dict
 
 @router.put("/{setting_type}", response_model=Setting)
-async def update_setting(setting_type: str, setting_data: SettingUpdate, current_user: dict = Depends(require_admin)):
+async def update_setting(
+    setting_type: str,
+    setting_data: SettingUpdate,
+    current_user: dict = Depends(require_admin),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
     update_dict = {k: v for k, v in setting_data.model_dump().items() if v is not None}
     if not update_dict:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
-    result = await db.settings.update_one({"setting_type": setting_type}, {"$set": update_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Setting not found")
-    
-    setting = await db.settings.find_one({"setting_type": setting_type}, {"_id": 0})
+    before, setting = await update_versioned_pair(
+        db, "settings", {"setting_type": setting_type}, {"$set": update_dict}, expected_version,
+        not_found="Setting not found"
+    )
+    record_audit("settings", setting_type, "update", current_user, before, setting)
     return setting
 
 @router.delete("/{setting_type}", status_code=status.HTTP_204_NO_CONTENT)
@@ -78,4 +86,5 @@ async def delete_setting(setting_type: str, current_user: dict = Depends(require
     result = await db.settings.delete_one({"setting_type": setting_type})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Setting not found")
+    record_audit("settings", setting_type, "delete", current_user)
     return None
\ No newline at end of file
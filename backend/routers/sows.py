@@ -1,12 +1,20 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 import uuid
-from typing import List
+from typing import List, Optional
 from models.sow import SOWCreate, SOW, SOWUpdate
 from database import get_db
 from utils.middleware import get_current_user
+from utils.scoping import Scope, get_scope
+from utils.collection_versions import bump_collection_version
+from utils.dates import with_bson_dates
+from utils.archival import find_record, find_records
+from utils.derived_data import CHANGE_PROJECTIONS, record_change
+from utils.tombstones import record_deletions, record_scope_change
+from utils.updates import if_match_version, update_from_current
+from utils.audit import record_audit
 
 router = APIRouter(prefix="/sows", tags=["SOWs"])
 
@@ -15,15 +23,22 @@ router = APIRouter(prefix="/sows", tags=["SOWs"])
 
 
 @router.get("", response_model=List[SOW])
-async def get_sows(current_user: dict = Depends(get_current_user)):
+async def get_sows(
+    include_archived: bool = Query(False, description="Also return archived (completed) SOWs"),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    sows = await db.sows.find({}, {"_id": 0}).to_list(1000)
+    sows = await find_records(db, "sows", scope.apply("sows"), {"_id": 0}, 1000, include_archived)
     return sows
 
 @router.get("/{sow_id}", response_model=SOW)
-async def get_sow(sow_id: str, current_user: dict = Depends(get_current_user)):
+async def get_sow(
+    sow_id: str,
+    include_archived: bool = Query(False, description="Also look in the archive"),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    sow = await db.sows.find_one({"id": sow_id}, {"_id": 0})
+    sow = await find_record(db, "sows", scope.apply("sows", {"id": sow_id}), {"_id": 0}, include_archived)
     if not sow:
         raise HTTPException(status_code=404, detail="SOW not found")
     return sow
@@ -31,40 +46,46 @@ async def get_sow(sow_id: str, current_user: dict = Depends(get_current_user)):
 @router.post("", response_model=SOW, status_code=status.HTTP_201_CREATED)
 async def create_sow(sow_data: SOWCreate, current_user: dict = Depends(get_current_user)):
     db = get_db()
-    sow_dict = sow_data.model_dump()
-    if "start_date" in sow_dict and sow_dict["start_date"]:
-        sow_dict["start_date"] = sow_dict["start_date"].isoformat()
-    if "end_date" in sow_dict and sow_dict["end_date"]:
-        sow_dict["end_date"] = sow_dict["end_date"].isoformat()
+    sow_dict = with_bson_dates("sows", sow_data.model_dump())
     
     sow_dict["id"] = str(uuid.uuid4())
     sow_dict["linked_opportunity_id"] = None
-    sow_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    sow_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    sow_dict["created_at"] = datetime.now(timezone.utc)
+    sow_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.sows.insert_one(sow_dict)
+    await bump_collection_version(db, "sows")
+    await record_change(db, "sows", None, sow_dict)
+    record_audit("sows", sow_dict["id"], "create", current_user)
     return sow_dict
 
 @router.put("/{sow_id}", response_model=SOW)
-async def update_sow(sow_id: str, sow_data: SOWUpdate, current_user: dict = Depends(get_current_user)):
+async def update_sow(
+    sow_id: str,
+    sow_data: SOWUpdate,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
     update_dict = {k: v for k, v in sow_data.model_dump().items() if v is not None}
     if not update_dict:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    if "start_date" in update_dict and update_dict["start_date"]:
-        update_dict["start_date"] = update_dict["start_date"].isoformat()
-    if "end_date" in update_dict and update_dict["end_date"]:
-        update_dict["end_date"] = update_dict["end_date"].isoformat()
+    with_bson_dates("sows", update_dict)
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    before, sow = await update_from_current(
+        db, "sows", scope.apply("sows", {"id": sow_id}), lambda current: {"$set": update_dict}, expected_version,
+        not_found="SOW not found"
+    )
+    await bump_collection_version(db, "sows")
+    await record_change(db, "sows", before, sow)
+    await record_scope_change(db, "sows", before, sow)
+    record_audit("sows", sow_id, "update", current_user, before, sow)
     
     # Auto-create Kickoff Activity if status is Completed
     if update_dict.get("status") == "Completed":
-        sow = await db.sows.find_one({"id": sow_id}, {"_id": 0})
-        if not sow:
-            raise HTTPException(status_code=404, detail="SOW not found")
-        
         # Create Kickoff Activity
         activity_dict = {
             "id": str(uuid.uuid4()),
@@ -75,24 +96,29 @@ async def update_sow(sow_id: str, sow_data: SOWUpdate, current_user: dict = Depe
             "related_id": sow_id,
             "assigned_to": sow.get("delivery_spoc"),
             "status": "Pending",
-            "due_date": datetime.now(timezone.utc).isoformat(),
+            "due_date": datetime.now(timezone.utc),
             "notes": "Auto-generated kickoff activity",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc)
         }
         await db.activities.insert_one(activity_dict)
     
-    result = await db.sows.update_one({"id": sow_id}, {"$set": update_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="SOW not found")
-    
-    sow = await db.sows.find_one({"id": sow_id}, {"_id": 0})
     return sow
 
 @router.delete("/{sow_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_sow(sow_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_sow(
+    sow_id: str,
+    current_user: dict = Depends(get_current_user),
+    scope: Scope = Depends(get_scope)
+):
     db = get_db()
-    result = await db.sows.delete_one({"id": sow_id})
-    if result.deleted_count == 0:
+    deleted = await db.sows.find_one_and_delete(
+        scope.apply("sows", {"id": sow_id}), projection=CHANGE_PROJECTIONS["sows"]
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="SOW not found")
+    await bump_collection_version(db, "sows")
+    await record_deletions(db, "sows", [deleted])
+    await record_change(db, "sows", deleted, None)
+    record_audit("sows", sow_id, "delete", current_user)
     return None
\ No newline at end of file
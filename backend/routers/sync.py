@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from database import get_db
+from utils.scoping import Scope, get_scope
+from utils.sync import SYNC_ENTITIES, InvalidSyncToken, load_delta
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+@router.get("")
+async def sync(
+    entities: str = Query(..., description="Comma-separated entities, e.g. leads,opportunities,action_items"),
+    since: Optional[str] = Query(None, description="token of the previous sync; omit to load everything"),
+    scope: Scope = Depends(get_scope)
+):
+    """
+    Records upserted and ids deleted since the token, per entity, and the
+    token for the next call. Changes come in pages; call again with the new
+    token while `more` is true.
+    """
+    names = list(dict.fromkeys(name.strip() for name in entities.split(",") if name.strip()))
+    unknown = [name for name in names if name not in SYNC_ENTITIES]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown sync entities: {', '.join(unknown) or '(none given)'}; use {', '.join(SYNC_ENTITIES)}",
+        )
+
+    try:
+        return await load_delta(get_db(), names, since, scope)
+    except InvalidSyncToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from database import get_db
+from utils.scoping import Scope, get_scope
+from utils.timeline import TIMELINE_SOURCES, InvalidCursor, load_timeline
+
+router = APIRouter(prefix="/timeline", tags=["Timeline"])
+
+@router.get("")
+async def get_timeline(
+    client: Optional[str] = Query(None, description="Client id or name"),
+    task_id: Optional[str] = Query(None, description="Shared task id, e.g. SAL0001"),
+    owner: Optional[str] = Query(None, description="User id, email or full name"),
+    sources: Optional[str] = Query(None, description="Comma-separated sources, e.g. sales_activities,lead_status"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(25, ge=1, le=100),
+    scope: Scope = Depends(get_scope)
+):
+    """Newest-first feed of activities, status changes and record updates for one client, task or owner"""
+    selected = {name: value for name, value in (("client", client), ("task_id", task_id), ("owner", owner)) if value}
+    if len(selected) != 1:
+        raise HTTPException(status_code=400, detail="Pass exactly one of client, task_id or owner")
+    (selector, value), = selected.items()
+
+    source_names = None
+    if sources:
+        source_names = [s.strip() for s in sources.split(",") if s.strip()]
+        unknown = [s for s in source_names if s not in TIMELINE_SOURCES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown timeline sources: {', '.join(unknown)}")
+
+    db = get_db()
+    try:
+        page = await load_timeline(db, selector, value, scope.filter, source_names, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"selector": {selector: value}, **page}
@@ -0,0 +1,187 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from typing import Optional
+from database import get_db, ANALYTICS
+from utils.middleware import get_current_user, require_admin
+from utils.archival import including_archive
+from utils.dates import month_start
+from utils.pipeline_snapshots import (
+    SNAPSHOTS_COLLECTION, SNAPSHOT_SOURCES, SUMMARY_BUCKET,
+    load_scoped_summaries, load_snapshot_rows, scope_limits, snapshot_date_for, snapshot_exists
+)
+from utils.scoping import Scope, get_scope
+from utils.jobs import enqueue_job
+
+router = APIRouter(prefix="/trends", tags=["Trends"])
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+def _validate_entity(entity: str):
+    if entity not in SNAPSHOT_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown snapshot entity '{entity}'")
+
+@router.post("/snapshots", status_code=status.HTTP_202_ACCEPTED)
+async def create_snapshot(
+    snapshot_date: Optional[str] = Query(None, pattern=DATE_PATTERN, description="Today (UTC), the default; past dates cannot be rewritten"),
+    current_user: dict = Depends(require_admin)
+):
+    """Queue today's pipeline snapshot (or retake) on demand; poll /api/jobs/{job_id} for completion"""
+    db = get_db()
+    today = snapshot_date_for()
+    if snapshot_date and snapshot_date != today:
+        # The snapshot reads the live pipeline, which would be filed under the wrong date
+        raise HTTPException(status_code=400, detail=f"Only today's snapshot ({today}) can be taken")
+    snapshot_date = today
+    job = await enqueue_job(
+        db, "pipeline.snapshot", {"snapshot_date": snapshot_date},
+        priority=1, created_by=current_user.get("sub"), dedupe_key=f"pipeline.snapshot:{snapshot_date}"
+    )
+    return {"snapshot_date": snapshot_date, "job_id": job["id"], "status": job["status"]}
+
+@router.get("/snapshots")
+async def list_snapshots(current_user: dict = Depends(get_current_user)):
+    """Dates for which a snapshot exists, newest first"""
+    db = get_db(ANALYTICS)
+    dates = await db[SNAPSHOTS_COLLECTION].distinct("snapshot_date", {"bucket": SUMMARY_BUCKET})
+    return {"snapshot_dates": sorted(dates, reverse=True)}
+
+@router.get("/pipeline")
+async def get_pipeline_over_time(
+    entity: str = Query("opportunities"),
+    from_date: Optional[str] = Query(None, pattern=DATE_PATTERN),
+    to_date: Optional[str] = Query(None, pattern=DATE_PATTERN),
+    group_by: Optional[str] = Query(None, description="stage, owner or region"),
+    scope: Scope = Depends(get_scope)
+):
+    """Pipeline totals per snapshot date, optionally broken down by a dimension (of the records the caller can see)"""
+    _validate_entity(entity)
+    if group_by and group_by not in ("stage", "owner", "region"):
+        raise HTTPException(status_code=400, detail="group_by must be stage, owner or region")
+
+    date_range = {}
+    if from_date:
+        date_range["$gte"] = from_date
+    if to_date:
+        date_range["$lte"] = to_date
+
+    db = get_db(ANALYTICS)
+    if scope_limits(entity, scope):
+        # Stored summaries cover every record; summarize the visible rows instead
+        summaries = await load_scoped_summaries(db, entity, date_range, scope)
+    else:
+        query = {"entity": entity, "bucket": SUMMARY_BUCKET}
+        if date_range:
+            query["snapshot_date"] = date_range
+        projection = {"_id": 0, "snapshot_date": 1, "summary.count": 1, "summary.amount": 1, "summary.weighted_amount": 1}
+        if group_by:
+            projection[f"summary.by_{group_by}"] = 1
+        summaries = [
+            (doc["snapshot_date"], doc["summary"])
+            async for doc in db[SNAPSHOTS_COLLECTION].find(query, projection).sort("snapshot_date", 1)
+        ]
+
+    series = []
+    for snapshot_date, summary in summaries:
+        point = {
+            "snapshot_date": snapshot_date,
+            "count": summary["count"],
+            "amount": round(summary["amount"], 2),
+            "weighted_amount": round(summary["weighted_amount"], 2),
+        }
+        if group_by:
+            point["groups"] = summary.get(f"by_{group_by}", [])
+        series.append(point)
+
+    return {"entity": entity, "group_by": group_by, "series": series}
+
+@router.get("/stage-movement")
+async def get_stage_movement(
+    from_date: str = Query(..., pattern=DATE_PATTERN),
+    to_date: str = Query(..., pattern=DATE_PATTERN),
+    entity: str = Query("opportunities"),
+    scope: Scope = Depends(get_scope)
+):
+    """Stage-to-stage transition counts between two snapshots (of the records the caller can see)"""
+    _validate_entity(entity)
+    if from_date >= to_date:
+        raise HTTPException(status_code=400, detail="from_date must be before to_date")
+
+    db = get_db(ANALYTICS)
+    before = await load_snapshot_rows(db, from_date, entity, ["id", "stage", "amount"], scope)
+    after = await load_snapshot_rows(db, to_date, entity, ["id", "stage", "amount"], scope)
+    if not before["id"] and not after["id"] and not (
+        await snapshot_exists(db, from_date) or await snapshot_exists(db, to_date)
+    ):
+        raise HTTPException(status_code=404, detail="No snapshots found for the requested dates")
+
+    stage_before = dict(zip(before["id"], before["stage"]))
+    stage_after = dict(zip(after["id"], after["stage"]))
+    amount_by_id = {**dict(zip(before["id"], before["amount"])), **dict(zip(after["id"], after["amount"]))}
+
+    # Records missing from a side either entered or left the open pipeline
+    transitions = {}
+    for record_id in stage_before.keys() | stage_after.keys():
+        key = (stage_before.get(record_id, "(new)"), stage_after.get(record_id, "(closed)"))
+        bucket = transitions.setdefault(key, {"count": 0, "amount": 0.0})
+        bucket["count"] += 1
+        bucket["amount"] += amount_by_id.get(record_id, 0)
+
+    movements = [
+        {"from_stage": from_stage, "to_stage": to_stage, "count": v["count"], "amount": round(v["amount"], 2)}
+        for (from_stage, to_stage), v in transitions.items()
+    ]
+    movements.sort(key=lambda m: m["count"], reverse=True)
+    return {"entity": entity, "from_date": from_date, "to_date": to_date, "movements": movements}
+
+@router.get("/forecast-accuracy")
+async def get_forecast_accuracy(
+    snapshot_date: str = Query(..., pattern=DATE_PATTERN, description="Snapshot the forecast was read from"),
+    month: str = Query(..., pattern=MONTH_PATTERN, description="Close month being forecast (YYYY-MM)"),
+    scope: Scope = Depends(get_scope)
+):
+    """Forecast (weighted pipeline closing in `month` as of `snapshot_date`) versus actual won bookings"""
+    db = get_db(ANALYTICS)
+    rows = await load_snapshot_rows(db, snapshot_date, "opportunities", ["amount", "probability", "close_month"], scope)
+    if not rows["amount"] and not await snapshot_exists(db, snapshot_date):
+        raise HTTPException(status_code=404, detail="No opportunity snapshot for that date")
+
+    forecast_amount = 0.0
+    pipeline_amount = 0.0
+    deals = 0
+    for amount, probability, close_month in zip(rows["amount"], rows["probability"], rows["close_month"]):
+        if close_month == month:
+            deals += 1
+            pipeline_amount += amount
+            forecast_amount += amount * probability / 100
+
+    # Actuals: deals won with a close date in the month (the expected closure date
+    # when there is none), read by (stage, close_date, expected_closure_date)
+    # from the hot and archived opportunities
+    in_month = {"$gte": month_start(month), "$lt": month_start(month, 1)}
+    won = scope.apply("opportunities", {
+        "stage": "Closed Won",
+        "$or": [{"close_date": in_month}, {"close_date": None, "expected_closure_date": in_month}],
+    })
+    totals = await db.opportunities.aggregate(including_archive("opportunities", [
+        {"$match": won},
+        {"$group": {
+            "_id": None,
+            "won_deals": {"$sum": 1},
+            "won_amount": {"$sum": {"$ifNull": ["$amount", {"$ifNull": ["$estimated_value", 0]}]}},
+        }},
+    ])).to_list(1)
+    won_deals = totals[0]["won_deals"] if totals else 0
+    actual_amount = totals[0]["won_amount"] if totals else 0.0
+
+    return {
+        "snapshot_date": snapshot_date,
+        "month": month,
+        "forecast": {
+            "deals": deals,
+            "pipeline_amount": round(pipeline_amount, 2),
+            "weighted_amount": round(forecast_amount, 2),
+        },
+        "actual": {"won_deals": won_deals, "won_amount": round(actual_amount, 2)},
+        "variance": round(actual_amount - forecast_amount, 2),
+        "accuracy_percent": round(actual_amount / forecast_amount * 100, 2) if forecast_amount else None,
+    }
@@ -3,11 +3,14 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 import uuid
-from typing import List
+from typing import List, Optional
 from models.user import UserCreate, User, UserUpdate
 from database import get_db
 from utils.auth import get_password_hash
 from utils.middleware import get_current_user, require_admin
+from utils.collection_versions import bump_collection_version
+from utils.updates import if_match_version, update_versioned_pair
+from utils.audit import record_audit
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -39,15 +42,22 @@ async def create_user(user_data: UserCreate, current_user: dict = Depends(requir
     user_dict = user_data.model_dump()
     user_dict["id"] = str(uuid.uuid4())
     user_dict["password"] = get_password_hash(user_data.password)
-    user_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    user_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    user_dict["created_at"] = datetime.now(timezone.utc)
+    user_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.users.insert_one(user_dict)
+    await bump_collection_version(db, "users")
+    record_audit("users", user_dict["id"], "create", current_user)
     user_dict.pop("password")
     return user_dict
 
 @router.put("/{user_id}", response_model=User)
-async def update_user(user_id: str, user_data: UserUpdate, current_user: dict = Depends(get_current_user)):
+async def update_user(
+    user_id: str,
+    user_data: UserUpdate,
+    current_user: dict = Depends(get_current_user),
+    expected_version: Optional[int] = Depends(if_match_version)
+):
     db = get_db()
     # Users can update themselves, admins can update anyone
     if current_user["sub"] != user_id and current_user.get("role") != "Admin":
@@ -60,14 +70,16 @@ async def update_user(user_id: str, user_data: UserUpdate, current_user: dict =
     if "password" in update_dict:
         update_dict["password"] = get_password_hash(update_dict["password"])
     
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
-    result = await db.users.update_one({"id": user_id}, {"$set": update_dict})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-    return user
+    # The password hash is read so a password change is audited (redacted), never returned
+    before, updated_user = await update_versioned_pair(
+        db, "users", {"id": user_id}, {"$set": update_dict}, expected_version, not_found="User not found"
+    )
+    await bump_collection_version(db, "users")
+    record_audit("users", user_id, "update", current_user, before, updated_user)
+    updated_user.pop("password", None)
+    return updated_user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(user_id: str, current_user: dict = Depends(require_admin)):
@@ -75,4 +87,6 @@ async def delete_user(user_id: str, current_user: dict = Depends(require_admin))
     result = await db.users.delete_one({"id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    await bump_collection_version(db, "users")
+    record_audit("users", user_id, "delete", current_user)
     return None
\ No newline at end of file
@@ -1,8 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from pathlib import Path
 import os
+import asyncio
 import logging
 import sys
 
@@ -14,14 +15,28 @@ sys.path.insert(0, str(ROOT_DIR))
 
 # Import database functions (don't initialize yet)
 from database import init_db, check_db_connection
+from utils.indexes import ensure_indexes
+from utils.permissions import watch_permissions
+from utils.audit import ensure_audit_collection, run_audit_flusher
+from utils import telemetry, blocking_detector
+from utils.response_cache import response_cache_stats
+from utils.middleware import require_admin
 
-from routers import auth, users, users_new, clients, partners, leads, leads_new, opportunities, opportunity_collections, sows, activities, settings, dashboard, employee_performance, action_items, sales_activities, forecasts, master
+from routers import auth, users, users_new, clients, partners, leads, leads_new, opportunities, opportunity_collections, sows, activities, settings, dashboard, employee_performance, action_items, sales_activities, forecasts, master, search, dedup, trends, analytics, jobs, timeline, audit, archive, sync
 
 # Create the main app
 app = FastAPI(title="Sightspectrum CRM", version="1.0.0")
 
 # Database will be initialized on first request, not at import time
 
+# In-flight request tracking and load shedding (see utils/telemetry.py); added
+# before CORS so shed responses still carry CORS headers
+app.add_middleware(telemetry.TelemetryMiddleware)
+
+# Opt-in (BLOCKING_DETECTOR_MS) attribution of event-loop stalls to routes
+if blocking_detector.ENABLED:
+    app.add_middleware(blocking_detector.BlockingCallMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -49,6 +64,15 @@ app.include_router(settings.router, prefix="/api")
 app.include_router(dashboard.router, prefix="/api")
 app.include_router(employee_performance.router, prefix="/api")
 app.include_router(master.router, prefix="/api")  # NEW
+app.include_router(search.router, prefix="/api")
+app.include_router(dedup.router, prefix="/api")
+app.include_router(trends.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+app.include_router(timeline.router, prefix="/api")
+app.include_router(audit.router, prefix="/api")
+app.include_router(archive.router, prefix="/api")
+app.include_router(sync.router, prefix="/api")
 
 # Configure logging
 logging.basicConfig(
@@ -57,13 +81,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Long-running background loops started with the app (kept referenced so they are not collected)
+background_tasks = []
+# Cancelled at shutdown so buffered audit events are flushed before exit
+audit_flusher = []
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database connection on startup"""
+    background_tasks.append(asyncio.create_task(telemetry.monitor_event_loop()))
+    if blocking_detector.ENABLED:
+        background_tasks.append(blocking_detector.detector.start())
+    background_tasks.append(asyncio.create_task(telemetry.watch_readiness(check_db_connection)))
     try:
-        init_db()
+        db = init_db()
         db_healthy = await check_db_connection()
         if db_healthy:
+            await ensure_audit_collection(db)
+            await ensure_indexes(db)
+            background_tasks.append(asyncio.create_task(watch_permissions(db)))
+            audit_flusher.append(asyncio.create_task(run_audit_flusher(db)))
             logger.info("Application startup complete - Database connected")
         else:
             logger.warning("Application started but database connection failed")
@@ -71,6 +108,12 @@ async def startup_event():
         logger.error(f"Startup error: {str(e)}")
         # Don't fail startup, let health checks handle it
 
+@app.on_event("shutdown")
+async def flush_audit_log():
+    for task in audit_flusher:
+        task.cancel()
+    await asyncio.gather(*audit_flusher, return_exceptions=True)
+
 @app.get("/api")
 async def root():
     return {"message": "Sightspectrum CRM API", "version": "1.0.0"}
@@ -82,9 +125,28 @@ async def health_check():
 
 @app.get("/api/health/ready")
 async def readiness_check():
-    """Readiness check - verifies database connectivity"""
-    db_healthy = await check_db_connection()
-    if db_healthy:
-        return {"status": "ready", "database": "connected"}
-    else:
-        return {"status": "not_ready", "database": "disconnected"}
\ No newline at end of file
+    """Readiness check - database connectivity (refreshed in the background) and load shedding state"""
+    return await telemetry.readiness(check_db_connection)
+
+@app.get("/api/metrics")
+async def metrics():
+    """Event-loop lag, connection pool, in-flight request and response cache telemetry for this process"""
+    return {**telemetry.metrics_snapshot(), "response_cache": response_cache_stats()}
+
+if blocking_detector.ENABLED:
+    @app.on_event("shutdown")
+    async def report_blocking_calls():
+        blocking_detector.detector.stop()
+        for hotspot in blocking_detector.detector.report(limit=10)["hotspots"]:
+            logger.info(
+                f"Blocking hot spot: {hotspot['total_ms']}ms over {hotspot['count']} stalls, "
+                f"{hotspot['route']} at {hotspot['site']} ({hotspot['call']})"
+            )
+
+    @app.get("/api/debug/blocking")
+    async def blocking_report(limit: int = 50, reset: bool = False, current_user: dict = Depends(require_admin)):
+        """Event-loop stalls over BLOCKING_DETECTOR_MS, ranked by total blocked time"""
+        report = blocking_detector.detector.report(limit)
+        if reset:
+            blocking_detector.detector.reset()
+        return report
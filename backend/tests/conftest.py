@@ -0,0 +1,118 @@
+"""
+Fixtures for tests that run the API against a real MongoDB.
+
+Set MONGO_TEST_URL (default mongodb://localhost:27017); tests needing the
+database are skipped when it is unreachable. Each session uses a throwaway
+database filled by the synthetic data generator and dropped afterwards.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import os
+import sys
+import uuid
+import httpx
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+from benchmarks.generator import generate_dataset
+from querylog import CommandRecorder, explainable, filtered_collscans
+from utils.auth import create_access_token
+from utils.indexes import ensure_indexes
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+# Fixed so plans and counts do not drift with the calendar
+ANCHOR = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+class ApiSession:
+    """Drives server:app in-process and records the Mongo commands of each request"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, db_name: str, recorder: CommandRecorder, sync_client: MongoClient):
+        self.loop = loop
+        self.db_name = db_name
+        self.recorder = recorder
+        self.sync_db = sync_client[db_name]
+        self.ids: Dict[str, str] = {}
+        self.tokens: Dict[str, str] = {}
+        from server import app
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    def request(
+        self, method: str, path: str, principal: str = "admin", json: Optional[Dict[str, Any]] = None
+    ) -> Tuple[httpx.Response, List[Dict[str, Any]]]:
+        headers = {"Authorization": f"Bearer {self.tokens[principal]}"}
+        self.recorder.start()
+        try:
+            response = self.loop.run_until_complete(self.client.request(method, path, json=json, headers=headers))
+        finally:
+            commands = self.recorder.stop()
+        return response, commands
+
+    def collscans(self, command: Dict[str, Any]) -> List[Dict[str, Any]]:
+        scans = []
+        for explained in explainable(command):
+            result = self.sync_db.command({"explain": explained, "verbosity": "queryPlanner"})
+            scans.extend(filtered_collscans(result))
+        return scans
+
+@pytest.fixture(scope="session")
+def api():
+    sync_client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1500)
+    try:
+        sync_client.admin.command("ping")
+    except PyMongoError:
+        sync_client.close()
+        pytest.skip(f"MongoDB not reachable at {MONGO_TEST_URL}")
+
+    db_name = f"crm_test_{uuid.uuid4().hex[:8]}"
+    recorder = CommandRecorder(db_name)
+    loop = asyncio.new_event_loop()
+
+    async def setup() -> AsyncIOMotorClient:
+        client = AsyncIOMotorClient(MONGO_TEST_URL, event_listeners=[recorder])
+        db = client[db_name]
+        await ensure_indexes(db)
+        await generate_dataset(db, clients=60, leads=600, opportunities=200, users=12, seed=7, anchor=ANCHOR)
+        # One recorded client serves every workload (a standalone has no secondaries anyway)
+        for workload in database.WORKLOADS:
+            database._clients[workload], database._dbs[workload] = client, db
+        return client
+
+    client = loop.run_until_complete(setup())
+    session = ApiSession(loop, db_name, recorder, sync_client)
+    sample = session.sync_db
+    # A restricted principal, and records it can see (so both principals get 200s)
+    owner = sample.sows.find_one({}, {"owner": 1})["owner"]
+    regional = sample.users.find_one({"full_name": owner}, {"id": 1, "email": 1, "role": 1, "assigned_regions": 1})
+    first_id = lambda collection, query: sample[collection].find_one(query, {"id": 1})["id"]
+    session.ids = {
+        "lead_id": first_id("leads", {"lead_owner": owner}),
+        "task_id": sample.leads.find_one({"lead_owner": owner}, {"task_id": 1})["task_id"],
+        "opportunity_id": first_id("opportunities", {"sales_owner": owner}),
+        "client_id": first_id("clients", {"region": {"$in": regional["assigned_regions"]}}),
+        "sow_id": first_id("sows", {"owner": owner}),
+        "user_id": regional["id"],
+        "action_item_id": first_id("action_items", {"assigned_to": regional["email"]}),
+        "sales_activity_id": first_id("sales_activities", {"activity_owner": owner}),
+    }
+    session.tokens = {
+        "admin": create_access_token({"sub": "admin", "email": "admin@sightspectrum.com", "role": "Admin"}),
+        "regional": create_access_token({"sub": regional["id"], "email": regional["email"], "role": regional["role"]}),
+    }
+
+    yield session
+
+    loop.run_until_complete(session.client.aclose())
+    database._clients.clear()
+    database._dbs.clear()
+    client.close()
+    loop.close()
+    sync_client.drop_database(db_name)
+    sync_client.close()
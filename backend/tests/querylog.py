@@ -0,0 +1,100 @@
+"""
+Mongo command recording and plan inspection for the query-budget tests.
+
+CommandRecorder is a pymongo CommandListener attached to the Motor client the
+API uses; it keeps every command sent to the test database while recording is
+on. Cursor continuations (getMore/killCursors) and connection chatter are not
+counted: a budget is the number of queries the code issues, not the number of
+batches they take.
+"""
+from pymongo import monitoring
+from typing import Any, Dict, List
+import json
+
+IGNORED_COMMANDS = {
+    "getMore", "killCursors", "endSessions", "hello", "isMaster", "ismaster",
+    "ping", "buildInfo", "saslStart", "saslContinue",
+}
+
+# Session/transport fields that are not part of what the code asked for
+META_FIELDS = {
+    "$db", "lsid", "$clusterTime", "$readPreference", "txnNumber",
+    "autocommit", "startTransaction", "readConcern", "writeConcern", "apiVersion",
+}
+
+SHAPE_IGNORED_FIELDS = META_FIELDS | {"cursor", "batchSize", "ordered", "singleBatch"}
+
+class CommandRecorder(monitoring.CommandListener):
+    def __init__(self, database_name: str):
+        self.database_name = database_name
+        self.recording = False
+        self.commands: List[Dict[str, Any]] = []
+
+    def start(self):
+        self.commands = []
+        self.recording = True
+
+    def stop(self) -> List[Dict[str, Any]]:
+        self.recording = False
+        return self.commands
+
+    def started(self, event):
+        if self.recording and event.database_name == self.database_name and event.command_name not in IGNORED_COMMANDS:
+            self.commands.append(dict(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def _shape(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items() if key not in SHAPE_IGNORED_FIELDS}
+    if isinstance(value, (list, tuple)):
+        if value and all(not isinstance(item, (dict, list, tuple)) for item in value):
+            # Value lists ($in etc.) only matter by their element type
+            return [_shape(value[0])] + (["..."] if len(value) > 1 else [])
+        return [_shape(item) for item in value]
+    if isinstance(value, str):
+        return value if value.startswith("$") else "?"
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    return f"<{type(value).__name__}>"
+
+def query_shape(command: Dict[str, Any]) -> str:
+    """The command with literal values masked, e.g. find leads {"id": "?"}"""
+    name = next(iter(command))
+    body = _shape({key: value for key, value in command.items() if key != name})
+    return f"{name} {command[name]} {json.dumps(body, default=str, sort_keys=False)}"
+
+def explainable(command: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Commands to explain for a recorded command (one per distinct write statement shape)"""
+    name = next(iter(command))
+    body = {key: value for key, value in command.items() if key not in META_FIELDS}
+    if name in ("find", "aggregate", "count", "distinct", "findAndModify"):
+        return [body]
+    if name in ("update", "delete"):
+        statements = "updates" if name == "update" else "deletes"
+        distinct = {}
+        for statement in body.get(statements, []):
+            distinct.setdefault(json.dumps(_shape(statement.get("q")), default=str), statement)
+        return [{name: body[name], statements: [statement]} for statement in distinct.values()]
+    return []
+
+def filtered_collscans(explain: Any, in_plan: bool = False) -> List[Dict[str, Any]]:
+    """
+    COLLSCAN stages of winning plans that apply a predicate. Unfiltered scans
+    (list everything, aggregate everything) are the intended plan; a filtered
+    one is a query that should have been answered from an index.
+    """
+    found = []
+    if isinstance(explain, dict):
+        if in_plan and explain.get("stage") == "COLLSCAN" and explain.get("filter"):
+            found.append(explain)
+        for key, value in explain.items():
+            found.extend(filtered_collscans(value, in_plan or key in ("winningPlan", "queryPlan")))
+    elif isinstance(explain, list):
+        for item in explain:
+            found.extend(filtered_collscans(item, in_plan))
+    return found
@@ -0,0 +1,35 @@
+"""
+Date helpers (utils/dates.py): every stored shape parses to an aware UTC
+datetime. No database needed.
+"""
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from utils.dates import month_start, parse_datetime
+
+UTC_MIDNIGHT = datetime(2025, 3, 2, tzinfo=timezone.utc)
+
+@pytest.mark.parametrize("value", [
+    "2025-03-01T19:00:00-05:00",
+    "2025-03-02T00:00:00Z",
+    "2025-03-02T00:00:00",
+    "2025-03-02",
+    date(2025, 3, 2),
+    datetime(2025, 3, 2),
+    datetime(2025, 3, 2, 5, 30, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+])
+def test_stored_shapes_parse_to_utc(value):
+    parsed = parse_datetime(value)
+    assert parsed == UTC_MIDNIGHT
+    assert parsed.utcoffset() == timedelta(0)
+
+def test_offset_values_land_on_their_utc_day():
+    # Incremental daily buckets use .date(); the nightly rebuild buckets by UTC day
+    assert parse_datetime("2025-03-01T23:00:00-05:00").date() == date(2025, 3, 2)
+
+@pytest.mark.parametrize("value", [None, "", "not a date", 42])
+def test_unparseable_values_are_none(value):
+    assert parse_datetime(value) is None
+
+def test_month_start_rolls_over_the_year():
+    assert month_start("2025-12") == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert month_start("2025-12", 1) == datetime(2026, 1, 1, tzinfo=timezone.utc)
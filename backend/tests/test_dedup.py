@@ -0,0 +1,79 @@
+"""
+Duplicate detection: name normalization, blocking keys and candidate scoring
+(utils/dedup.py). Pure functions, no database needed.
+"""
+import pytest
+from utils.dedup import (
+    DUPLICATE_THRESHOLD, build_dedup_keys, normalize_name, score_candidate, similarity, trigrams
+)
+
+def _band_keys(dedup):
+    return {key for key in dedup["keys"] if key.startswith("m")}
+
+def test_normalize_name_drops_case_accents_punctuation_and_legal_suffixes():
+    assert normalize_name("Acme Corp.") == "acme"
+    assert normalize_name("  ACME, Inc ") == "acme"
+    assert normalize_name("Café Müller GmbH") == "cafe muller"
+    assert normalize_name("Smith & Sons Pvt Ltd") == "smith and sons"
+    assert normalize_name(None) == ""
+
+def test_similarity_is_trigram_jaccard():
+    assert similarity("acme", "acme") == 1.0
+    assert similarity("acme", "") == 0.0
+    assert 0.5 < similarity("northwind traders", "northwind trader") < 1.0
+    assert similarity("acme", "zyxw") == 0.0
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+
+def test_client_keys_cover_name_email_and_company_domain():
+    dedup = build_dedup_keys("clients", {
+        "client_name": "Acme Corp",
+        "contact_email": "jane@acme.com",
+        "contacts": [{"email": "Bob@Gmail.com"}],
+        "website": "https://www.acme.com/about",
+    })
+    assert dedup["name_key"] == "acme"
+    assert "n:acme" in dedup["keys"]
+    assert {"e:jane@acme.com", "e:bob@gmail.com", "d:acme.com"} <= set(dedup["keys"])
+    # Shared mailbox providers say nothing about the company
+    assert "d:gmail.com" not in dedup["keys"]
+    assert len(dedup["keys"]) == len(set(dedup["keys"]))
+
+def test_lead_keys_include_the_contact():
+    dedup = build_dedup_keys("leads", {"client_name": "Acme", "contact_person": "Jane Doe", "contact_details": "jane@acme.com, +1 555"})
+    assert dedup["contact_key"] == "jane doe"
+    assert {"c:jane doe", "e:jane@acme.com", "d:acme.com"} <= set(dedup["keys"])
+
+def test_minhash_blocks_near_duplicates_together_and_unrelated_names_apart():
+    near = build_dedup_keys("clients", {"client_name": "Northwind Traders International"})
+    typo = build_dedup_keys("clients", {"client_name": "Northwind Trader International"})
+    other = build_dedup_keys("clients", {"client_name": "Contoso Pharmaceuticals"})
+    assert _band_keys(near) & _band_keys(typo)
+    assert not _band_keys(near) & _band_keys(other)
+
+def test_same_email_is_a_certain_duplicate():
+    a = build_dedup_keys("clients", {"client_name": "Acme", "contact_email": "jane@acme.com"})
+    b = build_dedup_keys("clients", {"client_name": "Totally Different", "contact_email": "jane@acme.com"})
+    assert score_candidate("clients", a, b) == (1.0, ["same_email"])
+
+def test_same_name_scores_above_threshold_and_unrelated_below():
+    a = build_dedup_keys("clients", {"client_name": "Acme Corporation"})
+    b = build_dedup_keys("clients", {"client_name": "ACME Inc."})
+    c = build_dedup_keys("clients", {"client_name": "Contoso"})
+    score, reasons = score_candidate("clients", a, b)
+    assert score == 1.0 and reasons == ["same_name"]
+    assert score_candidate("clients", a, c)[0] < DUPLICATE_THRESHOLD
+
+def test_shared_domain_boosts_a_similar_name():
+    a = build_dedup_keys("clients", {"client_name": "Northwind Traders", "website": "northwind.com"})
+    b = build_dedup_keys("clients", {"client_name": "Northwind Trading Co", "website": "www.northwind.com"})
+    without_domain = similarity(a["name_key"], b["name_key"])
+    score, reasons = score_candidate("clients", a, b)
+    assert reasons == ["similar_name", "same_domain"]
+    assert score == pytest.approx(min(1.0, without_domain + 0.25), abs=1e-4)
+
+def test_leads_need_the_contact_to_line_up_too():
+    a = build_dedup_keys("leads", {"client_name": "Acme", "contact_person": "Jane Doe"})
+    same = build_dedup_keys("leads", {"client_name": "Acme", "contact_person": "Jane Doe"})
+    other = build_dedup_keys("leads", {"client_name": "Acme", "contact_person": "Raj Patel"})
+    assert score_candidate("leads", a, same) == (1.0, ["same_name", "same_contact"])
+    assert score_candidate("leads", a, other)[0] < DUPLICATE_THRESHOLD
@@ -0,0 +1,50 @@
+"""
+Monte Carlo bookings (utils/forecast_engine.simulate_bookings): exact draws
+for the largest deals, a normal approximation for the tail. No database needed.
+"""
+import numpy as np
+import pytest
+from utils import forecast_engine
+from utils.forecast_engine import simulate_bookings
+
+def test_empty_pipeline_books_nothing():
+    totals = simulate_bookings(np.array([]), np.array([]), trials=100, seed=1)
+    assert totals.shape == (100,) and not totals.any()
+
+def test_certain_outcomes_are_exact():
+    amounts = np.array([1000.0, 250.0, 40.0])
+    totals = simulate_bookings(amounts, np.array([1.0, 0.0, 1.0]), trials=50, seed=1)
+    assert np.allclose(totals, 1040.0)
+
+def test_same_seed_gives_the_same_draws():
+    amounts = np.array([500.0, 300.0, 200.0])
+    probabilities = np.array([0.5, 0.3, 0.8])
+    first = simulate_bookings(amounts, probabilities, trials=200, seed=7)
+    again = simulate_bookings(amounts, probabilities, trials=200, seed=7)
+    assert np.array_equal(first, again)
+
+def test_every_total_is_a_sum_of_won_deals():
+    amounts = np.array([100.0, 20.0, 3.0])
+    totals = simulate_bookings(amounts, np.array([0.5, 0.5, 0.5]), trials=500, seed=3)
+    possible = {a + b + c for a in (0, 100) for b in (0, 20) for c in (0, 3)}
+    assert set(np.round(totals, 4)) <= possible
+
+def test_mean_matches_the_weighted_pipeline():
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(1_000, 50_000, 200)
+    probabilities = rng.uniform(0.05, 0.95, 200)
+    totals = simulate_bookings(amounts, probabilities, trials=20_000, seed=11)
+    expected = float((amounts * probabilities).sum())
+    assert totals.mean() == pytest.approx(expected, rel=0.01)
+
+def test_tail_beyond_exact_deals_keeps_mean_and_spread(monkeypatch):
+    monkeypatch.setattr(forecast_engine, "EXACT_DEALS", 10)
+    rng = np.random.default_rng(1)
+    amounts = rng.uniform(1_000, 10_000, 300)
+    probabilities = rng.uniform(0.1, 0.9, 300)
+    totals = simulate_bookings(amounts, probabilities, trials=20_000, seed=5)
+    expected_mean = float((amounts * probabilities).sum())
+    expected_std = float(np.sqrt((amounts ** 2 * probabilities * (1 - probabilities)).sum()))
+    assert totals.mean() == pytest.approx(expected_mean, rel=0.01)
+    assert totals.std() == pytest.approx(expected_std, rel=0.05)
+    assert (totals >= 0).all()
@@ -0,0 +1,67 @@
+"""
+Conversion funnel helpers (utils/funnel.py): rates, the per-group summary
+and the shape of the aggregation. The join check runs against MongoDB
+(skipped when none is reachable, see conftest.py).
+"""
+from datetime import datetime, timezone
+from utils.funnel import FUNNEL_STAGES, _rate, _summarize_group, build_funnel_pipeline
+
+def test_rate_is_a_rounded_percentage_or_none():
+    assert _rate(1, 3) == 33.33
+    assert _rate(0, 5) == 0.0
+    assert _rate(3, 0) is None
+
+def test_group_summary_has_counts_rates_and_medians():
+    summary = _summarize_group("2025-03", {
+        "lead": 10, "opportunity": 4, "sow": 2, "project": 1,
+        "lead_to_opportunity_days": 12.345, "opportunity_to_sow_days": None, "sow_to_project_days": 7,
+    })
+    assert summary["key"] == "2025-03"
+    assert summary["counts"] == {"lead": 10, "opportunity": 4, "sow": 2, "project": 1}
+    assert summary["conversion_percent"] == {
+        "lead_to_opportunity": 40.0, "opportunity_to_sow": 50.0, "sow_to_project": 50.0, "lead_to_project": 10.0,
+    }
+    assert summary["median_days"] == {"lead_to_opportunity": 12.3, "opportunity_to_sow": None, "sow_to_project": 7}
+
+def test_missing_group_and_key_are_empty_and_unknown():
+    summary = _summarize_group(None, None)
+    assert summary["key"] == "Unknown"
+    assert summary["counts"] == {stage: 0 for stage in FUNNEL_STAGES}
+    assert set(summary["conversion_percent"].values()) == {None}
+    assert _summarize_group("", {"lead": 1})["key"] == "Unknown"
+
+def test_pipeline_groups_and_totals_in_one_pass():
+    pipeline = build_funnel_pipeline("owner", {"region": "EMEA"})
+    assert pipeline[0] == {"$match": {"region": "EMEA"}}
+    facet = pipeline[-1]["$facet"]
+    groups, totals = facet["groups"], facet["totals"]
+    assert groups[0]["$group"]["_id"] == "$owner"
+    assert totals[0]["$group"]["_id"] is None
+    # Both sides accumulate the same counters and medians
+    assert {k for k in groups[0]["$group"] if k != "_id"} == {k for k in totals[0]["$group"] if k != "_id"}
+    assert groups[0]["$group"]["lead_to_opportunity_days"]["$median"]["method"] == "approximate"
+
+def test_linked_records_are_joined_from_hot_and_archived_collections():
+    pipeline = build_funnel_pipeline("cohort_month", {})
+    joined = [stage["$lookup"]["from"] for stage in pipeline if "$lookup" in stage]
+    assert joined == [
+        "opportunities", "opportunities_archive", "sows", "sows_archive", "projects",
+    ]
+
+def test_joins_require_a_linking_key():
+    for stage in build_funnel_pipeline("cohort_month", {}):
+        if "$lookup" in stage:
+            assert "localField" not in stage["$lookup"]
+            assert {"$ne": ["$$key", None]} in stage["$lookup"]["pipeline"][0]["$match"]["$expr"]["$and"]
+
+def test_lead_without_opportunity_does_not_join_unlinked_records(api):
+    # Manual SOWs carry linked_opportunity_id: None; a lead with no opportunity must not pick them up
+    lead_id, sow_id = "funnel-test-lead", "funnel-test-sow"
+    api.sync_db.leads.insert_one({"id": lead_id, "created_at": datetime(2025, 3, 1, tzinfo=timezone.utc)})
+    api.sync_db.sows.insert_one({"id": sow_id, "linked_opportunity_id": None, "created_at": datetime(2025, 3, 2, tzinfo=timezone.utc)})
+    try:
+        row = list(api.sync_db.leads.aggregate(build_funnel_pipeline("cohort_month", {"id": lead_id})))[0]["totals"][0]
+    finally:
+        api.sync_db.leads.delete_one({"id": lead_id})
+        api.sync_db.sows.delete_one({"id": sow_id})
+    assert {stage: row[stage] for stage in FUNNEL_STAGES} == {"lead": 1, "opportunity": 0, "sow": 0, "project": 0}
@@ -0,0 +1,29 @@
+"""
+Pipeline snapshots (utils/pipeline_snapshots.py): which snapshot rows a
+scoped caller is shown. No database needed.
+"""
+from utils.pipeline_snapshots import _scoped_columns, scope_limits
+from utils.scoping import DENY_ALL, Scope, matches_scope
+
+COLUMNS = {"id": ["a", "b", "c"], "owner": ["Ann", "Bob", "Bob"], "region": ["APAC", "EMEA", "APAC"]}
+
+def test_fragments_evaluate_like_the_query():
+    by_region_or_owner = {"$or": [{"region": {"$in": ["EMEA"]}}, {"sales_owner": {"$in": ["Ann"]}}]}
+    assert matches_scope(by_region_or_owner, {"region": "EMEA", "sales_owner": "Bob"})
+    assert matches_scope(by_region_or_owner, {"region": "APAC", "sales_owner": "Ann"})
+    assert not matches_scope(by_region_or_owner, {"region": "APAC", "sales_owner": "Bob"})
+    # Array fields match on any element, as in Mongo
+    assert matches_scope({"assigned_regions": {"$in": ["EMEA"]}}, {"assigned_regions": ["APAC", "EMEA"]})
+    assert not matches_scope(DENY_ALL, {"id": "a"})
+    assert matches_scope({}, {"id": "a"})
+
+def test_unrestricted_callers_read_every_row():
+    admin = Scope("Admin")
+    assert not scope_limits("opportunities", admin)
+    assert _scoped_columns("opportunities", COLUMNS, admin) == COLUMNS
+
+def test_owner_limited_callers_only_read_their_rows():
+    # A role without read permission on opportunities sees only what it owns
+    owner = Scope("No Such Role", ("EMEA",), ("Ann",))
+    assert scope_limits("opportunities", owner)
+    assert _scoped_columns("opportunities", COLUMNS, owner) == {"id": ["a"], "owner": ["Ann"], "region": ["APAC"]}
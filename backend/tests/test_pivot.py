@@ -0,0 +1,73 @@
+"""
+Pivot compiler (utils/pivot.compile_pivot): whitelist validation and the
+generated $match/$group pipeline. No database needed.
+"""
+from datetime import date, datetime, timezone
+import pytest
+from models.analytics import PivotMeasure, PivotRequest, PivotTimeBucket
+from utils.pivot import MAX_GROUPS, PivotError, compile_pivot
+
+def pivot(**fields):
+    return PivotRequest(**{"source": "opportunities", **fields})
+
+def test_dimensions_and_measures_compile_to_one_group():
+    pipeline = compile_pivot(pivot(
+        dimensions=["region", "owner"],
+        measures=[PivotMeasure(), PivotMeasure(op="sum", field="amount"), PivotMeasure(op="avg", field="win_probability")],
+    ), {})
+    match, group, sort, limit = pipeline
+    assert match == {"$match": {}}
+    assert group["$group"]["_id"] == {"region": "$region", "owner": "$sales_owner"}
+    assert group["$group"]["count"] == {"$sum": 1}
+    assert group["$group"]["sum_amount"] == {"$sum": {"$ifNull": ["$amount", {"$ifNull": ["$estimated_value", 0]}]}}
+    assert group["$group"]["avg_win_probability"] == {"$avg": "$win_probability"}
+    assert sort == {"$sort": {"_id.region": 1, "_id.owner": 1}}
+    assert limit == {"$limit": MAX_GROUPS + 1}
+
+def test_filters_dates_and_scope_are_combined_in_the_match():
+    pipeline = compile_pivot(pivot(
+        filters={"stage": ["Proposal", "Negotiation"], "type": "New Business"},
+        from_date=date(2025, 1, 1), to_date=date(2025, 3, 31),
+    ), {"region": {"$in": ["EMEA"]}})
+    assert pipeline[0]["$match"] == {
+        "stage": {"$in": ["Proposal", "Negotiation"]},
+        "type": "New Business",
+        "created_at": {
+            "$gte": datetime(2025, 1, 1, tzinfo=timezone.utc),
+            "$lt": datetime(2025, 4, 1, tzinfo=timezone.utc),
+        },
+        "region": {"$in": ["EMEA"]},
+    }
+
+def test_scope_on_a_filtered_field_is_not_overwritten():
+    pipeline = compile_pivot(pivot(filters={"region": "APAC"}), {"region": {"$in": ["EMEA"]}})
+    assert pipeline[0]["$match"] == {"$and": [{"region": "APAC"}, {"region": {"$in": ["EMEA"]}}]}
+
+def test_time_bucket_adds_a_period_key():
+    pipeline = compile_pivot(pivot(
+        dimensions=["stage"], time_bucket=PivotTimeBucket(field="expected_closure_date", unit="quarter"),
+    ), {})
+    group_id = pipeline[1]["$group"]["_id"]
+    assert list(group_id) == ["stage", "period"]
+    assert group_id["period"]["$concat"][1] == "-Q"
+    assert pipeline[2] == {"$sort": {"_id.stage": 1, "_id.period": 1}}
+
+def test_weighted_sum_scales_by_the_probability():
+    pipeline = compile_pivot(pivot(measures=[PivotMeasure(op="weighted_sum", field="estimated_value")]), {})
+    assert pipeline[1]["$group"]["weighted_sum_estimated_value"] == {"$sum": {"$multiply": [
+        {"$ifNull": ["$estimated_value", 0]}, {"$divide": [{"$ifNull": ["$win_probability", 0]}, 100]},
+    ]}}
+
+@pytest.mark.parametrize("request_fields, message", [
+    ({"source": "users"}, "Unknown pivot source"),
+    ({"dimensions": ["password"]}, "Unknown opportunities dimensions: password"),
+    ({"filters": {"$where": "1"}}, "Unknown opportunities dimensions"),
+    ({"dimensions": ["region", "region"]}, "distinct"),
+    ({"measures": [PivotMeasure(op="sum", field="secret")]}, "Unknown opportunities measure 'secret'"),
+    ({"time_bucket": PivotTimeBucket(field="close_date")}, "can only be bucketed by"),
+    ({"from_date": date(2025, 2, 1), "to_date": date(2025, 1, 1)}, "from_date must not be after to_date"),
+    ({"source": "sows", "measures": [PivotMeasure(op="weighted_sum", field="value")]}, "no probability"),
+])
+def test_requests_outside_the_whitelist_are_rejected(request_fields, message):
+    with pytest.raises(PivotError, match=message):
+        compile_pivot(pivot(**request_fields), {})
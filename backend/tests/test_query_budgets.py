@@ -0,0 +1,103 @@
+"""
+Query-count and query-shape budgets per endpoint.
+
+Each request runs against a generated dataset with the command recorder on.
+A test fails when an endpoint issues more commands than its budget or when a
+filtered query is answered by a collection scan, and prints every command the
+request sent so the offending shape is visible in the failure.
+"""
+import json
+import pytest
+from querylog import query_shape
+
+# (method, path, max commands, collections where a filtered COLLSCAN is accepted)
+BUDGETS = [
+    # Cached responses (utils/response_cache.py) add one counters read to a miss
+    ("GET", "/api/dashboard/analytics", 9, set()),
+    # Windowed: one read of both windows' daily buckets (plus the counters read)
+    ("GET", "/api/dashboard/analytics?from=2025-07-01&to=2025-12-31", 2, set()),
+    ("GET", "/api/dashboard/analytics?month=2025-11&compare_to=previous_year", 2, set()),
+    ("GET", "/api/leads", 3, set()),
+    ("GET", "/api/leads/{lead_id}", 2, set()),
+    ("GET", "/api/leads/{lead_id}/status-history", 1, set()),
+    # Versioned read, guarded pipeline find_one_and_update, version bump (+ rollup if the status moves)
+    ("PUT", "/api/leads/{lead_id}", 4, set()),
+    ("GET", "/api/opportunities", 1, set()),
+    ("GET", "/api/opportunities/{opportunity_id}", 1, set()),
+    ("GET", "/api/clients", 1, set()),
+    ("GET", "/api/clients/{client_id}", 1, set()),
+    ("GET", "/api/sows", 1, set()),
+    ("GET", "/api/sows/{sow_id}", 1, set()),
+    ("GET", "/api/partners", 1, set()),
+    ("GET", "/api/action-items", 1, set()),
+    ("GET", "/api/action-items/{action_item_id}", 1, set()),
+    ("GET", "/api/sales-activities", 1, set()),
+    ("GET", "/api/sales-activities/{sales_activity_id}", 1, set()),
+    ("GET", "/api/users", 1, set()),
+    ("GET", "/api/users/{user_id}", 1, set()),
+    ("GET", "/api/employees/proposal-counts", 5, set()),
+    ("GET", "/api/employees/{user_id}/performance", 5, set()),
+    ("GET", "/api/search?q=analytics", 5, set()),
+    ("GET", "/api/analytics/funnel", 2, set()),
+    # Version lookup, then one $group over the (scoped) collection
+    ("POST", "/api/analytics/pivot", 2, {"opportunities"}),
+    # The open pipeline is most of the collection; scanning it is the plan
+    ("GET", "/api/forecasts/pipeline/weighted", 3, {"opportunities"}),
+    ("GET", "/api/trends/pipeline", 1, set()),
+    ("GET", "/api/jobs", 1, set()),
+    # Selector lookup, then one page query per timeline source
+    ("GET", "/api/timeline?client={client_id}", 6, set()),
+    ("GET", "/api/timeline?task_id={task_id}", 6, set()),
+    ("GET", "/api/timeline?owner={user_id}", 7, set()),
+    ("GET", "/api/settings", 1, set()),
+    # Stored clustering lookup, queueing the job when there is none (a duplicate enqueue reads the queued job)
+    ("GET", "/api/dedup/clients/clusters", 3, set()),
+]
+
+REQUEST_BODIES = {
+    ("PUT", "/api/leads/{lead_id}"): {"lead_score": 42, "notes": "query budget test"},
+    ("POST", "/api/analytics/pivot"): {
+        "source": "opportunities",
+        "dimensions": ["region", "industry"],
+        "measures": [{"op": "count"}, {"op": "sum", "field": "amount"}, {"op": "weighted_sum", "field": "amount"}],
+        "time_bucket": {"field": "created_at", "unit": "quarter"},
+    },
+}
+
+# Non-admin principals resolve their scope with one (cached) users lookup
+PRINCIPAL_OVERHEAD = {"admin": 0, "regional": 1}
+
+def _report(method, path, commands, problems):
+    lines = [f"{method} {path}: " + "; ".join(problems), "Commands sent:"]
+    for index, command in enumerate(commands, 1):
+        lines.append(f"  {index:>2}. {query_shape(command)}")
+    return "\n".join(lines)
+
+@pytest.mark.parametrize("principal", ["admin", "regional"])
+@pytest.mark.parametrize(
+    "method,path,max_commands,allow_collscan", BUDGETS,
+    ids=[f"{method} {path}" for method, path, _, _ in BUDGETS]
+)
+def test_query_budget(api, principal, method, path, max_commands, allow_collscan):
+    url = path.format(**api.ids)
+    response, commands = api.request(method, url, principal, json=REQUEST_BODIES.get((method, path)))
+    if response.status_code == 403 and principal != "admin":
+        pytest.skip(f"{principal} may not call {method} {path}")
+    assert response.status_code < 400, f"{method} {url} returned {response.status_code}: {response.text[:500]}"
+
+    problems = []
+    budget = max_commands + PRINCIPAL_OVERHEAD[principal]
+    if len(commands) > budget:
+        problems.append(f"{len(commands)} commands, budget {budget}")
+
+    for command in commands:
+        collection = command.get(next(iter(command)))
+        if collection in allow_collscan:
+            continue
+        for scan in api.collscans(command):
+            problems.append(
+                f"COLLSCAN on {collection} filtering {json.dumps(scan.get('filter'), default=str)} "
+                f"for: {query_shape(command)}"
+            )
+
+    assert not problems, _report(method, path, commands, problems)
@@ -0,0 +1,146 @@
+"""
+Response cache (utils/response_cache.py): single-flight, the stale window,
+version invalidation and LRU eviction of one RouteCache. No database needed.
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+from utils import response_cache
+from utils.response_cache import RouteCache, request_key
+
+class Clock:
+    """Stands in for time.monotonic so entry ages are exact"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the cache's clock; the event loop keeps the real one
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+def counting(value="value"):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return f"{value}-{len(calls)}"
+    return compute, calls
+
+def test_concurrent_misses_share_one_computation():
+    async def scenario():
+        cache = RouteCache("test", ttl_seconds=30, stale_seconds=0, max_entries=8)
+        release = asyncio.Event()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await release.wait()
+            return "value"
+
+        waiters = [asyncio.create_task(cache.get("k", {"leads": 1}, compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*waiters), calls, cache.counters
+
+    results, calls, counters = asyncio.run(scenario())
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert counters["misses"] == 1 and counters["coalesced"] == 4
+
+def test_fresh_entry_is_served_without_recomputing(clock):
+    async def scenario():
+        cache = RouteCache("test", ttl_seconds=30, stale_seconds=0, max_entries=8)
+        compute, calls = counting()
+        first = await cache.get("k", {"leads": 1}, compute)
+        clock.now += 30
+        second = await cache.get("k", {"leads": 1}, compute)
+        return first, second, calls, cache.counters
+
+    first, second, calls, counters = asyncio.run(scenario())
+    assert first == second == "value-1"
+    assert len(calls) == 1 and counters["hits"] == 1
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock):
+    async def scenario():
+        cache = RouteCache("test", ttl_seconds=30, stale_seconds=300, max_entries=8)
+        compute, calls = counting()
+        await cache.get("k", {"leads": 1}, compute)
+        clock.now += 60
+        stale = [await cache.get("k", {"leads": 1}, compute) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        refreshed = await cache.get("k", {"leads": 1}, compute)
+        return stale, refreshed, calls, cache.counters
+
+    stale, refreshed, calls, counters = asyncio.run(scenario())
+    assert stale == ["value-1"] * 3
+    assert refreshed == "value-2"
+    assert len(calls) == 2
+    assert counters["stale_hits"] == 3 and counters["refreshes"] == 1
+
+def test_entry_past_the_stale_window_is_recomputed(clock):
+    async def scenario():
+        cache = RouteCache("test", ttl_seconds=30, stale_seconds=300, max_entries=8)
+        compute, _ = counting()
+        await cache.get("k", {"leads": 1}, compute)
+        clock.now += 331
+        return await cache.get("k", {"leads": 1}, compute), cache.counters
+
+    value, counters = asyncio.run(scenario())
+    assert value == "value-2"
+    assert counters["misses"] == 2 and counters["stale_hits"] == 0
+
+def test_bumped_version_is_never_served_from_cache():
+    async def scenario():
+        cache = RouteCache("test", ttl_seconds=30, stale_seconds=300, max_entries=8)
+        compute, calls = counting()
+        await cache.get("k", {"leads": 1, "opportunities": 4}, compute)
+        value = await cache.get("k", {"leads": 2, "opportunities": 4}, compute)
+        return value, calls, cache.counters
+
+    value, calls, counters = asyncio.run(scenario())
+    assert value == "value-2"
+    assert len(calls) == 2 and counters["hits"] == 0 and counters["stale_hits"] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    async def scenario():
+        cache = RouteCache("test", ttl_seconds=30, stale_seconds=0, max_entries=2)
+        compute, calls = counting()
+        await cache.get("a", {}, compute)
+        await cache.get("b", {}, compute)
+        await cache.get("a", {}, compute)  # a is now more recent than b
+        await cache.get("c", {}, compute)  # evicts b
+        await cache.get("a", {}, compute)
+        await cache.get("b", {}, compute)
+        return calls, cache.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert len(calls) == 4
+    assert stats["entries"] == 2 and stats["hits"] == 2
+
+def test_failed_computation_is_not_cached():
+    async def scenario():
+        cache = RouteCache("test", ttl_seconds=30, stale_seconds=0, max_entries=8)
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await cache.get("k", {}, fail)
+        compute, _ = counting()
+        return await cache.get("k", {}, compute), cache.counters
+
+    value, counters = asyncio.run(scenario())
+    assert value == "value-1"
+    assert counters["errors"] == 1
+
+def test_request_key_is_order_independent_and_rejects_unkeyable_values():
+    assert request_key({"b": 1, "a": {"x", "y"}}) == request_key({"a": {"y", "x"}, "b": 1})
+    with pytest.raises(TypeError):
+        request_key({"body": {"nested": 1}})
@@ -0,0 +1,24 @@
+"""
+Record scoping on writes: a region-scoped principal cannot update or delete a
+record it cannot read (404, and the record is left untouched).
+"""
+import pytest
+from utils.scoping import UNRESTRICTED_ROLES
+
+@pytest.mark.parametrize("method", ["PUT", "DELETE"])
+def test_out_of_scope_client_write_is_not_found(api, method):
+    user = api.sync_db.users.find_one({"id": api.ids["user_id"]}, {"role": 1, "assigned_regions": 1})
+    if user["role"] in UNRESTRICTED_ROLES or not user.get("assigned_regions"):
+        pytest.skip("regional principal is not region-limited")
+    other = api.sync_db.clients.find_one(
+        {"region": {"$nin": user["assigned_regions"]}}, {"_id": 0, "id": 1, "notes": 1}
+    )
+    if other is None:
+        pytest.skip("every generated client is in the principal's regions")
+
+    body = {"notes": "out of scope write"} if method == "PUT" else None
+    response, _ = api.request(method, f"/api/clients/{other['id']}", "regional", json=body)
+
+    assert response.status_code == 404, response.text[:500]
+    after = api.sync_db.clients.find_one({"id": other["id"]}, {"_id": 0, "id": 1, "notes": 1})
+    assert after == other
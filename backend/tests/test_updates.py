@@ -0,0 +1,47 @@
+"""
+Versioned updates (utils/updates.py): If-Match parsing, the version bump
+added to every update and the local before -> after copy. No database needed.
+"""
+import pytest
+from fastapi import HTTPException
+from utils.updates import (
+    VERSION_FIELD, _apply_locally, _project, with_version_bump, if_match_version, literal_fields, version_filter
+)
+
+@pytest.mark.parametrize("header, version", [
+    (None, None), ("*", None), (" * ", None), ("3", 3), ('"3"', 3), ('W/"12"', 12), ("0", 0),
+])
+def test_if_match_names_a_version(header, version):
+    assert if_match_version(header) == version
+
+@pytest.mark.parametrize("header", ['"abc"', "-1", "1.5", 'W/"x"'])
+def test_if_match_that_is_not_a_version_is_rejected(header):
+    with pytest.raises(HTTPException) as error:
+        if_match_version(header)
+    assert error.value.status_code == 400
+
+def test_unversioned_records_count_as_version_zero():
+    assert version_filter(0) == {VERSION_FIELD: {"$in": [0, None]}}
+    assert version_filter(4) == {VERSION_FIELD: 4}
+
+def test_operator_update_gains_a_version_increment():
+    update = with_version_bump({"$set": {"notes": "x"}, "$unset": {}, "$inc": {"views": 1}})
+    assert update == {"$set": {"notes": "x"}, "$inc": {"views": 1, VERSION_FIELD: 1}}
+
+def test_pipeline_update_gains_a_version_stage():
+    update = with_version_bump([{"$set": literal_fields({"notes": "$5k"})}])
+    assert update[0] == {"$set": {"notes": {"$literal": "$5k"}}}
+    assert update[-1] == {"$set": {VERSION_FIELD: {"$add": [{"$ifNull": [f"${VERSION_FIELD}", 0]}, 1]}}}
+
+def test_apply_locally_mirrors_set_unset_and_inc():
+    before = {"id": "a", "name": "Old", "phone": "123", VERSION_FIELD: 2}
+    after = _apply_locally(before, with_version_bump({"$set": {"name": "New"}, "$unset": {"phone": ""}}))
+    assert after == {"id": "a", "name": "New", VERSION_FIELD: 3}
+    assert before["name"] == "Old" and "phone" in before
+
+def test_apply_locally_starts_unversioned_records_at_one():
+    assert _apply_locally({"id": "a"}, with_version_bump({"$set": {}}))[VERSION_FIELD] == 1
+
+def test_project_drops_excluded_fields():
+    doc = {"_id": "x", "id": "a", "password": "hash", "email": "a@b.c"}
+    assert _project(doc, {"_id": 0, "password": 0}) == {"id": "a", "email": "a@b.c"}
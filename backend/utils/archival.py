@@ -0,0 +1,224 @@
+"""
+Hot/Cold Archival
+Records that reached a terminal state long ago (closed-lost opportunities,
+completed SOWs, rejected leads) are moved from the hot collection to
+`<collection>_archive`, so the scans, indexes and counts the API runs every
+request only cover live data.
+
+- ARCHIVE_POLICIES names each collection's terminal states and the field
+  that ages a record; records older than ARCHIVE_AFTER_MONTHS (or the months
+  passed to the `archive.run` job) are moved in _id-ordered batches, paced
+  like migrations. A record is copied to the archive first and only then
+  deleted from the hot collection, guarded by the policy, so one that changed
+  meanwhile stays hot (and its archive copy is discarded).
+- The nightly `archive.run` job applies every policy.
+- Reads are transparent with `include_archived=true` (find_records /
+  find_record); archived records carry `archived_at`.
+- `restore_records` moves records back (POST /api/archive/{collection}/restore).
+  A restored record is not archived again until it is ARCHIVE_AFTER_MONTHS
+  past its restore; restoring also sets `updated_at`, so delta sync clients
+  (utils/sync.py) pick it up again.
+- Archiving is not a delete: dashboard buckets and client rollups keep
+  counting archived records, and their nightly rebuilds read the archive too
+  (see `including_archive`).
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+import calendar
+import logging
+import os
+import time
+from utils.collection_versions import bump_collection_version
+from utils.jobs import schedule_daily_job
+from utils.migrations import DEFAULT_PAUSE_MS, Throttle
+from utils.tombstones import record_deletions
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = "_archive"
+ARCHIVE_AFTER_MONTHS = int(os.environ.get("ARCHIVE_AFTER_MONTHS", "12"))
+ARCHIVE_BATCH_SIZE = 500
+MAX_RESTORE = 1000
+
+# Per collection: the terminal-state filter and the field that ages a record
+ARCHIVE_POLICIES: Dict[str, Dict[str, Any]] = {
+    "opportunities": {"terminal": {"stage": "Closed Lost"}, "age_field": "updated_at"},
+    "sows": {"terminal": {"status": "Completed"}, "age_field": "updated_at"},
+    "leads": {"terminal": {"lead_status": "Rejected"}, "age_field": "updated_at"},
+}
+
+class ArchiveError(ValueError):
+    pass
+
+def archive_name(collection: str) -> str:
+    return f"{collection}{ARCHIVE_SUFFIX}"
+
+def _policy(collection: str) -> Dict[str, Any]:
+    if collection not in ARCHIVE_POLICIES:
+        raise ArchiveError(f"'{collection}' is not archived; use one of {', '.join(ARCHIVE_POLICIES)}")
+    return ARCHIVE_POLICIES[collection]
+
+def months_before(moment: datetime, months: int) -> datetime:
+    """The same day and time `months` calendar months earlier (clamped to the month's last day)"""
+    index = moment.year * 12 + moment.month - 1 - months
+    year, month = divmod(index, 12)
+    day = min(moment.day, calendar.monthrange(year, month + 1)[1])
+    return moment.replace(year=year, month=month + 1, day=day)
+
+def archivable_filter(collection: str, cutoff: datetime) -> Dict[str, Any]:
+    """Hot records of `collection` the policy moves when records older than `cutoff` are archived"""
+    policy = _policy(collection)
+    return {
+        **policy["terminal"],
+        policy["age_field"]: {"$lt": cutoff},
+        "restored_at": {"$not": {"$gte": cutoff}},
+    }
+
+def including_archive(collection: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    `pipeline` over the hot and archived records of `collection`: its leading
+    $match is applied to both sides of a $unionWith. Collections without a
+    policy get the pipeline unchanged.
+    """
+    if collection not in ARCHIVE_POLICIES:
+        return pipeline
+    split = next((i for i, stage in enumerate(pipeline) if "$match" not in stage), len(pipeline))
+    head = pipeline[:split]
+    return [*head, {"$unionWith": {"coll": archive_name(collection), "pipeline": head}}, *pipeline[split:]]
+
+async def find_records(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    query: Dict[str, Any],
+    projection: Dict[str, Any],
+    limit: int,
+    include_archived: bool = False,
+) -> List[Dict[str, Any]]:
+    """find(query, projection).to_list(limit), over the archive as well when asked (one round trip)"""
+    if not include_archived or collection not in ARCHIVE_POLICIES:
+        return await db[collection].find(query, projection).to_list(limit)
+    pipeline = including_archive(collection, [{"$match": query}, {"$project": projection}])
+    return await db[collection].aggregate([*pipeline, {"$limit": limit}]).to_list(limit)
+
+async def find_record(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    query: Dict[str, Any],
+    projection: Dict[str, Any],
+    include_archived: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """find_one, falling back to the archive when asked and the record is not hot"""
+    doc = await db[collection].find_one(query, projection)
+    if doc is None and include_archived and collection in ARCHIVE_POLICIES:
+        doc = await db[archive_name(collection)].find_one(query, projection)
+    return doc
+
+async def archive_collection(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    months: int = ARCHIVE_AFTER_MONTHS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause_ms: int = DEFAULT_PAUSE_MS,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """Move the records `collection`'s policy selects, one batch at a time; returns counts"""
+    cutoff = months_before(datetime.now(timezone.utc), months)
+    query = archivable_filter(collection, cutoff)
+    if dry_run:
+        return {"eligible": await db[collection].count_documents(query), "archived": 0, "kept": 0}
+
+    hot, cold = db[collection], db[archive_name(collection)]
+    throttle = Throttle(db, pause_ms)
+    archived = kept = 0
+    last_id = None
+    while True:
+        started = time.monotonic()
+        batch_query = {**query, "_id": {"$gt": last_id}} if last_id is not None else query
+        docs = await hot.find(batch_query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+        ids = [doc["_id"] for doc in docs]
+        archived_at = datetime.now(timezone.utc)
+
+        # Copy first: a crash between the two writes leaves a duplicate, never a loss
+        await cold.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in docs],
+            ordered=False,
+        )
+        result = await hot.delete_many({**query, "_id": {"$in": ids}})
+        still_hot = set()
+        if result.deleted_count < len(ids):
+            # Changed since it was read (e.g. reopened): it stays hot, so drop its copy
+            still_hot = {doc["_id"] async for doc in hot.find({"_id": {"$in": ids}}, {"_id": 1})}
+            await cold.delete_many({"_id": {"$in": list(still_hot)}})
+            kept += len(still_hot)
+        archived += result.deleted_count
+        if result.deleted_count:
+            await bump_collection_version(db, collection)
+            # Gone from the live lists as far as delta sync clients are concerned
+            await record_deletions(db, collection, [doc for doc in docs if doc["_id"] not in still_hot])
+        await throttle.wait((time.monotonic() - started) * 1000)
+
+    if archived:
+        logger.info(f"Archived {archived} {collection} (terminal and older than {months} months)")
+    return {"archived": archived, "kept": kept}
+
+async def run_archival(
+    db: AsyncIOMotorDatabase,
+    collections: Optional[List[str]] = None,
+    months: int = ARCHIVE_AFTER_MONTHS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    dry_run: bool = False,
+) -> Dict[str, Dict[str, int]]:
+    """Apply the archive policies of the given collections (default: all)"""
+    if months < 1:
+        raise ArchiveError("months must be at least 1")
+    collections = collections or list(ARCHIVE_POLICIES)
+    for collection in collections:
+        _policy(collection)
+    return {
+        collection: await archive_collection(db, collection, months, batch_size, dry_run=dry_run)
+        for collection in collections
+    }
+
+async def restore_records(db: AsyncIOMotorDatabase, collection: str, ids: List[str]) -> Dict[str, Any]:
+    """Move archived records (by `id`) back to the hot collection"""
+    _policy(collection)
+    if len(ids) > MAX_RESTORE:
+        raise ArchiveError(f"Restore at most {MAX_RESTORE} records at a time")
+    cold = db[archive_name(collection)]
+    docs = await cold.find({"id": {"$in": ids}}).to_list(len(ids))
+    if docs:
+        restored_at = datetime.now(timezone.utc)
+        await db[collection].bulk_write([
+            ReplaceOne(
+                {"_id": doc["_id"]},
+                {**{k: v for k, v in doc.items() if k != "archived_at"}, "restored_at": restored_at, "updated_at": restored_at},
+                upsert=True,
+            )
+            for doc in docs
+        ], ordered=False)
+        await cold.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        await bump_collection_version(db, collection)
+    restored = [doc["id"] for doc in docs]
+    found = set(restored)
+    return {"restored": restored, "not_found": [i for i in ids if i not in found]}
+
+async def archive_status(db: AsyncIOMotorDatabase, months: int = ARCHIVE_AFTER_MONTHS) -> Dict[str, Dict[str, int]]:
+    """Per archived collection: hot and archived record counts, and how many hot records are due"""
+    cutoff = months_before(datetime.now(timezone.utc), months)
+    status = {}
+    for collection in ARCHIVE_POLICIES:
+        status[collection] = {
+            "hot": await db[collection].estimated_document_count(),
+            "archived": await db[archive_name(collection)].estimated_document_count(),
+            "due": await db[collection].count_documents(archivable_filter(collection, cutoff)),
+        }
+    return status
+
+async def schedule_nightly_archival(db: AsyncIOMotorDatabase):
+    """Worker loop: queue the archive run after the nightly rebuilds"""
+    await schedule_daily_job(db, "archive.run", hour_utc=2, minute_utc=0)
@@ -0,0 +1,277 @@
+"""
+Audit Trail
+Who changed which fields on opportunities, SOWs, clients, users and
+settings, served by GET /api/audit.
+
+- Writers call `record_audit(...)` after their own write has succeeded. It
+  only computes the field-level diff and appends the event to an in-process
+  buffer, so auditing adds no database round trip to the request.
+- `run_audit_flusher` (started with the API) writes the buffer with one
+  unordered insert_many every AUDIT_FLUSH_SECONDS, or as soon as
+  AUDIT_FLUSH_BATCH events are waiting. A failed flush keeps its events for
+  the next attempt; past AUDIT_MAX_BUFFERED the oldest events are dropped
+  (and counted) rather than letting the API process grow without bound.
+- `audit_log` is a time-series collection (time-bucketed storage, meta =
+  entity, entity_id and actor_id) that expires events after
+  AUDIT_HOT_DAYS. Servers that cannot create time-series collections get a
+  plain collection with a TTL index instead.
+- The nightly `audit.archive_export` job writes each finished day to
+  AUDIT_ARCHIVE_DIR/audit-YYYY-MM-DD.jsonl.gz before it expires, recording
+  exported days in `audit_archives` so missed nights are caught up.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import CollectionInvalid, OperationFailure
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Any, Deque, List, Optional
+from collections import deque
+import asyncio
+import base64
+import binascii
+import gzip
+import json
+import logging
+import os
+from utils.dates import parse_datetime
+from utils.jobs import schedule_daily_job
+
+logger = logging.getLogger(__name__)
+
+AUDIT_COLLECTION = "audit_log"
+ARCHIVES_COLLECTION = "audit_archives"
+
+AUDIT_FLUSH_SECONDS = float(os.environ.get("AUDIT_FLUSH_SECONDS", "2"))
+AUDIT_FLUSH_BATCH = int(os.environ.get("AUDIT_FLUSH_BATCH", "500"))
+AUDIT_MAX_BUFFERED = int(os.environ.get("AUDIT_MAX_BUFFERED", "20000"))
+AUDIT_HOT_DAYS = int(os.environ.get("AUDIT_HOT_DAYS", "90"))
+AUDIT_ARCHIVE_DIR = Path(os.environ.get("AUDIT_ARCHIVE_DIR", "/app/backend/audit_archive"))
+
+AUDITED_ENTITIES = ["opportunities", "sows", "clients", "users", "settings"]
+# Bookkeeping that changes on every write and says nothing about who changed what
+IGNORED_FIELDS = {"_id", "updated_at", "version", "dedup", "rollup", "status_change_log"}
+REDACTED_FIELDS = {"password"}
+REDACTED = "[redacted]"
+
+def field_changes(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Top-level fields whose values differ, as {field, from, to} (secrets redacted)"""
+    before, after = before or {}, after or {}
+    changes = []
+    for field in sorted((before.keys() | after.keys()) - IGNORED_FIELDS):
+        old, new = before.get(field), after.get(field)
+        if old == new:
+            continue
+        if field in REDACTED_FIELDS:
+            old, new = REDACTED if old is not None else None, REDACTED if new is not None else None
+        changes.append({"field": field, "from": old, "to": new})
+    return changes
+
+def actor_of(current_user: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": current_user.get("id") or current_user.get("sub"),
+        "name": current_user.get("full_name") or current_user.get("email", ""),
+    }
+
+class AuditBuffer:
+    """Events waiting to be written; appended to by requests, drained by the flusher"""
+
+    def __init__(self, max_buffered: int = AUDIT_MAX_BUFFERED):
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._max_buffered = max_buffered
+        self._wakeup: Optional[asyncio.Event] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, event: Dict[str, Any]):
+        self._events.append(event)
+        while len(self._events) > self._max_buffered:
+            self._events.popleft()
+            self.dropped += 1
+        if len(self._events) >= AUDIT_FLUSH_BATCH and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self, db: AsyncIOMotorDatabase) -> int:
+        """Write everything buffered so far; events stay buffered if the write fails"""
+        written = 0
+        while self._events:
+            batch = [self._events.popleft() for _ in range(min(AUDIT_FLUSH_BATCH, len(self._events)))]
+            try:
+                await db[AUDIT_COLLECTION].insert_many(batch, ordered=False)
+            except Exception as e:
+                self._events.extendleft(reversed(batch))
+                self.failed_flushes += 1
+                logger.error(f"Audit flush of {len(batch)} events failed: {str(e)}")
+                break
+            written += len(batch)
+        self.written += written
+        return written
+
+    async def wait(self, timeout: float):
+        """Sleep until the next periodic flush, or until a full batch is waiting"""
+        if len(self._events) >= AUDIT_FLUSH_BATCH:
+            return
+        # Created by the flusher's own loop (the buffer itself is created at import)
+        self._wakeup = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"buffered": len(self), "written": self.written, "dropped": self.dropped, "failed_flushes": self.failed_flushes}
+
+buffer = AuditBuffer()
+
+def record_audit(
+    entity: str,
+    entity_id: str,
+    action: str,
+    current_user: Dict[str, Any],
+    before: Optional[Dict[str, Any]] = None,
+    after: Optional[Dict[str, Any]] = None,
+):
+    """Queue an audit event for a create, update or delete (updates that change nothing are skipped)"""
+    changes = field_changes(before, after) if action == "update" else []
+    if action == "update" and not changes:
+        return
+    actor = actor_of(current_user)
+    buffer.add({
+        "at": datetime.now(timezone.utc),
+        "meta": {"entity": entity, "entity_id": entity_id, "actor_id": actor["id"]},
+        "actor_name": actor["name"],
+        "action": action,
+        "changes": changes,
+    })
+
+async def run_audit_flusher(db: AsyncIOMotorDatabase):
+    """API background loop: flush the buffer periodically, and once more when cancelled at shutdown"""
+    try:
+        while True:
+            await buffer.wait(AUDIT_FLUSH_SECONDS)
+            await buffer.flush(db)
+    except asyncio.CancelledError:
+        await buffer.flush(db)
+        raise
+
+async def ensure_audit_collection(db: AsyncIOMotorDatabase):
+    """Create audit_log as a time-series collection with hot retention (before ensure_indexes creates it implicitly)"""
+    expire_after = AUDIT_HOT_DAYS * 24 * 3600
+    try:
+        await db.create_collection(
+            AUDIT_COLLECTION,
+            timeseries={"timeField": "at", "metaField": "meta", "granularity": "minutes"},
+            expireAfterSeconds=expire_after,
+        )
+        return
+    except CollectionInvalid:
+        pass  # already exists
+    except OperationFailure as e:
+        logger.warning(f"Time-series audit collection unavailable, using a TTL index instead: {str(e)}")
+        await db[AUDIT_COLLECTION].create_index("at", expireAfterSeconds=expire_after, name="audit_hot_retention")
+        return
+
+    options = await db[AUDIT_COLLECTION].options()
+    if "timeseries" in options and options.get("expireAfterSeconds") != expire_after:
+        await db.command("collMod", AUDIT_COLLECTION, expireAfterSeconds=expire_after)
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(event: Dict[str, Any]) -> str:
+    raw = json.dumps([event["at"].isoformat(), str(event["_id"])], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        at, event_id = json.loads(raw)
+        at, event_id = parse_datetime(at), ObjectId(event_id)
+    except (binascii.Error, InvalidId, ValueError, TypeError):
+        raise InvalidCursor("Malformed audit cursor")
+    if at is None:
+        raise InvalidCursor("Malformed audit cursor")
+    return at, event_id
+
+async def load_audit(
+    db: AsyncIOMotorDatabase,
+    match: Dict[str, Any],
+    cursor: Optional[str] = None,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """One newest-first page of events matching `match`, and the cursor for the next page"""
+    query = dict(match)
+    if cursor:
+        at, event_id = decode_cursor(cursor)
+        query["$or"] = [{"at": {"$lt": at}}, {"at": at, "_id": {"$lt": event_id}}]
+    events = await db[AUDIT_COLLECTION].find(query).sort([("at", -1), ("_id", -1)]).limit(limit + 1).to_list(limit + 1)
+    page = events[:limit]
+    return {
+        "events": [
+            {
+                "at": event["at"],
+                "entity": event["meta"]["entity"],
+                "entity_id": event["meta"]["entity_id"],
+                "actor_id": event["meta"]["actor_id"],
+                "actor_name": event.get("actor_name"),
+                "action": event["action"],
+                "changes": event.get("changes", []),
+            }
+            for event in page
+        ],
+        "next_cursor": encode_cursor(page[-1]) if len(events) > limit else None,
+    }
+
+def _day_bounds(day: date):
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+def _write_archive(path: Path, lines: List[str], append: bool):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "at" if append else "wt", encoding="utf-8") as f:
+        f.writelines(lines)
+
+async def export_archives(db: AsyncIOMotorDatabase, through: Optional[date] = None) -> Dict[str, int]:
+    """Write every finished, not yet exported day still in audit_log to a gzipped JSON Lines file"""
+    through = through or datetime.now(timezone.utc).date() - timedelta(days=1)
+    last = await db[ARCHIVES_COLLECTION].find_one({}, sort=[("_id", -1)])
+    if last:
+        day = date.fromisoformat(last["_id"]) + timedelta(days=1)
+    else:
+        oldest = await db[AUDIT_COLLECTION].find_one({}, {"at": 1}, sort=[("at", 1)])
+        if oldest is None:
+            return {}
+        day = oldest["at"].date()
+
+    exported = {}
+    while day <= through:
+        start, end = _day_bounds(day)
+        path = AUDIT_ARCHIVE_DIR / f"audit-{day.isoformat()}.jsonl.gz"
+        count = 0
+        lines: List[str] = []
+        async for event in db[AUDIT_COLLECTION].find({"at": {"$gte": start, "$lt": end}}).sort("at", 1):
+            lines.append(json_util.dumps(event) + "\n")
+            if len(lines) >= AUDIT_FLUSH_BATCH:
+                # File writes stay off the event loop
+                await asyncio.to_thread(_write_archive, path, lines, count > 0)
+                count += len(lines)
+                lines = []
+        if lines or count == 0:
+            await asyncio.to_thread(_write_archive, path, lines, count > 0)
+            count += len(lines)
+        await db[ARCHIVES_COLLECTION].update_one(
+            {"_id": day.isoformat()},
+            {"$set": {"events": count, "path": str(path), "exported_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        exported[day.isoformat()] = count
+        day += timedelta(days=1)
+    return exported
+
+async def schedule_nightly_audit_export(db: AsyncIOMotorDatabase):
+    """Worker loop: queue the archive export shortly after midnight UTC"""
+    await schedule_daily_job(db, "audit.archive_export", hour_utc=0, minute_utc=50)
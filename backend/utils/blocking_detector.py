@@ -0,0 +1,165 @@
+"""
+Blocking Call Detector
+Debug instrumentation that finds synchronous work run on the event loop
+(smtplib, bcrypt, file I/O, print of large payloads, ...). Enabled only when
+BLOCKING_DETECTOR_MS is set, e.g. BLOCKING_DETECTOR_MS=50 uvicorn server:app.
+
+A heartbeat coroutine ticks on the loop while a watchdog thread watches it.
+When the heartbeat is late by more than the threshold, the watchdog captures
+the loop thread's stack (i.e. the code that is blocking it right now) and the
+request the running task belongs to. The stall's full duration is recorded
+when the heartbeat resumes. Stalls are grouped by route and by the innermost
+frame in this codebase, and ranked by total blocked time on
+GET /api/debug/blocking.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+logger = logging.getLogger(__name__)
+
+THRESHOLD_MS = float(os.environ.get("BLOCKING_DETECTOR_MS") or 0)
+ENABLED = THRESHOLD_MS > 0
+HEARTBEAT_SECONDS = 0.01
+STACK_DEPTH = 25
+# Frames under this directory (and not in site-packages) count as our code,
+# except the instrumentation middleware every request passes through
+APP_DIR = str(Path(__file__).resolve().parent.parent)
+_INSTRUMENTATION = {__file__, str(Path(__file__).with_name("telemetry.py"))}
+
+# Request scope for each task handling a request; read from the watchdog thread
+_task_scopes: "weakref.WeakKeyDictionary[asyncio.Task, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+class BlockingCallMiddleware:
+    """ASGI middleware recording which request each task is serving"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        task = asyncio.current_task()
+        if scope["type"] == "http" and task is not None:
+            _task_scopes[task] = scope
+        await self.app(scope, receive, send)
+
+def _is_app_frame(filename: str) -> bool:
+    return filename.startswith(APP_DIR) and "site-packages" not in filename and filename not in _INSTRUMENTATION
+
+def _describe_task(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return "(event loop callback)"
+    scope = _task_scopes.get(task)
+    if scope is not None:
+        route = scope.get("route")
+        return f"{scope['method']} {route.path if route is not None else scope['path']}"
+    coro = task.get_coro()
+    return f"(task {getattr(coro, '__qualname__', task.get_name())})"
+
+class _Stall:
+    __slots__ = ("route", "site", "call", "stack")
+
+    def __init__(self, route: str, site: str, call: str, stack: List[str]):
+        self.route = route
+        self.site = site
+        self.call = call
+        self.stack = stack
+
+class BlockingDetector:
+    def __init__(self, threshold_ms: float):
+        self.threshold = threshold_ms / 1000
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._beats = 0
+        self._captured_beat = -1
+        self._pending: Optional[_Stall] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._hotspots: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.stalls = 0
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            blocked = time.monotonic() - self._last_beat - HEARTBEAT_SECONDS
+            with self._lock:
+                self._beats += 1
+                stall, self._pending = self._pending, None
+            if stall is not None:
+                self._record(stall, blocked)
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 4):
+            with self._lock:
+                beat = self._beats
+                if beat == self._captured_beat or time.monotonic() - self._last_beat - HEARTBEAT_SECONDS < self.threshold:
+                    continue
+                self._captured_beat = beat
+                self._pending = self._capture()
+
+    def _capture(self) -> Optional[_Stall]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        summary = traceback.extract_stack(frame)[-STACK_DEPTH:]
+        app_frames = [f for f in summary if _is_app_frame(f.filename)]
+        site = app_frames[-1] if app_frames else summary[-1]
+        call = summary[-1]
+        return _Stall(
+            route=_describe_task(asyncio.current_task(self._loop)),
+            site=f"{os.path.relpath(site.filename, APP_DIR)}:{site.lineno} in {site.name}",
+            call=f"{call.filename}:{call.lineno} in {call.name}",
+            stack=[f"{f.filename}:{f.lineno} in {f.name}: {f.line}" for f in summary],
+        )
+
+    def _record(self, stall: _Stall, blocked: float):
+        blocked_ms = blocked * 1000
+        self.stalls += 1
+        hotspot = self._hotspots.setdefault((stall.route, stall.site), {
+            "route": stall.route, "site": stall.site, "call": stall.call,
+            "count": 0, "total_ms": 0.0, "max_ms": 0.0, "stack": stall.stack,
+        })
+        hotspot["count"] += 1
+        hotspot["total_ms"] += blocked_ms
+        if blocked_ms > hotspot["max_ms"]:
+            hotspot["max_ms"] = blocked_ms
+            hotspot["call"] = stall.call
+            hotspot["stack"] = stall.stack
+        logger.warning(f"Event loop blocked {blocked_ms:.0f}ms by {stall.route} at {stall.site} ({stall.call})")
+
+    def start(self) -> asyncio.Task:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        threading.Thread(target=self._watch, name="blocking-detector", daemon=True).start()
+        logger.info(f"Blocking call detector on (threshold {self.threshold * 1000:.0f}ms)")
+        return asyncio.create_task(self._heartbeat())
+
+    def stop(self):
+        self._stopped.set()
+
+    def report(self, limit: int = 50) -> Dict[str, Any]:
+        """Hot spots ranked by total blocked time"""
+        hotspots = sorted(self._hotspots.values(), key=lambda h: h["total_ms"], reverse=True)[:limit]
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "hotspots": [
+                {**h, "total_ms": round(h["total_ms"], 1), "max_ms": round(h["max_ms"], 1),
+                 "avg_ms": round(h["total_ms"] / h["count"], 1)}
+                for h in hotspots
+            ],
+        }
+
+    def reset(self):
+        self._hotspots.clear()
+        self.stalls = 0
+
+detector = BlockingDetector(THRESHOLD_MS) if ENABLED else None
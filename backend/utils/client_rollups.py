@@ -0,0 +1,203 @@
+"""
+Client Account Rollups
+Per-client totals stored on each client document under `rollup`, so the
+accounts table can sort and filter on them with an index instead of joining
+leads, opportunities, SOWs and sales activities by client name per request:
+
+    lead_count, open_lead_count          leads (open = Active or Delayed)
+    open_opportunity_count, open_pipeline, won_opportunity_count
+    sow_count, won_sow_value             SOWs
+    last_activity_at                     latest sales activity
+
+Writers call `apply_rollup_change` with the linked record before and after
+the write; the difference is applied with $inc/$max in one bulk write. The
+nightly `clients.rollup_reconcile` job recomputes every rollup from the
+source collections, which also repairs what deltas cannot express (e.g.
+`last_activity_at` after the latest activity is deleted) and any drift from
+failed or concurrent updates.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateMany
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import logging
+from utils.archival import including_archive
+from utils.forecast_engine import CLOSED_STAGES
+from utils.jobs import schedule_daily_job
+from utils.lead_status import LeadStatus
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELD = "rollup"
+OPEN_LEAD_STATUSES = [LeadStatus.ACTIVE.value, LeadStatus.DELAYED.value]
+RECONCILE_BATCH_SIZE = 1000
+
+EMPTY_ROLLUP = {
+    "lead_count": 0,
+    "open_lead_count": 0,
+    "open_opportunity_count": 0,
+    "open_pipeline": 0.0,
+    "won_opportunity_count": 0,
+    "sow_count": 0,
+    "won_sow_value": 0.0,
+    "last_activity_at": None,
+}
+
+# Rollup fields the accounts table may sort by
+SORTABLE_FIELDS = ["open_pipeline", "won_sow_value", "lead_count", "open_lead_count", "last_activity_at"]
+
+# Fields each linked entity needs for its contribution
+ROLLUP_PROJECTIONS = {
+    "leads": {"_id": 0, "client_name": 1, "lead_status": 1},
+    "opportunities": {"_id": 0, "client_name": 1, "stage": 1, "amount": 1, "estimated_value": 1},
+    "sows": {"_id": 0, "client_name": 1, "value": 1},
+    "sales_activities": {"_id": 0, "linked_account": 1, "activity_date": 1},
+}
+
+def _contribution(entity: str, doc: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Dict[str, float], Dict[str, Any]]:
+    """(client name, counters, maxima) one record adds to its client's rollup"""
+    if not doc:
+        return None, {}, {}
+    if entity == "leads":
+        return doc.get("client_name"), {
+            "lead_count": 1,
+            "open_lead_count": 1 if doc.get("lead_status") in OPEN_LEAD_STATUSES else 0,
+        }, {}
+    if entity == "opportunities":
+        stage = doc.get("stage")
+        if stage in CLOSED_STAGES:
+            return doc.get("client_name"), {"won_opportunity_count": 1 if stage == "Closed Won" else 0}, {}
+        return doc.get("client_name"), {
+            "open_opportunity_count": 1,
+            "open_pipeline": float(doc.get("amount") or doc.get("estimated_value") or 0),
+        }, {}
+    if entity == "sows":
+        return doc.get("client_name"), {"sow_count": 1, "won_sow_value": float(doc.get("value") or 0)}, {}
+    if entity == "sales_activities":
+        activity_date = doc.get("activity_date")
+        return doc.get("linked_account"), {}, ({"last_activity_at": activity_date} if activity_date else {})
+    raise ValueError(f"No rollup contribution for '{entity}'")
+
+async def apply_rollup_change(
+    db: AsyncIOMotorDatabase,
+    entity: str,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]],
+):
+    """
+    Move a record's contribution from `before` to `after` (None for inserts
+    and deletes). Errors are logged, not raised: the write that triggered the
+    change has already happened and the nightly reconcile repairs the rollup.
+    """
+    changes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        client_name, counters, maxima = _contribution(entity, doc)
+        if not client_name:
+            continue
+        change = changes.setdefault(client_name, {"$inc": {}, "$max": {}})
+        for field, value in counters.items():
+            key = f"{ROLLUP_FIELD}.{field}"
+            change["$inc"][key] = change["$inc"].get(key, 0) + sign * value
+        if sign > 0:
+            for field, value in maxima.items():
+                change["$max"][f"{ROLLUP_FIELD}.{field}"] = value
+
+    operations = []
+    for client_name, change in changes.items():
+        update = {op: {k: v for k, v in fields.items() if v} for op, fields in change.items()}
+        update = {op: fields for op, fields in update.items() if fields}
+        if update:
+            operations.append(UpdateMany({"client_name": client_name}, update))
+    if not operations:
+        return
+    try:
+        await db.clients.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Updating client rollups for {entity} failed: {str(e)}")
+
+async def compute_rollups(db: AsyncIOMotorDatabase, client_names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Rollups recomputed from the source collections, for the given clients or all of them"""
+    def match(field: str) -> List[Dict[str, Any]]:
+        if client_names is None:
+            return [{"$match": {field: {"$nin": [None, ""]}}}]
+        return [{"$match": {field: {"$in": client_names}}}]
+
+    pipelines = {
+        "leads": match("client_name") + [{"$group": {
+            "_id": "$client_name",
+            "lead_count": {"$sum": 1},
+            "open_lead_count": {"$sum": {"$cond": [{"$in": ["$lead_status", OPEN_LEAD_STATUSES]}, 1, 0]}},
+        }}],
+        "opportunities": match("client_name") + [{"$group": {
+            "_id": "$client_name",
+            "open_opportunity_count": {"$sum": {"$cond": [{"$in": ["$stage", CLOSED_STAGES]}, 0, 1]}},
+            "open_pipeline": {"$sum": {"$cond": [
+                {"$in": ["$stage", CLOSED_STAGES]}, 0,
+                {"$ifNull": ["$amount", {"$ifNull": ["$estimated_value", 0]}]},
+            ]}},
+            "won_opportunity_count": {"$sum": {"$cond": [{"$eq": ["$stage", "Closed Won"]}, 1, 0]}},
+        }}],
+        "sows": match("client_name") + [{"$group": {
+            "_id": "$client_name",
+            "sow_count": {"$sum": 1},
+            "won_sow_value": {"$sum": {"$ifNull": ["$value", 0]}},
+        }}],
+        "sales_activities": match("linked_account") + [{"$group": {
+            "_id": "$linked_account",
+            "last_activity_at": {"$max": "$activity_date"},
+        }}],
+    }
+
+    async def run(collection: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Archived records still count towards their client
+        return await db[collection].aggregate(including_archive(collection, pipeline), allowDiskUse=True).to_list(None)
+
+    results = await asyncio.gather(*(run(collection, pipeline) for collection, pipeline in pipelines.items()))
+    rollups: Dict[str, Dict[str, Any]] = {}
+    for rows in results:
+        for row in rows:
+            rollup = rollups.setdefault(row.pop("_id"), dict(EMPTY_ROLLUP))
+            rollup.update(row)
+    for rollup in rollups.values():
+        rollup["open_pipeline"] = float(rollup["open_pipeline"])
+        rollup["won_sow_value"] = float(rollup["won_sow_value"])
+    return rollups
+
+async def refresh_client_rollups(db: AsyncIOMotorDatabase, client_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Recompute the rollups of a few clients (after a client is created or renamed); returns them by name"""
+    client_names = [name for name in client_names if name]
+    if not client_names:
+        return {}
+    computed = await compute_rollups(db, client_names)
+    rollups = {name: computed.get(name, dict(EMPTY_ROLLUP)) for name in client_names}
+    await db.clients.bulk_write([
+        UpdateMany({"client_name": name}, {"$set": {ROLLUP_FIELD: rollup}})
+        for name, rollup in rollups.items()
+    ], ordered=False)
+    return rollups
+
+async def reconcile_client_rollups(db: AsyncIOMotorDatabase) -> Dict[str, int]:
+    """Recompute every client's rollup; clients with no linked records are reset to zero"""
+    reconciled_at = datetime.now(timezone.utc)
+    rollups = await compute_rollups(db)
+
+    updated = 0
+    operations = [
+        UpdateMany({"client_name": name}, {"$set": {ROLLUP_FIELD: {**rollup, "reconciled_at": reconciled_at}}})
+        for name, rollup in rollups.items()
+    ]
+    for start in range(0, len(operations), RECONCILE_BATCH_SIZE):
+        result = await db.clients.bulk_write(operations[start:start + RECONCILE_BATCH_SIZE], ordered=False)
+        updated += result.modified_count
+
+    reset = await db.clients.update_many(
+        {f"{ROLLUP_FIELD}.reconciled_at": {"$ne": reconciled_at}},
+        {"$set": {ROLLUP_FIELD: {**EMPTY_ROLLUP, "reconciled_at": reconciled_at}}}
+    )
+    logger.info(f"Client rollups reconciled: {updated} updated, {reset.modified_count} reset")
+    return {"clients_with_activity": len(rollups), "updated": updated, "reset": reset.modified_count}
+
+async def schedule_nightly_rollup_reconcile(db: AsyncIOMotorDatabase, hour_utc: int = 0, minute_utc: int = 20):
+    """Worker loop: queue one reconcile job per day, after the pipeline snapshot"""
+    await schedule_daily_job(db, "clients.rollup_reconcile", hour_utc, minute_utc)
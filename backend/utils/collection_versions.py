@@ -0,0 +1,30 @@
+"""
+Collection Version Counters
+Monotonic per-collection counters stored in the `counters` collection (next to
+the Task ID sequence). Writers bump them; readers use them to decide whether a
+cached result computed from that collection is still current. Because the
+counters live in MongoDB, every worker process sees the same versions.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Iterable
+
+def _counter_id(collection_name: str) -> str:
+    return f"version:{collection_name}"
+
+async def bump_collection_version(db: AsyncIOMotorDatabase, *collection_names: str):
+    """Mark one or more collections as changed"""
+    for collection_name in collection_names:
+        await db.counters.update_one(
+            {"_id": _counter_id(collection_name)},
+            {"$inc": {"sequence": 1}},
+            upsert=True
+        )
+
+async def get_collection_versions(db: AsyncIOMotorDatabase, collection_names: Iterable[str]) -> Dict[str, int]:
+    """Current version of each collection (0 if it has never been bumped)"""
+    collection_names = list(collection_names)
+    counters = await db.counters.find(
+        {"_id": {"$in": [_counter_id(name) for name in collection_names]}}
+    ).to_list(len(collection_names))
+    by_id = {counter["_id"]: counter.get("sequence", 0) for counter in counters}
+    return {name: by_id.get(_counter_id(name), 0) for name in collection_names}
@@ -0,0 +1,308 @@
+"""
+Dashboard Daily Buckets
+Per-day totals in `dashboard_daily`, so a dashboard window costs one indexed
+read of O(days in window) bucket documents instead of scanning the source
+collections. One bucket per (source, day, scope dimensions):
+
+    leads             created (count, estimated value)
+    opportunities     created, won, lost (count, amount); won/lost dated by close date
+    sows              created (count, value)
+    sales_activities  activity (count)
+
+Buckets carry the source's scope fields (region and owner fields from
+SCOPE_RULES), so `scope.filter(source)` applies to them unchanged.
+
+Writers call `apply_bucket_change` (through utils.derived_data.record_change)
+with the record before and after the write; the difference is $inc-ed into
+the affected buckets. The nightly `dashboard.rebuild_buckets` job recomputes
+every bucket from the source collections (and their archives, see
+utils/archival.py) into a staging collection and swaps it in atomically,
+which repairs any drift.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+from utils.archival import including_archive
+from utils.dates import parse_datetime, to_date_expression
+from utils.indexes import INDEXES
+from utils.jobs import schedule_daily_job
+from utils.scoping import SCOPE_RULES, Scope
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_COLLECTION = "dashboard_daily"
+STAGING_COLLECTION = "dashboard_daily_rebuild"
+REBUILD_BATCH_SIZE = 1000
+MAX_WINDOW_DAYS = 731
+
+def _value(*fields: str) -> Dict[str, Any]:
+    """First non-null of the fields, else 0"""
+    expression: Any = 0
+    for field in reversed(fields):
+        expression = {"$ifNull": [f"${field}", expression]}
+    return expression
+
+def _first(*fields: str) -> Any:
+    """First non-null of the fields"""
+    expression: Any = None
+    for field in reversed(fields):
+        expression = {"$ifNull": [f"${field}", expression]} if expression is not None else f"${field}"
+    return expression
+
+_CLOSE_DATE = ("close_date", "expected_closure_date", "updated_at")
+
+# Per source, per metric: the date field(s) that place a record in a day
+# (first present wins), the summed value field(s) and the stage condition
+BUCKET_SOURCES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "leads": {
+        "created": {"dates": ("created_at",), "value": ("estimated_value",)},
+    },
+    "opportunities": {
+        "created": {"dates": ("created_at",), "value": ("amount", "estimated_value")},
+        "won": {"dates": _CLOSE_DATE, "value": ("amount", "estimated_value"), "stage": "Closed Won"},
+        "lost": {"dates": _CLOSE_DATE, "value": ("amount", "estimated_value"), "stage": "Closed Lost"},
+    },
+    "sows": {
+        "created": {"dates": ("created_at",), "value": ("value",)},
+    },
+    "sales_activities": {
+        "activity": {"dates": ("activity_date",), "value": None},
+    },
+}
+
+def dimensions(source: str) -> List[str]:
+    """Scope fields a source's buckets are split by"""
+    rule = SCOPE_RULES[source]
+    return [field for field in [rule["region_field"], *rule["owner_fields"]] if field]
+
+# Fields each source needs for its contribution (deletes project these)
+BUCKET_PROJECTIONS = {
+    source: {
+        "_id": 0, "stage": 1,
+        **{field: 1 for field in dimensions(source)},
+        **{field: 1 for metric in metrics.values() for field in (*metric["dates"], *(metric["value"] or ()))},
+    }
+    for source, metrics in BUCKET_SOURCES.items()
+}
+
+def metric_fields(source: str) -> List[str]:
+    """Counter names stored in a source's buckets, e.g. created_count, created_value"""
+    fields = []
+    for name, metric in BUCKET_SOURCES[source].items():
+        fields.append(f"{name}_count")
+        if metric["value"]:
+            fields.append(f"{name}_value")
+    return fields
+
+def _contribution(source: str, doc: Optional[Dict[str, Any]]) -> Dict[Tuple, Dict[str, float]]:
+    """(day, dimension values) -> counters one record adds to its buckets"""
+    if not doc:
+        return {}
+    dims = tuple(doc.get(field) for field in dimensions(source))
+    contribution: Dict[Tuple, Dict[str, float]] = {}
+    for name, metric in BUCKET_SOURCES[source].items():
+        if "stage" in metric and doc.get("stage") != metric["stage"]:
+            continue
+        when = parse_datetime(next((doc.get(f) for f in metric["dates"] if doc.get(f)), None))
+        if when is None:
+            continue
+        counters = contribution.setdefault((when.date().isoformat(), dims), {})
+        counters[f"{name}_count"] = counters.get(f"{name}_count", 0) + 1
+        if metric["value"]:
+            value = next((doc.get(f) for f in metric["value"] if doc.get(f) is not None), 0)
+            counters[f"{name}_value"] = counters.get(f"{name}_value", 0) + float(value or 0)
+    return contribution
+
+def _bucket_filter(source: str, day: str, dims: Tuple) -> Dict[str, Any]:
+    return {"source": source, "day": day, **dict(zip(dimensions(source), dims))}
+
+async def apply_bucket_change(
+    db: AsyncIOMotorDatabase,
+    source: str,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]],
+):
+    """
+    Move a record's contribution from `before` to `after` (None for inserts
+    and deletes) in one bulk write. Errors are logged, not raised; the nightly
+    rebuild repairs the buckets.
+    """
+    if source not in BUCKET_SOURCES:
+        return
+    changes: Dict[Tuple, Dict[str, float]] = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        for key, counters in _contribution(source, doc).items():
+            change = changes.setdefault(key, {})
+            for field, value in counters.items():
+                change[field] = change.get(field, 0) + sign * value
+
+    operations = []
+    for (day, dims), change in changes.items():
+        increments = {f"metrics.{field}": value for field, value in change.items() if value}
+        if increments:
+            operations.append(UpdateOne(_bucket_filter(source, day, dims), {"$inc": increments}, upsert=True))
+    if not operations:
+        return
+    try:
+        await db[BUCKETS_COLLECTION].bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Updating dashboard buckets for {source} failed: {str(e)}")
+
+def _rebuild_pipeline(source: str, name: str, metric: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Aggregation summing one metric of one source per (day, dimensions)"""
+    match: Dict[str, Any] = {"stage": metric["stage"]} if "stage" in metric else {}
+    day = {"$dateToString": {"format": "%Y-%m-%d", "date": to_date_expression(_first(*metric["dates"]))}}
+    group: Dict[str, Any] = {
+        "_id": {"day": day, **{field: f"${field}" for field in dimensions(source)}},
+        f"{name}_count": {"$sum": 1},
+    }
+    if metric["value"]:
+        group[f"{name}_value"] = {"$sum": _value(*metric["value"])}
+    return [{"$match": match}, {"$group": group}, {"$match": {"_id.day": {"$ne": None}}}]
+
+async def rebuild_daily_buckets(db: AsyncIOMotorDatabase) -> Dict[str, int]:
+    """
+    Recompute every bucket from the source collections. The new buckets are
+    written to a staging collection that then replaces `dashboard_daily` in
+    one rename, so readers never see a half-built set. Incremental updates
+    that land while the rebuild runs are lost until the next rebuild.
+    """
+    staging = db[STAGING_COLLECTION]
+    await staging.drop()
+    await staging.create_indexes(INDEXES[BUCKETS_COLLECTION])
+
+    counts: Dict[str, int] = {}
+    for source, metrics in BUCKET_SOURCES.items():
+        buckets: Dict[Tuple, Dict[str, Any]] = {}
+        for name, metric in metrics.items():
+            async for row in db[source].aggregate(including_archive(source, _rebuild_pipeline(source, name, metric)), allowDiskUse=True):
+                key = row.pop("_id")
+                bucket = buckets.setdefault(tuple(key.items()), {
+                    "source": source, **key, "metrics": {field: 0 for field in metric_fields(source)},
+                })
+                bucket["metrics"].update(row)
+        documents = list(buckets.values())
+        for start in range(0, len(documents), REBUILD_BATCH_SIZE):
+            await staging.insert_many(documents[start:start + REBUILD_BATCH_SIZE], ordered=False)
+        counts[source] = len(documents)
+
+    await staging.rename(BUCKETS_COLLECTION, dropTarget=True)
+    logger.info(f"Dashboard daily buckets rebuilt: {counts}")
+    return counts
+
+async def schedule_nightly_bucket_rebuild(db: AsyncIOMotorDatabase):
+    """Worker loop: queue one bucket rebuild per day, after the client rollup reconcile"""
+    await schedule_daily_job(db, "dashboard.rebuild_buckets", hour_utc=0, minute_utc=40)
+
+async def load_window_totals(
+    db: AsyncIOMotorDatabase,
+    windows: Dict[str, Tuple[date, date]],
+    scope: Scope,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Per window (inclusive day range): totals per source and a daily series,
+    read in one aggregation over the buckets of all the windows
+    """
+    first = min(start for start, _ in windows.values()).isoformat()
+    last = max(end for _, end in windows.values()).isoformat()
+    branches = []
+    accumulators: Dict[str, Any] = {}
+    for source in BUCKET_SOURCES:
+        scope_filter = scope.filter(source)
+        branches.append({"source": source, "day": {"$gte": first, "$lte": last}, **scope_filter})
+        for field in metric_fields(source):
+            accumulators[field] = {"$sum": f"$metrics.{field}"}
+
+    rows = await db[BUCKETS_COLLECTION].aggregate([
+        {"$match": {"$or": branches}},
+        {"$group": {"_id": {"source": "$source", "day": "$day"}, **accumulators}},
+        {"$sort": {"_id.day": 1}},
+    ]).to_list(None)
+
+    results = {
+        window: {
+            "totals": {source: {field: 0 for field in metric_fields(source)} for source in BUCKET_SOURCES},
+            "daily": {},
+        }
+        for window in windows
+    }
+    for row in rows:
+        source, day = row["_id"]["source"], row["_id"]["day"]
+        for window, (start, end) in windows.items():
+            if not start.isoformat() <= day <= end.isoformat():
+                continue
+            totals = results[window]["totals"][source]
+            daily = results[window]["daily"].setdefault(day, {}).setdefault(source, {})
+            for field in metric_fields(source):
+                totals[field] += row.get(field) or 0
+                daily[field] = row.get(field) or 0
+    return results
+
+def previous_window(start: date, end: date, compare_to: str) -> Tuple[date, date]:
+    """The window a period is compared against: the equal-length period before it, or the same dates a year earlier"""
+    if compare_to == "previous_year":
+        def year_before(day: date) -> date:
+            try:
+                return day.replace(year=day.year - 1)
+            except ValueError:  # 29 February
+                return day.replace(year=day.year - 1, day=28)
+        return year_before(start), year_before(end)
+    length = end - start + timedelta(days=1)
+    return start - length, end - length
+
+def _with_rates(totals: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, Any]]:
+    totals = {source: {k: round(v, 2) if isinstance(v, float) else v for k, v in fields.items()} for source, fields in totals.items()}
+    opportunities = totals["opportunities"]
+    closed = opportunities["won_count"] + opportunities["lost_count"]
+    opportunities["win_rate"] = round(opportunities["won_count"] / closed * 100, 2) if closed else 0
+    return totals
+
+def _deltas(current: Dict[str, Dict[str, Any]], previous: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Absolute and percent change per metric (percent is None when the previous value is 0)"""
+    deltas: Dict[str, Dict[str, Any]] = {}
+    for source, fields in current.items():
+        deltas[source] = {}
+        for field, value in fields.items():
+            before = previous[source][field]
+            deltas[source][field] = {
+                "change": round(value - before, 2),
+                "percent": round((value - before) / before * 100, 2) if before else None,
+            }
+    return deltas
+
+async def windowed_dashboard(
+    db: AsyncIOMotorDatabase,
+    start: date,
+    end: date,
+    compare_to: str,
+    scope: Scope,
+) -> Dict[str, Any]:
+    """Totals for [start, end] and the comparison window, their deltas and the window's daily series"""
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+    days = (end - start).days + 1
+    if days > MAX_WINDOW_DAYS:
+        raise ValueError(f"Dashboard windows are limited to {MAX_WINDOW_DAYS} days")
+    previous_start, previous_end = previous_window(start, end, compare_to)
+
+    windows = await load_window_totals(db, {"current": (start, end), "previous": (previous_start, previous_end)}, scope)
+    current = _with_rates(windows["current"]["totals"])
+    previous = _with_rates(windows["previous"]["totals"])
+    empty = {source: {field: 0 for field in metric_fields(source)} for source in BUCKET_SOURCES}
+    daily = windows["current"]["daily"]
+    return {
+        "window": {"from": start.isoformat(), "to": end.isoformat(), "days": days},
+        "compare_window": {
+            "from": previous_start.isoformat(), "to": previous_end.isoformat(),
+            "days": (previous_end - previous_start).days + 1, "compare_to": compare_to,
+        },
+        "current": current,
+        "previous": previous,
+        "deltas": _deltas(current, previous),
+        "daily": [
+            {"day": day.isoformat(), **{**empty, **daily.get(day.isoformat(), {})}}
+            for day in (start + timedelta(days=offset) for offset in range(days))
+        ],
+    }
@@ -0,0 +1,83 @@
+"""
+Date Helpers
+Dates are stored as BSON datetimes in UTC (calendar dates such as due dates
+at midnight UTC). Records written before the migration to BSON dates may
+still hold ISO strings with or without offsets, or bare YYYY-MM-DD strings;
+these helpers normalize every shape, and DATE_FIELDS lists the fields that
+migration 0005_dates_to_bson converts (see utils/migration_steps.py).
+"""
+from datetime import datetime, date, timezone
+from typing import Any, Dict, List, Optional
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """Parse any stored date value into an aware UTC datetime (None if unparseable)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        # Offsets are converted, so .date() is the UTC day the rebuilds bucket by
+        return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+# Fields stored as dates, per collection. A dotted path reaches into an
+# array of subdocuments (leads.status_change_log[].changed_at).
+DATE_FIELDS: Dict[str, List[str]] = {
+    "leads": ["created_at", "updated_at", "expected_closure_date", "next_followup", "status_change_log.changed_at"],
+    "opportunities": [
+        "created_at", "updated_at", "expected_closure_date", "close_date", "last_interaction",
+        "submission_deadline", "target_kickoff_date",
+    ],
+    "sows": ["created_at", "updated_at", "start_date", "end_date"],
+    "action_items": ["created_at", "updated_at", "due_date", "completed_date"],
+    "sales_activities": ["created_at", "updated_at", "activity_date"],
+    "activities": ["created_at", "updated_at", "due_date"],
+    "forecasts": ["created_at", "updated_at", "expected_closure_date"],
+    "clients": ["created_at", "updated_at", "rollup.last_activity_at", "rollup.reconciled_at"],
+    "partners": ["created_at", "updated_at"],
+    "settings": ["created_at", "updated_at"],
+    "users": ["created_at", "updated_at", "last_login", "password_changed_at"],
+    "projects": ["created_at", "updated_at"],
+}
+
+def to_bson_date(value: Any) -> Any:
+    """
+    Value to store in a date field: an aware UTC datetime (calendar dates at
+    midnight). Empty values become None; anything unparseable is returned
+    unchanged rather than lost.
+    """
+    if value is None or value == "":
+        return None
+    parsed = parse_datetime(value)
+    return parsed if parsed is not None else value
+
+def with_bson_dates(collection: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert the top-level date fields present in an insert/$set document in place"""
+    for field in DATE_FIELDS.get(collection, []):
+        if "." not in field and field in data:
+            data[field] = to_bson_date(data[field])
+    return data
+
+def to_date_expression(expression: Any) -> Dict[str, Any]:
+    """Aggregation expression parsing ISO strings and passing BSON dates through; unparseable values become null"""
+    return {"$convert": {"input": expression, "to": "date", "onError": None, "onNull": None}}
+
+def month_start(label: str, months_after: int = 0) -> datetime:
+    """Midnight UTC on the first of a YYYY-MM month (or of a month after it)"""
+    year, month = (int(part) for part in label.split("-"))
+    index = year * 12 + month - 1 + months_after
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+def month_label(month_index: int) -> str:
+    """Format a month index (year * 12 + month - 1) as YYYY-MM"""
+    return f"{month_index // 12}-{month_index % 12 + 1:02d}"
+
+def quarter_label(quarter_index: int) -> str:
+    """Format a quarter index (year * 4 + quarter - 1) as 'Q1 2025', matching forecast_quarter"""
+    return f"Q{quarter_index % 4 + 1} {quarter_index // 4}"
@@ -0,0 +1,474 @@
+"""
+Duplicate Detection Utility
+Builds blocking keys for Clients and Leads so that duplicate candidates can be
+found with a single indexed lookup instead of a collection scan.
+
+Every document carries a `dedup` sub-document:
+    {"name_key": "acme", "keys": ["n:acme", "m0:1f3a...", "d:acme.com", ...]}
+
+Keys are:
+    n:<normalized name>        exact match after normalization
+    m<band>:<hash>             MinHash bands over name trigrams (fuzzy blocking)
+    e:<email> / d:<domain>     contact email and company domain
+    c:<normalized contact>     contact person (leads only)
+
+Candidates sharing any key are then scored with trigram Jaccard similarity.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Set, Tuple
+import asyncio
+import hashlib
+import re
+import unicodedata
+from utils.collection_versions import bump_collection_version
+from utils.client_rollups import refresh_client_rollups
+from utils.tombstones import record_deletions
+from utils.updates import with_version_bump
+
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "llp", "ltd", "limited", "corp", "corporation",
+    "co", "company", "gmbh", "plc", "pvt", "private", "sa", "ag", "bv", "pty", "group"
+}
+
+# Shared mailbox providers never identify a company
+FREE_EMAIL_DOMAINS = {
+    "gmail.com", "yahoo.com", "outlook.com", "hotmail.com", "live.com",
+    "icloud.com", "aol.com", "protonmail.com", "zoho.com", "yandex.com"
+}
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+
+MINHASH_BANDS = 4
+MINHASH_ROWS = 2
+
+# Blocks larger than this are too generic to pair exhaustively in batch mode
+MAX_BLOCK_SIZE = 200
+
+# Candidate scores at or above this are reported as duplicates
+DUPLICATE_THRESHOLD = 0.75
+
+# Stored batch clusterings, one document per entity and threshold
+CLUSTERS_COLLECTION = "dedup_clusters"
+MAX_STORED_CLUSTERS = 1000
+
+DEDUP_ENTITIES = {
+    "clients": {
+        "collection": "clients",
+        "name_field": "client_name",
+        "contact_field": None,
+        "email_fields": ["contact_email", "contacts"],
+        "website_field": "website",
+        "summary_fields": ["id", "client_id", "client_name", "contact_email", "country", "region", "created_at"],
+    },
+    "leads": {
+        "collection": "leads",
+        "name_field": "client_name",
+        "contact_field": "contact_person",
+        "email_fields": ["contact_details"],
+        "website_field": None,
+        "summary_fields": ["id", "task_id", "client_name", "opportunity_name", "contact_person", "stage", "created_at"],
+    },
+}
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase, strip accents/punctuation and drop legal suffixes"""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    text = text.lower().replace("&", " and ")
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    tokens = [token for token in text.split() if token not in LEGAL_SUFFIXES]
+    return " ".join(tokens)
+
+def trigrams(normalized: str) -> Set[str]:
+    """Character trigrams of a normalized name, padded so short names still match"""
+    if not normalized:
+        return set()
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the trigram sets of two normalized names"""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+@lru_cache(maxsize=8192)
+def _name_keys(name_key: str) -> Tuple[str, ...]:
+    """Exact and MinHash keys of a normalized name (cached: many leads share a client name)"""
+    return (f"n:{name_key}", *_minhash_keys(trigrams(name_key)))
+
+def _minhash_keys(grams: Set[str]) -> List[str]:
+    """Locality-sensitive band keys: similar trigram sets share a band with high probability"""
+    if not grams:
+        return []
+    signature = []
+    for seed in range(MINHASH_BANDS * MINHASH_ROWS):
+        salt = seed.to_bytes(2, "big")
+        signature.append(min(
+            hashlib.blake2b(gram.encode(), digest_size=8, salt=salt).digest()
+            for gram in grams
+        ))
+    keys = []
+    for band in range(MINHASH_BANDS):
+        rows = b"".join(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+        keys.append(f"m{band}:{hashlib.blake2b(rows, digest_size=6).hexdigest()}")
+    return keys
+
+def _extract_emails(doc: Dict[str, Any], email_fields: List[str]) -> List[str]:
+    emails = []
+    for field in email_fields:
+        value = doc.get(field)
+        if isinstance(value, list):
+            # Embedded contact lists (clients.contacts)
+            for contact in value:
+                if isinstance(contact, dict) and contact.get("email"):
+                    emails.append(contact["email"])
+        elif isinstance(value, str):
+            emails.extend(EMAIL_PATTERN.findall(value))
+    return [email.strip().lower() for email in emails]
+
+def _website_domain(website: Optional[str]) -> Optional[str]:
+    if not website:
+        return None
+    domain = re.sub(r"^[a-z]+://", "", website.strip().lower()).split("/")[0]
+    domain = domain.split(":")[0]
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return domain or None
+
+def build_dedup_keys(entity: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the `dedup` sub-document stored on a client or lead"""
+    config = DEDUP_ENTITIES[entity]
+    name_key = normalize_name(doc.get(config["name_field"]))
+
+    keys = []
+    if name_key:
+        keys.extend(_name_keys(name_key))
+
+    domains = set()
+    for email in _extract_emails(doc, config["email_fields"]):
+        keys.append(f"e:{email}")
+        domain = email.split("@", 1)[1]
+        if domain not in FREE_EMAIL_DOMAINS:
+            domains.add(domain)
+    if config["website_field"]:
+        website_domain = _website_domain(doc.get(config["website_field"]))
+        if website_domain:
+            domains.add(website_domain)
+    keys.extend(f"d:{domain}" for domain in sorted(domains))
+
+    contact_key = ""
+    if config["contact_field"]:
+        contact_key = normalize_name(doc.get(config["contact_field"]))
+        if contact_key:
+            keys.append(f"c:{contact_key}")
+
+    return {
+        "name_key": name_key,
+        "contact_key": contact_key,
+        "keys": list(dict.fromkeys(keys))
+    }
+
+def score_candidate(entity: str, dedup: Dict[str, Any], other: Dict[str, Any]) -> Tuple[float, List[str]]:
+    """Score how likely two records are the same, with the reasons that matched"""
+    reasons = []
+    shared = set(dedup.get("keys", [])) & set(other.get("keys", []))
+
+    if any(key.startswith("e:") for key in shared):
+        reasons.append("same_email")
+        return 1.0, reasons
+
+    score = similarity(dedup.get("name_key", ""), other.get("name_key", ""))
+    if f"n:{dedup.get('name_key')}" in shared:
+        reasons.append("same_name")
+    elif score > 0:
+        reasons.append("similar_name")
+
+    if any(key.startswith("d:") for key in shared):
+        reasons.append("same_domain")
+        score = min(1.0, score + 0.25)
+
+    if DEDUP_ENTITIES[entity]["contact_field"] and dedup.get("contact_key") and other.get("contact_key"):
+        contact_score = similarity(dedup["contact_key"], other["contact_key"])
+        if contact_score == 1.0:
+            reasons.append("same_contact")
+        # A lead is only a duplicate if both the company and the contact line up
+        score = 0.7 * score + 0.3 * contact_score
+
+    return round(score, 4), reasons
+
+async def find_duplicate_candidates(
+    db: AsyncIOMotorDatabase,
+    entity: str,
+    doc: Dict[str, Any],
+    exclude_id: Optional[str] = None,
+    threshold: float = DUPLICATE_THRESHOLD,
+    limit: int = 10
+) -> List[Dict[str, Any]]:
+    """Indexed candidate lookup for a single (possibly unsaved) record"""
+    config = DEDUP_ENTITIES[entity]
+    dedup = doc.get("dedup") or build_dedup_keys(entity, doc)
+    if not dedup["keys"]:
+        return []
+
+    query = {"dedup.keys": {"$in": dedup["keys"]}}
+    if exclude_id:
+        query["id"] = {"$ne": exclude_id}
+
+    projection = {field: 1 for field in config["summary_fields"]}
+    projection.update({"_id": 0, "dedup": 1})
+    candidates = await db[config["collection"]].find(query, projection).limit(MAX_BLOCK_SIZE).to_list(MAX_BLOCK_SIZE)
+
+    matches = []
+    for candidate in candidates:
+        score, reasons = score_candidate(entity, dedup, candidate.pop("dedup", {}))
+        if score >= threshold:
+            candidate["score"] = score
+            candidate["reasons"] = reasons
+            matches.append(candidate)
+
+    matches.sort(key=lambda c: c["score"], reverse=True)
+    return matches[:limit]
+
+def dedup_source_projection(entity: str) -> Dict[str, int]:
+    """The fields build_dedup_keys reads"""
+    config = DEDUP_ENTITIES[entity]
+    projection = {config["name_field"]: 1, **{f: 1 for f in config["email_fields"]}}
+    if config["contact_field"]:
+        projection[config["contact_field"]] = 1
+    if config["website_field"]:
+        projection[config["website_field"]] = 1
+    return projection
+
+async def backfill_dedup_keys(db: AsyncIOMotorDatabase, entity: str, batch_size: int = 500) -> int:
+    """Compute `dedup` for records created before duplicate detection existed"""
+    collection = db[DEDUP_ENTITIES[entity]["collection"]]
+    projection = {"_id": 1, **dedup_source_projection(entity)}
+
+    updated = 0
+    operations = []
+    async for doc in collection.find({"dedup": {"$exists": False}}, projection):
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"dedup": build_dedup_keys(entity, doc)}}))
+        if len(operations) >= batch_size:
+            await collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    return updated
+
+async def cluster_duplicates(
+    db: AsyncIOMotorDatabase,
+    entity: str,
+    threshold: float = DUPLICATE_THRESHOLD
+) -> List[Dict[str, Any]]:
+    """
+    Batch mode: group the whole collection into duplicate clusters.
+    Records are only compared within shared blocking keys, and matching pairs
+    are joined with union-find so transitive duplicates land in one cluster.
+    Reads every keyed record, so it runs in the worker (`dedup.clusters`);
+    records from before duplicate detection get keys from migration 0006.
+    """
+    config = DEDUP_ENTITIES[entity]
+
+    projection = {field: 1 for field in config["summary_fields"]}
+    projection.update({"_id": 0, "dedup": 1})
+    records = await db[config["collection"]].find({"dedup.keys.0": {"$exists": True}}, projection).to_list(None)
+
+    blocks: Dict[str, List[int]] = {}
+    for index, record in enumerate(records):
+        for key in record["dedup"]["keys"]:
+            blocks.setdefault(key, []).append(index)
+
+    parent = list(range(len(records)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    pair_scores: Dict[Tuple[int, int], float] = {}
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for position, i in enumerate(members):
+            for j in members[position + 1:]:
+                pair = (i, j) if i < j else (j, i)
+                if pair in pair_scores:
+                    continue
+                score, _ = score_candidate(entity, records[i]["dedup"], records[j]["dedup"])
+                pair_scores[pair] = score
+                if score >= threshold:
+                    parent[find(i)] = find(j)
+
+    groups: Dict[int, List[int]] = {}
+    for index in range(len(records)):
+        groups.setdefault(find(index), []).append(index)
+
+    max_scores: Dict[int, float] = {}
+    for (i, _), score in pair_scores.items():
+        if score >= threshold:
+            root = find(i)
+            max_scores[root] = max(max_scores.get(root, 0.0), score)
+
+    clusters = []
+    for root, members in groups.items():
+        if len(members) < 2:
+            continue
+        items = []
+        for index in members:
+            record = dict(records[index])
+            record.pop("dedup", None)
+            items.append(record)
+        # Oldest record first: it is the natural merge target
+        items.sort(key=lambda r: str(r.get("created_at") or ""))
+        clusters.append({
+            "size": len(items),
+            "max_score": max_scores.get(root),
+            "suggested_primary_id": items[0].get("id"),
+            "records": items
+        })
+
+    clusters.sort(key=lambda c: (c["size"], c["max_score"] or 0), reverse=True)
+    return clusters
+
+def _clusters_id(entity: str, threshold: float) -> str:
+    return f"{entity}:{threshold:g}"
+
+async def compute_clusters(db: AsyncIOMotorDatabase, entity: str, threshold: float = DUPLICATE_THRESHOLD) -> Dict[str, Any]:
+    """Cluster `entity` and store the result for GET /api/dedup/{entity}/clusters (largest clusters kept)"""
+    clusters = await cluster_duplicates(db, entity, threshold)
+    result = {
+        "entity": entity,
+        "threshold": threshold,
+        "computed_at": datetime.now(timezone.utc),
+        "total_clusters": len(clusters),
+        "clusters": clusters[:MAX_STORED_CLUSTERS],
+    }
+    await db[CLUSTERS_COLLECTION].replace_one({"_id": _clusters_id(entity, threshold)}, result, upsert=True)
+    return {"entity": entity, "threshold": threshold, "total_clusters": len(clusters)}
+
+async def load_clusters(db: AsyncIOMotorDatabase, entity: str, threshold: float = DUPLICATE_THRESHOLD) -> Optional[Dict[str, Any]]:
+    """The last stored clustering of `entity` at `threshold`, if any"""
+    return await db[CLUSTERS_COLLECTION].find_one({"_id": _clusters_id(entity, threshold)}, {"_id": 0})
+
+def _merge_contacts(primary: List[Dict[str, Any]], others: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    merged = list(primary or [])
+    seen = {((c.get("email") or "").lower(), normalize_name(c.get("name"))) for c in merged}
+    for contact in others:
+        key = ((contact.get("email") or "").lower(), normalize_name(contact.get("name")))
+        if key not in seen:
+            seen.add(key)
+            merged.append({**contact, "is_primary": False})
+    return merged
+
+async def merge_clients(db: AsyncIOMotorDatabase, primary: Dict[str, Any], duplicates: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Fold duplicate clients into the primary one.
+    Linked records reference clients by name (and opportunity collections by id),
+    so every reference is re-pointed with one update_many per collection.
+    """
+    now = datetime.now(timezone.utc)
+    primary_name = primary["client_name"]
+    duplicate_names = list({d["client_name"] for d in duplicates if d.get("client_name") and d["client_name"] != primary_name})
+    duplicate_ids = [d["id"] for d in duplicates]
+    duplicate_codes = [d["client_id"] for d in duplicates if d.get("client_id")]
+
+    updates = {}
+    if duplicate_names:
+        by_name = {"client_name": {"$in": duplicate_names}}
+        repoint = with_version_bump({"$set": {"client_name": primary_name, "updated_at": now}})
+        results = await asyncio.gather(
+            db.leads.update_many(by_name, repoint),
+            db.opportunities.update_many(by_name, repoint),
+            db.sows.update_many(by_name, repoint),
+            db.projects.update_many(by_name, repoint),
+            db.sales_activities.update_many(
+                {"linked_account": {"$in": duplicate_names}},
+                with_version_bump({"$set": {"linked_account": primary_name, "updated_at": now}})
+            ),
+        )
+        for name, result in zip(["leads", "opportunities", "sows", "projects", "sales_activities"], results):
+            updates[name] = result.modified_count
+
+    # Opportunity collection documents reference clients by id
+    by_id = await db.opportunities.update_many(
+        {"client_id": {"$in": duplicate_ids + duplicate_codes}},
+        with_version_bump({"$set": {"client_id": primary["id"], "updated_at": now}})
+    )
+    updates["opportunities"] = updates.get("opportunities", 0) + by_id.modified_count
+
+    merged = {
+        "contacts": _merge_contacts(
+            primary.get("contacts", []),
+            [contact for d in duplicates for contact in d.get("contacts", [])]
+        ),
+        "updated_at": now
+    }
+    # Fill gaps on the primary from the duplicates, never overwrite
+    for field in ["contact_email", "website", "region", "country", "notes"]:
+        if not primary.get(field):
+            value = next((d.get(field) for d in duplicates if d.get(field)), None)
+            if value:
+                merged[field] = value
+    merged["dedup"] = build_dedup_keys("clients", {**primary, **merged})
+
+    await db.clients.update_one({"id": primary["id"]}, with_version_bump({"$set": merged}))
+    deleted = await db.clients.delete_many({"id": {"$in": duplicate_ids}})
+    updates["clients_deleted"] = deleted.deleted_count
+    await record_deletions(db, "clients", duplicates)
+    # The primary's rollup now covers the re-pointed records
+    if duplicate_names:
+        await refresh_client_rollups(db, [primary_name, *duplicate_names])
+    await bump_collection_version(db, "clients", "leads", "opportunities", "sows", "projects", "sales_activities")
+    return updates
+
+async def merge_leads(db: AsyncIOMotorDatabase, primary: Dict[str, Any], duplicates: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Fold duplicate leads into the primary one, re-pointing everything linked by lead id"""
+    now = datetime.now(timezone.utc)
+    duplicate_ids = [d["id"] for d in duplicates]
+
+    results = await asyncio.gather(
+        db.opportunities.update_many(
+            {"linked_lead_id": {"$in": duplicate_ids}},
+            with_version_bump({"$set": {"linked_lead_id": primary["id"], "updated_at": now}})
+        ),
+        db.action_items.update_many(
+            {"linked_to": {"$in": duplicate_ids}, "linked_to_type": "Lead"},
+            with_version_bump({"$set": {"linked_to": primary["id"], "updated_at": now}})
+        ),
+        db.sales_activities.update_many(
+            {"linked_lead": {"$in": duplicate_ids}},
+            with_version_bump({"$set": {"linked_lead": primary["id"], "updated_at": now}})
+        ),
+    )
+    updates = {
+        name: result.modified_count
+        for name, result in zip(["opportunities", "action_items", "sales_activities"], results)
+    }
+
+    attachments = list(primary.get("attachments", []))
+    for duplicate in duplicates:
+        attachments.extend(duplicate.get("attachments", []))
+
+    await db.leads.update_one(
+        {"id": primary["id"]},
+        with_version_bump({"$set": {"attachments": attachments, "updated_at": now}})
+    )
+    deleted = await db.leads.delete_many({"id": {"$in": duplicate_ids}})
+    updates["leads_deleted"] = deleted.deleted_count
+    await record_deletions(db, "leads", duplicates)
+    await bump_collection_version(db, "leads", "opportunities", "action_items", "sales_activities")
+    return updates
+
+MERGE_HANDLERS = {
+    "clients": merge_clients,
+    "leads": merge_leads,
+}
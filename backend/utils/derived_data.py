@@ -0,0 +1,30 @@
+"""
+Derived Data Hooks
+Single entry point writers call after changing a lead, opportunity, SOW or
+sales activity, so every store derived from those records (client rollups,
+dashboard daily buckets) is updated from the same before/after pair.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, Optional
+import asyncio
+from utils.client_rollups import ROLLUP_PROJECTIONS, apply_rollup_change
+from utils.daily_buckets import BUCKET_PROJECTIONS, apply_bucket_change
+
+# Fields a deleted (or pre-update) record must be read with; they include
+# the id and scope fields its tombstone needs (utils/tombstones.py)
+CHANGE_PROJECTIONS = {
+    entity: {**ROLLUP_PROJECTIONS[entity], **BUCKET_PROJECTIONS.get(entity, {}), "id": 1}
+    for entity in ROLLUP_PROJECTIONS
+}
+
+async def record_change(
+    db: AsyncIOMotorDatabase,
+    entity: str,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]],
+):
+    """Apply a record's change (None before for inserts, None after for deletes) to the derived stores"""
+    await asyncio.gather(
+        apply_rollup_change(db, entity, before, after),
+        apply_bucket_change(db, entity, before, after),
+    )
@@ -2,6 +2,7 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+import asyncio
 from typing import Optional
 
 class EmailConfig:
@@ -12,6 +13,15 @@ class EmailConfig:
         self.smtp_password = os.getenv('SMTP_PASSWORD', '')
         self.from_email = os.getenv('FROM_EMAIL', 'noreply@salescrm.com')
 
+def _deliver(config: EmailConfig, to_email: str, text: str):
+    server = smtplib.SMTP(config.smtp_server, config.smtp_port, timeout=30)
+    try:
+        server.starttls()
+        server.login(config.smtp_username, config.smtp_password)
+        server.sendmail(config.from_email, to_email, text)
+    finally:
+        server.quit()
+
 async def send_email(
     to_email: str,
     subject: str,
@@ -37,13 +47,8 @@ async def send_email(
             html_part = MIMEText(html_body, 'html')
             msg.attach(html_part)
         
-        # Send email
-        server = smtplib.SMTP(config.smtp_server, config.smtp_port)
-        server.starttls()
-        server.login(config.smtp_username, config.smtp_password)
-        text = msg.as_string()
-        server.sendmail(config.from_email, to_email, text)
-        server.quit()
+        # Send email (smtplib blocks, so keep it off the event loop)
+        await asyncio.to_thread(_deliver, config, to_email, msg.as_string())
         
         return True
         
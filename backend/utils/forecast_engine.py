@@ -0,0 +1,230 @@
+"""
+Forecast Engine
+Loads the open opportunity pipeline into NumPy arrays once per pipeline
+version and computes weighted forecasts and Monte Carlo booking simulations
+from them. Results are cached per caller scope (only the opportunities the
+caller may read are loaded) until an opportunity write bumps the
+`opportunities` collection version.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, List, Optional
+import asyncio
+import time
+import numpy as np
+from utils.collection_versions import get_collection_versions
+from utils.dates import parse_datetime, month_label, quarter_label
+from utils.scoping import Scope, apply_scope
+from utils.versioned_cache import VersionedCache
+
+CLOSED_STAGES = ["Closed Won", "Closed Lost"]
+
+OPEN_PIPELINE_FILTER = {
+    "status": "Active",
+    "stage": {"$nin": CLOSED_STAGES},
+    "pipeline_status": {"$ne": "Converted to SOW"},
+}
+
+PIPELINE_PROJECTION = {
+    "_id": 0, "id": 1, "amount": 1, "estimated_value": 1, "win_probability": 1,
+    "probability_percent": 1, "close_date": 1, "expected_closure_date": 1,
+    "sales_owner": 1, "region": 1,
+}
+
+UNSCHEDULED = -1
+
+# The largest deals (by outcome spread) are simulated one by one; the long
+# tail of small deals is summed with its exact mean/variance (normal
+# approximation), which keeps 10k+ trials over 50k deals well under a second
+EXACT_DEALS = 2048
+
+# Bound the size of each trials x deals random block (~16MB of float32)
+SIMULATION_BLOCK = 4_000_000
+
+_cache = VersionedCache(max_entries=64, ttl_seconds=600)
+
+class Pipeline:
+    """Open pipeline as parallel arrays, one slot per opportunity"""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        size = len(docs)
+        self.size = size
+        self.amounts = np.zeros(size, dtype=np.float64)
+        self.probabilities = np.zeros(size, dtype=np.float64)
+        self.months = np.full(size, UNSCHEDULED, dtype=np.int32)
+
+        owner_codes: Dict[str, int] = {}
+        region_codes: Dict[str, int] = {}
+        self.owners = np.zeros(size, dtype=np.int32)
+        self.regions = np.zeros(size, dtype=np.int32)
+
+        for i, doc in enumerate(docs):
+            self.amounts[i] = doc.get("amount") or doc.get("estimated_value") or 0
+            probability = doc.get("win_probability")
+            if probability is None:
+                probability = doc.get("probability_percent") or 0
+            self.probabilities[i] = probability
+            close = parse_datetime(doc.get("close_date") or doc.get("expected_closure_date"))
+            if close:
+                self.months[i] = close.year * 12 + close.month - 1
+            self.owners[i] = owner_codes.setdefault(doc.get("sales_owner") or "Unassigned", len(owner_codes))
+            self.regions[i] = region_codes.setdefault(doc.get("region") or "Unassigned", len(region_codes))
+
+        self.probabilities = np.clip(self.probabilities, 0, 100) / 100.0
+        self.weighted = self.amounts * self.probabilities
+        self.owner_labels = list(owner_codes)
+        self.region_labels = list(region_codes)
+
+    def period_mask(self, from_month: Optional[int], to_month: Optional[int]) -> np.ndarray:
+        """Deals whose close month falls within [from_month, to_month] (all deals if unbounded)"""
+        mask = np.ones(self.size, dtype=bool)
+        if from_month is not None:
+            mask &= self.months >= from_month
+        if to_month is not None:
+            mask &= (self.months <= to_month) & (self.months != UNSCHEDULED)
+        return mask
+
+def _group(codes: np.ndarray, labels: List[str], pipeline: Pipeline) -> List[Dict[str, Any]]:
+    deals = np.bincount(codes, minlength=len(labels))
+    value = np.bincount(codes, weights=pipeline.amounts, minlength=len(labels))
+    weighted = np.bincount(codes, weights=pipeline.weighted, minlength=len(labels))
+    return [
+        {
+            "key": label,
+            "deals": int(deals[i]),
+            "pipeline_value": round(float(value[i]), 2),
+            "weighted_value": round(float(weighted[i]), 2),
+        }
+        for i, label in enumerate(labels)
+        if deals[i]
+    ]
+
+def _group_by_period(periods: np.ndarray, formatter, pipeline: Pipeline) -> List[Dict[str, Any]]:
+    scheduled = periods != UNSCHEDULED
+    groups = []
+    if scheduled.any():
+        keys, codes = np.unique(periods[scheduled], return_inverse=True)
+        scheduled_pipeline = _subset(pipeline, scheduled)
+        groups = _group(codes, [formatter(int(k)) for k in keys], scheduled_pipeline)
+    if (~scheduled).any():
+        groups += _group(np.zeros(int((~scheduled).sum()), dtype=np.int64), ["Unscheduled"], _subset(pipeline, ~scheduled))
+    return groups
+
+def _subset(pipeline: Pipeline, mask: np.ndarray) -> Pipeline:
+    subset = Pipeline.__new__(Pipeline)
+    subset.size = int(mask.sum())
+    subset.amounts = pipeline.amounts[mask]
+    subset.probabilities = pipeline.probabilities[mask]
+    subset.weighted = pipeline.weighted[mask]
+    subset.months = pipeline.months[mask]
+    subset.owners = pipeline.owners[mask]
+    subset.regions = pipeline.regions[mask]
+    subset.owner_labels = pipeline.owner_labels
+    subset.region_labels = pipeline.region_labels
+    return subset
+
+def weighted_breakdown(pipeline: Pipeline) -> Dict[str, Any]:
+    """Weighted forecast by close month, quarter, owner and region"""
+    quarters = np.where(pipeline.months == UNSCHEDULED, UNSCHEDULED, pipeline.months // 3)
+    by_owner = sorted(_group(pipeline.owners, pipeline.owner_labels, pipeline), key=lambda g: g["weighted_value"], reverse=True)
+    by_region = sorted(_group(pipeline.regions, pipeline.region_labels, pipeline), key=lambda g: g["weighted_value"], reverse=True)
+    return {
+        "totals": {
+            "deals": pipeline.size,
+            "pipeline_value": round(float(pipeline.amounts.sum()), 2),
+            "weighted_value": round(float(pipeline.weighted.sum()), 2),
+        },
+        "by_month": _group_by_period(pipeline.months, month_label, pipeline),
+        "by_quarter": _group_by_period(quarters, quarter_label, pipeline),
+        "by_owner": by_owner,
+        "by_region": by_region,
+    }
+
+def simulate_bookings(amounts: np.ndarray, probabilities: np.ndarray, trials: int, seed: Optional[int]) -> np.ndarray:
+    """Total bookings for each of `trials` independent win/loss draws over the pipeline"""
+    rng = np.random.default_rng(seed)
+    totals = np.zeros(trials, dtype=np.float64)
+    if amounts.size == 0:
+        return totals
+
+    spread = amounts * np.sqrt(probabilities * (1 - probabilities))
+    order = np.argsort(spread)[::-1]
+    exact, tail = order[:EXACT_DEALS], order[EXACT_DEALS:]
+
+    exact_amounts = amounts[exact].astype(np.float32)
+    exact_probabilities = probabilities[exact].astype(np.float32)
+    block = max(1, SIMULATION_BLOCK // max(1, exact.size))
+    for start in range(0, trials, block):
+        end = min(trials, start + block)
+        wins = rng.random((end - start, exact.size), dtype=np.float32) < exact_probabilities
+        totals[start:end] = wins.astype(np.float32) @ exact_amounts
+
+    if tail.size:
+        tail_mean = float((amounts[tail] * probabilities[tail]).sum())
+        tail_std = float(np.sqrt((amounts[tail] ** 2 * probabilities[tail] * (1 - probabilities[tail])).sum()))
+        totals += rng.normal(tail_mean, tail_std, trials)
+
+    return np.maximum(totals, 0)
+
+def _scope_key(scope: Optional[Scope]) -> Any:
+    return scope.cache_key() if scope else None
+
+async def load_pipeline(db: AsyncIOMotorDatabase, scope: Optional[Scope] = None) -> Pipeline:
+    """Open pipeline arrays (limited to the caller's scope) for the current pipeline version (cached)"""
+    versions = await get_collection_versions(db, ["opportunities"])
+    cache_key = ("pipeline", _scope_key(scope))
+    pipeline = _cache.get(cache_key, versions)
+    if pipeline is None:
+        query = apply_scope(OPEN_PIPELINE_FILTER, scope.filter("opportunities") if scope else {})
+        docs = await db.opportunities.find(query, PIPELINE_PROJECTION).to_list(None)
+        pipeline = await asyncio.to_thread(Pipeline, docs)
+        _cache.set(cache_key, versions, pipeline)
+    return pipeline
+
+async def get_weighted_forecast(db: AsyncIOMotorDatabase, scope: Optional[Scope] = None) -> Dict[str, Any]:
+    versions = await get_collection_versions(db, ["opportunities"])
+    cache_key = ("weighted", _scope_key(scope))
+    result = _cache.get(cache_key, versions)
+    if result is None:
+        pipeline = await load_pipeline(db, scope)
+        result = weighted_breakdown(pipeline)
+        _cache.set(cache_key, versions, result)
+    return result
+
+async def run_simulation(
+    db: AsyncIOMotorDatabase,
+    trials: int = 10000,
+    seed: Optional[int] = 42,
+    from_month: Optional[int] = None,
+    to_month: Optional[int] = None,
+    scope: Optional[Scope] = None
+) -> Dict[str, Any]:
+    """P10/P50/P90 bookings for deals closing in the (optional) month range"""
+    versions = await get_collection_versions(db, ["opportunities"])
+    cache_key = ("simulation", trials, seed, from_month, to_month, _scope_key(scope))
+    result = _cache.get(cache_key, versions)
+    if result is not None:
+        return result
+
+    pipeline = await load_pipeline(db, scope)
+    mask = pipeline.period_mask(from_month, to_month)
+    amounts, probabilities = pipeline.amounts[mask], pipeline.probabilities[mask]
+
+    started = time.perf_counter()
+    totals = await asyncio.to_thread(simulate_bookings, amounts, probabilities, trials, seed)
+    p10, p50, p90 = np.percentile(totals, [10, 50, 90])
+
+    result = {
+        "trials": trials,
+        "deals": int(mask.sum()),
+        "from_month": month_label(from_month) if from_month is not None else None,
+        "to_month": month_label(to_month) if to_month is not None else None,
+        "expected_bookings": round(float((amounts * probabilities).sum()), 2),
+        "mean": round(float(totals.mean()), 2),
+        "std_dev": round(float(totals.std()), 2),
+        "p10": round(float(p10), 2),
+        "p50": round(float(p50), 2),
+        "p90": round(float(p90), 2),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    _cache.set(cache_key, versions, result)
+    return result
@@ -0,0 +1,183 @@
+"""
+Conversion Funnel Analytics
+Follows each lead through Opportunity -> SOW -> Project using the shared
+task_id (lead -> opportunity) and linked_opportunity_id (opportunity -> SOW
+and Project), entirely inside one aggregation on the leads collection.
+Median stage durations are computed by the server ($median, MongoDB 7.0+),
+so a group's output stays one small document however many leads it holds.
+Archived leads, opportunities and SOWs (utils/archival.py) are included, so
+old cohorts keep their conversions after their records are archived.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, List, Optional
+from utils.archival import ARCHIVE_POLICIES, archive_name, including_archive
+from utils.collection_versions import get_collection_versions
+from utils.dates import month_start, to_date_expression as _to_date
+from utils.scoping import Scope, apply_scope
+from utils.versioned_cache import VersionedCache
+
+FUNNEL_STAGES = ["lead", "opportunity", "sow", "project"]
+FUNNEL_STEPS = [("lead", "opportunity"), ("opportunity", "sow"), ("sow", "project")]
+FUNNEL_COLLECTIONS = ["leads", "opportunities", "sows", "projects"]
+
+GROUP_BY_OPTIONS = ["cohort_month", "owner", "region", "lead_source"]
+
+MS_PER_DAY = 86400000
+
+_cache = VersionedCache(max_entries=256, ttl_seconds=900)
+
+def _days_between(start: str, end: str) -> Dict[str, Any]:
+    """Days from start to end; null (ignored by $median) when either is missing or end comes first"""
+    return {
+        "$cond": [
+            {"$and": [{"$ne": [start, None]}, {"$ne": [end, None]}, {"$gte": [end, start]}]},
+            {"$divide": [{"$subtract": [end, start]}, MS_PER_DAY]},
+            None
+        ]
+    }
+
+def _median_days(start: str, end: str) -> Dict[str, Any]:
+    return {"$median": {"input": _days_between(start, end), "method": "approximate"}}
+
+def _funnel_accumulators() -> Dict[str, Any]:
+    return {
+        "lead": {"$sum": 1},
+        "opportunity": {"$sum": {"$cond": [{"$ifNull": ["$opportunity", False]}, 1, 0]}},
+        "sow": {"$sum": {"$cond": [{"$ifNull": ["$sow", False]}, 1, 0]}},
+        "project": {"$sum": {"$cond": [{"$ifNull": ["$project", False]}, 1, 0]}},
+        "lead_to_opportunity_days": _median_days("$created", "$opportunity_created"),
+        "opportunity_to_sow_days": _median_days("$opportunity_created", "$sow_created"),
+        "sow_to_project_days": _median_days("$sow_created", "$project_created"),
+    }
+
+def _linked_lookup(collection: str, local_field: str, foreign_field: str, alias: str) -> List[Dict[str, Any]]:
+    """Join the earliest linked record (hot or archived), keeping only its id and creation date"""
+    sources = [collection, *([archive_name(collection)] if collection in ARCHIVE_POLICIES else [])]
+    matches = [f"{alias}_{i}" for i in range(len(sources))]
+    return [
+        *({"$lookup": {
+            "from": source,
+            # A missing key joins nothing: localField/foreignField would match it to
+            # every unlinked record (manual SOWs, leads from before task ids)
+            "let": {"key": {"$ifNull": [f"${local_field}", None]}},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [
+                    {"$ne": ["$$key", None]},
+                    {"$eq": [f"${foreign_field}", "$$key"]},
+                ]}}},
+                {"$project": {"_id": 0, "id": 1, "created_at": 1}},
+                {"$sort": {"created_at": 1}},
+                {"$limit": 1},
+            ],
+            "as": field,
+        }} for source, field in zip(sources, matches)),
+        {"$set": {alias: {"$first": {"$sortArray": {
+            "input": {"$concatArrays": [f"${field}" for field in matches]},
+            "sortBy": {"created_at": 1},
+        }}}}},
+        {"$unset": matches},
+    ]
+
+def build_funnel_pipeline(group_by: str, match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    group_key = {
+        "cohort_month": {"$dateToString": {"format": "%Y-%m", "date": "$created"}},
+        "owner": "$owner",
+        "region": "$region",
+        "lead_source": "$lead_source",
+    }[group_by]
+
+    return [
+        {"$match": match},
+        {"$project": {
+            "_id": 0,
+            "task_id": 1,
+            "region": 1,
+            "lead_source": 1,
+            "owner": {"$cond": [{"$gt": ["$lead_owner", ""]}, "$lead_owner", "$owner"]},
+            "created": _to_date("$created_at"),
+        }},
+        *_linked_lookup("opportunities", "task_id", "task_id", "opportunity"),
+        *_linked_lookup("sows", "opportunity.id", "linked_opportunity_id", "sow"),
+        *_linked_lookup("projects", "opportunity.id", "linked_opportunity_id", "project"),
+        {"$set": {
+            "opportunity_created": _to_date("$opportunity.created_at"),
+            "sow_created": _to_date("$sow.created_at"),
+            "project_created": _to_date("$project.created_at"),
+        }},
+        # Overall medians cannot be derived from per-group ones, so both are grouped from the same pass
+        {"$facet": {
+            "groups": [{"$group": {"_id": group_key, **_funnel_accumulators()}}, {"$sort": {"_id": 1}}],
+            "totals": [{"$group": {"_id": None, **_funnel_accumulators()}}],
+        }},
+    ]
+
+def _rate(numerator: int, denominator: int) -> Optional[float]:
+    return round(numerator / denominator * 100, 2) if denominator else None
+
+def _summarize_group(key: Any, row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """API shape of one $group output row (None: no leads matched)"""
+    row = row or {}
+    counts = {stage: row.get(stage, 0) for stage in FUNNEL_STAGES}
+    conversion = {f"{a}_to_{b}": _rate(counts[b], counts[a]) for a, b in FUNNEL_STEPS}
+    conversion["lead_to_project"] = _rate(counts["project"], counts["lead"])
+    median_days = {}
+    for a, b in FUNNEL_STEPS:
+        days = row.get(f"{a}_to_{b}_days")
+        median_days[f"{a}_to_{b}"] = round(days, 1) if days is not None else None
+    return {
+        "key": key if key not in (None, "") else "Unknown",
+        "counts": counts,
+        "conversion_percent": conversion,
+        "median_days": median_days,
+    }
+
+async def compute_funnel(
+    db: AsyncIOMotorDatabase,
+    group_by: str = "cohort_month",
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    owner: Optional[str] = None,
+    region: Optional[str] = None,
+    lead_source: Optional[str] = None,
+    scope: Optional[Scope] = None,
+) -> Dict[str, Any]:
+    """Conversion counts, rates and median stage durations per group (cached per parameter set and scope)"""
+    params = (group_by, from_month, to_month, owner, region, lead_source, scope.cache_key() if scope else None)
+    versions = await get_collection_versions(db, FUNNEL_COLLECTIONS)
+    cached = _cache.get(params, versions)
+    if cached is not None:
+        return cached
+
+    match: Dict[str, Any] = {}
+    if from_month or to_month:
+        match["created_at"] = {}
+        if from_month:
+            match["created_at"]["$gte"] = month_start(from_month)
+        if to_month:
+            match["created_at"]["$lt"] = month_start(to_month, months_after=1)
+    if owner:
+        match["$or"] = [{"lead_owner": owner}, {"owner": owner}]
+    if region:
+        match["region"] = region
+    if lead_source:
+        match["lead_source"] = lead_source
+
+    if scope:
+        match = apply_scope(match, scope.filter("leads"))
+
+    pipeline = including_archive("leads", build_funnel_pipeline(group_by, match))
+    rows = await db.leads.aggregate(pipeline, allowDiskUse=True).to_list(1)
+    facet = rows[0] if rows else {"groups": [], "totals": []}
+
+    result = {
+        "group_by": group_by,
+        "filters": {
+            "from_month": from_month, "to_month": to_month,
+            "owner": owner, "region": region, "lead_source": lead_source,
+        },
+        "stages": FUNNEL_STAGES,
+        "totals": _summarize_group("All", facet["totals"][0] if facet["totals"] else None),
+        "groups": [_summarize_group(row["_id"], row) for row in facet["groups"]],
+    }
+    _cache.set(params, versions, result)
+    return result
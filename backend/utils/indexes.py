@@ -0,0 +1,193 @@
+"""
+Index Registry
+Declares the indexes that the API relies on and creates them at startup.
+Index creation is idempotent, so this is safe to run on every boot.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+import logging
+from utils.tombstones import SYNC_TOMBSTONE_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Full-text indexes backing GET /api/search (one text index per collection)
+SEARCH_INDEXES = {
+    "leads": IndexModel(
+        [("client_name", TEXT), ("opportunity_name", TEXT), ("contact_person", TEXT), ("notes", TEXT)],
+        name="search_text",
+        weights={"client_name": 10, "opportunity_name": 8, "contact_person": 5, "notes": 1},
+    ),
+    "clients": IndexModel(
+        [("client_name", TEXT), ("contacts.name", TEXT), ("notes", TEXT)],
+        name="search_text",
+        weights={"client_name": 10, "contacts.name": 5, "notes": 1},
+    ),
+    "opportunities": IndexModel(
+        [("opportunity_name", TEXT), ("client_name", TEXT), ("partner_org", TEXT), ("next_steps", TEXT)],
+        name="search_text",
+        weights={"opportunity_name": 10, "client_name": 8, "partner_org": 3, "next_steps": 1},
+    ),
+    "sows": IndexModel(
+        [("sow_title", TEXT), ("client_name", TEXT), ("project_name", TEXT), ("notes", TEXT)],
+        name="search_text",
+        weights={"sow_title": 10, "client_name": 8, "project_name": 5, "notes": 1},
+    ),
+    "partners": IndexModel(
+        [("name", TEXT), ("contacts.name", TEXT), ("notes", TEXT)],
+        name="search_text",
+        weights={"name": 10, "contacts.name": 5, "notes": 1},
+    ),
+}
+
+# Regular indexes per collection
+INDEXES = {
+    "leads": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("region", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("dedup.keys", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+        IndexModel([("lead_owner", ASCENDING)]),
+        IndexModel([("owner", ASCENDING)]),
+        IndexModel([("task_id", ASCENDING)]),
+        IndexModel([("client_name", ASCENDING)]),
+        IndexModel([("lead_status", ASCENDING), ("updated_at", ASCENDING)]),
+        # Delta sync (utils/sync.py): pages by (updated_at, id); on every synced collection
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "clients": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("region", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("dedup.keys", ASCENDING)]),
+        IndexModel([("client_name", ASCENDING)]),
+        # Accounts table sorted by rollup (see utils/client_rollups.py)
+        IndexModel([("rollup.open_pipeline", DESCENDING)]),
+        IndexModel([("rollup.won_sow_value", DESCENDING)]),
+        IndexModel([("rollup.lead_count", DESCENDING)]),
+        IndexModel([("rollup.open_lead_count", DESCENDING)]),
+        IndexModel([("rollup.last_activity_at", DESCENDING)]),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "opportunities": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("region", ASCENDING), ("created_at", DESCENDING)]),
+        # Also the archive policy's terminal-stage + age scan (see utils/archival.py)
+        IndexModel([("stage", ASCENDING), ("updated_at", ASCENDING)]),
+        # Won deals per close month (forecast accuracy, routers/trends.py)
+        IndexModel([("stage", ASCENDING), ("close_date", ASCENDING), ("expected_closure_date", ASCENDING)]),
+        # Timeline sources: selector, then newest first on (updated_at, id)
+        IndexModel([("task_id", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("sales_owner", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("client_name", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "sows": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("linked_opportunity_id", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("owner", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("client_name", ASCENDING), ("updated_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    # Cold tiers (utils/archival.py): looked up by id, restored by id, and
+    # joined by the conversion funnel (utils/funnel.py); won deals are also
+    # read per close month (routers/trends.py)
+    "leads_archive": [IndexModel([("id", ASCENDING)])],
+    "opportunities_archive": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("task_id", ASCENDING)]),
+        IndexModel([("stage", ASCENDING), ("close_date", ASCENDING), ("expected_closure_date", ASCENDING)]),
+    ],
+    "sows_archive": [IndexModel([("id", ASCENDING)]), IndexModel([("linked_opportunity_id", ASCENDING)])],
+    "projects": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("linked_opportunity_id", ASCENDING)]),
+    ],
+    "partners": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("region", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "action_items": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("assigned_to", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("task_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("linked_to", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "sales_activities": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("activity_owner", ASCENDING), ("activity_date", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("task_id", ASCENDING), ("activity_date", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("linked_account", ASCENDING), ("activity_date", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "forecasts": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "activities": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("related_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("assigned_to", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "settings": [
+        IndexModel([("setting_type", ASCENDING)]),
+    ],
+    # Stored role overrides (utils/permissions.py save_role upserts by name)
+    "roles": [IndexModel([("name", ASCENDING)], unique=True)],
+    "users": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("assigned_regions", ASCENDING)]),
+        IndexModel([("email", ASCENDING)]),
+    ],
+    "jobs": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("priority", DESCENDING), ("run_after", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)]),
+        IndexModel([("created_by", ASCENDING), ("created_at", DESCENDING)]),
+        # Only unfinished jobs carry a dedupe_key
+        IndexModel([("dedupe_key", ASCENDING)], unique=True, partialFilterExpression={"dedupe_key": {"$exists": True}}),
+        # Finished jobs are purged after 30 days
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=30 * 24 * 3600),
+    ],
+    "pipeline_snapshots": [
+        IndexModel([("snapshot_date", ASCENDING), ("entity", ASCENDING), ("bucket", ASCENDING)]),
+        IndexModel([("entity", ASCENDING), ("bucket", ASCENDING), ("snapshot_date", ASCENDING)]),
+    ],
+    # Dashboard windows read one day range per source (see utils/daily_buckets.py)
+    "dashboard_daily": [
+        IndexModel([("source", ASCENDING), ("day", ASCENDING)]),
+    ],
+    # Rollback replays a migration's undo log newest first (see utils/migrations.py)
+    # Time-series collection (see utils/audit.py); secondary indexes on the meta fields
+    "audit_log": [
+        IndexModel([("meta.entity", ASCENDING), ("meta.entity_id", ASCENDING), ("at", DESCENDING)]),
+        IndexModel([("meta.actor_id", ASCENDING), ("at", DESCENDING)]),
+    ],
+    "tombstones": [
+        IndexModel([("entity", ASCENDING), ("deleted_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("deleted_at", ASCENDING)], expireAfterSeconds=SYNC_TOMBSTONE_DAYS * 24 * 3600),
+    ],
+    "migration_undo": [
+        IndexModel([("migration", ASCENDING), ("_id", DESCENDING)]),
+    ],
+}
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    """Create all registered indexes, logging (not raising) on conflicts"""
+    for collection_name, text_index in SEARCH_INDEXES.items():
+        try:
+            await db[collection_name].create_indexes([text_index])
+        except OperationFailure as e:
+            # A text index with a different definition already exists
+            logger.warning(f"Could not create text index on {collection_name}: {str(e)}")
+
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.warning(f"Could not create indexes on {collection_name}: {str(e)}")
+
+    logger.info("Database indexes ensured")
@@ -0,0 +1,107 @@
+"""
+Background Job Handlers
+Work that runs in `python -m worker` rather than in the API process.
+Importing this module registers every handler with utils.jobs.
+"""
+from typing import Dict, Any
+from utils import migration_steps  # noqa: F401 - registers the migrations
+from utils.archival import ARCHIVE_AFTER_MONTHS, ARCHIVE_BATCH_SIZE, run_archival
+from utils.audit import export_archives
+from utils.auth import TEMP_PASSWORD
+from utils.client_rollups import reconcile_client_rollups
+from utils.daily_buckets import rebuild_daily_buckets
+from utils.dedup import DEDUP_ENTITIES, DUPLICATE_THRESHOLD, backfill_dedup_keys, compute_clusters
+from utils.email import send_user_invitation_email
+from utils.jobs import JobContext, job_handler
+from utils.migrations import DEFAULT_BATCH_SIZE, DEFAULT_PAUSE_MS, rollback_migration, run_pending
+from utils.pipeline_snapshots import take_snapshot, snapshot_date_for
+
+@job_handler("mail.user_invitation")
+async def send_invitation(ctx: JobContext) -> Dict[str, Any]:
+    """Payload: email, full_name"""
+    sent = await send_user_invitation_email(ctx.payload["email"], ctx.payload["full_name"], TEMP_PASSWORD)
+    if not sent:
+        # Raising makes the queue retry with backoff and keeps the failure visible
+        raise RuntimeError(f"Invitation email to {ctx.payload['email']} could not be sent")
+    return {"sent": True}
+
+@job_handler("pipeline.snapshot", enqueueable=True)
+async def pipeline_snapshot(ctx: JobContext) -> Dict[str, Any]:
+    """Payload: snapshot_date (optional, YYYY-MM-DD; defaults to today UTC)"""
+    snapshot_date = ctx.payload.get("snapshot_date") or snapshot_date_for()
+    await ctx.progress(0, message=f"Snapshotting pipeline for {snapshot_date}")
+    counts = await take_snapshot(ctx.db, snapshot_date)
+    return {"snapshot_date": snapshot_date, "counts": counts}
+
+@job_handler("dedup.backfill", enqueueable=True)
+async def dedup_backfill(ctx: JobContext) -> Dict[str, Any]:
+    """Payload: entities (optional list; defaults to every deduplicated entity)"""
+    entities = ctx.payload.get("entities") or list(DEDUP_ENTITIES)
+    updated = {}
+    for index, entity in enumerate(entities):
+        await ctx.progress(index, len(entities), f"Backfilling {entity}")
+        updated[entity] = await backfill_dedup_keys(ctx.db, entity)
+    await ctx.progress(len(entities), len(entities))
+    return {"updated": updated}
+
+@job_handler("dedup.clusters", enqueueable=True)
+async def dedup_clusters(ctx: JobContext) -> Dict[str, Any]:
+    """Payload: entity, threshold (optional)"""
+    entity = ctx.payload["entity"]
+    threshold = float(ctx.payload.get("threshold") or DUPLICATE_THRESHOLD)
+    await ctx.progress(0, message=f"Clustering duplicate {entity}")
+    return await compute_clusters(ctx.db, entity, threshold)
+
+@job_handler("clients.rollup_reconcile", enqueueable=True)
+async def client_rollup_reconcile(ctx: JobContext) -> Dict[str, Any]:
+    """Recompute every client's account rollup from the linked collections"""
+    await ctx.progress(0, message="Reconciling client rollups")
+    return await reconcile_client_rollups(ctx.db)
+
+@job_handler("dashboard.rebuild_buckets", enqueueable=True)
+async def dashboard_rebuild_buckets(ctx: JobContext) -> Dict[str, Any]:
+    """Recompute the dashboard's daily buckets from the source collections"""
+    await ctx.progress(0, message="Rebuilding dashboard daily buckets")
+    return {"buckets": await rebuild_daily_buckets(ctx.db)}
+
+@job_handler("audit.archive_export", enqueueable=True)
+async def audit_archive_export(ctx: JobContext) -> Dict[str, Any]:
+    """Export finished days of the audit log to gzipped JSON Lines before they expire"""
+    await ctx.progress(0, message="Exporting audit log archives")
+    return {"days": await export_archives(ctx.db)}
+
+@job_handler("archive.run", enqueueable=True)
+async def archive_run(ctx: JobContext) -> Dict[str, Any]:
+    """Move terminal records past their policy's age to the archive collections"""
+    await ctx.progress(0, message="Archiving closed records")
+    return await run_archival(
+        ctx.db,
+        collections=ctx.payload.get("collections"),
+        months=int(ctx.payload.get("months") or ARCHIVE_AFTER_MONTHS),
+        batch_size=int(ctx.payload.get("batch_size") or ARCHIVE_BATCH_SIZE),
+        dry_run=bool(ctx.payload.get("dry_run")),
+    )
+
+def _migration_options(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "dry_run": bool(payload.get("dry_run")),
+        "batch_size": int(payload.get("batch_size") or DEFAULT_BATCH_SIZE),
+        "pause_ms": int(payload.get("pause_ms") if payload.get("pause_ms") is not None else DEFAULT_PAUSE_MS),
+    }
+
+@job_handler("migrations.run", enqueueable=True)
+async def migrations_run(ctx: JobContext) -> Dict[str, Any]:
+    """Payload: names (optional list; defaults to every pending migration), dry_run, batch_size, pause_ms, restart"""
+    results = await run_pending(
+        ctx.db,
+        names=ctx.payload.get("names"),
+        restart=bool(ctx.payload.get("restart")),
+        progress=ctx.progress,
+        **_migration_options(ctx.payload),
+    )
+    return {"migrations": results}
+
+@job_handler("migrations.rollback", enqueueable=True)
+async def migrations_rollback(ctx: JobContext) -> Dict[str, Any]:
+    """Payload: name, dry_run, batch_size, pause_ms"""
+    return await rollback_migration(ctx.db, ctx.payload["name"], progress=ctx.progress, **_migration_options(ctx.payload))
@@ -0,0 +1,227 @@
+"""
+Background Job Queue
+Durable jobs stored in the `jobs` collection and executed by `python -m worker`
+instead of the request workers.
+
+Job lifecycle: queued -> running -> succeeded | failed (| cancelled).
+- Workers claim the highest-priority due job atomically with
+  find_one_and_update and hold it under a lease that they keep extending
+  while the handler runs. A job whose lease expires (worker crashed or was
+  killed) becomes claimable again.
+- Failed attempts are retried with exponential backoff until max_attempts.
+- Handlers report progress, which GET /api/jobs/{id} exposes.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Callable, Awaitable, List, Optional
+import asyncio
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "jobs"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = [SUCCEEDED, FAILED, CANCELLED]
+
+DEFAULT_LEASE_SECONDS = 60
+RETRY_BASE_SECONDS = 15
+RETRY_MAX_SECONDS = 3600
+
+class JobContext:
+    """What a handler gets: the database, its job document and a progress reporter"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, job: Dict[str, Any], worker_id: str):
+        self.db = db
+        self.job = job
+        self.payload = job.get("payload") or {}
+        self.worker_id = worker_id
+
+    async def progress(self, current: int, total: Optional[int] = None, message: Optional[str] = None):
+        await update_progress(self.db, self.job["id"], self.worker_id, current, total, message)
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+
+# job type -> {"handler", "enqueueable"}; populated by utils/job_handlers.py
+JOB_HANDLERS: Dict[str, Dict[str, Any]] = {}
+
+def job_handler(job_type: str, enqueueable: bool = False):
+    """Register a handler; `enqueueable` types may also be queued through POST /api/jobs"""
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = {"handler": handler, "enqueueable": enqueueable}
+        return handler
+    return register
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+async def enqueue_job(
+    db: AsyncIOMotorDatabase,
+    job_type: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    max_attempts: int = 3,
+    run_after: Optional[datetime] = None,
+    created_by: Optional[str] = None,
+    dedupe_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Queue a job. Higher priority runs first. With a `dedupe_key`, enqueueing the
+    same key again while an earlier job with that key is unfinished returns the
+    existing job instead of creating a duplicate (the key is unique among
+    unfinished jobs and removed when a job finishes).
+    """
+    now = _now()
+    job = {
+        "id": str(uuid.uuid4()),
+        "type": job_type,
+        "payload": payload or {},
+        "status": QUEUED,
+        "priority": priority,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_after": run_after or now,
+        "lease_until": None,
+        "worker_id": None,
+        "progress": {"current": 0, "total": None, "message": None},
+        "result": None,
+        "error": None,
+        "created_by": created_by,
+        "created_at": now,
+        "updated_at": now,
+        "started_at": None,
+        "finished_at": None,
+    }
+    if dedupe_key:
+        job["dedupe_key"] = dedupe_key
+
+    try:
+        await db[JOBS_COLLECTION].insert_one(job)
+    except DuplicateKeyError:
+        existing = await db[JOBS_COLLECTION].find_one({"dedupe_key": dedupe_key}, {"_id": 0})
+        if existing:
+            return existing
+        raise
+    job.pop("_id", None)
+    return job
+
+async def claim_job(
+    db: AsyncIOMotorDatabase,
+    worker_id: str,
+    job_types: Optional[List[str]] = None,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+) -> Optional[Dict[str, Any]]:
+    """Atomically take the next due job (or one whose lease expired)"""
+    now = _now()
+    query: Dict[str, Any] = {
+        "$or": [
+            {"status": QUEUED, "run_after": {"$lte": now}},
+            {"status": RUNNING, "lease_until": {"$lt": now}},
+        ]
+    }
+    if job_types:
+        query["type"] = {"$in": job_types}
+
+    return await db[JOBS_COLLECTION].find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": RUNNING,
+                "worker_id": worker_id,
+                "lease_until": now + timedelta(seconds=lease_seconds),
+                "started_at": now,
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("priority", -1), ("run_after", 1)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def extend_lease(db: AsyncIOMotorDatabase, job_id: str, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+    """Heartbeat; False means the job is no longer ours (lease lost or cancelled)"""
+    now = _now()
+    result = await db[JOBS_COLLECTION].update_one(
+        {"id": job_id, "worker_id": worker_id, "status": RUNNING},
+        {"$set": {"lease_until": now + timedelta(seconds=lease_seconds), "updated_at": now}}
+    )
+    return result.matched_count == 1
+
+async def update_progress(
+    db: AsyncIOMotorDatabase, job_id: str, worker_id: str,
+    current: int, total: Optional[int] = None, message: Optional[str] = None
+):
+    await db[JOBS_COLLECTION].update_one(
+        {"id": job_id, "worker_id": worker_id, "status": RUNNING},
+        {"$set": {
+            "progress": {"current": current, "total": total, "message": message},
+            "updated_at": _now(),
+        }}
+    )
+
+async def complete_job(db: AsyncIOMotorDatabase, job: Dict[str, Any], worker_id: str, result: Any = None):
+    now = _now()
+    await db[JOBS_COLLECTION].update_one(
+        {"id": job["id"], "worker_id": worker_id, "status": RUNNING},
+        {"$set": {
+            "status": SUCCEEDED,
+            "result": result,
+            "error": None,
+            "lease_until": None,
+            "finished_at": now,
+            "updated_at": now,
+        }, "$unset": {"dedupe_key": ""}}
+    )
+
+async def fail_job(db: AsyncIOMotorDatabase, job: Dict[str, Any], worker_id: str, error: str):
+    """Record a failed attempt: requeue with backoff, or fail for good after max_attempts"""
+    now = _now()
+    update: Dict[str, Any] = {"$set": {"error": error, "lease_until": None, "updated_at": now}}
+    if job["attempts"] < job["max_attempts"]:
+        delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1))
+        update["$set"].update({"status": QUEUED, "worker_id": None, "run_after": now + timedelta(seconds=delay)})
+    else:
+        update["$set"].update({"status": FAILED, "finished_at": now})
+        update["$unset"] = {"dedupe_key": ""}
+    await db[JOBS_COLLECTION].update_one(
+        {"id": job["id"], "worker_id": worker_id, "status": RUNNING},
+        update
+    )
+
+async def cancel_job(db: AsyncIOMotorDatabase, job_id: str) -> Optional[Dict[str, Any]]:
+    """Cancel a queued or running job (a running handler notices at its next heartbeat)"""
+    now = _now()
+    return await db[JOBS_COLLECTION].find_one_and_update(
+        {"id": job_id, "status": {"$in": [QUEUED, RUNNING]}},
+        {
+            "$set": {"status": CANCELLED, "lease_until": None, "finished_at": now, "updated_at": now},
+            "$unset": {"dedupe_key": ""},
+        },
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def get_job(db: AsyncIOMotorDatabase, job_id: str) -> Optional[Dict[str, Any]]:
+    return await db[JOBS_COLLECTION].find_one({"id": job_id}, {"_id": 0})
+
+async def schedule_daily_job(db: AsyncIOMotorDatabase, job_type: str, hour_utc: int, minute_utc: int):
+    """Worker loop: queue one `job_type` job per day at the given UTC time (deduplicated per day)"""
+    while True:
+        now = _now()
+        next_run = now.replace(hour=hour_utc, minute=minute_utc, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        try:
+            today = next_run.date().isoformat()
+            await enqueue_job(db, job_type, {}, priority=-1, dedupe_key=f"{job_type}:{today}")
+        except Exception as e:
+            logger.error(f"Scheduling {job_type} failed: {str(e)}")
@@ -1,6 +1,7 @@
-from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+from datetime import date, datetime, timezone
+from typing import Dict, Any, List, Optional, Union
 from enum import Enum
+from utils.dates import parse_datetime, to_date_expression
 
 class LeadStatus(str, Enum):
     ACTIVE = "Active"
@@ -22,7 +23,7 @@ class StatusChangeReason(str, Enum):
 
 def calculate_lead_status(
     stage: str, 
-    next_followup_date: Optional[str] = None,
+    next_followup_date: Optional[Union[date, str]] = None,
     current_status: Optional[str] = None
 ) -> tuple[str, str]:
     """
@@ -43,7 +44,7 @@ def calculate_lead_status(
     if stage in [LeadStage.NEW, LeadStage.IN_PROGRESS] and next_followup_date:
         try:
             # Parse the followup date
-            followup_date = datetime.fromisoformat(next_followup_date.replace('Z', '+00:00'))
+            followup_date = parse_datetime(next_followup_date)
             today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
             followup_date_normalized = followup_date.replace(hour=0, minute=0, second=0, microsecond=0)
             
@@ -75,12 +76,65 @@ def create_status_change_log(
         "previous_status": previous_status,
         "new_status": new_status,
         "reason": reason,
-        "changed_at": datetime.now(timezone.utc).isoformat(),
+        "changed_at": datetime.now(timezone.utc),
         "changed_by_user_id": user_id,
         "changed_by_user_name": user_name,
         "system_generated": True  # All status changes are system-generated
     }
 
+def lead_status_stages(user_id: str, user_name: str) -> List[Dict[str, Any]]:
+    """
+    Update-pipeline stages that recalculate lead_status the way
+    calculate_lead_status does, from the stage and next_followup the record
+    has after the preceding stages, appending a status change log entry
+    when the status changes.
+    """
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    followup = to_date_expression("$next_followup")
+    open_stage = {"$in": ["$stage", [LeadStage.NEW.value, LeadStage.IN_PROGRESS.value]]}
+    has_followup = {"$ne": [followup, None]}
+    overdue = {"$and": [open_stage, has_followup, {"$lt": [followup, today]}]}
+    closed = {"$in": ["$stage", [LeadStage.QUALIFIED.value, LeadStage.UNQUALIFIED.value]]}
+    return [
+        {"$set": {
+            "_new_status": {"$switch": {
+                "branches": [
+                    {"case": {"$eq": ["$stage", LeadStage.QUALIFIED.value]}, "then": LeadStatus.COMPLETED.value},
+                    {"case": {"$eq": ["$stage", LeadStage.UNQUALIFIED.value]}, "then": LeadStatus.REJECTED.value},
+                    {"case": overdue, "then": LeadStatus.DELAYED.value},
+                ],
+                "default": LeadStatus.ACTIVE.value,
+            }},
+            "_status_reason": {"$switch": {
+                "branches": [
+                    {"case": closed, "then": StatusChangeReason.STAGE_CHANGE.value},
+                    {"case": overdue, "then": StatusChangeReason.DATE_EXCEEDED.value},
+                    {"case": {"$and": [open_stage, has_followup, {"$eq": ["$lead_status", LeadStatus.DELAYED.value]}]},
+                     "then": StatusChangeReason.DATE_UPDATED.value},
+                ],
+                "default": StatusChangeReason.STAGE_CHANGE.value,
+            }},
+        }},
+        {"$set": {
+            "lead_status": "$_new_status",
+            "status_change_log": {"$cond": [
+                {"$ne": ["$_new_status", "$lead_status"]},
+                {"$concatArrays": [{"$ifNull": ["$status_change_log", []]}, [{
+                    "lead_id": "$id",
+                    "previous_status": {"$ifNull": ["$lead_status", None]},
+                    "new_status": "$_new_status",
+                    "reason": "$_status_reason",
+                    "changed_at": "$$NOW",
+                    "changed_by_user_id": {"$literal": user_id},
+                    "changed_by_user_name": {"$literal": user_name},
+                    "system_generated": True,
+                }]]},
+                {"$ifNull": ["$status_change_log", []]},
+            ]},
+        }},
+        {"$unset": ["_new_status", "_status_reason"]},
+    ]
+
 def get_status_badge_color(status: str) -> str:
     """Get the color for status badge display."""
     colors = {
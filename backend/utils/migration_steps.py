@@ -0,0 +1,147 @@
+"""
+Migration Steps
+The data migrations applied by utils/migrations.py, in name order.
+Importing this module registers every migration.
+
+0001-0004 replace the one-off scripts that used to be run by hand
+(migrate_task_ids.py, update_all_status.py, update_all_users_status.py,
+setup_regions.py); 0005 converts string dates to BSON datetimes; 0006 gives
+records from before duplicate detection their blocking keys.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+import uuid
+from utils.dates import DATE_FIELDS, to_bson_date
+from utils.dedup import DEDUP_ENTITIES, build_dedup_keys, dedup_source_projection
+from utils.lead_status import calculate_lead_status
+from utils.migrations import MigrationContext, migration, per_document
+from utils.task_id_generator import reserve_task_ids
+
+logger = logging.getLogger(__name__)
+
+@migration("0001_task_ids")
+async def add_task_ids(ctx: MigrationContext):
+    """Give leads and opportunities created before Task IDs existed the next SAL#### id"""
+    async def assign(docs: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        if ctx.dry_run:
+            return [{"task_id": "(next Task ID)"} for _ in docs]
+        return [{"task_id": task_id} for task_id in await reserve_task_ids(ctx.db, len(docs))]
+
+    for collection in ("leads", "opportunities"):
+        await ctx.backfill(collection, {"task_id": {"$exists": False}}, assign, {"task_id": 1})
+
+@migration("0002_lead_status")
+async def recalculate_lead_status(ctx: MigrationContext):
+    """Recalculate every lead's lead_status from its stage and follow-up date"""
+    now = datetime.now(timezone.utc)
+
+    def status(lead: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not lead.get("stage"):
+            return None
+        new_status, _ = calculate_lead_status(lead.get("stage"), lead.get("next_followup"), lead.get("lead_status"))
+        if new_status == lead.get("lead_status"):
+            return None
+        return {"lead_status": new_status, "updated_at": now}
+
+    await ctx.backfill(
+        "leads", {"stage": {"$nin": [None, ""]}}, per_document(status),
+        {"stage": 1, "next_followup": 1, "lead_status": 1, "updated_at": 1},
+    )
+
+@migration("0003_user_status")
+async def default_user_status(ctx: MigrationContext):
+    """Mark users without a status as Active (users that have one keep it)"""
+    await ctx.backfill(
+        "users", {"status": {"$in": [None, ""]}}, per_document(lambda user: {"status": "Active"}), {"status": 1}
+    )
+
+DEFAULT_REGIONS = [
+    {"id": "1", "name": "North America", "displayName": "North America"},
+    {"id": "2", "name": "Europe", "displayName": "Europe"},
+    {"id": "3", "name": "Asia Pacific", "displayName": "Asia Pacific"},
+    {"id": "4", "name": "Latin America", "displayName": "Latin America"},
+    {"id": "5", "name": "Middle East", "displayName": "Middle East"},
+    {"id": "6", "name": "Africa", "displayName": "Africa"},
+]
+
+@migration("0004_regions_setting")
+async def seed_regions(ctx: MigrationContext):
+    """Create the regions setting with the default regions unless one exists"""
+    now = datetime.now(timezone.utc)
+    await ctx.insert_if_missing("settings", {"setting_type": "regions"}, {
+        "id": str(uuid.uuid4()),
+        "setting_type": "regions",
+        "data": DEFAULT_REGIONS,
+        "created_at": now,
+        "updated_at": now,
+    })
+
+def _convert(value: Any) -> Tuple[bool, Any]:
+    """(convertible, converted value) for a stored string date"""
+    converted = to_bson_date(value)
+    return converted is None or isinstance(converted, datetime), converted
+
+def _date_updates(doc: Dict[str, Any], fields: List[str]) -> Tuple[Dict[str, Any], int]:
+    """($set, unparseable value count) converting one document's string dates"""
+    updates: Dict[str, Any] = {}
+    unparseable = 0
+    for field in fields:
+        head, _, sub = field.partition(".")
+        value = doc.get(head)
+        if sub and isinstance(value, list):
+            converted_items = []
+            for item in value:
+                if isinstance(item, dict) and isinstance(item.get(sub), str):
+                    ok, converted = _convert(item[sub])
+                    if ok:
+                        item = {**item, sub: converted}
+                    else:
+                        unparseable += 1
+                converted_items.append(item)
+            if converted_items != value:
+                updates[head] = converted_items
+            continue
+        if sub:
+            value = value.get(sub) if isinstance(value, dict) else None
+        if isinstance(value, str):
+            ok, converted = _convert(value)
+            if ok:
+                updates[field] = converted
+            else:
+                unparseable += 1
+    return updates, unparseable
+
+# Logging every document's previous strings would double the writes of the
+# largest backfill, and nothing reads string dates any more
+@migration("0005_dates_to_bson", reversible=False)
+async def dates_to_bson(ctx: MigrationContext):
+    """Convert ISO / YYYY-MM-DD strings in the fields of utils.dates.DATE_FIELDS to BSON datetimes"""
+    for collection, fields in DATE_FIELDS.items():
+        unparseable = 0
+
+        def convert(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            nonlocal unparseable
+            updates, skipped = _date_updates(doc, fields)
+            unparseable += skipped
+            return updates or None
+
+        await ctx.backfill(
+            collection,
+            {"$or": [{field: {"$type": "string"}} for field in fields]},
+            per_document(convert),
+            {field.partition(".")[0]: 1 for field in fields},
+        )
+        if unparseable:
+            logger.warning(f"{unparseable} {collection} date value(s) could not be parsed and were left as strings")
+
+@migration("0006_dedup_keys")
+async def dedup_keys(ctx: MigrationContext):
+    """Compute the duplicate-detection keys of clients and leads created before they existed"""
+    for entity, config in DEDUP_ENTITIES.items():
+        await ctx.backfill(
+            config["collection"],
+            {"dedup": {"$exists": False}},
+            per_document(lambda doc, entity=entity: {"dedup": build_dedup_keys(entity, doc)}),
+            {"dedup": 1, **dedup_source_projection(entity)},
+        )
@@ -0,0 +1,441 @@
+"""
+Schema Migrations
+Versioned, online data migrations recorded in the `migrations` collection
+(one document per migration, keyed by its name) and run by the
+`migrations.run` job or `python -m migrate`.
+
+Migrations are registered with @migration in utils/migration_steps.py and
+applied in name order ("0001_...", "0002_..."). A migration's `up` receives
+a MigrationContext and expresses its work as backfills:
+
+- A backfill walks one collection in _id order, batch_size documents at a
+  time, over the documents matching its query; the transform returns the
+  fields to $set per document and the batch is written with one unordered
+  bulk_write.
+- Every update is guarded by the values it replaces, so a record edited
+  between the read and the write is skipped (counted as a conflict) instead
+  of being overwritten with stale data.
+- The last _id of each batch is checkpointed, so an interrupted run resumes
+  where it stopped; finished backfills are not walked again.
+- Reversible migrations log each document's previous values in
+  `migration_undo` before writing, which rollback restores (newest first,
+  again guarded by the values the migration wrote).
+- Dry runs read and transform as usual but write nothing; they report what
+  would change, with a few samples.
+- Between batches the runner pauses, longer when a batch was slow, and
+  waits while the replica set's secondaries lag behind the primary.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+import asyncio
+import logging
+import time
+from utils.collection_versions import bump_collection_version
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = "migrations"
+UNDO_COLLECTION = "migration_undo"
+
+APPLIED = "applied"
+RUNNING = "running"
+ROLLING_BACK = "rolling_back"
+FAILED = "failed"
+ROLLED_BACK = "rolled_back"
+PENDING = "pending"
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE_MS = 50
+# A batch slower than this adds its excess to the pause that follows
+SLOW_BATCH_MS = 250
+# Batches wait while a secondary is further behind the primary than this
+MAX_REPLICATION_LAG_SECONDS = 10
+LAG_POLL_SECONDS = 2
+# A running migration whose heartbeat is older than this may be taken over
+STALE_AFTER_SECONDS = 300
+DRY_RUN_SAMPLES = 5
+
+ProgressCallback = Callable[[int, Optional[int], Optional[str]], Awaitable[None]]
+# Batch in, one $set (or None to leave the document alone) per document out
+Transform = Callable[[List[Dict[str, Any]]], Awaitable[List[Optional[Dict[str, Any]]]]]
+
+class MigrationError(ValueError):
+    pass
+
+# name -> {"up", "description", "reversible"}; populated by utils/migration_steps.py
+MIGRATIONS: Dict[str, Dict[str, Any]] = {}
+
+def migration(name: str, reversible: bool = True):
+    """Register a migration; its docstring is the description shown by status"""
+    def register(up: Callable[["MigrationContext"], Awaitable[None]]):
+        MIGRATIONS[name] = {"up": up, "description": (up.__doc__ or "").strip(), "reversible": reversible}
+        return up
+    return register
+
+def per_document(transform: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]) -> Transform:
+    """Adapt a per-document transform to the batch signature backfill expects"""
+    async def batch(docs: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        return [transform(doc) for doc in docs]
+    return batch
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+_MISSING = object()
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+class Throttle:
+    """Paces batches by their own latency and by the replica set's replication lag"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, pause_ms: int, max_lag_seconds: float = MAX_REPLICATION_LAG_SECONDS):
+        self.db = db
+        self.pause_ms = pause_ms
+        self.max_lag_seconds = max_lag_seconds
+        # Standalone servers and users without clusterMonitor cannot report lag
+        self.lag_supported = True
+
+    async def replication_lag(self) -> Optional[float]:
+        """Seconds the slowest healthy secondary is behind the primary (None when unknown)"""
+        if not self.lag_supported:
+            return None
+        try:
+            status = await self.db.client.admin.command("replSetGetStatus")
+        except OperationFailure as e:
+            logger.info(f"Replication lag unavailable, throttling on latency only: {str(e)}")
+            self.lag_supported = False
+            return None
+        members = status.get("members", [])
+        primary = next((m["optimeDate"] for m in members if m.get("stateStr") == "PRIMARY"), None)
+        secondaries = [m["optimeDate"] for m in members if m.get("stateStr") == "SECONDARY" and m.get("health") == 1]
+        if primary is None or not secondaries:
+            return 0.0
+        return max((primary - optime).total_seconds() for optime in secondaries)
+
+    async def wait(self, batch_ms: float):
+        await asyncio.sleep((self.pause_ms + max(0.0, batch_ms - SLOW_BATCH_MS)) / 1000)
+        while True:
+            lag = await self.replication_lag()
+            if lag is None or lag <= self.max_lag_seconds:
+                return
+            logger.info(f"Replication lag {lag:.1f}s above {self.max_lag_seconds}s; migration paused")
+            await asyncio.sleep(LAG_POLL_SECONDS)
+
+class MigrationContext:
+    """What a migration's `up` gets: the database and the batched, checkpointed write helpers"""
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        name: str,
+        state: Dict[str, Any],
+        dry_run: bool,
+        batch_size: int,
+        throttle: Throttle,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        self.db = db
+        self.name = name
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.reversible = MIGRATIONS[name]["reversible"]
+        self.checkpoints: Dict[str, Any] = state.get("checkpoints") or {}
+        self.completed_steps: List[str] = list(state.get("completed_steps") or [])
+        self.counts: Dict[str, Dict[str, Any]] = dict(state.get("counts") or {})
+        self._progress = progress
+
+    async def _save(self, fields: Dict[str, Any], unset: Optional[Dict[str, Any]] = None):
+        if self.dry_run:
+            return
+        update: Dict[str, Any] = {"$set": {**fields, "heartbeat_at": _now()}}
+        if unset:
+            update["$unset"] = unset
+        await self.db[MIGRATIONS_COLLECTION].update_one({"_id": self.name}, update)
+
+    async def backfill(
+        self,
+        collection: str,
+        query: Dict[str, Any],
+        transform: Transform,
+        projection: Optional[Dict[str, Any]] = None,
+        step: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Apply `transform` to every document matching `query`. The projection
+        must include every field the transform sets, since its current values
+        guard the update. `step` names the backfill's checkpoint (default: the
+        collection) when a migration walks the same collection twice.
+        """
+        step = step or collection
+        if step in self.completed_steps:
+            return self.counts.get(step, {})
+
+        counts: Dict[str, Any] = {"scanned": 0, "changed": 0, "unchanged": 0, "conflicts": 0}
+        if self.dry_run:
+            counts["samples"] = []
+        after_id = self.checkpoints.get(step)
+        while True:
+            started = time.monotonic()
+            batch_query = {**query, **({"_id": {"$gt": after_id}} if after_id is not None else {})}
+            batch = await self.db[collection].find(batch_query, projection).sort("_id", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not batch:
+                break
+
+            operations = []
+            undo = []
+            for doc, fields in zip(batch, await transform(batch)):
+                if not fields:
+                    counts["unchanged"] += 1
+                    continue
+                before = {field: _get_path(doc, field) for field in fields}
+                if self.dry_run:
+                    counts["changed"] += 1
+                    if len(counts["samples"]) < DRY_RUN_SAMPLES:
+                        counts["samples"].append({"_id": str(doc["_id"]), "set": fields})
+                    continue
+                guard = {field: {"$exists": False} if value is _MISSING else value for field, value in before.items()}
+                operations.append(UpdateOne({"_id": doc["_id"], **guard}, {"$set": fields}))
+                if self.reversible:
+                    undo.append({
+                        "migration": self.name,
+                        "collection": collection,
+                        "kind": "update",
+                        "doc_id": doc["_id"],
+                        "before": [{"field": f, "value": v} for f, v in before.items() if v is not _MISSING],
+                        "missing": [f for f, v in before.items() if v is _MISSING],
+                        "after": [{"field": f, "value": v} for f, v in fields.items()],
+                    })
+
+            if operations:
+                # Undo entries go first so a crash mid-batch can still be rolled back
+                if undo:
+                    await self.db[UNDO_COLLECTION].insert_many(undo, ordered=False)
+                result = await self.db[collection].bulk_write(operations, ordered=False)
+                counts["changed"] += result.modified_count
+                counts["conflicts"] += len(operations) - result.matched_count
+                if result.modified_count:
+                    await bump_collection_version(self.db, collection)
+
+            counts["scanned"] += len(batch)
+            after_id = batch[-1]["_id"]
+            await self._save({f"checkpoints.{step}": after_id, f"counts.{step}": counts})
+            if self._progress:
+                await self._progress(counts["scanned"], None, f"{self.name}: {step}")
+            await self.throttle.wait((time.monotonic() - started) * 1000)
+
+        self.counts[step] = counts
+        self.completed_steps.append(step)
+        await self._save(
+            {f"counts.{step}": counts, "completed_steps": self.completed_steps},
+            unset={f"checkpoints.{step}": ""},
+        )
+        logger.info(f"Migration {self.name}, {step}: {counts}")
+        return counts
+
+    async def insert_if_missing(self, collection: str, match: Dict[str, Any], document: Dict[str, Any], step: Optional[str] = None) -> bool:
+        """Insert `document` unless a document matching `match` exists; True when it was (or would be) inserted"""
+        step = step or collection
+        if step in self.completed_steps:
+            return bool(self.counts.get(step, {}).get("inserted"))
+        if self.dry_run:
+            inserted = await self.db[collection].find_one(match, {"_id": 1}) is None
+        else:
+            doc_id = ObjectId()
+            if self.reversible:
+                await self.db[UNDO_COLLECTION].insert_one({
+                    "migration": self.name, "collection": collection, "kind": "insert", "doc_id": doc_id,
+                })
+            result = await self.db[collection].update_one(match, {"$setOnInsert": {**document, "_id": doc_id}}, upsert=True)
+            inserted = result.upserted_id is not None
+            if inserted:
+                await bump_collection_version(self.db, collection)
+            if self.reversible and not inserted:
+                await self.db[UNDO_COLLECTION].delete_one({"migration": self.name, "doc_id": doc_id})
+
+        self.counts[step] = {"inserted": int(inserted)}
+        self.completed_steps.append(step)
+        await self._save({f"counts.{step}": self.counts[step], "completed_steps": self.completed_steps})
+        return inserted
+
+def _known(name: str) -> Dict[str, Any]:
+    entry = MIGRATIONS.get(name)
+    if entry is None:
+        raise MigrationError(f"Unknown migration '{name}'")
+    return entry
+
+async def _claim(db: AsyncIOMotorDatabase, name: str, status: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Mark a migration running (or rolling back) unless another runner holds it"""
+    now = _now()
+    try:
+        return await db[MIGRATIONS_COLLECTION].find_one_and_update(
+            {"_id": name, "$or": [
+                {"status": {"$nin": [RUNNING, ROLLING_BACK]}},
+                {"heartbeat_at": {"$lt": now - timedelta(seconds=STALE_AFTER_SECONDS)}},
+            ]},
+            {"$set": {"status": status, "heartbeat_at": now, **fields}, "$unset": {"error": ""}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        raise MigrationError(f"Migration '{name}' is already being run")
+
+async def migration_status(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """Every registered migration with its recorded state"""
+    states = {
+        state["_id"]: state
+        async for state in db[MIGRATIONS_COLLECTION].find({"_id": {"$in": list(MIGRATIONS)}})
+    }
+    return [
+        {
+            "name": name,
+            "description": entry["description"],
+            "reversible": entry["reversible"],
+            "status": states.get(name, {}).get("status", PENDING),
+            **{k: v for k, v in states.get(name, {}).items() if k not in ("_id", "status")},
+        }
+        for name, entry in sorted(MIGRATIONS.items())
+    ]
+
+async def run_migration(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    dry_run: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pause_ms: int = DEFAULT_PAUSE_MS,
+    restart: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """Apply one migration, resuming from its checkpoints unless `restart` is set"""
+    entry = _known(name)
+    state = await db[MIGRATIONS_COLLECTION].find_one({"_id": name}) or {}
+    if state.get("status") == APPLIED and not dry_run:
+        raise MigrationError(f"Migration '{name}' is already applied; roll it back to run it again")
+    if restart or state.get("status") == ROLLED_BACK:
+        state = {}
+
+    if not dry_run:
+        await _claim(db, name, RUNNING, {
+            "started_at": _now(),
+            "checkpoints": state.get("checkpoints") or {},
+            "completed_steps": state.get("completed_steps") or [],
+            "counts": state.get("counts") or {},
+        })
+
+    ctx = MigrationContext(db, name, state, dry_run, batch_size, Throttle(db, pause_ms), progress)
+    try:
+        await entry["up"](ctx)
+    except Exception as e:
+        if not dry_run:
+            await db[MIGRATIONS_COLLECTION].update_one(
+                {"_id": name}, {"$set": {"status": FAILED, "error": f"{type(e).__name__}: {str(e)}"}}
+            )
+        raise
+
+    if not dry_run:
+        await db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": name},
+            {"$set": {"status": APPLIED, "applied_at": _now()}, "$unset": {"checkpoints": "", "completed_steps": ""}},
+        )
+    # Records that changed mid-batch were skipped; rolling back and re-running picks them up
+    conflicts = sum(counts.get("conflicts", 0) for counts in ctx.counts.values())
+    return {"migration": name, "dry_run": dry_run, "steps": ctx.counts, "conflicts": conflicts}
+
+async def run_pending(
+    db: AsyncIOMotorDatabase,
+    names: Optional[List[str]] = None,
+    dry_run: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pause_ms: int = DEFAULT_PAUSE_MS,
+    restart: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> List[Dict[str, Any]]:
+    """Apply the given migrations (default: every unapplied one) in name order, stopping at the first failure"""
+    for name in names or []:
+        _known(name)
+    applied = {
+        state["_id"] async for state in db[MIGRATIONS_COLLECTION].find({"status": APPLIED}, {"_id": 1})
+    }
+    results = []
+    for name in sorted(names or MIGRATIONS):
+        if name in applied and not dry_run:
+            continue
+        results.append(await run_migration(db, name, dry_run, batch_size, pause_ms, restart, progress))
+    return results
+
+async def rollback_migration(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    dry_run: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pause_ms: int = DEFAULT_PAUSE_MS,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """Restore the values a (possibly partially) applied migration replaced, newest change first"""
+    entry = _known(name)
+    if not entry["reversible"]:
+        raise MigrationError(f"Migration '{name}' is not reversible")
+    if dry_run:
+        pending = await db[UNDO_COLLECTION].count_documents({"migration": name})
+        return {"migration": name, "dry_run": True, "would_restore": pending}
+
+    await _claim(db, name, ROLLING_BACK, {"rollback_started_at": _now()})
+    throttle = Throttle(db, pause_ms)
+    counts = {"restored": 0, "deleted": 0, "conflicts": 0}
+    try:
+        while True:
+            # Entries are deleted as they are applied, so the remaining log is the checkpoint
+            started = time.monotonic()
+            batch = await db[UNDO_COLLECTION].find({"migration": name}).sort("_id", -1).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            by_collection: Dict[str, list] = {}
+            for record in batch:
+                if record["kind"] == "insert":
+                    operation = DeleteOne({"_id": record["doc_id"]})
+                else:
+                    guard = {item["field"]: item["value"] for item in record["after"]}
+                    update: Dict[str, Any] = {}
+                    if record["before"]:
+                        update["$set"] = {item["field"]: item["value"] for item in record["before"]}
+                    if record["missing"]:
+                        update["$unset"] = {field: "" for field in record["missing"]}
+                    operation = UpdateOne({"_id": record["doc_id"], **guard}, update)
+                by_collection.setdefault(record["collection"], []).append(operation)
+
+            for collection, operations in by_collection.items():
+                result = await db[collection].bulk_write(operations, ordered=False)
+                counts["restored"] += result.modified_count
+                counts["deleted"] += result.deleted_count
+                counts["conflicts"] += len(operations) - result.matched_count - result.deleted_count
+            await bump_collection_version(db, *by_collection)
+            await db[UNDO_COLLECTION].delete_many({"_id": {"$in": [record["_id"] for record in batch]}})
+            await db[MIGRATIONS_COLLECTION].update_one({"_id": name}, {"$set": {"heartbeat_at": _now()}})
+            if progress:
+                await progress(counts["restored"] + counts["deleted"], None, f"Rolling back {name}")
+            await throttle.wait((time.monotonic() - started) * 1000)
+    except Exception as e:
+        await db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": name}, {"$set": {"status": FAILED, "error": f"Rollback: {type(e).__name__}: {str(e)}"}}
+        )
+        raise
+
+    await db[MIGRATIONS_COLLECTION].update_one(
+        {"_id": name},
+        {
+            "$set": {"status": ROLLED_BACK, "rolled_back_at": _now(), "rollback_counts": counts},
+            "$unset": {"checkpoints": "", "completed_steps": "", "applied_at": ""},
+        },
+    )
+    logger.info(f"Rolled back migration {name}: {counts}")
+    return {"migration": name, "dry_run": False, **counts}
@@ -0,0 +1,188 @@
+"""
+Role Permissions
+Compiles roles_config.json (overlaid with any documents in the `roles`
+collection) into one integer bitset per role and resource, so a permission
+check is a dict lookup and a bitwise AND.
+
+The compiled table is hot-reloaded: every process (API workers and the job
+worker alike) runs `watch_permissions`, which recompiles when the config
+file's mtime or the `roles` collection version changes. Stored roles are
+written only through `save_role` / `delete_role` (PUT/DELETE
+/api/users/roles/{name}), which bump that version and reload the writing
+process at once. Changes therefore reach all processes within
+RELOAD_INTERVAL_SECONDS without a restart.
+"""
+from fastapi import HTTPException, Depends, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, List, Optional
+import asyncio
+import json
+import logging
+import os
+from utils.collection_versions import bump_collection_version, get_collection_versions
+from utils.middleware import get_current_user
+
+logger = logging.getLogger(__name__)
+
+ROLES_CONFIG_PATH = Path(__file__).resolve().parent.parent / "roles_config.json"
+RELOAD_INTERVAL_SECONDS = 10
+
+ACTIONS = {
+    "create": 1,
+    "read": 2,
+    "update": 4,
+    "delete": 8,
+    "write": 16,
+}
+
+# Used only when roles_config.json is missing and no roles are stored
+FALLBACK_ROLES = {
+    "Super Admin": {
+        "permissions": {
+            "users": ["create", "read", "update", "delete"],
+            "leads": ["create", "read", "update", "delete"],
+            "opportunities": ["create", "read", "update", "delete"],
+            "action_items": ["create", "read", "update", "delete"],
+            "contacts": ["create", "read", "update", "delete"],
+            "sales_activity": ["create", "read", "update", "delete"]
+        }
+    }
+}
+
+class RoleConfigError(ValueError):
+    pass
+
+class PermissionTable:
+    """Compiled role -> resource -> action bitset table"""
+
+    def __init__(self, config: Dict[str, Any], file_mtime: Optional[float] = None, roles_version: int = 0):
+        self.config = config
+        self.file_mtime = file_mtime
+        self.roles_version = roles_version
+        self.bits: Dict[str, Dict[str, int]] = {}
+        for role, role_config in config.items():
+            resources = {}
+            for resource, actions in (role_config.get("permissions") or {}).items():
+                mask = 0
+                for action in actions:
+                    if action in ACTIONS:
+                        mask |= ACTIONS[action]
+                    else:
+                        logger.warning(f"Unknown action '{action}' for {role}/{resource} ignored")
+                resources[resource] = mask
+            self.bits[role] = resources
+
+    def allows(self, role: str, resource: str, action: str) -> bool:
+        return bool(self.bits.get(role, {}).get(resource, 0) & ACTIONS[action])
+
+_reload_listeners: List[Callable[[], None]] = []
+
+def on_reload(listener: Callable[[], None]):
+    """Register a callback run after the table is recompiled (e.g. to drop derived caches)"""
+    _reload_listeners.append(listener)
+
+def _file_mtime() -> Optional[float]:
+    try:
+        return os.stat(ROLES_CONFIG_PATH).st_mtime
+    except FileNotFoundError:
+        return None
+
+def _read_file_config() -> Dict[str, Any]:
+    try:
+        with open(ROLES_CONFIG_PATH, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"Roles configuration not found at {ROLES_CONFIG_PATH}, using fallback roles")
+        return FALLBACK_ROLES
+
+def _install(table: PermissionTable):
+    global _table
+    _table = table
+    for listener in _reload_listeners:
+        listener()
+
+_table = PermissionTable(_read_file_config(), _file_mtime())
+
+def has_permission(role: str, resource: str, action: str) -> bool:
+    return _table.allows(role, resource, action)
+
+def get_roles_config() -> Dict[str, Any]:
+    """Effective roles configuration (file overlaid with stored roles)"""
+    return _table.config
+
+def require(resource: str, action: str):
+    """Dependency factory: the caller's role must allow `action` on `resource`"""
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown permission action '{action}'")
+
+    async def checker(current_user: dict = Depends(get_current_user)) -> dict:
+        if not _table.allows(current_user.get("role", ""), resource, action):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Insufficient permissions to {action} {resource}"
+            )
+        return current_user
+
+    return checker
+
+async def reload_permissions(db: Optional[AsyncIOMotorDatabase] = None, force: bool = False) -> bool:
+    """Recompile if the config file or the roles collection changed; returns True when reloaded"""
+    file_mtime = _file_mtime()
+    roles_version = _table.roles_version
+    if db is not None:
+        roles_version = (await get_collection_versions(db, ["roles"]))["roles"]
+
+    if not force and file_mtime == _table.file_mtime and roles_version == _table.roles_version:
+        return False
+
+    config = _read_file_config()
+    if db is not None:
+        async for role in db.roles.find({}, {"_id": 0}):
+            if role.get("name"):
+                config[role["name"]] = {
+                    "description": role.get("description", ""),
+                    "permissions": role.get("permissions", {}),
+                }
+
+    _install(PermissionTable(config, file_mtime, roles_version))
+    logger.info(f"Role permissions reloaded ({len(config)} roles)")
+    return True
+
+async def save_role(
+    db: AsyncIOMotorDatabase, name: str, description: str, permissions: Dict[str, List[str]]
+) -> Dict[str, Any]:
+    """Store a role (overriding roles_config.json's definition of it) and apply it; returns the effective role"""
+    for resource, actions in permissions.items():
+        unknown = [action for action in actions if action not in ACTIONS]
+        if unknown:
+            raise RoleConfigError(f"Unknown action(s) for {resource}: {', '.join(unknown)}; use {', '.join(ACTIONS)}")
+    await db.roles.update_one(
+        {"name": name},
+        {"$set": {"name": name, "description": description, "permissions": permissions, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    await bump_collection_version(db, "roles")
+    await reload_permissions(db)
+    return get_roles_config()[name]
+
+async def delete_role(db: AsyncIOMotorDatabase, name: str) -> bool:
+    """Remove a stored role (a role roles_config.json defines falls back to that); False if none was stored"""
+    result = await db.roles.delete_one({"name": name})
+    if not result.deleted_count:
+        return False
+    await bump_collection_version(db, "roles")
+    await reload_permissions(db)
+    return True
+
+async def watch_permissions(db: AsyncIOMotorDatabase, interval_seconds: float = RELOAD_INTERVAL_SECONDS):
+    """Background loop keeping this process's permission table current"""
+    first = True
+    while True:
+        try:
+            await reload_permissions(db, force=first)
+            first = False
+        except Exception as e:
+            logger.error(f"Role permission reload failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
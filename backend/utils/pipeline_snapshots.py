@@ -0,0 +1,259 @@
+"""
+Pipeline Snapshot Store
+Captures a compact columnar copy of every open opportunity and lead so that
+historical questions ("what did the pipeline look like on the 1st?") can be
+answered without the live collections, which are overwritten in place.
+
+Layout of the `pipeline_snapshots` collection (bucketed, one document per
+SNAPSHOT_BUCKET_SIZE rows):
+    {
+        "_id": "2026-10-01:opportunities:0",
+        "snapshot_date": "2026-10-01",
+        "entity": "opportunities",
+        "bucket": 0,
+        "count": 5000,
+        "columns": {"id": [...], "stage": [...], "pipeline_status": [...],
+                    "amount": [...], "probability": [...], "owner": [...],
+                    "region": [...], "close_month": [...]}
+    }
+A small summary document per date/entity (`bucket: -1`) holds the totals used
+by pipeline-over-time charts, so those never have to read the row buckets.
+Callers limited by region or ownership (utils/scoping.py) are answered from
+the row buckets instead, keeping only the rows whose owner and region they
+may see.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import logging
+from utils.dates import parse_datetime, month_label
+from utils.forecast_engine import OPEN_PIPELINE_FILTER
+from utils.jobs import enqueue_job
+from utils.scoping import SCOPE_RULES, Scope
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_COLLECTION = "pipeline_snapshots"
+SNAPSHOT_BUCKET_SIZE = 5000
+SUMMARY_BUCKET = -1
+
+OPEN_LEAD_FILTER = {"lead_status": {"$in": ["Active", "Delayed"]}}
+
+# Per entity: source filter and how each snapshot column is read from a document
+SNAPSHOT_SOURCES = {
+    "opportunities": {
+        "filter": OPEN_PIPELINE_FILTER,
+        "projection": {
+            "_id": 0, "id": 1, "stage": 1, "pipeline_status": 1, "amount": 1, "estimated_value": 1,
+            "win_probability": 1, "sales_owner": 1, "region": 1, "close_date": 1, "expected_closure_date": 1,
+        },
+        "amount": lambda d: d.get("amount") or d.get("estimated_value") or 0,
+        "probability": lambda d: d.get("win_probability") or 0,
+        "owner": lambda d: d.get("sales_owner"),
+        "close": lambda d: d.get("close_date") or d.get("expected_closure_date"),
+    },
+    "leads": {
+        "filter": OPEN_LEAD_FILTER,
+        "projection": {
+            "_id": 0, "id": 1, "stage": 1, "lead_status": 1, "estimated_value": 1, "probability": 1,
+            "lead_owner": 1, "owner": 1, "region": 1, "expected_closure_date": 1,
+        },
+        "amount": lambda d: d.get("estimated_value") or 0,
+        "probability": lambda d: d.get("probability") or 0,
+        "owner": lambda d: d.get("lead_owner") or d.get("owner"),
+        "close": lambda d: d.get("expected_closure_date"),
+    },
+}
+
+SUMMARY_DIMENSIONS = ["stage", "owner", "region"]
+
+def _snapshot_row(source: Dict[str, Any], doc: Dict[str, Any]) -> Dict[str, Any]:
+    close = parse_datetime(source["close"](doc))
+    return {
+        "id": doc.get("id"),
+        "stage": doc.get("stage") or "Unknown",
+        "pipeline_status": doc.get("pipeline_status") or doc.get("lead_status"),
+        "amount": float(source["amount"](doc)),
+        "probability": int(source["probability"](doc)),
+        "owner": source["owner"](doc) or "Unassigned",
+        "region": doc.get("region") or "Unassigned",
+        "close_month": month_label(close.year * 12 + close.month - 1) if close else None,
+    }
+
+def _summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {
+        "count": len(rows),
+        "amount": 0.0,
+        "weighted_amount": 0.0,
+        **{f"by_{dimension}": {} for dimension in SUMMARY_DIMENSIONS},
+    }
+    for row in rows:
+        weighted = row["amount"] * row["probability"] / 100
+        summary["amount"] += row["amount"]
+        summary["weighted_amount"] += weighted
+        for dimension in SUMMARY_DIMENSIONS:
+            group = summary[f"by_{dimension}"].setdefault(row[dimension], {"count": 0, "amount": 0.0, "weighted_amount": 0.0})
+            group["count"] += 1
+            group["amount"] += row["amount"]
+            group["weighted_amount"] += weighted
+    # Stored as lists: owner/stage names may contain characters that are unsafe in field names
+    for dimension in SUMMARY_DIMENSIONS:
+        groups = summary[f"by_{dimension}"]
+        summary[f"by_{dimension}"] = [{"key": key, **totals} for key, totals in groups.items()]
+    return summary
+
+class SnapshotDateError(ValueError):
+    pass
+
+def snapshot_date_for(moment: Optional[datetime] = None) -> str:
+    return (moment or datetime.now(timezone.utc)).date().isoformat()
+
+async def take_snapshot(db: AsyncIOMotorDatabase, snapshot_date: Optional[str] = None) -> Dict[str, int]:
+    """
+    Snapshot every open opportunity and lead for the given date (today by default).
+    Buckets have deterministic ids and are written with upserts, so re-running a
+    snapshot for the same date (or two workers racing) simply overwrites it.
+    A snapshot always reads the current pipeline, so an earlier date is only
+    written while it has none (a nightly job that ran late); history that
+    exists is never overwritten.
+    """
+    today = snapshot_date_for()
+    snapshot_date = snapshot_date or today
+    if snapshot_date > today:
+        raise SnapshotDateError(f"Cannot snapshot {snapshot_date}: it is in the future")
+    if snapshot_date < today and await snapshot_exists(db, snapshot_date):
+        raise SnapshotDateError(f"{snapshot_date} already has a snapshot; only today's can be retaken")
+    collection = db[SNAPSHOTS_COLLECTION]
+    taken_at = datetime.now(timezone.utc)
+    counts = {}
+
+    for entity, source in SNAPSHOT_SOURCES.items():
+        rows = [
+            _snapshot_row(source, doc)
+            async for doc in db[entity].find(source["filter"], source["projection"])
+        ]
+
+        operations = []
+        for bucket, start in enumerate(range(0, len(rows), SNAPSHOT_BUCKET_SIZE)):
+            chunk = rows[start:start + SNAPSHOT_BUCKET_SIZE]
+            operations.append(ReplaceOne(
+                {"_id": f"{snapshot_date}:{entity}:{bucket}"},
+                {
+                    "snapshot_date": snapshot_date,
+                    "entity": entity,
+                    "bucket": bucket,
+                    "count": len(chunk),
+                    "taken_at": taken_at,
+                    "columns": {column: [row[column] for row in chunk] for column in chunk[0]},
+                },
+                upsert=True
+            ))
+        operations.append(ReplaceOne(
+            {"_id": f"{snapshot_date}:{entity}:summary"},
+            {
+                "snapshot_date": snapshot_date,
+                "entity": entity,
+                "bucket": SUMMARY_BUCKET,
+                "taken_at": taken_at,
+                "summary": _summarize(rows),
+            },
+            upsert=True
+        ))
+        await collection.bulk_write(operations, ordered=False)
+
+        # Drop buckets left over from an earlier, larger snapshot of the same date
+        await collection.delete_many({
+            "snapshot_date": snapshot_date,
+            "entity": entity,
+            "bucket": {"$gte": len(operations) - 1}
+        })
+        counts[entity] = len(rows)
+
+    logger.info(f"Pipeline snapshot {snapshot_date} written: {counts}")
+    return counts
+
+def scope_limits(entity: str, scope: Optional[Scope]) -> bool:
+    """Whether the caller sees fewer snapshot rows than the stored summaries cover"""
+    return scope is not None and bool(scope.filter(entity))
+
+def _visible_mask(entity: str, scope: Scope, owners: List[Any], regions: List[Any]) -> List[bool]:
+    """Per row, whether the caller may see it (rows keep one owner and region column per entity)"""
+    rule = SCOPE_RULES[entity]
+    def record(owner: Any, region: Any) -> Dict[str, Any]:
+        fields = {field: owner for field in rule["owner_fields"]}
+        if rule["region_field"]:
+            fields[rule["region_field"]] = region
+        return fields
+    return [scope.allows(entity, record(owner, region)) for owner, region in zip(owners, regions)]
+
+def _scoped_columns(entity: str, columns: Dict[str, List[Any]], scope: Optional[Scope]) -> Dict[str, List[Any]]:
+    if not scope_limits(entity, scope):
+        return columns
+    visible = _visible_mask(entity, scope, columns["owner"], columns["region"])
+    return {column: [value for value, keep in zip(values, visible) if keep] for column, values in columns.items()}
+
+async def load_snapshot_rows(
+    db: AsyncIOMotorDatabase, snapshot_date: str, entity: str, columns: List[str], scope: Optional[Scope] = None
+) -> Dict[str, List[Any]]:
+    """Read the requested columns of one snapshot (the rows the caller may see) back into parallel lists"""
+    read = list(dict.fromkeys([*columns, *(["owner", "region"] if scope_limits(entity, scope) else [])]))
+    projection = {"_id": 0, **{f"columns.{column}": 1 for column in read}}
+    buckets = db[SNAPSHOTS_COLLECTION].find(
+        {"snapshot_date": snapshot_date, "entity": entity, "bucket": {"$gte": 0}},
+        projection
+    ).sort("bucket", 1)
+
+    result = {column: [] for column in read}
+    async for bucket in buckets:
+        for column in read:
+            result[column].extend(bucket["columns"].get(column, []))
+    result = _scoped_columns(entity, result, scope)
+    return {column: result[column] for column in columns}
+
+async def load_scoped_summaries(
+    db: AsyncIOMotorDatabase, entity: str, date_range: Dict[str, str], scope: Scope
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """(snapshot_date, summary) per snapshot in range, summarized from the rows the caller may see"""
+    query: Dict[str, Any] = {"entity": entity, "bucket": {"$gte": 0}}
+    if date_range:
+        query["snapshot_date"] = date_range
+    columns = ["stage", "amount", "probability", "owner", "region"]
+    projection = {"_id": 0, "snapshot_date": 1, **{f"columns.{column}": 1 for column in columns}}
+
+    by_date: Dict[str, Dict[str, List[Any]]] = {}
+    async for bucket in db[SNAPSHOTS_COLLECTION].find(query, projection).sort([("snapshot_date", 1), ("bucket", 1)]):
+        result = by_date.setdefault(bucket["snapshot_date"], {column: [] for column in columns})
+        for column in columns:
+            result[column].extend(bucket["columns"].get(column, []))
+
+    summaries = []
+    for snapshot_date, result in by_date.items():
+        result = _scoped_columns(entity, result, scope)
+        rows = [dict(zip(columns, values)) for values in zip(*(result[column] for column in columns))]
+        summaries.append((snapshot_date, _summarize(rows)))
+    return summaries
+
+async def snapshot_exists(db: AsyncIOMotorDatabase, snapshot_date: str) -> bool:
+    summary = await db[SNAPSHOTS_COLLECTION].find_one(
+        {"snapshot_date": snapshot_date, "bucket": SUMMARY_BUCKET}, {"_id": 1}
+    )
+    return summary is not None
+
+async def schedule_nightly_snapshots(db: AsyncIOMotorDatabase, hour_utc: int = 0, minute_utc: int = 5):
+    """Worker loop: queue one snapshot job per day shortly after midnight UTC"""
+    while True:
+        try:
+            today = snapshot_date_for()
+            if not await snapshot_exists(db, today):
+                await enqueue_job(
+                    db, "pipeline.snapshot", {"snapshot_date": today},
+                    priority=-1, dedupe_key=f"pipeline.snapshot:{today}"
+                )
+        except Exception as e:
+            logger.error(f"Scheduling nightly pipeline snapshot failed: {str(e)}")
+
+        now = datetime.now(timezone.utc)
+        next_run = (now + timedelta(days=1)).replace(hour=hour_utc, minute=minute_utc, second=0, microsecond=0)
+        await asyncio.sleep((next_run - now).total_seconds())
@@ -0,0 +1,189 @@
+"""
+Pivot Analytics
+Compiles an ad-hoc pivot (dimensions x measures over one collection, with
+filters and an optional time bucket) into a single $match + $group
+aggregation. Only the dimensions, measures and date fields whitelisted in
+PIVOT_SOURCES can be referenced, and the caller's scope is applied to the
+$match, so a pivot never sees records the caller could not list. Archived
+records (utils/archival.py) are included, like in the dashboard totals.
+
+Results are cached per normalized query and scope, and invalidated by the
+source collection's version counter (see utils/collection_versions.py).
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
+import json
+from models.analytics import PivotRequest
+from utils.archival import including_archive
+from utils.collection_versions import get_collection_versions
+from utils.dates import to_bson_date, to_date_expression
+from utils.scoping import Scope, apply_scope
+from utils.versioned_cache import VersionedCache
+
+MAX_GROUPS = 1000
+
+# Per source: groupable dimensions (name -> field), numeric measures (name ->
+# expression), the percentage field used as weight by weighted_sum, and the
+# date fields that may be bucketed or range-filtered
+PIVOT_SOURCES = {
+    "leads": {
+        "collection": "leads",
+        "dimensions": {
+            "region": "region", "country": "country", "industry": "industry", "lead_source": "lead_source",
+            "stage": "stage", "lead_status": "lead_status", "owner": "lead_owner", "solution": "solution",
+            "currency": "currency",
+        },
+        "measures": {"estimated_value": "$estimated_value", "lead_score": "$lead_score", "probability": "$probability"},
+        "weight": "$probability",
+        "dates": ["created_at", "expected_closure_date", "next_followup"],
+    },
+    "opportunities": {
+        "collection": "opportunities",
+        "dimensions": {
+            "region": "region", "country": "country", "industry": "industry", "lead_source": "lead_source",
+            "stage": "stage", "status": "status", "type": "type", "owner": "sales_owner",
+            "pipeline_status": "pipeline_status", "currency": "currency_code",
+        },
+        "measures": {
+            "amount": {"$ifNull": ["$amount", {"$ifNull": ["$estimated_value", 0]}]},
+            "estimated_value": "$estimated_value",
+            "win_probability": "$win_probability",
+        },
+        "weight": "$win_probability",
+        "dates": ["created_at", "expected_closure_date", "updated_at"],
+    },
+    "sows": {
+        "collection": "sows",
+        "dimensions": {
+            "billing_type": "billing_type", "status": "status", "sow_type": "sow_type", "owner": "owner",
+            "currency": "currency", "client_name": "client_name",
+        },
+        "measures": {"value": "$value"},
+        "weight": None,
+        "dates": ["created_at", "start_date", "end_date"],
+    },
+    "sales_activities": {
+        "collection": "sales_activities",
+        "dimensions": {
+            "activity_type": "activity_type", "owner": "activity_owner", "outcome": "outcome",
+            "linked_account": "linked_account",
+        },
+        "measures": {},
+        "weight": None,
+        "dates": ["activity_date", "created_at"],
+    },
+}
+
+class PivotError(ValueError):
+    pass
+
+_cache = VersionedCache(max_entries=512, ttl_seconds=900)
+
+def _period(date_field: str, unit: str) -> Dict[str, Any]:
+    """Sortable label of the bucket a date falls in (2025-03-14, 2025-W11, 2025-03, 2025-Q1, 2025)"""
+    date = to_date_expression(f"${date_field}")
+    if unit == "quarter":
+        return {"$concat": [
+            {"$toString": {"$year": date}}, "-Q",
+            {"$toString": {"$toInt": {"$ceil": {"$divide": [{"$month": date}, 3]}}}},
+        ]}
+    formats = {"day": "%Y-%m-%d", "week": "%G-W%V", "month": "%Y-%m", "year": "%Y"}
+    return {"$dateToString": {"format": formats[unit], "date": date}}
+
+def _measure_name(op: str, field: Optional[str]) -> str:
+    return "count" if op == "count" else f"{op}_{field}"
+
+def compile_pivot(request: PivotRequest, scope_filter: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Validate a pivot against the whitelist and build its aggregation pipeline"""
+    source = PIVOT_SOURCES.get(request.source)
+    if source is None:
+        raise PivotError(f"Unknown pivot source '{request.source}'; use one of {', '.join(PIVOT_SOURCES)}")
+
+    unknown = [d for d in [*request.dimensions, *request.filters] if d not in source["dimensions"]]
+    if unknown:
+        raise PivotError(f"Unknown {request.source} dimensions: {', '.join(unknown)}")
+    if len(set(request.dimensions)) != len(request.dimensions):
+        raise PivotError("Dimensions must be distinct")
+
+    match: Dict[str, Any] = {}
+    for dimension, value in request.filters.items():
+        field = source["dimensions"][dimension]
+        match[field] = {"$in": value} if isinstance(value, list) else value
+
+    date_field = request.time_bucket.field if request.time_bucket else "created_at"
+    if date_field not in source["dates"]:
+        raise PivotError(f"{request.source} can only be bucketed by {', '.join(source['dates'])}")
+    if request.from_date and request.to_date and request.from_date > request.to_date:
+        raise PivotError("from_date must not be after to_date")
+    if request.from_date or request.to_date:
+        match[date_field] = {}
+        if request.from_date:
+            match[date_field]["$gte"] = to_bson_date(request.from_date)
+        if request.to_date:
+            match[date_field]["$lt"] = to_bson_date(request.to_date + timedelta(days=1))
+
+    group_id: Dict[str, Any] = {d: f"${source['dimensions'][d]}" for d in request.dimensions}
+    if request.time_bucket:
+        group_id["period"] = _period(date_field, request.time_bucket.unit)
+
+    accumulators: Dict[str, Any] = {}
+    for measure in request.measures:
+        if measure.op == "count":
+            accumulators["count"] = {"$sum": 1}
+            continue
+        if measure.field not in source["measures"]:
+            available = ", ".join(source["measures"]) or "none (count only)"
+            raise PivotError(f"Unknown {request.source} measure '{measure.field}'; available: {available}")
+        value = source["measures"][measure.field]
+        if measure.op == "weighted_sum":
+            if not source["weight"]:
+                raise PivotError(f"{request.source} has no probability to weight by")
+            value = {"$multiply": [
+                {"$ifNull": [value, 0]}, {"$divide": [{"$ifNull": [source["weight"], 0]}, 100]},
+            ]}
+        accumulators[_measure_name(measure.op, measure.field)] = {"$avg" if measure.op == "avg" else "$sum": value}
+
+    return [
+        {"$match": apply_scope(match, scope_filter)},
+        {"$group": {"_id": group_id, **accumulators}},
+        {"$sort": {f"_id.{key}": 1 for key in group_id} or {"_id": 1}},
+        {"$limit": MAX_GROUPS + 1},
+    ]
+
+def _normalized(request: PivotRequest) -> str:
+    """Cache key: filters and their values in a canonical order"""
+    data = request.model_dump(mode="json")
+    data["filters"] = {
+        k: sorted(v) if isinstance(v, list) else v for k, v in sorted(data["filters"].items())
+    }
+    return json.dumps(data, sort_keys=True)
+
+async def run_pivot(db: AsyncIOMotorDatabase, request: PivotRequest, scope: Scope) -> Dict[str, Any]:
+    collection = PIVOT_SOURCES[request.source]["collection"] if request.source in PIVOT_SOURCES else None
+    pipeline = compile_pivot(request, scope.filter(collection) if collection else {})
+
+    key = (_normalized(request), scope.cache_key())
+    versions = await get_collection_versions(db, [collection])
+    cached = _cache.get(key, versions)
+    if cached is not None:
+        return cached
+
+    rows = []
+    measure_names = list(pipeline[1]["$group"].keys())[1:]
+    async for group in db[collection].aggregate(including_archive(collection, pipeline), allowDiskUse=True):
+        row = {name: (value if value is not None else "Unknown") for name, value in group["_id"].items()}
+        for name in measure_names:
+            value = group[name]
+            row[name] = round(value, 2) if isinstance(value, float) else value
+        rows.append(row)
+
+    result = {
+        "source": request.source,
+        "dimensions": [*request.dimensions, *(["period"] if request.time_bucket else [])],
+        "measures": measure_names,
+        "rows": rows[:MAX_GROUPS],
+        "truncated": len(rows) > MAX_GROUPS,
+    }
+    _cache.set(key, versions, result)
+    return result
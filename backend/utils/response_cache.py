@@ -0,0 +1,166 @@
+"""
+Response Cache
+Single-flight, stale-while-revalidate caching for expensive GET endpoints:
+
+    @router.get("/analytics")
+    @cached_response(["leads", "opportunities"], ttl_seconds=30)
+    async def get_analytics(month: Optional[str] = None, scope: Scope = Depends(get_scope)):
+        ...
+
+- Requests are keyed by endpoint, normalized query/path parameters and the
+  caller's scope (Scope.cache_key), so principals that see the same records
+  share entries.
+- Entries remember the collection versions they were computed from (see
+  utils/collection_versions.py) and are never served once a writer bumps one
+  of them. Each request costs one read of the version counters.
+- Within `ttl_seconds` an entry is served as is. For `stale_seconds` after
+  that it is still served while one background recomputation replaces it,
+  which covers inputs that are not versioned (the current date, collections
+  without counters).
+- Identical concurrent misses await one computation (single-flight); a
+  client that disconnects does not cancel the computation others wait on.
+
+Counters (hits, stale hits, misses, coalesced requests, background
+refreshes, errors) are per endpoint and reported by GET /api/metrics.
+RESPONSE_CACHE=0 turns caching off (every request computes).
+"""
+from collections import OrderedDict
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import functools
+import logging
+import os
+import time
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from utils.collection_versions import get_collection_versions
+from utils.scoping import Scope
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE", "1") != "0"
+
+ROUTE_CACHES: Dict[str, "RouteCache"] = {}
+
+_KEYABLE = (str, int, float, bool, date, datetime, Enum, type(None))
+
+def _param_key(name: str, value: Any) -> Hashable:
+    if isinstance(value, Scope):
+        return value.cache_key()
+    if isinstance(value, _KEYABLE):
+        return value
+    if isinstance(value, (list, tuple, set, frozenset)) and all(isinstance(item, _KEYABLE) for item in value):
+        return tuple(sorted(value, key=repr)) if isinstance(value, (set, frozenset)) else tuple(value)
+    raise TypeError(f"Cannot key a cached response on parameter '{name}' ({type(value).__name__})")
+
+def request_key(params: Dict[str, Any]) -> Tuple:
+    """Normalized (name, value) pairs of an endpoint call; database handles are not part of the key"""
+    return tuple(
+        (name, _param_key(name, value))
+        for name, value in sorted(params.items())
+        if not isinstance(value, AsyncIOMotorDatabase)
+    )
+
+class RouteCache:
+    """One endpoint's entries, in-flight computations and counters"""
+
+    def __init__(self, name: str, ttl_seconds: float, stale_seconds: float, max_entries: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Dict[str, int], float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "errors": 0}
+
+    def _store(self, key: Hashable, versions: Dict[str, int], value: Any):
+        self._entries[key] = (versions, time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _start(self, key: Hashable, versions: Dict[str, int], compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        flight = (key, tuple(sorted(versions.items())))
+
+        async def run():
+            try:
+                value = await compute()
+            except Exception:
+                self.counters["errors"] += 1
+                raise
+            self._store(key, versions, value)
+            return value
+
+        task = asyncio.create_task(run())
+        self._in_flight[flight] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(flight, None))
+        return task
+
+    def _in_flight_for(self, key: Hashable, versions: Dict[str, int]) -> Optional[asyncio.Task]:
+        return self._in_flight.get((key, tuple(sorted(versions.items()))))
+
+    def _refresh(self, key: Hashable, versions: Dict[str, int], compute: Callable[[], Awaitable[Any]]):
+        if self._in_flight_for(key, versions) is not None:
+            return
+        self.counters["refreshes"] += 1
+        task = self._start(key, versions, compute)
+
+        def log_failure(done: asyncio.Task):
+            if not done.cancelled() and done.exception() is not None:
+                logger.warning(f"Background refresh of {self.name} failed: {done.exception()}")
+        task.add_done_callback(log_failure)
+
+    async def get(self, key: Hashable, versions: Dict[str, int], compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == versions:
+            age = time.monotonic() - entry[1]
+            if age <= self.ttl_seconds:
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return entry[2]
+            if age <= self.ttl_seconds + self.stale_seconds:
+                self.counters["stale_hits"] += 1
+                self._refresh(key, versions, compute)
+                return entry[2]
+
+        task = self._in_flight_for(key, versions)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            task = self._start(key, versions, compute)
+        # Shielded: one waiter disconnecting must not cancel the shared computation
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "entries": len(self._entries), "in_flight": len(self._in_flight)}
+
+    def clear(self):
+        self._entries.clear()
+
+def cached_response(
+    collections: List[str],
+    ttl_seconds: float = 30,
+    stale_seconds: float = 300,
+    max_entries: int = 256,
+):
+    """Decorator for an async endpoint whose result depends only on its parameters and `collections`"""
+    def decorate(endpoint: Callable[..., Awaitable[Any]]):
+        cache = RouteCache(f"{endpoint.__module__}.{endpoint.__name__}", ttl_seconds, stale_seconds, max_entries)
+        ROUTE_CACHES[cache.name] = cache
+
+        @functools.wraps(endpoint)
+        async def wrapper(**params):
+            if not RESPONSE_CACHE_ENABLED:
+                return await endpoint(**params)
+            versions = await get_collection_versions(get_db(), collections)
+            return await cache.get(request_key(params), versions, lambda: endpoint(**params))
+
+        wrapper.cache = cache
+        return wrapper
+    return decorate
+
+def response_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in ROUTE_CACHES.items()}
@@ -0,0 +1,140 @@
+"""
+Query Scoping
+Compiles a principal's role permissions (roles_config.json) and assigned
+regions into a Mongo filter fragment per collection, so record-level access
+control is enforced by (indexed) queries instead of post-fetch Python checks.
+
+Rules per collection:
+- Unrestricted roles see everything.
+- Roles without `read` permission on the collection's resource only see
+  records they own (matched on the owner fields against name/email).
+- Otherwise, principals with assigned regions see records in those regions
+  plus records they own; principals without regions are not region-limited.
+"""
+from fastapi import Depends
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+from database import get_db
+from models.user_new import UserRole
+from utils.middleware import get_current_user
+from utils.permissions import has_permission, on_reload
+from utils.versioned_cache import VersionedCache
+
+# "Admin" is the role carried by the built-in admin login (see require_admin)
+UNRESTRICTED_ROLES = {UserRole.SUPER_ADMIN.value, "Admin"}
+
+# permission: roles_config.json resource governing reads (None = region scoping only)
+SCOPE_RULES = {
+    "leads": {"permission": "leads", "region_field": "region", "owner_fields": ["lead_owner", "owner"]},
+    "opportunities": {"permission": "opportunities", "region_field": "region", "owner_fields": ["sales_owner"]},
+    "action_items": {"permission": "action_items", "region_field": None, "owner_fields": ["assigned_to"]},
+    "sales_activities": {"permission": "sales_activity", "region_field": None, "owner_fields": ["activity_owner"]},
+    "clients": {"permission": None, "region_field": "region", "owner_fields": []},
+    "partners": {"permission": None, "region_field": "region", "owner_fields": []},
+    "sows": {"permission": None, "region_field": None, "owner_fields": ["owner"]},
+    "users": {"permission": None, "region_field": "assigned_regions", "owner_fields": ["email"]},
+}
+
+# Matches nothing (and is answered from the `id` index without a scan)
+DENY_ALL = {"id": {"$in": []}}
+
+@lru_cache(maxsize=2048)
+def compile_scope(role: str, regions: Tuple[str, ...], identities: Tuple[str, ...], collection: str) -> Dict[str, Any]:
+    """Filter fragment for one principal shape and collection (shared, treat as read-only)"""
+    rule = SCOPE_RULES.get(collection)
+    if rule is None or role in UNRESTRICTED_ROLES:
+        return {}
+
+    owned = [{field: {"$in": list(identities)}} for field in rule["owner_fields"]] if identities else []
+
+    if rule["permission"] and not has_permission(role, rule["permission"], "read"):
+        if not owned:
+            return DENY_ALL
+        return owned[0] if len(owned) == 1 else {"$or": owned}
+
+    if rule["region_field"] and regions:
+        return {"$or": [{rule["region_field"]: {"$in": list(regions)}}, *owned]}
+    return {}
+
+# Compiled fragments depend on role permissions, so drop them when those change
+on_reload(compile_scope.cache_clear)
+
+def apply_scope(query: Optional[Dict[str, Any]], fragment: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine a query with a scope fragment without mutating either"""
+    query = query or {}
+    if not fragment:
+        return query
+    if not query:
+        return dict(fragment)
+    if fragment.keys() & query.keys():
+        return {"$and": [query, fragment]}
+    return {**query, **fragment}
+
+def matches_scope(fragment: Dict[str, Any], record: Dict[str, Any]) -> bool:
+    """Evaluate a compiled fragment against a plain dict (data read without the scope, e.g. snapshot rows)"""
+    for field, condition in fragment.items():
+        if field == "$or":
+            if not any(matches_scope(part, record) for part in condition):
+                return False
+            continue
+        value = record.get(field)
+        values = value if isinstance(value, list) else [value]
+        if not any(v in condition["$in"] for v in values):
+            return False
+    return True
+
+class Scope:
+    """Access scope of the requesting principal"""
+
+    def __init__(self, role: str, regions: Tuple[str, ...] = (), identities: Tuple[str, ...] = ()):
+        self.role = role
+        self.regions = regions
+        self.identities = identities
+
+    @property
+    def unrestricted(self) -> bool:
+        return self.role in UNRESTRICTED_ROLES
+
+    def filter(self, collection: str) -> Dict[str, Any]:
+        return compile_scope(self.role, self.regions, self.identities, collection)
+
+    def apply(self, collection: str, query: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return apply_scope(query, self.filter(collection))
+
+    def allows(self, collection: str, record: Dict[str, Any]) -> bool:
+        return matches_scope(self.filter(collection), record)
+
+    def cache_key(self) -> Tuple:
+        """Identifies principals that see the same records (for result caches)"""
+        return (self.role, self.regions, self.identities) if not self.unrestricted else ("*",)
+
+# Principal lookups are cached briefly; user writes in this process clear it
+_principals = VersionedCache(max_entries=1024, ttl_seconds=60)
+
+def invalidate_principals():
+    _principals.clear()
+
+async def get_scope(current_user: dict = Depends(get_current_user)) -> Scope:
+    """Dependency resolving the caller's role, regions and identities into a Scope"""
+    role = current_user.get("role", "")
+    if role in UNRESTRICTED_ROLES:
+        return Scope(role)
+
+    key = (current_user.get("sub"), current_user.get("email"))
+    scope = _principals.get(key, {})
+    if scope is None:
+        db = get_db()
+        user = await db.users.find_one(
+            {"$or": [{"id": current_user.get("sub")}, {"email": current_user.get("email")}]},
+            {"_id": 0, "role": 1, "assigned_regions": 1, "full_name": 1, "email": 1}
+        ) or {}
+        identities = tuple(sorted({
+            value for value in (user.get("full_name"), user.get("email") or current_user.get("email")) if value
+        }))
+        scope = Scope(
+            user.get("role") or role,
+            tuple(sorted(user.get("assigned_regions") or [])),
+            identities,
+        )
+        _principals.set(key, {}, scope)
+    return scope
@@ -0,0 +1,94 @@
+"""
+Global Search Utility
+Runs ranked full-text queries across Leads, Clients, Opportunities, SOWs and
+Partners using the `search_text` indexes declared in utils/indexes.py.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, List, Optional
+import asyncio
+
+# Per entity type: source collection, fields used to build the result card,
+# and the fields returned alongside it
+SEARCH_SOURCES = {
+    "leads": {
+        "collection": "leads",
+        "title": "opportunity_name",
+        "subtitle": "client_name",
+        "fields": ["id", "task_id", "client_name", "opportunity_name", "contact_person", "stage", "lead_status", "region"],
+    },
+    "clients": {
+        "collection": "clients",
+        "title": "client_name",
+        "subtitle": "country",
+        "fields": ["id", "client_id", "client_name", "country", "region", "client_status"],
+    },
+    "opportunities": {
+        "collection": "opportunities",
+        "title": "opportunity_name",
+        "subtitle": "client_name",
+        "fields": ["id", "task_id", "client_name", "opportunity_name", "pipeline_status", "stage", "region"],
+    },
+    "sows": {
+        "collection": "sows",
+        "title": "sow_title",
+        "subtitle": "client_name",
+        "fields": ["id", "sow_title", "client_name", "project_name", "status"],
+    },
+    "partners": {
+        "collection": "partners",
+        "title": "name",
+        "subtitle": "partner_type",
+        "fields": ["id", "name", "partner_type", "category", "region", "status"],
+    },
+}
+
+async def search_collection(
+    db: AsyncIOMotorDatabase,
+    entity_type: str,
+    query: str,
+    scope_filter: Dict[str, Any],
+    skip: int = 0,
+    limit: int = 10
+) -> List[Dict[str, Any]]:
+    """Return one page of ranked matches for a single entity type"""
+    source = SEARCH_SOURCES[entity_type]
+    projection = {field: 1 for field in source["fields"]}
+    projection["_id"] = 0
+    projection["score"] = {"$meta": "textScore"}
+
+    mongo_filter = {"$text": {"$search": query}, **scope_filter}
+    cursor = (
+        db[source["collection"]]
+        .find(mongo_filter, projection)
+        .sort([("score", {"$meta": "textScore"})])
+        .skip(skip)
+        .limit(limit)
+    )
+
+    results = []
+    async for doc in cursor:
+        doc["type"] = entity_type
+        doc["title"] = doc.get(source["title"]) or ""
+        doc["subtitle"] = doc.get(source["subtitle"]) or ""
+        doc["score"] = round(doc.get("score", 0), 4)
+        results.append(doc)
+    return results
+
+async def search_entities(
+    db: AsyncIOMotorDatabase,
+    query: str,
+    scope_filters: Dict[str, Dict[str, Any]],
+    entity_types: Optional[List[str]] = None,
+    skip: int = 0,
+    limit: int = 10
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Search every requested entity type concurrently.
+    Results are grouped by entity type and ranked by text score within a group.
+    """
+    entity_types = entity_types or list(SEARCH_SOURCES.keys())
+    pages = await asyncio.gather(*[
+        search_collection(db, entity_type, query, scope_filters.get(entity_type, {}), skip, limit)
+        for entity_type in entity_types
+    ])
+    return dict(zip(entity_types, pages))
@@ -0,0 +1,190 @@
+"""
+Delta Sync
+Lets a client keep a local copy of its lists and fetch only what changed:
+
+    GET /api/sync?entities=leads,opportunities            -> first page of everything + token
+    GET /api/sync?since=<token>&entities=leads,...        -> next page / changes since token
+
+- The token holds two cursors per entity: (updated_at, id) of the last
+  record returned and (deleted_at, id) of the last tombstone returned.
+  Records and tombstones are read in that order through (updated_at, id)
+  and (entity, deleted_at, id) indexes, at most SYNC_MAX_CHANGES of each
+  per call. An entity with more to send comes back with `more`; the client
+  calls again with the new token until no entity has `more`. The initial
+  load and large deltas are paged the same way.
+- `reset` marks the first page of a full load (no token for the entity, or
+  its tombstones have expired after SYNC_TOMBSTONE_DAYS): the client clears
+  its local list before applying the page.
+- Deletes come from `tombstones` (utils/tombstones.py): writers leave one
+  when they delete or archive a record, and when an update changes the
+  fields the record's scope depends on (region, owners). Tombstones carry
+  those fields, so the caller's scope applies to them and a caller only
+  hears about records it could see. Ids the caller can still see (moved
+  within its scope, restored, re-created) are not reported as deleted.
+- Cursors never run ahead of the server clock minus SYNC_OVERLAP_SECONDS,
+  so a write whose `updated_at` was taken just before a sync but committed
+  just after it is still picked up next time. Consecutive deltas may repeat
+  a record; clients apply upserts and deletes idempotently by `id`.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import base64
+import binascii
+import json
+from utils.dates import parse_datetime
+from utils.scoping import SCOPE_RULES, Scope
+from utils.tombstones import SYNC_TOMBSTONE_DAYS, TOMBSTONES_COLLECTION
+
+SYNC_OVERLAP_SECONDS = 5
+# Records (and, separately, tombstones) per entity per call
+SYNC_MAX_CHANGES = 1000
+
+# Entity name -> collection (entities are what the frontend pages list)
+SYNC_ENTITIES = {
+    "leads": "leads",
+    "opportunities": "opportunities",
+    "sows": "sows",
+    "action_items": "action_items",
+    "sales_activities": "sales_activities",
+    "clients": "clients",
+    "partners": "partners",
+    "activities": "activities",
+    "forecasts": "forecasts",
+}
+
+# (timestamp, id) of the last change returned; (None, "") is the very start
+Cursor = Tuple[Optional[datetime], str]
+START: Cursor = (None, "")
+
+class InvalidSyncToken(ValueError):
+    pass
+
+def _encode_cursor(cursor: Cursor) -> List[Any]:
+    at, record_id = cursor
+    return [at.isoformat() if at else None, record_id]
+
+def _decode_cursor(value: Any, nullable: bool) -> Cursor:
+    if not isinstance(value, list) or len(value) != 2 or not isinstance(value[1], str):
+        raise InvalidSyncToken("Malformed sync token")
+    at = parse_datetime(value[0]) if value[0] is not None else None
+    if at is None and (value[0] is not None or not nullable):
+        raise InvalidSyncToken("Malformed sync token")
+    return at, value[1]
+
+def encode_token(states: Dict[str, Dict[str, Cursor]]) -> str:
+    """Token for per-entity cursors: {entity: {"u": records cursor, "d": tombstones cursor}}"""
+    data = {
+        "entities": {
+            entity: {"u": _encode_cursor(state["u"]), "d": _encode_cursor(state["d"])}
+            for entity, state in states.items()
+        }
+    }
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_token(token: str) -> Dict[str, Dict[str, Cursor]]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if "at" in data:
+            # Tokens issued before paging: one timestamp for every entity
+            at = _decode_cursor([data["at"], ""], nullable=False)
+            return {entity: {"u": at, "d": at} for entity in SYNC_ENTITIES}
+        return {
+            entity: {"u": _decode_cursor(state["u"], nullable=True), "d": _decode_cursor(state["d"], nullable=False)}
+            for entity, state in data["entities"].items()
+            if entity in SYNC_ENTITIES
+        }
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+        raise InvalidSyncToken("Malformed sync token")
+
+def _after(field: str, cursor: Cursor) -> Dict[str, Any]:
+    """Query for what sorts after `cursor` by (field, id); records without `field` sort first"""
+    at, record_id = cursor
+    if at is None:
+        if not record_id:
+            return {}
+        return {"$or": [{field: None, "id": {"$gt": record_id}}, {field: {"$ne": None}}]}
+    return {"$or": [{field: {"$gt": at}}, {field: at, "id": {"$gt": record_id}}]}
+
+def _next_cursor(docs: List[Dict[str, Any]], field: str, more: bool, floor: Cursor) -> Cursor:
+    """Where the next call resumes: after the last doc sent, but never past `floor`"""
+    if not more or not docs:
+        return floor
+    last = (parse_datetime(docs[-1].get(field)), docs[-1].get("id") or "")
+    if last[0] is None or (last[0], last[1]) < floor:
+        return last
+    return floor
+
+def _scoped(collection: str, query: Dict[str, Any], scope: Scope) -> Dict[str, Any]:
+    return scope.apply(collection, query) if collection in SCOPE_RULES else query
+
+async def _entity_delta(
+    db: AsyncIOMotorDatabase,
+    entity: str,
+    state: Optional[Dict[str, Cursor]],
+    scope: Scope,
+    floor: Cursor,
+) -> Tuple[Dict[str, Any], Dict[str, Cursor]]:
+    """One page of an entity's changes after its cursors, and the cursors to resume from"""
+    collection = SYNC_ENTITIES[entity]
+    reset = state is None or state["d"][0] < floor[0] - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    if reset:
+        # Deletes from before now are moot for a full load; expired ones cannot be reported
+        state = {"u": START, "d": floor}
+
+    upserted = await db[collection].find(
+        _scoped(collection, _after("updated_at", state["u"]), scope), {"_id": 0}
+    ).sort([("updated_at", 1), ("id", 1)]).to_list(SYNC_MAX_CHANGES + 1)
+    more_upserts = len(upserted) > SYNC_MAX_CHANGES
+    upserted = upserted[:SYNC_MAX_CHANGES]
+
+    tombstones: List[Dict[str, Any]] = []
+    if not reset:
+        tombstones = await db[TOMBSTONES_COLLECTION].find(
+            _scoped(collection, {"entity": entity, **_after("deleted_at", state["d"])}, scope),
+            {"_id": 0, "id": 1, "deleted_at": 1},
+        ).sort([("deleted_at", 1), ("id", 1)]).to_list(SYNC_MAX_CHANGES + 1)
+    more_deletes = len(tombstones) > SYNC_MAX_CHANGES
+    tombstones = tombstones[:SYNC_MAX_CHANGES]
+
+    deleted = list(dict.fromkeys(tombstone["id"] for tombstone in tombstones))
+    if deleted:
+        # Still visible (moved within the caller's scope, restored, re-created): an upsert, not a delete
+        visible = {
+            doc["id"] async for doc in db[collection].find(
+                _scoped(collection, {"id": {"$in": deleted}}, scope), {"_id": 0, "id": 1}
+            )
+        }
+        deleted = [record_id for record_id in deleted if record_id not in visible]
+
+    delta = {
+        "reset": reset,
+        "more": more_upserts or more_deletes,
+        "upserted": upserted,
+        "deleted": deleted,
+    }
+    return delta, {
+        "u": _next_cursor(upserted, "updated_at", more_upserts, floor),
+        "d": _next_cursor(tombstones, "deleted_at", more_deletes, floor),
+    }
+
+async def load_delta(
+    db: AsyncIOMotorDatabase, entities: List[str], since_token: Optional[str], scope: Scope
+) -> Dict[str, Any]:
+    """A page of changes to each entity since the token (everything without one) and the token for the next call"""
+    floor: Cursor = (datetime.now(timezone.utc) - timedelta(seconds=SYNC_OVERLAP_SECONDS), "")
+    states = decode_token(since_token) if since_token else {}
+
+    results = await asyncio.gather(*(_entity_delta(db, entity, states.get(entity), scope, floor) for entity in entities))
+    deltas = {}
+    for entity, (delta, state) in zip(entities, results):
+        deltas[entity] = delta
+        states[entity] = state
+    # Entities not asked for this time keep their cursors
+    return {
+        "token": encode_token(states),
+        "more": any(delta["more"] for delta in deltas.values()),
+        "entities": deltas,
+    }
@@ -4,7 +4,7 @@ Generates unique sequential Task IDs in format: SAL0001, SAL0002, etc.
 Task IDs are shared across Leads → Opportunities → Action Items → Activities → Forecasts
 """
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import Optional
+from typing import List, Optional
 
 async def generate_task_id(db: AsyncIOMotorDatabase) -> str:
     """
@@ -27,6 +27,21 @@ async def generate_task_id(db: AsyncIOMotorDatabase) -> str:
     
     return task_id
 
+async def reserve_task_ids(db: AsyncIOMotorDatabase, count: int) -> List[str]:
+    """
+    Reserve `count` consecutive Task IDs with a single counter update
+    """
+    if count <= 0:
+        return []
+    result = await db.counters.find_one_and_update(
+        {"_id": "task_id"},
+        {"$inc": {"sequence": count}},
+        upsert=True,
+        return_document=True
+    )
+    last = result.get("sequence", count)
+    return [f"SAL{sequence_number:04d}" for sequence_number in range(last - count + 1, last + 1)]
+
 async def get_current_task_id_sequence(db: AsyncIOMotorDatabase) -> int:
     """
     Get current Task ID sequence number
@@ -0,0 +1,325 @@
+"""
+Runtime Telemetry
+Saturation signals for a single API process, served on GET /api/metrics:
+
+- event-loop lag: `monitor_event_loop` sleeps for a fixed interval and records
+  how late it wakes up, i.e. how long callbacks waited behind blocking work
+- connection pools: `PoolTelemetry` is a pymongo CMAP listener (one per
+  database workload) tracking open and checked-out connections, threads
+  waiting for a connection and how long checkouts waited
+- requests: `TelemetryMiddleware` keeps the in-flight requests, counted per
+  route template when the metrics are read
+
+`watch_readiness` refreshes the database ping in the background so readiness
+probes are answered from memory. When loop lag, checkout wait or in-flight
+requests exceed the SHED_* thresholds the process reports itself overloaded
+and answers new API requests with 503 + Retry-After until it recovers
+(health and metrics routes are never shed). A threshold of 0 disables it.
+"""
+from pymongo import monitoring
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL_SECONDS = 0.25
+READINESS_INTERVAL_SECONDS = float(os.environ.get("READINESS_INTERVAL_SECONDS", "5"))
+# Samples older than this do not count towards percentiles or shedding
+WINDOW_SECONDS = 60
+
+SHED_LOOP_LAG_MS = float(os.environ.get("SHED_LOOP_LAG_MS", "1000"))
+SHED_POOL_WAIT_MS = float(os.environ.get("SHED_POOL_WAIT_MS", "2000"))
+SHED_MAX_IN_FLIGHT = int(os.environ.get("SHED_MAX_IN_FLIGHT", "0"))
+SHED_RETRY_AFTER_SECONDS = 5
+UNSHED_PATHS = ("/api/health", "/api/metrics")
+
+class SampleWindow:
+    """Recent (timestamp, value) samples with percentile summaries"""
+
+    def __init__(self, max_samples: int = 2048, window_seconds: float = WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def add(self, value: float):
+        with self._lock:
+            self._samples.append((time.monotonic(), value))
+            self.total += 1
+
+    def values(self) -> List[float]:
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            return sorted(v for t, v in self._samples if t >= cutoff)
+
+    def percentile(self, q: float) -> float:
+        values = self.values()
+        return _percentile(values, q) if values else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        values = self.values()
+        if not values:
+            return {"samples": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "samples": len(values),
+            "p50": round(_percentile(values, 50), 2),
+            "p95": round(_percentile(values, 95), 2),
+            "p99": round(_percentile(values, 99), 2),
+            "max": round(values[-1], 2),
+        }
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+# ---------------------------------------------------------------------------
+# Connection pools
+# ---------------------------------------------------------------------------
+
+class PoolTelemetry(monitoring.ConnectionPoolListener):
+    """CMAP listener for one client; events arrive on Motor's executor threads"""
+
+    def __init__(self, workload: str, max_pool_size: int):
+        self.workload = workload
+        self.max_pool_size = max_pool_size
+        self.checkout_wait_ms = SampleWindow()
+        self._servers: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        # A checkout's started and checked-out events fire on the same thread
+        self._local = threading.local()
+
+    def _count(self, address, **deltas: int):
+        key = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        with self._lock:
+            server = self._servers.setdefault(key, {
+                "open": 0, "in_use": 0, "waiting": 0, "checkouts": 0, "failed_checkouts": 0, "cleared": 0,
+            })
+            for name, delta in deltas.items():
+                server[name] += delta
+
+    def pool_created(self, event):
+        self._count(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+        self._count(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        self._count(event.address, waiting=-1, failed_checkouts=1)
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self.checkout_wait_ms.add((time.monotonic() - started) * 1000)
+            self._local.started = None
+        self._count(event.address, waiting=-1, in_use=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._count(event.address, in_use=-1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            servers = {address: dict(counts) for address, counts in self._servers.items()}
+        in_use = sum(s["in_use"] for s in servers.values())
+        return {
+            "max_pool_size": self.max_pool_size,
+            "in_use": in_use,
+            "waiting": sum(s["waiting"] for s in servers.values()),
+            "utilization": round(in_use / self.max_pool_size, 3) if self.max_pool_size else None,
+            "checkout_wait_ms": self.checkout_wait_ms.summary(),
+            "servers": servers,
+        }
+
+_pools: Dict[str, PoolTelemetry] = {}
+
+def pool_listener(workload: str, max_pool_size: int) -> PoolTelemetry:
+    """Listener to pass in a client's event_listeners; replaces any earlier one for the workload"""
+    listener = PoolTelemetry(workload, max_pool_size)
+    _pools[workload] = listener
+    return listener
+
+# ---------------------------------------------------------------------------
+# Event loop lag
+# ---------------------------------------------------------------------------
+
+loop_lag_ms = SampleWindow()
+_current_lag_ms = 0.0
+
+async def monitor_event_loop(interval: float = LOOP_LAG_INTERVAL_SECONDS):
+    """Record how late the loop wakes from a fixed sleep, then re-evaluate shedding"""
+    global _current_lag_ms
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        _current_lag_ms = max(0.0, (time.monotonic() - started - interval) * 1000)
+        loop_lag_ms.add(_current_lag_ms)
+        _evaluate_overload()
+
+# ---------------------------------------------------------------------------
+# Requests
+# ---------------------------------------------------------------------------
+
+# id(scope) -> scope for requests being handled. FastAPI stores the matched
+# route on the same scope dict, so route templates are resolved at read time.
+_active: Dict[int, Dict[str, Any]] = {}
+_request_counters = {"started": 0, "shed": 0, "peak_in_flight": 0}
+
+class TelemetryMiddleware:
+    """ASGI middleware counting in-flight requests and shedding load when overloaded"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if _overload["reasons"] and not scope["path"].startswith(UNSHED_PATHS):
+            _request_counters["shed"] += 1
+            await _send_overloaded(send)
+            return
+
+        key = id(scope)
+        _active[key] = scope
+        _request_counters["started"] += 1
+        if len(_active) > _request_counters["peak_in_flight"]:
+            _request_counters["peak_in_flight"] = len(_active)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _active.pop(key, None)
+
+async def _send_overloaded(send):
+    body = json.dumps({"detail": "Server is overloaded, retry shortly", "reasons": _overload["reasons"]}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(SHED_RETRY_AFTER_SECONDS).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def in_flight_by_route() -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for scope in list(_active.values()):
+        route = scope.get("route")
+        label = f"{scope['method']} {route.path if route is not None else '(unmatched)'}"
+        counts[label] = counts.get(label, 0) + 1
+    return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+# ---------------------------------------------------------------------------
+# Overload and readiness
+# ---------------------------------------------------------------------------
+
+_overload: Dict[str, Any] = {"reasons": [], "since": None}
+
+def _evaluate_overload():
+    reasons = []
+    if SHED_LOOP_LAG_MS and _current_lag_ms > SHED_LOOP_LAG_MS:
+        reasons.append(f"event loop lag {_current_lag_ms:.0f}ms > {SHED_LOOP_LAG_MS:.0f}ms")
+    if SHED_POOL_WAIT_MS:
+        for workload, pool in _pools.items():
+            # Recent checkouts only, so an idle process recovers once the window passes
+            wait = pool.checkout_wait_ms.percentile(95)
+            if wait > SHED_POOL_WAIT_MS:
+                reasons.append(f"{workload} pool checkout wait p95 {wait:.0f}ms > {SHED_POOL_WAIT_MS:.0f}ms")
+    if SHED_MAX_IN_FLIGHT and len(_active) > SHED_MAX_IN_FLIGHT:
+        reasons.append(f"{len(_active)} requests in flight > {SHED_MAX_IN_FLIGHT}")
+
+    if reasons and not _overload["reasons"]:
+        logger.warning(f"Shedding load: {'; '.join(reasons)}")
+        _overload["since"] = time.time()
+    elif not reasons and _overload["reasons"]:
+        logger.info("Load back under thresholds, no longer shedding")
+        _overload["since"] = None
+    _overload["reasons"] = reasons
+
+_readiness: Dict[str, Any] = {"database": None, "checked_at": None}
+
+async def refresh_readiness(check: Callable[[], Awaitable[bool]]) -> Dict[str, Any]:
+    healthy = await check()
+    _readiness["database"] = "connected" if healthy else "disconnected"
+    _readiness["checked_at"] = time.time()
+    return _readiness
+
+async def watch_readiness(check: Callable[[], Awaitable[bool]], interval: float = READINESS_INTERVAL_SECONDS):
+    """Ping the database every `interval` seconds so probes never wait on it"""
+    while True:
+        try:
+            await refresh_readiness(check)
+        except Exception as e:
+            logger.error(f"Readiness refresh failed: {str(e)}")
+            _readiness["database"] = "disconnected"
+            _readiness["checked_at"] = time.time()
+        await asyncio.sleep(interval)
+
+async def readiness(check: Callable[[], Awaitable[bool]]) -> Dict[str, Any]:
+    """Cached readiness; pings directly only if the background check has not run yet or is stale"""
+    checked_at: Optional[float] = _readiness["checked_at"]
+    if checked_at is None or time.time() - checked_at > 3 * READINESS_INTERVAL_SECONDS:
+        await refresh_readiness(check)
+    ready = _readiness["database"] == "connected" and not _overload["reasons"]
+    result = {
+        "status": "ready" if ready else "not_ready",
+        "database": _readiness["database"],
+        "checked_at": _readiness["checked_at"],
+    }
+    if _overload["reasons"]:
+        result["overloaded"] = _overload["reasons"]
+    return result
+
+def metrics_snapshot() -> Dict[str, Any]:
+    return {
+        "timestamp": time.time(),
+        "window_seconds": WINDOW_SECONDS,
+        "event_loop": {
+            "lag_ms": round(_current_lag_ms, 2),
+            "lag_window_ms": loop_lag_ms.summary(),
+        },
+        "pools": {workload: pool.snapshot() for workload, pool in _pools.items()},
+        "requests": {
+            "in_flight": len(_active),
+            "in_flight_by_route": in_flight_by_route(),
+            **_request_counters,
+        },
+        "readiness": dict(_readiness),
+        "load_shedding": {
+            "overloaded": bool(_overload["reasons"]),
+            "reasons": _overload["reasons"],
+            "since": _overload["since"],
+            "thresholds": {
+                "loop_lag_ms": SHED_LOOP_LAG_MS,
+                "pool_wait_p95_ms": SHED_POOL_WAIT_MS,
+                "max_in_flight": SHED_MAX_IN_FLIGHT,
+            },
+        },
+    }
@@ -0,0 +1,306 @@
+"""
+Activity Timeline
+Builds one time-ordered feed from every collection that records something
+happening to an account, task or owner: activities, sales activities, action
+items, lead status changes and opportunity/SOW updates.
+
+Each source is an indexed query sorted newest first on (time, id) and
+limited to one page, so a page costs one round trip per source however many
+events the selector has. The sources are opened concurrently and merged
+lazily with a heap. Pages continue from a resume token holding the sort key
+of the last event returned; ties on the timestamp are broken by source rank
+and then id, so no event is skipped or repeated across pages.
+
+Lead status changes are embedded in `leads.status_change_log`, so that source
+is an aggregation that unwinds the selector's leads: it is bounded by the
+number of matching leads rather than by the page size.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import asyncio
+import base64
+import binascii
+import heapq
+import json
+from utils.dates import parse_datetime
+
+SELECTORS = ("client", "task_id", "owner")
+
+# Per source: collection, timestamp field, query field per selector and the
+# resolved selector value it matches ("client_name", "client_id", "task_id",
+# "opportunity_ids" or "owner"). A source without a field for the selector is
+# not part of that feed.
+TIMELINE_SOURCES = {
+    "opportunities": {
+        "collection": "opportunities",
+        "time": "updated_at",
+        "selectors": {"client": ("client_name", "client_name"), "task_id": ("task_id", "task_id"), "owner": ("sales_owner", "owner")},
+        "fields": ["id", "task_id", "client_name", "opportunity_name", "stage", "sales_owner", "created_at", "updated_at"],
+    },
+    "sows": {
+        "collection": "sows",
+        "time": "updated_at",
+        "selectors": {"client": ("client_name", "client_name"), "task_id": ("linked_opportunity_id", "opportunity_ids"), "owner": ("owner", "owner")},
+        "fields": ["id", "client_name", "sow_title", "status", "owner", "created_at", "updated_at"],
+    },
+    "lead_status": {
+        "collection": "leads",
+        "time": "status_change_log.changed_at",
+        "selectors": {"client": ("client_name", "client_name"), "task_id": ("task_id", "task_id"), "owner": ("lead_owner", "owner")},
+        "fields": ["id", "task_id", "client_name", "opportunity_name", "status_change_log"],
+    },
+    "sales_activities": {
+        "collection": "sales_activities",
+        "time": "activity_date",
+        "selectors": {"client": ("linked_account", "client_name"), "task_id": ("task_id", "task_id"), "owner": ("activity_owner", "owner")},
+        "fields": ["id", "task_id", "linked_account", "activity_type", "activity_owner", "summary", "outcome", "activity_date"],
+    },
+    "action_items": {
+        "collection": "action_items",
+        "time": "created_at",
+        "selectors": {"task_id": ("task_id", "task_id"), "owner": ("assigned_to", "owner")},
+        "fields": ["id", "task_id", "task_title", "linked_to", "assigned_to", "status", "due_date", "created_at"],
+    },
+    "activities": {
+        "collection": "activities",
+        "time": "created_at",
+        "selectors": {"client": ("related_id", "client_id"), "owner": ("assigned_to", "owner")},
+        "fields": ["id", "activity_type", "title", "assigned_to", "status", "related_to", "related_id", "created_at"],
+    },
+}
+SOURCE_RANK = {name: rank for rank, name in enumerate(TIMELINE_SOURCES)}
+
+# (timestamp, source rank, id): events are returned in descending timestamp order
+SortKey = Tuple[datetime, int, str]
+# Sort key timestamp of events without a (parseable) one; they sort last
+_NO_TIME = datetime.min.replace(tzinfo=timezone.utc)
+
+class InvalidCursor(ValueError):
+    pass
+
+def _moment(value: Any) -> datetime:
+    return parse_datetime(value) or _NO_TIME
+
+def encode_cursor(key: SortKey) -> str:
+    at, rank, event_id = key
+    raw = json.dumps([at.isoformat(), rank, event_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> SortKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        at, rank, event_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Malformed timeline cursor")
+    at = parse_datetime(at) if isinstance(at, str) else None
+    if at is None or not isinstance(rank, int) or not isinstance(event_id, str):
+        raise InvalidCursor("Malformed timeline cursor")
+    return at, rank, event_id
+
+async def resolve_selector(db: AsyncIOMotorDatabase, selector: str, value: str) -> Dict[str, List[Any]]:
+    """Values each source matches for the selector (client by id or name, owner by id, email or name)"""
+    if selector == "client":
+        client = await db.clients.find_one(
+            {"$or": [{"id": value}, {"client_name": value}]}, {"_id": 0, "id": 1, "client_name": 1}
+        )
+        if client is None:
+            # Leads and activities may name an account that has no client record
+            return {"client_name": [value], "client_id": []}
+        return {"client_name": [client["client_name"]], "client_id": [client["id"]]}
+
+    if selector == "task_id":
+        opportunity_ids = await db.opportunities.distinct("id", {"task_id": value})
+        return {"task_id": [value], "opportunity_ids": opportunity_ids}
+
+    user = await db.users.find_one(
+        {"$or": [{"id": value}, {"email": value}, {"full_name": value}]}, {"_id": 0, "full_name": 1, "email": 1}
+    )
+    # Owner fields hold a full name, except action items which may hold an email
+    identities = sorted({v for v in (user or {}).values() if v}) if user else [value]
+    return {"owner": identities}
+
+def _after(time_field: str, id_field: str, rank: int, cursor: Optional[SortKey]) -> Dict[str, Any]:
+    """Filter for events of a source that sort after the cursor"""
+    if cursor is None:
+        return {time_field: {"$ne": None}}
+    at, cursor_rank, cursor_id = cursor
+    if rank < cursor_rank:
+        return {time_field: {"$lt": at}}
+    if rank > cursor_rank:
+        return {time_field: {"$lte": at}}
+    return {"$or": [{time_field: {"$lt": at}}, {time_field: at, id_field: {"$lt": cursor_id}}]}
+
+def _render(source: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    if source in ("opportunities", "sows"):
+        kind = "opportunity" if source == "opportunities" else "sow"
+        return {
+            "event": f"{kind}_{'created' if doc.get('updated_at') == doc.get('created_at') else 'updated'}",
+            "at": doc.get("updated_at"),
+            "title": doc.get("opportunity_name") if source == "opportunities" else doc.get("sow_title"),
+            "detail": doc.get("stage") if source == "opportunities" else doc.get("status"),
+            "actor": doc.get("sales_owner") if source == "opportunities" else doc.get("owner"),
+            "task_id": doc.get("task_id"),
+            "client_name": doc.get("client_name"),
+            "record_id": doc.get("id"),
+        }
+    if source == "lead_status":
+        entry = doc["status_change_log"]
+        return {
+            "event": "lead_status_changed",
+            "at": entry.get("changed_at"),
+            "title": f"{entry.get('previous_status') or 'New'} → {entry.get('new_status')}",
+            "detail": entry.get("reason"),
+            "actor": entry.get("changed_by_user_name"),
+            "task_id": doc.get("task_id"),
+            "client_name": doc.get("client_name"),
+            "record_id": doc.get("id"),
+        }
+    if source == "sales_activities":
+        return {
+            "event": "sales_activity",
+            "at": doc.get("activity_date"),
+            "title": doc.get("summary") or doc.get("activity_type"),
+            "detail": doc.get("outcome"),
+            "actor": doc.get("activity_owner"),
+            "task_id": doc.get("task_id"),
+            "client_name": doc.get("linked_account"),
+            "record_id": doc.get("id"),
+            "activity_type": doc.get("activity_type"),
+        }
+    if source == "action_items":
+        return {
+            "event": "action_item",
+            "at": doc.get("created_at"),
+            "title": doc.get("task_title"),
+            "detail": doc.get("status"),
+            "actor": doc.get("assigned_to"),
+            "task_id": doc.get("task_id"),
+            "client_name": None,
+            "record_id": doc.get("id"),
+            "due_date": doc.get("due_date"),
+        }
+    return {
+        "event": "activity",
+        "at": doc.get("created_at"),
+        "title": doc.get("title"),
+        "detail": doc.get("status"),
+        "actor": doc.get("assigned_to"),
+        "task_id": None,
+        "client_name": None,
+        "record_id": doc.get("id"),
+        "activity_type": doc.get("activity_type"),
+    }
+
+async def _source_events(
+    db: AsyncIOMotorDatabase, source: str, match: Dict[str, Any], cursor: Optional[SortKey], limit: int
+) -> AsyncIterator[Tuple[SortKey, Dict[str, Any]]]:
+    """One source's events after the cursor, newest first, as (sort key, event)"""
+    config = TIMELINE_SOURCES[source]
+    rank = SOURCE_RANK[source]
+    collection = db[config["collection"]]
+    projection = {field: 1 for field in config["fields"]}
+    projection["_id"] = 0
+
+    if source == "lead_status":
+        # Entry ids are "<lead id>:<position in the log>"; compare on both parts
+        resume = _after("status_change_log.changed_at", "id", rank, cursor)
+        if cursor is not None:
+            at, cursor_rank, cursor_id = cursor
+            match = {**match, "status_change_log.changed_at": {"$lte": at}}
+            if rank == cursor_rank:
+                lead_id, _, position = cursor_id.rpartition(":")
+                resume = {"$or": [
+                    {"status_change_log.changed_at": {"$lt": at}},
+                    {"status_change_log.changed_at": at, "id": {"$lt": lead_id}},
+                    {"status_change_log.changed_at": at, "id": lead_id, "position": {"$lt": int(position or 0)}},
+                ]}
+        pipeline = [
+            {"$match": match},
+            {"$project": projection},
+            {"$unwind": {"path": "$status_change_log", "includeArrayIndex": "position"}},
+            {"$match": resume},
+            {"$sort": {"status_change_log.changed_at": -1, "id": -1, "position": -1}},
+            {"$limit": limit},
+        ]
+        async for doc in collection.aggregate(pipeline, batchSize=limit):
+            event_id = f"{doc['id']}:{doc['position']}"
+            yield (_moment(doc["status_change_log"].get("changed_at")), rank, event_id), {"source": source, "id": event_id, **_render(source, doc)}
+        return
+
+    time_field = config["time"]
+    query = {**match, **_after(time_field, "id", rank, cursor)}
+    found = collection.find(query, projection).sort([(time_field, -1), ("id", -1)]).limit(limit).batch_size(limit)
+    async for doc in found:
+        yield (_moment(doc.get(time_field)), rank, doc["id"]), {"source": source, "id": doc["id"], **_render(source, doc)}
+
+class _Head:
+    """Next unreturned event of one source, ordered newest first in the merge heap"""
+    __slots__ = ("key", "event", "events")
+
+    def __init__(self, key: SortKey, event: Dict[str, Any], events: AsyncIterator):
+        self.key = key
+        self.event = event
+        self.events = events
+
+    def __lt__(self, other: "_Head") -> bool:
+        (at, rank, event_id), (other_at, other_rank, other_id) = self.key, other.key
+        if at != other_at:
+            return at > other_at
+        if rank != other_rank:
+            return rank < other_rank
+        return event_id > other_id
+
+async def _advance(events: AsyncIterator) -> Optional[_Head]:
+    try:
+        key, event = await events.__anext__()
+    except StopAsyncIteration:
+        return None
+    return _Head(key, event, events)
+
+async def load_timeline(
+    db: AsyncIOMotorDatabase,
+    selector: str,
+    value: str,
+    scope_filter: Callable[[str], Dict[str, Any]],
+    sources: Optional[List[str]] = None,
+    cursor: Optional[str] = None,
+    limit: int = 25,
+) -> Dict[str, Any]:
+    """One page of the merged feed and the cursor for the next page (None on the last page)"""
+    resume = decode_cursor(cursor) if cursor else None
+    resolved = await resolve_selector(db, selector, value)
+
+    streams = []
+    for source in sources or list(TIMELINE_SOURCES):
+        config = TIMELINE_SOURCES[source]
+        if selector not in config["selectors"]:
+            continue
+        field, kind = config["selectors"][selector]
+        values = resolved.get(kind) or []
+        if not values:
+            continue
+        match = {field: values[0] if len(values) == 1 else {"$in": values}}
+        fragment = scope_filter(config["collection"])
+        if fragment:
+            match = {"$and": [match, fragment]}
+        # One extra event per source tells whether another page exists
+        streams.append(_source_events(db, source, match, resume, limit + 1))
+
+    heap = [head for head in await asyncio.gather(*(_advance(s) for s in streams)) if head is not None]
+    heapq.heapify(heap)
+
+    events = []
+    last_key = None
+    while heap and len(events) < limit:
+        head = heapq.heappop(heap)
+        events.append(head.event)
+        last_key = head.key
+        following = await _advance(head.events)
+        if following is not None:
+            heapq.heappush(heap, following)
+
+    return {
+        "events": events,
+        "next_cursor": encode_cursor(last_key) if heap and last_key is not None else None,
+    }
@@ -0,0 +1,56 @@
+"""
+Delete Tombstones
+One `tombstones` document per deleted record ({entity, id, deleted_at} plus
+the record's scope fields), so GET /api/sync can tell clients which records
+to drop (see utils/sync.py). They expire after SYNC_TOMBSTONE_DAYS through a
+TTL index.
+
+Tombstones carry the region and owner fields named in SCOPE_RULES, so
+`scope.filter(entity)` applies to them unchanged and a caller is only told
+about records it could see. An update that changes those fields leaves a
+tombstone with the old values (`record_scope_change`): callers that saw the
+record before and cannot see it now drop it on their next sync.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+import os
+from utils.scoping import SCOPE_RULES
+
+TOMBSTONES_COLLECTION = "tombstones"
+SYNC_TOMBSTONE_DAYS = int(os.environ.get("SYNC_TOMBSTONE_DAYS", "30"))
+
+def scope_fields(entity: str) -> List[str]:
+    """Fields a record's visibility depends on (copied onto its tombstones)"""
+    rule = SCOPE_RULES.get(entity)
+    if rule is None:
+        return []
+    return [field for field in [rule["region_field"], *rule["owner_fields"]] if field]
+
+def tombstone_projection(entity: str) -> Dict[str, Any]:
+    """Fields a deleted record must be read with to leave its tombstone"""
+    return {"_id": 0, "id": 1, **{field: 1 for field in scope_fields(entity)}}
+
+async def record_deletions(db: AsyncIOMotorDatabase, entity: str, records: List[Dict[str, Any]]):
+    """Leave a tombstone per deleted (or archived) record; records carry `id` and the scope fields"""
+    records = [record for record in records if record.get("id")]
+    if not records:
+        return
+    deleted_at = datetime.now(timezone.utc)
+    fields = scope_fields(entity)
+    await db[TOMBSTONES_COLLECTION].insert_many([
+        {"entity": entity, "id": record["id"], "deleted_at": deleted_at, **{field: record.get(field) for field in fields}}
+        for record in records
+    ], ordered=False)
+
+async def record_scope_change(
+    db: AsyncIOMotorDatabase,
+    entity: str,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]],
+):
+    """After an update: tombstone the record as it was if its scope fields changed"""
+    if not before or not after:
+        return
+    if any(before.get(field) != after.get(field) for field in scope_fields(entity)):
+        await record_deletions(db, entity, [{**before, "id": after.get("id") or before.get("id")}])
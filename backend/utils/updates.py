@@ -0,0 +1,175 @@
+"""
+Versioned Updates
+Shared write path for the update endpoints: one find_one_and_update that
+applies the change, increments the record's `version` and returns the
+updated record, instead of find_one -> update_one -> find_one.
+
+Clients read `version` from any response and may send it back as
+`If-Match: "<version>"`; an update whose version is stale fails with 409
+instead of silently overwriting someone else's edit. Records written before
+versioning have no `version` field and count as version 0.
+
+Endpoints whose derived stores need the record as it was before the change
+(client rollups, dashboard buckets) use update_from_current, which reads
+the record and makes the update conditional on the version it read, so the
+before/after pair handed to utils.derived_data is always consistent.
+Endpoints that only need the before-image for the audit trail use
+update_versioned_pair, which keeps the single round trip by returning the
+record as it was and applying the change to that copy locally.
+
+Every other write that changes a record's fields (merges, re-pointed
+references, recalculated statuses) goes through with_version_bump, so a
+client still holding the older version gets 409 rather than overwriting it.
+"""
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import Header, HTTPException
+from pymongo import ReturnDocument
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+
+VERSION_FIELD = "version"
+# Unguarded updates retry this often when a concurrent write wins the race
+MAX_ATTEMPTS = 3
+
+Update = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+def if_match_version(if_match: Optional[str] = Header(None, alias="If-Match")) -> Optional[int]:
+    """FastAPI dependency: the record version an If-Match header names ('3', '"3"', 'W/"3"'; '*' means any)"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    if not tag.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match must name a record version")
+    return int(tag)
+
+def version_filter(version: int) -> Dict[str, Any]:
+    return {VERSION_FIELD: version} if version else {VERSION_FIELD: {"$in": [0, None]}}
+
+def literal_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """$set stage values for a pipeline update (user text such as '$5k' must not be read as a field path)"""
+    return {key: {"$literal": value} for key, value in fields.items()}
+
+def with_version_bump(update: Update) -> Update:
+    """The update plus a `version` increment (for writes outside update_versioned: merges, bulk recalculations)"""
+    if isinstance(update, list):
+        return [*update, {"$set": {VERSION_FIELD: {"$add": [{"$ifNull": [f"${VERSION_FIELD}", 0]}, 1]}}}]
+    operators = {op: fields for op, fields in update.items() if fields}
+    operators["$inc"] = {**operators.get("$inc", {}), VERSION_FIELD: 1}
+    return operators
+
+def _conflict(current: Dict[str, Any]) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail=f"Record was changed by someone else (now version {current.get(VERSION_FIELD, 0)}); reload and retry",
+    )
+
+async def update_versioned(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    match: Dict[str, Any],
+    update: Update,
+    expected_version: Optional[int] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    not_found: str = "Record not found",
+) -> Dict[str, Any]:
+    """
+    Apply `update` (operator document or pipeline) to the record matching
+    `match` and return it as updated. 404 when nothing matches, 409 when
+    `expected_version` is no longer current.
+    """
+    query = {**match, **(version_filter(expected_version) if expected_version is not None else {})}
+    doc = await db[collection].find_one_and_update(
+        query, with_version_bump(update),
+        projection=projection or {"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is not None:
+        return doc
+    if expected_version is not None:
+        current = await db[collection].find_one(match, {"_id": 0, VERSION_FIELD: 1})
+        if current is not None:
+            raise _conflict(current)
+    raise HTTPException(status_code=404, detail=not_found)
+
+def _apply_locally(doc: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """The record after an operator update ($set / $unset / $inc on top-level fields)"""
+    after = dict(doc)
+    after.update(update.get("$set", {}))
+    for field in update.get("$unset", {}):
+        after.pop(field, None)
+    for field, amount in update.get("$inc", {}).items():
+        after[field] = (after.get(field) or 0) + amount
+    return after
+
+def _project(doc: Dict[str, Any], projection: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply an exclusion projection (such as {"_id": 0, "password": 0}) to a local copy"""
+    return {key: value for key, value in doc.items() if projection.get(key, 1)}
+
+async def update_versioned_pair(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    match: Dict[str, Any],
+    update: Dict[str, Any],
+    expected_version: Optional[int] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    not_found: str = "Record not found",
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    update_versioned for an operator update and an exclusion projection,
+    returning (before, after) from the same single write.
+    """
+    projection = projection or {"_id": 0}
+    update = with_version_bump(update)
+    query = {**match, **(version_filter(expected_version) if expected_version is not None else {})}
+    before = await db[collection].find_one_and_update(
+        query, update, projection=projection, return_document=ReturnDocument.BEFORE,
+    )
+    if before is not None:
+        return before, _project(_apply_locally(before, update), projection)
+    if expected_version is not None:
+        current = await db[collection].find_one(match, {"_id": 0, VERSION_FIELD: 1})
+        if current is not None:
+            raise _conflict(current)
+    raise HTTPException(status_code=404, detail=not_found)
+
+async def update_from_current(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    match: Dict[str, Any],
+    build_update: Callable[[Dict[str, Any]], Update],
+    expected_version: Optional[int] = None,
+    read_projection: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    not_found: str = "Record not found",
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Read the record, build the update from it and apply it only if the
+    record is still at the version read; returns (before, after).
+    `build_update` may run more than once and must not have side effects.
+    """
+    read_projection = read_projection or {"_id": 0}
+    if any(value for key, value in read_projection.items() if key != "_id"):
+        read_projection = {**read_projection, VERSION_FIELD: 1}
+    for _ in range(MAX_ATTEMPTS):
+        before = await db[collection].find_one(match, read_projection)
+        if before is None:
+            raise HTTPException(status_code=404, detail=not_found)
+        version = before.get(VERSION_FIELD, 0)
+        if expected_version is not None and version != expected_version:
+            raise _conflict(before)
+        after = await db[collection].find_one_and_update(
+            {**match, **version_filter(version)},
+            with_version_bump(build_update(before)),
+            projection=projection or {"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if after is not None:
+            return before, after
+        if expected_version is not None:
+            break
+    current = await db[collection].find_one(match, {"_id": 0, VERSION_FIELD: 1})
+    if current is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    raise _conflict(current)
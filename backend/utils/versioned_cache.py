@@ -0,0 +1,36 @@
+"""
+Versioned Result Cache
+In-process cache for expensive computations. Each entry remembers the
+collection versions it was computed from (see utils/collection_versions.py)
+and is only served while those versions are unchanged and the TTL holds.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import time
+
+class VersionedCache:
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Dict[str, int], float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, versions: Dict[str, int]) -> Optional[Any]:
+        """Return the cached value if it was computed from the same versions and has not expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry_versions, stored_at, value = entry
+        if entry_versions != versions or time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, versions: Dict[str, int], value: Any):
+        self._entries[key] = (dict(versions), time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,184 @@
+"""
+Background Job Worker
+Runs jobs queued in the `jobs` collection (see utils/jobs.py) outside the API
+process:
+
+    cd backend && python -m worker --processes 2 --concurrency 4
+
+Claims are atomic, so any number of worker processes (on any number of hosts)
+can share the queue. Process 0 also runs the schedulers (nightly pipeline
+snapshot, client rollup reconcile, dashboard bucket rebuild, audit archive
+export and closed-record archival). SIGTERM/SIGINT stop claiming new jobs
+and let running ones finish.
+"""
+from dotenv import load_dotenv
+from pathlib import Path
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+sys.path.insert(0, str(ROOT_DIR))
+
+from database import init_db, check_db_connection
+from utils import job_handlers  # noqa: F401 - registers the job handlers
+from utils.jobs import (
+    JOB_HANDLERS, DEFAULT_LEASE_SECONDS, JobContext,
+    claim_job, complete_job, fail_job, extend_lease
+)
+from utils.permissions import watch_permissions
+from utils.pipeline_snapshots import schedule_nightly_snapshots
+from utils.client_rollups import schedule_nightly_rollup_reconcile
+from utils.daily_buckets import schedule_nightly_bucket_rebuild
+from utils.audit import schedule_nightly_audit_export
+from utils.archival import schedule_nightly_archival
+
+logger = logging.getLogger("worker")
+
+POLL_INTERVAL_SECONDS = 1.0
+
+async def run_job(db, job: dict, worker_id: str, lease_seconds: int):
+    """Run one claimed job, heartbeating its lease until the handler returns"""
+    entry = JOB_HANDLERS.get(job["type"])
+    if entry is None:
+        await fail_job(db, {**job, "attempts": job["max_attempts"]}, worker_id, f"No handler for job type '{job['type']}'")
+        return
+    if job["attempts"] > job["max_attempts"]:
+        # Reclaimed after the lease of its final attempt expired
+        await fail_job(db, job, worker_id, job.get("error") or "Lease expired on final attempt")
+        return
+
+    logger.info(f"Running job {job['id']} ({job['type']}, attempt {job['attempts']}/{job['max_attempts']})")
+    task = asyncio.create_task(entry["handler"](JobContext(db, job, worker_id)))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=lease_seconds / 3)
+            if done:
+                break
+            if not await extend_lease(db, job["id"], worker_id, lease_seconds):
+                task.cancel()
+                logger.warning(f"Job {job['id']} was cancelled or lost its lease; stopped")
+                return
+        result = task.result()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    except Exception as e:
+        logger.error(f"Job {job['id']} ({job['type']}) failed: {str(e)}")
+        await fail_job(db, job, worker_id, f"{type(e).__name__}: {str(e)}")
+        return
+
+    await complete_job(db, job, worker_id, result)
+    logger.info(f"Job {job['id']} ({job['type']}) succeeded")
+
+async def run_worker(concurrency: int, job_types, lease_seconds: int, scheduler: bool):
+    db = init_db()
+    if not await check_db_connection():
+        logger.error("Worker could not connect to the database")
+        sys.exit(1)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    background = [asyncio.create_task(watch_permissions(db))]
+    if scheduler:
+        background.append(asyncio.create_task(schedule_nightly_snapshots(db)))
+        background.append(asyncio.create_task(schedule_nightly_rollup_reconcile(db)))
+        background.append(asyncio.create_task(schedule_nightly_bucket_rebuild(db)))
+        background.append(asyncio.create_task(schedule_nightly_audit_export(db)))
+        background.append(asyncio.create_task(schedule_nightly_archival(db)))
+
+    logger.info(f"Worker {worker_id} started (concurrency {concurrency}, types {job_types or 'all'})")
+    running = set()
+    while not stopping.is_set():
+        try:
+            while len(running) < concurrency:
+                job = await claim_job(db, worker_id, job_types, lease_seconds)
+                if job is None:
+                    break
+                running.add(asyncio.create_task(run_job(db, job, worker_id, lease_seconds)))
+        except Exception as e:
+            logger.error(f"Claiming jobs failed: {str(e)}")
+
+        if running:
+            _, running = await asyncio.wait(running, timeout=POLL_INTERVAL_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+        else:
+            try:
+                await asyncio.wait_for(stopping.wait(), POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    logger.info(f"Worker {worker_id} stopping; waiting for {len(running)} running job(s)")
+    if running:
+        await asyncio.wait(running)
+    for task in background:
+        task.cancel()
+
+def configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+def process_main(index: int, args: argparse.Namespace):
+    configure_logging()
+    job_types = [t.strip() for t in args.types.split(",") if t.strip()] if args.types else None
+    asyncio.run(run_worker(args.concurrency, job_types, args.lease, scheduler=index == 0 and not args.no_scheduler))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--processes", type=int, default=int(os.environ.get("WORKER_PROCESSES", "2")))
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get("WORKER_CONCURRENCY", "4")),
+                        help="Jobs run concurrently per process")
+    parser.add_argument("--types", default=None, help="Comma-separated job types to run (default: all)")
+    parser.add_argument("--lease", type=int, default=DEFAULT_LEASE_SECONDS, help="Job lease in seconds")
+    parser.add_argument("--no-scheduler", action="store_true", help="Do not run the periodic schedulers")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        process_main(0, args)
+        return
+
+    configure_logging()
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def start(index: int):
+        process = context.Process(target=process_main, args=(index, args), name=f"worker-{index}")
+        process.start()
+        return process
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    processes = [start(index) for index in range(args.processes)]
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    # Supervise: replace processes that die unexpectedly
+    while not stopping:
+        for index, process in enumerate(processes):
+            if not process.is_alive() and process.exitcode not in (0, None) and not stopping:
+                logger.warning(f"worker-{index} exited with {process.exitcode}; restarting")
+                processes[index] = start(index)
+        time.sleep(1)
+
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
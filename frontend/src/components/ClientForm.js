@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import api from '../utils/api';
+import { createWithDuplicateCheck, errorMessage } from '../utils/duplicates';
 import { Button } from './ui/button';
 import { Input } from './ui/input';
 import { Label } from './ui/label';
@@ -217,13 +218,14 @@ const ClientForm = ({ client, onClose }) => {
         await api.put(`/clients/${client.id}`, submitData);
         toast.success('Client updated successfully');
       } else {
-        await api.post('/clients', submitData);
+        const response = await createWithDuplicateCheck('/clients', submitData);
+        if (!response) return;
         toast.success('Client created successfully');
       }
       onClose();
     } catch (error) {
       console.error('Client form error:', error);
-      toast.error(error.response?.data?.detail || 'Failed to save client');
+      toast.error(errorMessage(error, 'Failed to save client'));
     } finally {
       setLoading(false);
     }
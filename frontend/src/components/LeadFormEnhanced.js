@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import api from '../utils/api';
+import { createWithDuplicateCheck, errorMessage } from '../utils/duplicates';
 import { Button } from '../components/ui/button';
 import { Input } from '../components/ui/input';
 import { Label } from '../components/ui/label';
@@ -169,7 +170,8 @@ const LeadFormEnhanced = ({ lead, onClose }) => {
 
   const handleCreateNewClient = async () => {
     try {
-      const response = await api.post('/clients', newClientData);
+      const response = await createWithDuplicateCheck('/clients', newClientData);
+      if (!response) return;
       const newClient = response.data;
       
       // Add to clients list
@@ -205,7 +207,7 @@ const LeadFormEnhanced = ({ lead, onClose }) => {
       
       toast.success('Client created successfully');
     } catch (error) {
-      toast.error('Failed to create client');
+      toast.error(errorMessage(error, 'Failed to create client'));
     }
   };
 
@@ -253,14 +255,15 @@ const LeadFormEnhanced = ({ lead, onClose }) => {
         await api.put(`/leads/${lead.id}`, payload);
         toast.success('Lead updated successfully');
       } else {
-        await api.post('/leads', payload);
+        const response = await createWithDuplicateCheck('/leads', payload);
+        if (!response) return;
         toast.success('Lead created successfully');
       }
       
       onClose();
     } catch (error) {
       console.error('Error saving lead:', error);
-      toast.error('Failed to save lead');
+      toast.error(errorMessage(error, 'Failed to save lead'));
     } finally {
       setLoading(false);
     }
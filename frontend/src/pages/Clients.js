@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import api from '../utils/api';
+import { isDuplicateConflict } from '../utils/duplicates';
 import { Plus } from 'lucide-react';
 import StandardDataTable from '../components/StandardDataTable';
 import ClientForm from '../components/ClientForm';
@@ -81,6 +82,7 @@ const Clients = () => {
 
         let successCount = 0;
         let errorCount = 0;
+        let duplicateCount = 0;
 
         for (const row of dataRows) {
           const values = row.split(',').map(v => v.trim());
@@ -106,7 +108,12 @@ const Clients = () => {
             await api.post('/clients', clientData);
             successCount++;
           } catch (error) {
-            errorCount++;
+            // Likely duplicates of existing clients are skipped, not imported again
+            if (isDuplicateConflict(error)) {
+              duplicateCount++;
+            } else {
+              errorCount++;
+            }
           }
         }
 
@@ -114,6 +121,9 @@ const Clients = () => {
           toast.success(`Successfully imported ${successCount} client(s)`);
           fetchClients();
         }
+        if (duplicateCount > 0) {
+          toast.warning(`${duplicateCount} row(s) skipped as likely duplicates of existing clients`);
+        }
         if (errorCount > 0) {
           toast.warning(`${errorCount} row(s) failed to import`);
         }
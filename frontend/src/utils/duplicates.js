@@ -0,0 +1,55 @@
+/**
+ * Create requests that the backend may flag as likely duplicates
+ */
+import api from './api';
+
+/**
+ * Whether an error is the backend's duplicate warning
+ * (409 with detail { message, duplicates: [...] })
+ */
+export const isDuplicateConflict = (error) =>
+  error.response?.status === 409 && Array.isArray(error.response?.data?.detail?.duplicates);
+
+/**
+ * One line describing a duplicate candidate (client or lead)
+ */
+const describeCandidate = (candidate) =>
+  [
+    candidate.client_name,
+    candidate.contact_person,
+    candidate.opportunity_name,
+    candidate.contact_email,
+    candidate.task_id || candidate.client_id,
+  ].filter(Boolean).join(' - ');
+
+/**
+ * POST a new client or lead. When the backend reports likely duplicates,
+ * list them and ask the user whether to create the record anyway.
+ * @param {string} path - Collection path, e.g. '/clients' or '/leads'
+ * @param {object} data - Request body
+ * @returns {Promise<object|null>} The axios response, or null if the user cancelled
+ */
+export const createWithDuplicateCheck = async (path, data) => {
+  try {
+    return await api.post(path, data);
+  } catch (error) {
+    if (!isDuplicateConflict(error)) throw error;
+    const { message, duplicates } = error.response.data.detail;
+    const list = duplicates.map((candidate) => `• ${describeCandidate(candidate)}`).join('\n');
+    if (!window.confirm(`${message}:\n\n${list}\n\nCreate it anyway?`)) return null;
+    return api.post(path, data, { params: { allow_duplicate: true } });
+  }
+};
+
+/**
+ * Readable message from an API error (detail may be a string or an object)
+ * @param {object} error - Axios error
+ * @param {string} fallback - Message when the response carries none
+ * @returns {string}
+ */
+export const errorMessage = (error, fallback) => {
+  const detail = error.response?.data?.detail;
+  if (typeof detail === 'string') return detail;
+  if (typeof detail?.message === 'string') return detail.message;
+  return fallback;
+};